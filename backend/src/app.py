@@ -1,6 +1,5 @@
 import logging
-from pathlib import Path
-from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 
 from fastapi import (
     FastAPI,
@@ -14,180 +13,46 @@ from fastapi.responses import JSONResponse
 
 from typing import Optional
 
+from src.app_container import AppContainer
 from src.clients.mongo.client import MClient
-from src.model import AppConfig
+from src.common.app_logging import (
+    RequestContextMiddleware,
+    setup_logging,
+    stop_logging,
+)
+from src.metrics.metrics_middleware import MetricsMiddleware
+from src.metrics.metrics_registry import MetricsRegistry
+from src.metrics.mongo_command_metrics import MongoCommandMetrics
+from src.model import (
+    AppConfig,
+    get_app_config,
+)
 from src.common.common_router_models import (
     ResponseError,
     ApiResponse,
     ApiErrorCodes,
 )
-from src.notifications.notifications_storage import NotificationsStorage
-from src.notifications.notifications_manager import NotificationManager
-from src.users.users_storage import UsersStorage
-from src.users.users_manager import UsersManager
-from src.permissions.permissions_manager import PermissionsManager
-from src.roles.roles_manager import RolesManager
-from src.signs.signs_storage import SignsStorage
-from src.signs.signs_manager import SignsManager
-from src.deals.deals_storage import DealsStorage
-from src.deals.deals_manager import DealsManager
-from src.buyers.buyers_storage import BuyersStorage
-from src.buyers.buyers_manager import BuyersManager
-from src.chats.chats_storage import ChatsStorage
-from src.chats.chats_manager import ChatsManager
-from src.chats import create_chats_indexes
-from src.integrations.integrations_storage import IntegrationsStorage
-from src.integrations.integrations_manager import IntegrationsManager
-from src.integrations.telephony.telephony_manager import TelephonyManager
-from src.integrations.zoom.zoom_manager import ZoomManager
+from src.features import (
+    load_feature_routers,
+    resolve_features,
+)
 from src.authorization.authorization_router import router as authorization_router
 from src.users.users_router import router as users_router
-from src.signs.signs_router import router as signs_router
-from src.deals.deals_router import router as deals_router
-from src.buyers.buyers_router import router as buyers_router
-from src.chats.chats_router import router as chats_router
-from src.integrations.integrations_router import router as integrations_router
-from src.integrations.telephony.telephony_router import router as telephony_router
-from src.integrations.zoom.zoom_router import router as zoom_router
-
-
-# Загружаем переменные окружения из local.env перед созданием конфигурации
-try:
-    env_file = Path(__file__).parent.parent.parent / "local.env"
-    if env_file.exists():
-        load_dotenv(
-            env_file,
-            override=False,
-        )
-        _LOG = logging.getLogger("uvicorn")
-        _LOG.info(f"Loaded environment variables from {env_file}")
-except ImportError:
-    pass
-except Exception as e:
-    _LOG = logging.getLogger("uvicorn")
-    _LOG.warning(f"Failed to load .env file: {e}")
+from src.metrics.metrics_router import router as metrics_router
 
 
 _LOG = logging.getLogger("uvicorn")
 
-APP_CONFIG = AppConfig()
-MONGO_CLIENT = None
-if APP_CONFIG.mongo_config and APP_CONFIG.mongo_config.db_name:
-    try:
-        MONGO_CLIENT = MClient(APP_CONFIG.mongo_config)
-        _LOG.info(f"MongoDB client created successfully. DB: {APP_CONFIG.mongo_config.db_name}")
-    except Exception as e:
-        _LOG.error(f"Failed to create MongoDB client: {e}")
-else:
-    _LOG.warning(
-        f"MongoDB client not created. "
-        f"mongo_config: {APP_CONFIG.mongo_config is not None}, "
-        f"db_name: {APP_CONFIG.mongo_config.db_name if APP_CONFIG.mongo_config else 'N/A'}"
-    )
-
-app = FastAPI()
-
+APP_CONFIG = get_app_config()
+setup_logging(APP_CONFIG.logging_config)
+METRICS = MetricsRegistry() if APP_CONFIG.metrics_config.enabled else None
 
-@app.on_event("startup")
-async def startup():
-    # FIXME: add create indexes for each storage if required
-    # FIXME: on_event is deprecated, use lifespan event handlers instead.
-    #  Read more about it in the
-    #  [FastAPI docs for Lifespan Events](https:// fastapi. tiangolo. com/ advanced/ events/).
-    if MONGO_CLIENT:
-        notifications_storage = NotificationsStorage(MONGO_CLIENT)
-        users_storage = UsersStorage(MONGO_CLIENT)
-        notifications_manager = NotificationManager(
-            notifications_storage,
-            users_storage,
-        )
-        permissions_manager = PermissionsManager(users_storage)
-        users_manager = UsersManager(
-            users_storage,
-            notifications_manager,
-            permissions_manager,
-        )
-
-        await users_manager.create_system_users()
-        
-        # Создаем индексы для чатов
-        try:
-            await create_chats_indexes(MONGO_CLIENT.client, MONGO_CLIENT.db_name)
-        except Exception as e:
-            _LOG.error(f"Failed to create chats indexes: {e}")
 
-
-def setup_app(
-    app_instance: FastAPI,
+def create_mongo_client(
     app_config: AppConfig,
-    mongo_client: Optional[MClient],
-):
-    app_instance.state.config = app_config
-    app_instance.state.mongo_client = mongo_client
-    
-    if mongo_client:
-        try:
-            users_storage = UsersStorage(mongo_client)
-            notifications_storage = NotificationsStorage(mongo_client)
-            signs_storage = SignsStorage(mongo_client)
-            deals_storage = DealsStorage(mongo_client)
-            buyers_storage = BuyersStorage(mongo_client)
-            chats_storage = ChatsStorage(mongo_client.client, mongo_client.db_name)
-            integrations_storage = IntegrationsStorage(mongo_client)
-
-            notifications_manager = NotificationManager(
-                notifications_storage,
-                users_storage,
-            )
-            roles_manager = RolesManager(users_storage=users_storage)
-            permissions_manager = PermissionsManager(users_storage=users_storage)
-            users_manager = UsersManager(
-                users_storage,
-                notifications_manager,
-                permissions_manager,
-            )
-            signs_manager = SignsManager(
-                signs_storage=signs_storage,
-                notification_manager=notifications_manager,
-                users_storage=users_storage,
-            )
-            deals_manager = DealsManager(
-                deals_storage=deals_storage,
-                users_storage=users_storage,
-                permissions_manager=permissions_manager,
-            )
-            buyers_manager = BuyersManager(
-                buyers_storage=buyers_storage,
-                users_storage=users_storage,
-                permissions_manager=permissions_manager,
-            )
-            chats_manager = ChatsManager(
-                chats_storage=chats_storage,
-                users_storage=users_storage,
-            )
-            integrations_manager = IntegrationsManager(
-                integrations_storage=integrations_storage,
-            )
-            telephony_manager = TelephonyManager(
-                integrations_storage=integrations_storage,
-            )
-            zoom_manager = ZoomManager(
-                integrations_storage=integrations_storage,
-            )
-
-            app_instance.state.users_manager = users_manager
-            app_instance.state.signs_manager = signs_manager
-            app_instance.state.deals_manager = deals_manager
-            app_instance.state.buyers_manager = buyers_manager
-            app_instance.state.chats_manager = chats_manager
-            app_instance.state.integrations_manager = integrations_manager
-            app_instance.state.telephony_manager = telephony_manager
-            app_instance.state.zoom_manager = zoom_manager
-            _LOG.info("Managers initialized successfully")
-        except Exception as e:
-            _LOG.error(f"Failed to initialize managers: {e}")
-            raise
-    else:
+    metrics: Optional[MetricsRegistry] = None,
+) -> MClient:
+    if not app_config.mongo_config or not app_config.mongo_config.db_name:
         error_msg = (
             "MongoDB client is not available. "
             "Please check MongoDB configuration in local.env file.\n"
@@ -197,6 +62,50 @@ def setup_app(
         )
         _LOG.error(error_msg)
         raise RuntimeError(error_msg)
+    mongo_client = MClient(
+        app_config.mongo_config,
+        event_listeners=[MongoCommandMetrics(metrics)] if metrics else None,
+        slow_query_config=app_config.slow_query_config,
+    )
+    _LOG.info("MongoDB client created successfully. DB: %s", app_config.mongo_config.db_name)
+    return mongo_client
+
+
+@asynccontextmanager
+async def lifespan(app_instance: FastAPI):
+    """Зависимости создаются один раз на процесс при старте и закрываются при остановке"""
+    app_config: AppConfig = app_instance.state.config
+    mongo_client = create_mongo_client(app_config, app_instance.state.metrics)
+    container = AppContainer(
+        app_config,
+        mongo_client,
+        app_instance.state.metrics,
+        features=app_instance.state.features,
+    )
+    app_instance.state.mongo_client = mongo_client
+    app_instance.state.container = container
+    container.bind(app_instance)
+    try:
+        await container.startup()
+        yield
+    finally:
+        await container.shutdown()
+        stop_logging()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def setup_app(
+    app_instance: FastAPI,
+    app_config: AppConfig,
+    metrics: Optional[MetricsRegistry] = None,
+):
+    """Middleware и роутеры включенных подсистем; зависимости создаются в lifespan"""
+    features = resolve_features(app_config.features_config.get_enabled())
+    app_instance.state.config = app_config
+    app_instance.state.metrics = metrics
+    app_instance.state.features = features
 
     origins = [
         "http://localhost:3000",
@@ -236,27 +145,43 @@ def setup_app(
             "Origin",
             "Access-Control-Request-Method",
             "Access-Control-Expose-Headers",
+            app_config.logging_config.request_id_header,
+        ],
+        expose_headers=[
+            app_config.logging_config.request_id_header,
         ],
     )
 
+    if metrics:
+        app_instance.add_middleware(
+            MetricsMiddleware,
+            metrics=metrics,
+        )
+
+    # Добавляется последним, чтобы идентификатор запроса был и в логах остальных middleware
+    app_instance.add_middleware(
+        RequestContextMiddleware,
+        header=app_config.logging_config.request_id_header,
+        debug_sample_rate=app_config.logging_config.debug_sample_rate,
+    )
+
     # app_instance.add_middleware(ApidocBasicAuthMiddleware)  # noqa
-    # app_instance.add_middleware(RequestTimeMiddleware, stage="dev")
 
     app_instance.include_router(authorization_router)
     app_instance.include_router(users_router)
-    app_instance.include_router(signs_router)
-    app_instance.include_router(deals_router)
-    app_instance.include_router(buyers_router)
-    app_instance.include_router(chats_router)
-    app_instance.include_router(integrations_router)
-    app_instance.include_router(telephony_router)
-    app_instance.include_router(zoom_router)
+    for router in load_feature_routers(
+        features,
+        log_import_time=app_config.features_config.log_import_time,
+    ):
+        app_instance.include_router(router)
+    if metrics:
+        app_instance.include_router(metrics_router)
 
 
 setup_app(
     app,
     APP_CONFIG,
-    MONGO_CLIENT,
+    METRICS,
 )
 
 
@@ -0,0 +1,382 @@
+import asyncio
+import logging
+from functools import (
+    cached_property,
+    partial,
+)
+from typing import (
+    Awaitable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+)
+
+from fastapi import FastAPI
+
+from src.clients.mongo.client import MClient
+from src.common.periodic_task import PeriodicTask
+from src.metrics.metrics_registry import MetricsRegistry
+from src.model import AppConfig
+from src.notifications.notifications_storage import NotificationsStorage
+from src.notifications.notifications_manager import NotificationManager
+from src.users.users_storage import UsersStorage
+from src.users.users_manager import UsersManager
+from src.permissions.permissions_manager import PermissionsManager
+from src.roles.roles_manager import RolesManager
+from src.revisions import (
+    apply_revisions_ttl,
+    create_revisions_indexes,
+)
+from src.sec.password import get_password_hasher
+
+
+_LOG = logging.getLogger("uvicorn")
+
+
+class AppContainer:
+    """
+    Зависимости приложения: каждое хранилище, менеджер и клиент создается один раз на процесс,
+    запускается в startup и закрывается в shutdown жизненного цикла приложения.
+
+    Пользователи, уведомления и права нужны всем подсистемам и создаются сразу. Остальное создается
+    при первом обращении, и модули выключенных подсистем не импортируются.
+    """
+
+    def __init__(
+        self,
+        app_config: AppConfig,
+        mongo_client: MClient,
+        metrics: Optional[MetricsRegistry] = None,
+        features: Iterable[str] = (),
+    ):
+        self.app_config = app_config
+        self.mongo_client = mongo_client
+        self.metrics = metrics
+        self.features = list(features)
+        self.periodic_tasks: List[PeriodicTask] = []
+
+        self.users_storage = UsersStorage(mongo_client, app_config.revisions_config)
+        self.notifications_storage = NotificationsStorage(mongo_client)
+        self.notifications_manager = NotificationManager(
+            self.notifications_storage,
+            self.users_storage,
+        )
+        self.roles_manager = RolesManager(users_storage=self.users_storage)
+        self.permissions_manager = PermissionsManager(users_storage=self.users_storage)
+        self.users_manager = UsersManager(
+            self.users_storage,
+            self.notifications_manager,
+            self.permissions_manager,
+        )
+
+    def _is_created(self, name: str) -> bool:
+        # cached_property хранит созданное значение в __dict__ экземпляра
+        return name in self.__dict__
+
+    # Общие клиенты
+
+    @cached_property
+    def http_clients(self):
+        from src.clients.http_client import HttpClientRegistry
+        return HttpClientRegistry(self.app_config.http_client_config)
+
+    @cached_property
+    def integrations_cache(self):
+        from src.integrations.integrations_cache import ActiveIntegrationCache
+        return ActiveIntegrationCache(self.integrations_storage)
+
+    # Хранилища
+
+    @cached_property
+    def signs_storage(self):
+        from src.signs.signs_storage import SignsStorage
+        return SignsStorage(self.mongo_client)
+
+    @cached_property
+    def deals_storage(self):
+        from src.deals.deals_storage import DealsStorage
+        return DealsStorage(self.mongo_client, self.app_config.revisions_config)
+
+    @cached_property
+    def buyers_storage(self):
+        from src.buyers.buyers_storage import BuyersStorage
+        return BuyersStorage(self.mongo_client, self.app_config.revisions_config)
+
+    @cached_property
+    def chats_storage(self):
+        from src.chats.chats_storage import ChatsStorage
+        return ChatsStorage(
+            self.mongo_client,
+            self.app_config.chat_search_config,
+            legacy_string_ids=self.app_config.chats_config.legacy_string_ids,
+        )
+
+    @cached_property
+    def integrations_storage(self):
+        from src.integrations.integrations_storage import IntegrationsStorage
+        return IntegrationsStorage(self.mongo_client)
+
+    @cached_property
+    def imports_storage(self):
+        from src.imports.imports_storage import ImportsStorage
+        return ImportsStorage(self.mongo_client)
+
+    @cached_property
+    def telephony_reports_storage(self):
+        from src.integrations.telephony.telephony_reports_storage import TelephonyReportsStorage
+        return TelephonyReportsStorage(self.mongo_client)
+
+    @cached_property
+    def telephony_calls_storage(self):
+        from src.integrations.telephony.telephony_calls_storage import TelephonyCallsStorage
+        return TelephonyCallsStorage(self.mongo_client)
+
+    @cached_property
+    def zoom_meetings_storage(self):
+        from src.integrations.zoom.zoom_meetings_storage import ZoomMeetingsStorage
+        return ZoomMeetingsStorage(self.mongo_client)
+
+    # Менеджеры подсистем
+
+    @cached_property
+    def signs_manager(self):
+        from src.signs.signs_manager import SignsManager
+        return SignsManager(
+            signs_storage=self.signs_storage,
+            notification_manager=self.notifications_manager,
+            users_storage=self.users_storage,
+        )
+
+    @cached_property
+    def deals_manager(self):
+        from src.deals.deals_manager import DealsManager
+        return DealsManager(
+            deals_storage=self.deals_storage,
+            users_storage=self.users_storage,
+            permissions_manager=self.permissions_manager,
+        )
+
+    @cached_property
+    def buyers_manager(self):
+        from src.buyers.buyers_manager import BuyersManager
+        return BuyersManager(
+            buyers_storage=self.buyers_storage,
+            users_storage=self.users_storage,
+            permissions_manager=self.permissions_manager,
+        )
+
+    @cached_property
+    def chats_manager(self):
+        from src.chats.chats_manager import ChatsManager
+        return ChatsManager(
+            chats_storage=self.chats_storage,
+            users_storage=self.users_storage,
+        )
+
+    @cached_property
+    def integrations_manager(self):
+        from src.integrations.integrations_manager import IntegrationsManager
+        return IntegrationsManager(
+            integrations_storage=self.integrations_storage,
+            integrations_cache=self.integrations_cache,
+        )
+
+    @cached_property
+    def telephony_events_storage(self):
+        from src.integrations.telephony.telephony_events_storage import TelephonyEventsStorage
+        return TelephonyEventsStorage(self.mongo_client, self.app_config.telephony_events_config)
+
+    @cached_property
+    def telephony_event_hub(self):
+        from src.integrations.telephony.telephony_events import TelephonyEventHub
+        # События вебхука, принятого одним воркером, доходят до соединений всех воркеров
+        return TelephonyEventHub(
+            self.app_config.telephony_events_config,
+            events_storage=self.telephony_events_storage,
+        )
+
+    @cached_property
+    def telephony_manager(self):
+        from src.integrations.telephony.telephony_manager import TelephonyManager
+        return TelephonyManager(
+            integrations_cache=self.integrations_cache,
+            http_clients=self.http_clients,
+            reports_storage=self.telephony_reports_storage,
+            calls_storage=self.telephony_calls_storage,
+            buyers_storage=self.buyers_storage,
+            deals_storage=self.deals_storage,
+            users_storage=self.users_storage,
+            event_hub=self.telephony_event_hub,
+            reports_config=self.app_config.telephony_reports_config,
+            sync_config=self.app_config.telephony_sync_config,
+            events_config=self.app_config.telephony_events_config,
+        )
+
+    @cached_property
+    def zoom_manager(self):
+        from src.integrations.zoom.zoom_manager import ZoomManager
+        from src.integrations.zoom.zoom_token_broker import ZoomTokenBroker
+        from src.integrations.zoom.zoom_token_storage import ZoomTokenStorage
+        token_broker = ZoomTokenBroker(
+            token_storage=ZoomTokenStorage(self.mongo_client) if self.app_config.zoom_token_persistence else None,
+        )
+        return ZoomManager(
+            integrations_cache=self.integrations_cache,
+            http_clients=self.http_clients,
+            token_broker=token_broker,
+            meetings_storage=self.zoom_meetings_storage,
+            sync_config=self.app_config.zoom_sync_config,
+        )
+
+    @cached_property
+    def imports_manager(self):
+        from src.imports.imports_manager import ImportsManager
+        return ImportsManager(
+            imports_storage=self.imports_storage,
+            deals_storage=self.deals_storage,
+            buyers_storage=self.buyers_storage,
+            users_storage=self.users_storage,
+            imports_config=self.app_config.imports_config,
+        )
+
+    def bind(self, app: FastAPI):
+        """Создать менеджеры включенных подсистем и опубликовать их в app.state, откуда их берут роутеры"""
+        app.state.users_manager = self.users_manager
+        features = set(self.features)
+        revisions_config = self.app_config.revisions_config
+        self.periodic_tasks.append(
+            PeriodicTask(
+                "revisions_ttl",
+                partial(apply_revisions_ttl, self.mongo_client, revisions_config),
+                interval=revisions_config.ttl_cleanup_interval,
+                enabled=bool(revisions_config.ttl_days),
+            ),
+        )
+        if "signs" in features:
+            app.state.signs_manager = self.signs_manager
+        if "deals" in features:
+            app.state.deals_manager = self.deals_manager
+        if "buyers" in features:
+            app.state.buyers_manager = self.buyers_manager
+        if "chats" in features:
+            app.state.chats_manager = self.chats_manager
+        if "integrations" in features:
+            app.state.integrations_manager = self.integrations_manager
+        if "telephony" in features:
+            app.state.telephony_manager = self.telephony_manager
+            app.state.telephony_event_hub = self.telephony_event_hub
+            self.periodic_tasks.append(
+                PeriodicTask(
+                    "telephony_calls_sync",
+                    self.telephony_manager.sync_calls,
+                    interval=self.app_config.telephony_sync_config.interval,
+                    enabled=self.app_config.telephony_sync_config.enabled,
+                ),
+            )
+        if "zoom" in features:
+            app.state.zoom_manager = self.zoom_manager
+            self.periodic_tasks.append(
+                PeriodicTask(
+                    "zoom_meetings_sync",
+                    self.zoom_manager.sync_meetings,
+                    interval=self.app_config.zoom_sync_config.interval,
+                    enabled=self.app_config.zoom_sync_config.enabled,
+                ),
+            )
+        if "imports" in features:
+            app.state.imports_manager = self.imports_manager
+        app.state.periodic_tasks = self.periodic_tasks
+        if self._is_created("http_clients"):
+            app.state.http_clients = self.http_clients
+
+        if self.metrics:
+            # Значения считаются при запросе метрик, обработка соединений не меняется
+            if "chats" in features:
+                connection_manager = self.chats_manager.connection_manager
+                self.metrics.callback_gauge(
+                    "chat_websocket_connections",
+                    "Количество WebSocket-соединений чатов",
+                    lambda: connection_manager.connections_count,
+                )
+                self.metrics.callback_gauge(
+                    "chat_online_users",
+                    "Количество пользователей, подключенных хотя бы к одному чату",
+                    lambda: connection_manager.online_users_count,
+                )
+            if "telephony" in features:
+                self.metrics.callback_gauge(
+                    "telephony_websocket_connections",
+                    "Количество WebSocket-соединений событий телефонии",
+                    lambda: self.telephony_event_hub.connections_count,
+                )
+
+    async def _create_indexes(self):
+        # Индексы создаются для хранилищ, которыми пользуется этот воркер. Коллекции независимы,
+        # поэтому индексы создаются параллельно; ошибка одной не мешает остальным
+        jobs: Dict[str, Awaitable] = {
+            "revisions": create_revisions_indexes(self.mongo_client, self.app_config.revisions_config),
+        }
+        if self._is_created("chats_storage"):
+            from src.chats import create_chats_indexes
+            jobs["chats"] = create_chats_indexes(self.mongo_client.client, self.mongo_client.db_name)
+        if self._is_created("deals_storage"):
+            jobs["deals"] = self.deals_storage.create_indexes()
+        if self._is_created("telephony_reports_storage"):
+            jobs["telephony reports"] = self.telephony_reports_storage.create_indexes()
+        if self._is_created("telephony_calls_storage"):
+            jobs["calls"] = self.telephony_calls_storage.create_indexes()
+        if self._is_created("telephony_events_storage"):
+            jobs["telephony events"] = self.telephony_events_storage.create_collection()
+        if self._is_created("zoom_meetings_storage"):
+            jobs["zoom meetings"] = self.zoom_meetings_storage.create_indexes()
+        results = await asyncio.gather(*jobs.values(), return_exceptions=True)
+        for name, result in zip(jobs, results, strict=True):
+            if isinstance(result, Exception):
+                _LOG.error("Failed to create %s indexes: %s", name, result)
+
+    async def _warm_caches(self):
+        if not self._is_created("integrations_cache"):
+            return
+        from src.integrations.integrations_storage_models import IntegrationType
+        # Активные интеграции нужны первым запросам телефонии и Zoom
+        integration_types = [
+            integration_type
+            for feature, integration_type in (
+                ("telephony", IntegrationType.TELEPHONY),
+                ("zoom", IntegrationType.ZOOM),
+            )
+            if feature in self.features
+        ]
+        results = await asyncio.gather(
+            *(self.integrations_cache.get(integration_type) for integration_type in integration_types),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                _LOG.warning("Failed to warm integrations cache: %s", result)
+
+    async def startup(self):
+        await asyncio.gather(
+            self.users_manager.create_system_users(),
+            self._create_indexes(),
+            self._warm_caches(),
+        )
+        for periodic_task in self.periodic_tasks:
+            periodic_task.start()
+        if self._is_created("telephony_event_hub"):
+            self.telephony_event_hub.start()
+        _LOG.info("Application started: %s", ", ".join(self.features))
+
+    async def shutdown(self):
+        for periodic_task in self.periodic_tasks:
+            await periodic_task.stop()
+        if self._is_created("telephony_event_hub"):
+            await self.telephony_event_hub.stop()
+        if self._is_created("imports_manager"):
+            await self.imports_manager.close()
+        if self._is_created("http_clients"):
+            await self.http_clients.aclose()
+        self.mongo_client.close()
+        get_password_hasher().shutdown()
+        _LOG.info("Application stopped")
@@ -1,6 +1,9 @@
 from uuid import UUID
 
-from src.auth.auth_handler import decode_jwt
+from src.auth.auth_handler import (
+    decode_jwt,
+    decode_jwt_cached,
+)
 from fastapi import (
     Request,
     status,
@@ -26,8 +29,6 @@ class CookieAuthMiddleware:
         # call_next: Callable
     ):
         # do something with the request object
-        _LOG.info(f"{request.headers=}")
-        _LOG.info(f"{request.cookies=}")
         headers_jwt_token = request.cookies.get("EPS-Auth")
         if headers_jwt_token is None:
             raise HTTPException(
@@ -51,13 +52,12 @@ class CookieAuthMiddleware:
         is_token_valid: bool = False
 
         try:
-            payload = decode_jwt(jwt_token)
+            payload = decode_jwt_cached(jwt_token)
         except Exception as e:
-            _LOG.warning(f"Ошибка декодирования токена. {e}")
+            _LOG.warning("Ошибка декодирования токена. %s", e)
             payload = None
         if payload:
             is_token_valid = True
-            _LOG.info(payload)
             payload["user_id"] = UUID(payload["user_id"])
             request.state.jwt_payload = payload
 
@@ -74,9 +74,6 @@ class AuthMiddleware(BaseHTTPMiddleware):
     """
 
     async def dispatch(self, request: StarleteRequest, call_next):
-        _LOG.info(f"{request.headers=}")
-        _LOG.info(f"{request.cookies=}")
-
         headers_jwt_token = request.cookies.get("EPS-Auth")
 
         if headers_jwt_token is None:
@@ -108,11 +105,10 @@ class AuthMiddleware(BaseHTTPMiddleware):
         try:
             payload = decode_jwt(jwt_token)
         except Exception as e:
-            _LOG.warning(f"Ошибка декодирования токена. {e}")
+            _LOG.warning("Ошибка декодирования токена. %s", e)
             payload = None
         if payload:
             is_token_valid = True
-            _LOG.info(payload)
             payload["user_id"] = UUID(payload["user_id"])
             request.app.storage.user["jwt_payload"] = payload
 
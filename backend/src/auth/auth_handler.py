@@ -2,10 +2,11 @@ import os
 import time
 
 import jwt
+from cachetools import TTLCache
 
-from src.model import AppConfig
+from src.model import get_app_config
 
-_app_config = AppConfig()
+_app_config = get_app_config()
 
 JWT_SECRET = _app_config.jwt_secret or os.environ.get("JWT_SECRET", "")
 JWT_ALGORITHM = _app_config.jwt_algorithm or os.environ.get("JWT_ALGORITHM", "HS256")
@@ -16,6 +17,10 @@ if not JWT_SECRET:
 # FIXME: this should be a config default should be hour
 EXPIRATION_TIME_SEC = 60 * 60 * 24
 
+# Проверенные токены: повторные запросы и переподключения WebSocket не проверяют подпись заново
+JWT_CACHE_TTL_SEC = 60
+_decoded_jwt_cache: TTLCache[str, dict] = TTLCache(maxsize=10000, ttl=JWT_CACHE_TTL_SEC)
+
 
 def sign_jwt(
     user_id: str,
@@ -41,3 +46,15 @@ def decode_jwt(token: str) -> dict:
         algorithms=[JWT_ALGORITHM],
     )
     return decoded_token
+
+
+def decode_jwt_cached(token: str) -> dict:
+    """
+    decode_jwt с кешем проверенных токенов. Возвращает копию payload;
+    срок жизни токена (expires) проверяет вызывающий.
+    """
+    payload = _decoded_jwt_cache.get(token)
+    if payload is None:
+        payload = decode_jwt(token)
+        _decoded_jwt_cache[token] = payload
+    return dict(payload)
@@ -1,5 +1,6 @@
 import logging
 from typing import (
+    AsyncIterator,
     List,
     Optional,
 )
@@ -7,8 +8,8 @@ from uuid import UUID
 
 from src.buyers.buyers_storage import (
     BuyersStorage,
-    NoSuchBuyerError,
-    NoSuchBuyerCategoryError,
+    NoSuchBuyerError as StorageNoSuchBuyerError,
+    NoSuchBuyerCategoryError as StorageNoSuchBuyerCategoryError,
     BuyersStorageException,
 )
 from src.buyers.buyers_storage_models import (
@@ -83,7 +84,7 @@ class BuyersManager:
         """Получить категорию по ID"""
         try:
             return await self.buyers_storage.get_category(category_id)
-        except NoSuchBuyerCategoryError as e:
+        except StorageNoSuchBuyerCategoryError as e:
             _LOG.error(e)
             raise NoSuchBuyerCategoryError(str(e))
 
@@ -296,7 +297,20 @@ class BuyersManager:
         """Получить покупателя по ID"""
         try:
             return await self.buyers_storage.get_buyer(buyer_id)
-        except NoSuchBuyerError as e:
+        except StorageNoSuchBuyerError as e:
+            _LOG.error(e)
+            raise NoSuchBuyerError(str(e))
+
+    async def get_buyer_revision(
+        self,
+        actor_id: UUID,
+        buyer_id: UUID,
+        revision: int,
+    ) -> BuyerToGet:
+        """Получить покупателя в состоянии на заданной ревизии"""
+        try:
+            return await self.buyers_storage.get_buyer_revision(buyer_id, revision)
+        except StorageNoSuchBuyerError as e:
             _LOG.error(e)
             raise NoSuchBuyerError(str(e))
 
@@ -311,11 +325,33 @@ class BuyersManager:
         sort_direction: str = "asc",
     ) -> List[BuyerToGet]:
         """Получить все покупатели в категории с поддержкой поиска, фильтрации и сортировки"""
+        rows = await self.get_buyer_rows_by_category(
+            actor_id=actor_id,
+            category_id=category_id,
+            active_only=active_only,
+            search=search,
+            stage_id=stage_id,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+        )
+        return [BuyerToGet(**row) for row in rows]
+
+    async def get_buyer_rows_by_category(
+        self,
+        actor_id: UUID,
+        category_id: UUID,
+        active_only: bool = True,
+        search: Optional[str] = None,
+        stage_id: Optional[UUID] = None,
+        sort_field: str = "order",
+        sort_direction: str = "asc",
+    ) -> List[dict]:
+        """Сырые документы покупателей категории для быстрой отдачи списка"""
         # Проверяем, что категория существует
         await self.get_category(actor_id, category_id)
         
         try:
-            return await self.buyers_storage.get_buyers_by_category(
+            return await self.buyers_storage.get_buyer_rows_by_category(
                 category_id=category_id,
                 active_only=active_only,
                 search=search,
@@ -329,6 +365,29 @@ class BuyersManager:
                 f"Ошибка при получении покупателей: {str(e)}",
             )
 
+    async def export_buyers_by_category(
+        self,
+        actor_id: UUID,
+        category_id: UUID,
+        active_only: bool = True,
+        search: Optional[str] = None,
+        stage_id: Optional[UUID] = None,
+        sort_field: str = "order",
+        sort_direction: str = "asc",
+    ) -> AsyncIterator[dict]:
+        """Потоковая выгрузка покупателей категории (сырые документы, без буферизации в памяти)"""
+        # Проверяем, что категория существует, до начала отдачи потока
+        await self.get_category(actor_id, category_id)
+
+        return self.buyers_storage.iter_buyers_by_category(
+            category_id=category_id,
+            active_only=active_only,
+            search=search,
+            stage_id=stage_id,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+        )
+
     async def get_buyers_by_responsible_user(
         self,
         actor_id: UUID,
@@ -336,6 +395,20 @@ class BuyersManager:
         active_only: bool = True,
     ) -> List[BuyerToGet]:
         """Получить все покупатели ответственного пользователя"""
+        rows = await self.get_buyer_rows_by_responsible_user(
+            actor_id=actor_id,
+            user_id=user_id,
+            active_only=active_only,
+        )
+        return [BuyerToGet(**row) for row in rows]
+
+    async def get_buyer_rows_by_responsible_user(
+        self,
+        actor_id: UUID,
+        user_id: UUID,
+        active_only: bool = True,
+    ) -> List[dict]:
+        """Сырые документы покупателей ответственного пользователя для быстрой отдачи списка"""
         try:
             await self.users_storage.get(user_id)
         except UsersStorageNoSuchUserException:
@@ -344,7 +417,7 @@ class BuyersManager:
             )
         
         try:
-            return await self.buyers_storage.get_buyers_by_responsible_user(
+            return await self.buyers_storage.get_buyer_rows_by_responsible_user(
                 user_id=user_id,
                 active_only=active_only,
             )
@@ -7,14 +7,17 @@ from fastapi import (
     Body,
     Depends,
     Request,
+    Response,
     Query,
 )
+from fastapi.responses import StreamingResponse
 
 from src.auth.auth_cookie import CookieAuthMiddleware
 from src.common.common_router_models import (
     ResponseError,
     ApiErrorCodes,
 )
+from src.common.fast_response import fast_list_response
 from src.buyers.buyers_manager import (
     BuyersManager,
     NoSuchBuyerError,
@@ -40,7 +43,16 @@ from src.buyers.buyers_router_models import (
     BuyersSumResponse,
     BuyersSumApiResponse,
 )
-from src.buyers.buyers_storage_models import BuyerStage
+from src.buyers.buyers_storage_models import (
+    BuyerStage,
+    BuyerToGet,
+)
+from src.exports.exports_serializers import (
+    ExportFormat,
+    build_export_headers,
+    build_export_stream,
+    get_export_media_type,
+)
 
 
 _LOG = logging.getLogger("uvicorn.error")
@@ -526,9 +538,57 @@ async def get_buyer(
         )
 
 
+@router.get(
+    "/{buyer_id}/revisions/{revision}",
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def get_buyer_revision(
+    request: Request,
+    buyer_id: UUID,
+    revision: int,
+) -> BuyerApiResponse | None:
+    """Получить покупателя в состоянии на заданной ревизии"""
+    buyers_manager: BuyersManager = request.app.state.buyers_manager
+    user_id = request.state.jwt_payload["user_id"]
+
+    errors = []
+    try:
+        buyer = await buyers_manager.get_buyer_revision(
+            actor_id=user_id,
+            buyer_id=buyer_id,
+            revision=revision,
+        )
+        buyer_response = BuyerResponse.from_buyer(buyer)
+
+        return BuyerApiResponse.success_response(
+            data=buyer_response,
+        )
+    except NoSuchBuyerError as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except Exception as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=f"Неизвестная ошибка. {str(e)}",
+        )
+        errors.append(error)
+
+    if errors:
+        return BuyerApiResponse.error_response(
+            errors=errors,
+            message_text="Ошибка при получении ревизии покупателя.",
+        )
+
+
 @router.get(
     "/category/{category_id}/buyers",
     dependencies=[Depends(CookieAuthMiddleware())],
+    response_model=BuyersListApiResponse,
 )
 async def get_buyers_by_category(
     request: Request,
@@ -553,14 +613,89 @@ async def get_buyers_by_category(
         default="asc",
         description="Направление сортировки: asc или desc",
     ),
-) -> BuyersListApiResponse | None:
+) -> Response | BuyersListApiResponse:
     """Получить все покупатели в категории с поддержкой поиска, фильтрации и сортировки"""
     buyers_manager: BuyersManager = request.app.state.buyers_manager
     user_id = request.state.jwt_payload["user_id"]
 
     errors = []
     try:
-        buyers = await buyers_manager.get_buyers_by_category(
+        rows = await buyers_manager.get_buyer_rows_by_category(
+            actor_id=user_id,
+            category_id=category_id,
+            active_only=active_only,
+            search=search,
+            stage_id=stage_id,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+        )
+        # Строки хранилища кодируются в JSON один раз, без BuyerToGet/BuyerResponse
+        return fast_list_response(BuyerResponse, rows)
+    except NoSuchBuyerCategoryError as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except Exception as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=f"Неизвестная ошибка. {str(e)}",
+        )
+        errors.append(error)
+
+    return BuyersListApiResponse.error_response(
+        errors=errors,
+        message_text="Ошибка при получении покупателей.",
+    )
+
+
+@router.get(
+    "/category/{category_id}/buyers/export",
+    dependencies=[Depends(CookieAuthMiddleware())],
+    response_model=None,
+)
+async def export_buyers_by_category(
+    request: Request,
+    category_id: UUID,
+    data_format: ExportFormat = Query(
+        default=ExportFormat.CSV,
+        description="Формат выгрузки: csv или ndjson",
+    ),
+    compress: bool = Query(
+        default=False,
+        description="Сжать выгрузку в gzip",
+    ),
+    active_only: bool = Query(
+        default=True,
+        description="Только активные покупателей",
+    ),
+    search: Optional[str] = Query(
+        default=None,
+        description="Поиск по названию",
+    ),
+    stage_id: Optional[UUID] = Query(
+        default=None,
+        description="Фильтр по ID стадии",
+    ),
+    sort_field: str = Query(
+        default="order",
+        description="Поле сортировки: order, created_at, value, name",
+    ),
+    sort_direction: str = Query(
+        default="asc",
+        description="Направление сортировки: asc или desc",
+    ),
+) -> StreamingResponse | BuyersListApiResponse | None:
+    """Потоковая выгрузка покупателей категории в CSV/NDJSON (память не зависит от размера выгрузки)"""
+    buyers_manager: BuyersManager = request.app.state.buyers_manager
+    user_id = request.state.jwt_payload["user_id"]
+
+    errors = []
+    try:
+        rows = await buyers_manager.export_buyers_by_category(
             actor_id=user_id,
             category_id=category_id,
             active_only=active_only,
@@ -569,10 +704,20 @@ async def get_buyers_by_category(
             sort_field=sort_field,
             sort_direction=sort_direction,
         )
-        buyers_response = [BuyerResponse.from_buyer(buyer) for buyer in buyers]
 
-        return BuyersListApiResponse.success_response(
-            data=buyers_response,
+        return StreamingResponse(
+            build_export_stream(
+                rows,
+                fields=list(BuyerToGet.model_fields),
+                data_format=data_format,
+                compress=compress,
+            ),
+            media_type=get_export_media_type(data_format, compress),
+            headers=build_export_headers(
+                f"buyers_{category_id}",
+                data_format,
+                compress,
+            ),
         )
     except NoSuchBuyerCategoryError as e:
         _LOG.error(e)
@@ -592,7 +737,7 @@ async def get_buyers_by_category(
     if errors:
         return BuyersListApiResponse.error_response(
             errors=errors,
-            message_text="Ошибка при получении покупателей.",
+            message_text="Ошибка при выгрузке покупателей.",
         )
 
 
@@ -705,6 +850,7 @@ async def sum_buyers_by_category(
 @router.get(
     "/user/{user_id}/buyers",
     dependencies=[Depends(CookieAuthMiddleware())],
+    response_model=BuyersListApiResponse,
 )
 async def get_buyers_by_responsible_user(
     request: Request,
@@ -713,23 +859,20 @@ async def get_buyers_by_responsible_user(
         default=True,
         description="Только активные покупатели",
     ),
-) -> BuyersListApiResponse | None:
+) -> Response | BuyersListApiResponse:
     """Получить все покупатели ответственного пользователя"""
     buyers_manager: BuyersManager = request.app.state.buyers_manager
     actor_id = request.state.jwt_payload["user_id"]
 
     errors = []
     try:
-        buyers = await buyers_manager.get_buyers_by_responsible_user(
+        rows = await buyers_manager.get_buyer_rows_by_responsible_user(
             actor_id=actor_id,
             user_id=user_id,
             active_only=active_only,
         )
-        buyers_response = [BuyerResponse.from_buyer(buyer) for buyer in buyers]
-
-        return BuyersListApiResponse.success_response(
-            data=buyers_response,
-        )
+        # Строки хранилища кодируются в JSON один раз, без BuyerToGet/BuyerResponse
+        return fast_list_response(BuyerResponse, rows)
     except BuyersManagerException as e:
         _LOG.error(e)
         error = ResponseError(
@@ -745,11 +888,10 @@ async def get_buyers_by_responsible_user(
         )
         errors.append(error)
 
-    if errors:
-        return BuyersListApiResponse.error_response(
-            errors=errors,
-            message_text="Ошибка при получении покупателей.",
-        )
+    return BuyersListApiResponse.error_response(
+        errors=errors,
+        message_text="Ошибка при получении покупателей.",
+    )
 
 
 @router.patch(
@@ -1,5 +1,6 @@
 import logging
 from typing import (
+    AsyncIterator,
     Optional,
     List,
 )
@@ -10,13 +11,18 @@ from uuid import (
 
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
-from pymongo.errors import DuplicateKeyError
-
-from src.clients.mongo.client import (
-    MClient,
-    codec_options,
+from pymongo.errors import (
+    BulkWriteError,
+    DuplicateKeyError,
 )
+
+from src.clients.mongo.client import MClient
+from src.model import RevisionsConfig
 from src.misc.misc_lib import utc_now
+from src.revisions.revisions_storage import (
+    RevisionsStorage,
+    NoSuchRevisionError,
+)
 from .buyers_storage_models import (
     BuyerToCreate,
     BuyerToGet,
@@ -49,28 +55,33 @@ class BuyersStorage:
     def __init__(
         self,
         mongo_client: MClient,
+        revisions_config: Optional[RevisionsConfig] = None,
     ):
         self.mongo_client: MClient = mongo_client
         self.buyers_collection_name: str = "buyers"
         self.categories_collection_name: str = "buyer_categories"
-        self.buyers_revisions_collection_name: str = f"{self.buyers_collection_name}_revisions"
-        self.categories_revisions_collection_name: str = f"{self.categories_collection_name}_revisions"
         
-        self.buyers_collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
+        self.buyers_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
             self.buyers_collection_name,
-            codec_options=codec_options,
         )
-        self.categories_collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
+        # Выгрузки, счетчики и итоги по воронке допускают отставание реплики и читаются с analytics read preference.
+        # Списки канбана остаются на основном read preference: сразу после изменения UI должен увидеть свою запись
+        self.buyers_analytics_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            self.buyers_collection_name,
+            analytics=True,
+        )
+        self.categories_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
             self.categories_collection_name,
-            codec_options=codec_options,
         )
-        self.buyers_revisions_collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
-            self.buyers_revisions_collection_name,
-            codec_options=codec_options,
+        self.buyers_revisions: RevisionsStorage = RevisionsStorage(
+            self.mongo_client,
+            self.buyers_collection_name,
+            revisions_config,
         )
-        self.categories_revisions_collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
-            self.categories_revisions_collection_name,
-            codec_options=codec_options,
+        self.categories_revisions: RevisionsStorage = RevisionsStorage(
+            self.mongo_client,
+            self.categories_collection_name,
+            revisions_config,
         )
 
     async def add_category(
@@ -126,7 +137,7 @@ class BuyersStorage:
         category_id: UUID,
     ) -> BuyerCategoryToGet:
         """Получить категорию по ID"""
-        _LOG.info(f"Запрашиваю категорию по id: {category_id}")
+        _LOG.debug("Запрашиваю категорию по id: %s", category_id)
         projection = {
             "_id": False,
         }
@@ -138,7 +149,7 @@ class BuyersStorage:
         )
         if data:
             return BuyerCategoryToGet(**data)
-        _LOG.info(f"Категория не найдена. {category_id=}")
+        _LOG.debug("Категория не найдена. category_id=%r", category_id)
         raise NoSuchBuyerCategoryError(
             f"Категория не найдена. {category_id=}",
         )
@@ -148,7 +159,7 @@ class BuyersStorage:
         _id: ObjectId,
     ) -> Optional[BuyerCategoryToGet]:
         """Получить категорию по ObjectId"""
-        _LOG.info(f"Запрашиваю категорию по ObjectID: {_id}")
+        _LOG.debug("Запрашиваю категорию по ObjectID: %s", _id)
         projection = {
             "_id": False,
         }
@@ -169,7 +180,7 @@ class BuyersStorage:
         active_only: bool = False,
     ) -> List[BuyerCategoryToGet]:
         """Получить все категории"""
-        _LOG.info("Запрашиваю все категории")
+        _LOG.debug("Запрашиваю все категории")
         query = {}
         if active_only:
             query["is_active"] = True
@@ -222,17 +233,30 @@ class BuyersStorage:
             },
             current_update_query,
         )
-        _LOG.info(f"Результат обновления категории: {category_id=} {result=}")
-        await self.categories_revisions_collection.insert_one(
+        _LOG.info("Результат обновления категории: category_id=%r result=%r", category_id, result)
+        await self.categories_revisions.add_revision(
+            actor_id,
             category.model_dump(),
         )
 
+    async def get_category_revision(
+        self,
+        category_id: UUID,
+        revision: int,
+    ) -> BuyerCategoryToGet:
+        """Восстановить категорию на заданной ревизии"""
+        try:
+            data = await self.categories_revisions.get_revision(category_id, revision)
+        except NoSuchRevisionError as e:
+            raise NoSuchBuyerCategoryError(str(e))
+        return BuyerCategoryToGet(**data)
+
     async def get_category_full(
         self,
         category_id: UUID,
     ) -> Optional[BuyerCategoryToCreate]:
         """Получить полную категорию (для ревизий)"""
-        _LOG.info(f"Запрашиваю полную категорию по id: {category_id}")
+        _LOG.debug("Запрашиваю полную категорию по id: %s", category_id)
         projection = {
             "_id": False,
         }
@@ -272,7 +296,7 @@ class BuyersStorage:
         category_id: UUID,
     ):
         """Мягкое удаление категории (установка is_active = False)"""
-        _LOG.info(f"Мягкое удаление категории: {category_id}")
+        _LOG.info("Мягкое удаление категории: %s", category_id)
         
         update_query = {
             "$set": {
@@ -293,7 +317,7 @@ class BuyersStorage:
         stage_id: UUID,
     ):
         """Мягкое удаление стадии (установка is_active = False)"""
-        _LOG.info(f"Мягкое удаление стадии: {stage_id} в категории: {category_id}")
+        _LOG.info("Мягкое удаление стадии: %s в категории: %s", stage_id, category_id)
         
         # Получаем категорию
         category = await self.get_category(category_id)
@@ -386,7 +410,7 @@ class BuyersStorage:
         buyer_id: UUID,
     ) -> BuyerToGet:
         """Получить покупателя по ID"""
-        _LOG.info(f"Запрашиваю покупателя по id: {buyer_id}")
+        _LOG.debug("Запрашиваю покупателя по id: %s", buyer_id)
         projection = {
             "_id": False,
         }
@@ -400,7 +424,7 @@ class BuyersStorage:
         )
         if data:
             return BuyerToGet(**data)
-        _LOG.info(f"Покупатель не найдена. {buyer_id=}")
+        _LOG.debug("Покупатель не найдена. buyer_id=%r", buyer_id)
         raise NoSuchBuyerError(
             f"Покупатель не найдена. {buyer_id=}",
         )
@@ -410,7 +434,7 @@ class BuyersStorage:
         _id: ObjectId,
     ) -> Optional[BuyerToGet]:
         """Получить покупателя по ObjectId"""
-        _LOG.info(f"Запрашиваю покупателя по ObjectID: {_id}")
+        _LOG.debug("Запрашиваю покупателя по ObjectID: %s", _id)
         projection = {
             "_id": False,
         }
@@ -426,17 +450,16 @@ class BuyersStorage:
             return BuyerToGet(**data)
         return None
 
-    async def get_buyers_by_category(
-        self,
+    @staticmethod
+    def _build_buyers_by_category_query(
         category_id: UUID,
         active_only: bool = True,
         search: Optional[str] = None,
         stage_id: Optional[UUID] = None,
         sort_field: str = "order",
         sort_direction: str = "asc",
-    ) -> List[BuyerToGet]:
-        """Получить все покупатели в категории с поддержкой поиска, фильтрации и сортировки"""
-        _LOG.info(f"Запрашиваю покупатели по категории: {category_id}")
+    ) -> tuple[dict, str, int]:
+        """Собрать фильтр и сортировку для выборки по категории"""
         query: dict = {
             "category_id": category_id,
         }
@@ -451,10 +474,6 @@ class BuyersStorage:
         if search:
             query["name"] = {"$regex": search, "$options": "i"}
         
-        projection = {"_id": False}
-        for key in BuyerToGet.model_fields:
-            projection[key] = True
-        
         # Определяем направление сортировки
         sort_dir = 1 if sort_direction == "asc" else -1
         
@@ -469,16 +488,94 @@ class BuyersStorage:
             sort_field,
             "order",
         )
+        return query, mongo_sort_field, sort_dir
+
+    async def get_buyers_by_category(
+        self,
+        category_id: UUID,
+        active_only: bool = True,
+        search: Optional[str] = None,
+        stage_id: Optional[UUID] = None,
+        sort_field: str = "order",
+        sort_direction: str = "asc",
+    ) -> List[BuyerToGet]:
+        """Получить все покупатели в категории с поддержкой поиска, фильтрации и сортировки"""
+        rows = await self.get_buyer_rows_by_category(
+            category_id=category_id,
+            active_only=active_only,
+            search=search,
+            stage_id=stage_id,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+        )
+        return [BuyerToGet(**row) for row in rows]
+
+    async def get_buyer_rows_by_category(
+        self,
+        category_id: UUID,
+        active_only: bool = True,
+        search: Optional[str] = None,
+        stage_id: Optional[UUID] = None,
+        sort_field: str = "order",
+        sort_direction: str = "asc",
+    ) -> List[dict]:
+        """То же, что get_buyers_by_category, но сырыми документами (поля BuyerToGet) без валидации"""
+        _LOG.debug("Запрашиваю покупатели по категории: %s", category_id)
+        query, mongo_sort_field, sort_dir = self._build_buyers_by_category_query(
+            category_id=category_id,
+            active_only=active_only,
+            search=search,
+            stage_id=stage_id,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+        )
+        
+        projection = {"_id": False}
+        for key in BuyerToGet.model_fields:
+            projection[key] = True
         
         cursor = self.buyers_collection.find(
             query,
             projection=projection,
         ).sort(mongo_sort_field, sort_dir)
         
-        buyers = []
+        return await cursor.to_list(None)
+
+    async def iter_buyers_by_category(
+        self,
+        category_id: UUID,
+        active_only: bool = True,
+        search: Optional[str] = None,
+        stage_id: Optional[UUID] = None,
+        sort_field: str = "order",
+        sort_direction: str = "asc",
+        batch_size: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """
+        Потоково отдать покупатели категории сырыми документами (для экспорта).
+        Курсор читается пачками batch_size, в памяти не накапливается.
+        """
+        _LOG.debug("Экспортирую покупатели по категории: %s", category_id)
+        query, mongo_sort_field, sort_dir = self._build_buyers_by_category_query(
+            category_id=category_id,
+            active_only=active_only,
+            search=search,
+            stage_id=stage_id,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+        )
+        
+        projection = {"_id": False}
+        for key in BuyerToGet.model_fields:
+            projection[key] = True
+        
+        cursor = self.buyers_analytics_collection.find(
+            query,
+            projection=projection,
+            batch_size=batch_size,
+        ).sort(mongo_sort_field, sort_dir)
         async for buyer in cursor:
-            buyers.append(BuyerToGet(**buyer))
-        return buyers
+            yield buyer
 
     async def count_buyers_by_category(
         self,
@@ -486,14 +583,14 @@ class BuyersStorage:
         active_only: bool = True,
     ) -> int:
         """Получить количество покупателей в категории"""
-        _LOG.info(f"Считаю покупатели по категории: {category_id}")
+        _LOG.debug("Считаю покупатели по категории: %s", category_id)
         query = {
             "category_id": category_id,
         }
         if active_only:
             query["is_active"] = True
         
-        count = await self.buyers_collection.count_documents(query)
+        count = await self.buyers_analytics_collection.count_documents(query)
         return count
 
     async def sum_buyers_amount_by_category(
@@ -502,7 +599,7 @@ class BuyersStorage:
         active_only: bool = True,
     ) -> float:
         """Получить сумму потенциальной стоимости всех покупателей в категории"""
-        _LOG.info(f"Суммирую покупателей по категории: {category_id}")
+        _LOG.debug("Суммирую покупателей по категории: %s", category_id)
         match_query = {
             "category_id": category_id,
         }
@@ -518,7 +615,7 @@ class BuyersStorage:
             },
         ]
         
-        cursor = self.buyers_collection.aggregate(pipeline)
+        cursor = self.buyers_analytics_collection.aggregate(pipeline)
         result = await cursor.to_list(length=1)
         
         if result and len(result) > 0:
@@ -531,7 +628,19 @@ class BuyersStorage:
         active_only: bool = True,
     ) -> List[BuyerToGet]:
         """Получить все покупатели ответственного пользователя"""
-        _LOG.info(f"Запрашиваю покупатели по ответственному пользователю: {user_id}")
+        rows = await self.get_buyer_rows_by_responsible_user(
+            user_id=user_id,
+            active_only=active_only,
+        )
+        return [BuyerToGet(**row) for row in rows]
+
+    async def get_buyer_rows_by_responsible_user(
+        self,
+        user_id: UUID,
+        active_only: bool = True,
+    ) -> List[dict]:
+        """То же, что get_buyers_by_responsible_user, но сырыми документами (поля BuyerToGet) без валидации"""
+        _LOG.debug("Запрашиваю покупатели по ответственному пользователю: %s", user_id)
         query = {
             "responsible_user_id": user_id,
         }
@@ -548,10 +657,7 @@ class BuyersStorage:
             query,
             projection=projection,
         ).sort("order", 1)  # Сортируем по order по возрастанию
-        buyers = []
-        async for buyer in cursor:
-            buyers.append(BuyerToGet(**buyer))
-        return buyers
+        return await cursor.to_list(None)
 
     async def update_buyer_with_revision(
         self,
@@ -586,17 +692,30 @@ class BuyersStorage:
             },
             current_update_query,
         )
-        _LOG.info(f"Результат обновления покупатели: {buyer_id=} {result=}")
-        await self.buyers_revisions_collection.insert_one(
+        _LOG.info("Результат обновления покупатели: buyer_id=%r result=%r", buyer_id, result)
+        await self.buyers_revisions.add_revision(
+            actor_id,
             buyer.model_dump(),
         )
 
+    async def get_buyer_revision(
+        self,
+        buyer_id: UUID,
+        revision: int,
+    ) -> BuyerToGet:
+        """Восстановить покупателя на заданной ревизии"""
+        try:
+            data = await self.buyers_revisions.get_revision(buyer_id, revision)
+        except NoSuchRevisionError as e:
+            raise NoSuchBuyerError(str(e))
+        return BuyerToGet(**data)
+
     async def get_buyer_full(
         self,
         buyer_id: UUID,
     ) -> Optional[BuyerToCreate]:
         """Получить полную покупателя (для ревизий)"""
-        _LOG.info(f"Запрашиваю полную покупателя по id: {buyer_id}")
+        _LOG.debug("Запрашиваю полную покупателя по id: %s", buyer_id)
         projection = {
             "_id": False,
         }
@@ -618,7 +737,7 @@ class BuyersStorage:
         buyer_id: UUID,
     ):
         """Мягкое удаление покупатели (установка is_active = False)"""
-        _LOG.info(f"Мягкое удаление покупатели: {buyer_id}")
+        _LOG.info("Мягкое удаление покупатели: %s", buyer_id)
         
         update_query = {
             "$set": {
@@ -745,3 +864,48 @@ class BuyersStorage:
             buyer_id,
             update_query,
         )
+
+
+    async def get_max_orders_by_stage(
+        self,
+        category_id: UUID,
+    ) -> dict[UUID, int]:
+        """Получить максимальный order по каждой стадии категории одним агрегатом"""
+        pipeline = [
+            {
+                "$match": {"category_id": category_id},
+            },
+            {
+                "$group": {"_id": "$stage_id", "max_order": {"$max": "$order"}},
+            },
+        ]
+        cursor = self.buyers_collection.aggregate(pipeline)
+        max_orders = {}
+        async for item in cursor:
+            # $max по стадии без order дает null
+            max_order = item.get("max_order")
+            max_orders[item["_id"]] = max_order if max_order is not None else -1
+        return max_orders
+
+    async def insert_buyers_batch(
+        self,
+        buyers: List[BuyerToCreate],
+    ) -> dict[int, str]:
+        """
+        Вставить пачку покупателей одним неупорядоченным insert_many.
+
+        Возвращает словарь {индекс в пачке: текст ошибки} для документов, которые не вставились.
+        """
+        if not buyers:
+            return {}
+        errors: dict[int, str] = {}
+        try:
+            await self.buyers_collection.insert_many(
+                [buyer.model_dump() for buyer in buyers],
+                ordered=False,
+            )
+        except BulkWriteError as e:
+            _LOG.error(e)
+            for write_error in e.details.get("writeErrors", []):
+                errors[write_error["index"]] = write_error.get("errmsg", str(e))
+        return errors
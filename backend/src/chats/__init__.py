@@ -27,6 +27,12 @@ async def create_chats_indexes(mongo_client: AsyncIOMotorClient, db_name: str):
         await messages_collection.create_index([("chat_id", 1), ("created_at", -1)])
         await messages_collection.create_index([("sender_id", 1)])
         await messages_collection.create_index([("is_deleted", 1)])
+        # Поиск по словам сообщений; удаленные сообщения в индекс не попадают
+        await messages_collection.create_index(
+            [("chat_id", 1), ("search_tokens", 1)],
+            name="chat_messages_search",
+            partialFilterExpression={"is_deleted": False},
+        )
         
         logger.info("Индексы для чатов успешно созданы")
     except Exception as e:
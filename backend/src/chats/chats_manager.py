@@ -4,11 +4,17 @@ import asyncio
 import datetime as dt
 import json
 import logging
-from typing import Dict, List, Optional, Set
-from uuid import UUID
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID, uuid4
 
 from fastapi import WebSocket
 
+from src.chats.chats_search import (
+    build_snippet,
+    decode_cursor,
+    encode_cursor,
+    query_tokens,
+)
 from src.chats.chats_storage import ChatsStorage
 from src.chats.chats_storage_models import (
     ChatToCreate,
@@ -16,6 +22,7 @@ from src.chats.chats_storage_models import (
     ChatMessageToCreate,
     ChatMessageToGet,
     ChatParticipant,
+    ChatMessageSearchHit,
     TypingIndicator,
 )
 from src.users.users_storage import UsersStorage
@@ -25,6 +32,10 @@ from src.misc.misc_lib import utc_now
 logger = logging.getLogger(__name__)
 
 
+class ChatAccessError(Exception):
+    pass
+
+
 class ConnectionManager:
     """Менеджер WebSocket соединений"""
 
@@ -47,7 +58,7 @@ class ConnectionManager:
             self.online_users[user_id] = set()
         self.online_users[user_id].add(chat_id)
         
-        logger.info(f"Пользователь {user_id} подключился к чату {chat_id}")
+        logger.info("Пользователь %s подключился к чату %s", user_id, chat_id)
 
     def disconnect(self, chat_id: str, user_id: str):
         """Отключить пользователя от чата"""
@@ -62,7 +73,15 @@ class ConnectionManager:
             if not self.online_users[user_id]:
                 del self.online_users[user_id]
         
-        logger.info(f"Пользователь {user_id} отключился от чата {chat_id}")
+        logger.info("Пользователь %s отключился от чата %s", user_id, chat_id)
+
+    @property
+    def connections_count(self) -> int:
+        return sum(len(connections) for connections in self.active_connections.values())
+
+    @property
+    def online_users_count(self) -> int:
+        return len(self.online_users)
 
     async def send_personal_message(self, message: str, chat_id: str, user_id: str):
         """Отправить сообщение конкретному пользователю в чате"""
@@ -70,7 +89,7 @@ class ConnectionManager:
             try:
                 await self.active_connections[chat_id][user_id].send_text(message)
             except Exception as e:
-                logger.error(f"Ошибка отправки сообщения пользователю {user_id}: {e}")
+                logger.error("Ошибка отправки сообщения пользователю %s: %s", user_id, e)
                 self.disconnect(chat_id, user_id)
 
     async def broadcast_to_chat(self, message: str, chat_id: str, exclude_user: Optional[str] = None):
@@ -87,7 +106,7 @@ class ConnectionManager:
             try:
                 await websocket.send_text(message)
             except Exception as e:
-                logger.error(f"Ошибка отправки сообщения пользователю {user_id}: {e}")
+                logger.error("Ошибка отправки сообщения пользователю %s: %s", user_id, e)
                 disconnected_users.append(user_id)
         
         # Удаляем отключившихся пользователей
@@ -122,7 +141,7 @@ class ChatsManager:
         Returns:
             Словарь {user_id: {name, soname, father_name}}
         """
-        logger.info(f"Получение информации о пользователях: {user_ids}")
+        logger.debug("Получение информации о пользователях: %s шт.", len(user_ids))
         users_info = {}
         for user_id in user_ids:
             try:
@@ -134,11 +153,9 @@ class ChatsManager:
                         'father_name': user.father_name,
                     }
                     users_info[str(user_id)] = user_data
-                    logger.info(f"Пользователь {user_id}: {user_data}")
             except Exception as e:
-                logger.warning(f"Не удалось получить информацию о пользователе {user_id}: {e}")
+                logger.warning("Не удалось получить информацию о пользователе %s: %s", user_id, e)
         
-        logger.info(f"Итого информация о пользователях: {users_info}")
         return users_info
 
     async def create_chat(
@@ -151,20 +168,20 @@ class ChatsManager:
         buyer_id: Optional[UUID] = None
     ) -> ChatToGet:
         """Создать новый чат"""
-        logger.info(f"Создание чата типа {chat_type} от пользователя {creator_id}")
+        logger.info("Создание чата типа %s от пользователя %s", chat_type, creator_id)
         
         # Если это личный чат, проверяем, не существует ли он уже
         if chat_type == "direct" and len(participant_ids) == 1:
             existing_chat = await self.chats_storage.get_direct_chat(creator_id, participant_ids[0])
             if existing_chat:
-                logger.info(f"Личный чат уже существует: {existing_chat.id}")
+                logger.info("Личный чат уже существует: %s", existing_chat.id)
                 return existing_chat
         
         # Создаем список участников
-        participants = [ChatParticipant(user_id=creator_id)]
+        participants = [ChatParticipant(user_id=creator_id, unread_count=0)]
         for user_id in participant_ids:
             if user_id != creator_id:
-                participants.append(ChatParticipant(user_id=user_id))
+                participants.append(ChatParticipant(user_id=user_id, unread_count=0))
         
         chat = ChatToCreate(
             title=title,
@@ -191,15 +208,20 @@ class ChatsManager:
         """Получить список чатов пользователя"""
         chats = await self.chats_storage.get_user_chats(user_id, active_only, skip, limit)
         
-        # Добавляем количество непрочитанных сообщений
+        # Количество непрочитанных берется из счетчика участника; запросом считается только там,
+        # где счетчик еще не ведется (чаты, созданные до его появления)
         for chat in chats:
-            chat.unread_count = await self.chats_storage.get_unread_count(chat.id, user_id)
+            participant = next((p for p in chat.participants if p.user_id == user_id), None)
+            if participant is not None and participant.unread_count is not None:
+                chat.unread_count = participant.unread_count
+            else:
+                chat.unread_count = await self.chats_storage.get_unread_count(chat.id, user_id)
         
         return chats
 
     async def add_participant(self, chat_id: UUID, user_id: UUID) -> bool:
         """Добавить участника в чат"""
-        participant = ChatParticipant(user_id=user_id)
+        participant = ChatParticipant(user_id=user_id, unread_count=0)
         success = await self.chats_storage.add_participant(chat_id, participant)
         
         if success:
@@ -244,12 +266,17 @@ class ChatsManager:
         sender_id: UUID,
         content: str,
         message_type: str = "text",
-        file_url: Optional[str] = None
+        file_url: Optional[str] = None,
+        message_id: Optional[UUID] = None,
     ) -> ChatMessageToGet:
-        """Отправить сообщение в чат"""
-        logger.info(f"Отправка сообщения в чат {chat_id} от пользователя {sender_id}")
+        """
+        Отправить сообщение в чат. message_id задает клиент, чтобы повтор отправки
+        после обрыва соединения не создал дубль
+        """
+        logger.debug("Отправка сообщения в чат %s от пользователя %s", chat_id, sender_id)
         
         message = ChatMessageToCreate(
+            id=message_id or uuid4(),
             chat_id=chat_id,
             sender_id=sender_id,
             content=content,
@@ -300,7 +327,7 @@ class ChatsManager:
         if message.sender_id != user_id:
             return False
         
-        success = await self.chats_storage.update_message(message_id, content)
+        success = await self.chats_storage.update_message(message_id, content, chat_id=message.chat_id)
         
         if success:
             # Уведомляем участников чата об изменении
@@ -326,7 +353,7 @@ class ChatsManager:
         if message.sender_id != user_id:
             return False
         
-        success = await self.chats_storage.delete_message(message_id)
+        success = await self.chats_storage.delete_message(message_id, chat_id=message.chat_id)
         
         if success:
             # Уведомляем участников чата об удалении
@@ -372,6 +399,47 @@ class ChatsManager:
             exclude_user=str(user_id)
         )
 
+    async def search_messages(
+        self,
+        user_id: UUID,
+        query: str,
+        chat_id: Optional[UUID] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> Tuple[List[ChatMessageSearchHit], Optional[str]]:
+        """
+        Найти сообщения в чате или во всех активных чатах пользователя.
+        Возвращает найденные сообщения и курсор следующей страницы (None - страниц больше нет).
+        """
+        tokens = query_tokens(query)
+        if not tokens:
+            return [], None
+        if chat_id is not None:
+            chat = await self.chats_storage.get_chat(chat_id)
+            if chat is None or all(participant.user_id != user_id for participant in chat.participants):
+                raise ChatAccessError(f"Пользователь {user_id} не участвует в чате {chat_id}")
+            chat_ids = [chat_id]
+        else:
+            chat_ids = await self.chats_storage.get_user_chat_ids(user_id)
+        
+        # Лишний результат показывает, есть ли следующая страница
+        hits = await self.chats_storage.search_messages(
+            chat_ids,
+            tokens,
+            limit=limit + 1,
+            after=decode_cursor(cursor) if cursor else None,
+        )
+        next_cursor = None
+        if len(hits) > limit:
+            hits = hits[:limit]
+            last = hits[-1]
+            next_cursor = encode_cursor(last.score, last.message.created_at, last.message.id)
+        
+        snippet_length = self.chats_storage.search_config.snippet_length
+        for hit in hits:
+            hit.snippet, hit.highlights = build_snippet(hit.message.content, tokens, snippet_length)
+        return hits, next_cursor
+
     def get_online_users(self, chat_id: UUID) -> List[str]:
         """Получить список онлайн пользователей в чате"""
         return self.connection_manager.get_online_users_in_chat(str(chat_id))
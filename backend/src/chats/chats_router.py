@@ -2,6 +2,7 @@
 
 import json
 import logging
+from typing import Optional
 from uuid import UUID
 
 from fastapi import (
@@ -15,7 +16,12 @@ from fastapi import (
 )
 from starlette import status
 
-from src.chats.chats_manager import ChatsManager
+from src.auth.auth_cookie import CookieAuthMiddleware
+from src.chats.chats_manager import (
+    ChatAccessError,
+    ChatsManager,
+)
+from src.chats.chats_search import ChatSearchError
 from src.chats.chats_router_models import (
     CreateChatParams,
     SendMessageParams,
@@ -25,6 +31,8 @@ from src.chats.chats_router_models import (
     ChatsListApiResponse,
     ChatMessageApiResponse,
     ChatMessagesListApiResponse,
+    ChatSearchApiResponse,
+    ChatMessageSearchHitResponse,
     OnlineUsersResponse,
     SuccessResponse,
     ChatResponse,
@@ -56,7 +64,7 @@ async def websocket_endpoint(
     - user_id: ID пользователя (query параметр)
     
     Типы входящих сообщений:
-    - send_message: отправить сообщение
+    - send_message: отправить сообщение (id - необязательный ID сообщения, повтор с тем же ID не создает дубль)
     - typing_indicator: индикатор набора текста
     - mark_as_read: отметить сообщения как прочитанные
     
@@ -110,13 +118,15 @@ async def websocket_endpoint(
                 content = message_data.get("content")
                 msg_type = message_data.get("message_type", "text")
                 file_url = message_data.get("file_url")
+                message_id = message_data.get("id")
                 
                 await chats_manager.send_message(
                     chat_id=chat_id,
                     sender_id=UUID(user_id),
                     content=content,
                     message_type=msg_type,
-                    file_url=file_url
+                    file_url=file_url,
+                    message_id=UUID(message_id) if message_id else None,
                 )
             
             elif message_type == "typing_indicator":
@@ -140,9 +150,9 @@ async def websocket_endpoint(
                 await websocket.send_text(json.dumps({"type": "pong"}))
     
     except WebSocketDisconnect:
-        logger.info(f"WebSocket disconnected: user {user_id} from chat {chat_id}")
+        logger.info("WebSocket disconnected: user %s from chat %s", user_id, chat_id)
     except Exception as e:
-        logger.error(f"WebSocket error: {e}")
+        logger.error("WebSocket error: %s", e)
     finally:
         # Отключаем пользователя
         chats_manager.connection_manager.disconnect(str(chat_id), user_id)
@@ -196,7 +206,7 @@ async def create_chat(
             data=ChatResponse.from_chat(chat, users_info)
         )
     except Exception as e:
-        logger.error(f"Ошибка создания чата: {e}")
+        logger.error("Ошибка создания чата: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка создания чата: {str(e)}"
@@ -226,29 +236,80 @@ async def get_user_chats(
             for participant in chat.participants:
                 all_participant_ids.add(participant.user_id)
         
-        logger.info(f"Собрано участников для загрузки: {all_participant_ids}")
+        logger.debug("Собрано участников для загрузки: %s", len(all_participant_ids))
         
         # Получаем информацию о всех пользователях одним запросом
         users_info = await chats_manager._get_users_info(list(all_participant_ids))
         
-        logger.info(f"Получена информация о пользователях: {users_info}")
         
         # Формируем ответ
         response_data = [ChatResponse.from_chat(chat, users_info) for chat in chats]
-        logger.info(f"Сформирован ответ для {len(response_data)} чатов")
+        logger.debug("Сформирован ответ для %s чатов", len(response_data))
         
         return ChatsListApiResponse(
             status=True,
             data=response_data
         )
     except Exception as e:
-        logger.error(f"Ошибка получения чатов: {e}")
+        logger.error("Ошибка получения чатов: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка получения чатов: {str(e)}"
         )
 
 
+async def _search_messages(
+    chats_manager: ChatsManager,
+    user_id: UUID,
+    query: str,
+    chat_id: Optional[UUID],
+    cursor: Optional[str],
+    limit: int,
+) -> ChatSearchApiResponse:
+    try:
+        hits, next_cursor = await chats_manager.search_messages(
+            user_id=user_id,
+            query=query,
+            chat_id=chat_id,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ChatSearchError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ChatAccessError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except Exception as e:
+        logger.error("Ошибка поиска сообщений: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка поиска сообщений: {str(e)}"
+        )
+    return ChatSearchApiResponse(
+        status=True,
+        data=[ChatMessageSearchHitResponse.from_hit(hit) for hit in hits],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get(
+    "/search",
+    response_model=ChatSearchApiResponse,
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def search_user_messages(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос"),
+    cursor: Optional[str] = Query(default=None, description="Курсор следующей страницы из предыдущего ответа"),
+    limit: int = Query(default=20, ge=1, le=100),
+    chats_manager: ChatsManager = Depends(get_chats_manager),
+):
+    """
+    Поиск по сообщениям во всех активных чатах текущего пользователя
+    """
+    user_id = UUID(request.state.jwt_payload["user_id"])
+    return await _search_messages(chats_manager, user_id, q, None, cursor, limit)
+
+
 @router.get(
     "/{chat_id}",
     response_model=ChatApiResponse,
@@ -280,7 +341,7 @@ async def get_chat(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Ошибка получения чата: {e}")
+        logger.error("Ошибка получения чата: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка получения чата: {str(e)}"
@@ -311,7 +372,7 @@ async def delete_chat(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Ошибка удаления чата: {e}")
+        logger.error("Ошибка удаления чата: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка удаления чата: {str(e)}"
@@ -343,7 +404,7 @@ async def add_participant(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Ошибка добавления участника: {e}")
+        logger.error("Ошибка добавления участника: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка добавления участника: {str(e)}"
@@ -375,7 +436,7 @@ async def remove_participant(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Ошибка удаления участника: {e}")
+        logger.error("Ошибка удаления участника: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка удаления участника: {str(e)}"
@@ -402,7 +463,8 @@ async def send_message(
             sender_id=user_id,
             content=params.content,
             message_type=params.message_type,
-            file_url=params.file_url
+            file_url=params.file_url,
+            message_id=params.id,
         )
         
         return ChatMessageApiResponse(
@@ -410,7 +472,7 @@ async def send_message(
             data=ChatMessageResponse.from_message(message)
         )
     except Exception as e:
-        logger.error(f"Ошибка отправки сообщения: {e}")
+        logger.error("Ошибка отправки сообщения: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка отправки сообщения: {str(e)}"
@@ -439,13 +501,33 @@ async def get_chat_messages(
             data=[ChatMessageResponse.from_message(msg) for msg in messages]
         )
     except Exception as e:
-        logger.error(f"Ошибка получения сообщений: {e}")
+        logger.error("Ошибка получения сообщений: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка получения сообщений: {str(e)}"
         )
 
 
+@router.get(
+    "/{chat_id}/messages/search",
+    response_model=ChatSearchApiResponse,
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def search_chat_messages(
+    request: Request,
+    chat_id: UUID,
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос"),
+    cursor: Optional[str] = Query(default=None, description="Курсор следующей страницы из предыдущего ответа"),
+    limit: int = Query(default=20, ge=1, le=100),
+    chats_manager: ChatsManager = Depends(get_chats_manager),
+):
+    """
+    Поиск по сообщениям чата; текущий пользователь должен быть участником чата
+    """
+    user_id = UUID(request.state.jwt_payload["user_id"])
+    return await _search_messages(chats_manager, user_id, q, chat_id, cursor, limit)
+
+
 @router.patch(
     "/{chat_id}/messages/{message_id}",
     response_model=SuccessResponse,
@@ -473,7 +555,7 @@ async def update_message(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Ошибка обновления сообщения: {e}")
+        logger.error("Ошибка обновления сообщения: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка обновления сообщения: {str(e)}"
@@ -506,7 +588,7 @@ async def delete_message(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Ошибка удаления сообщения: {e}")
+        logger.error("Ошибка удаления сообщения: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка удаления сообщения: {str(e)}"
@@ -530,7 +612,7 @@ async def mark_messages_as_read(
         
         return SuccessResponse(status=True, data={"marked_count": count})
     except Exception as e:
-        logger.error(f"Ошибка отметки сообщений как прочитанных: {e}")
+        logger.error("Ошибка отметки сообщений как прочитанных: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка отметки сообщений: {str(e)}"
@@ -553,7 +635,7 @@ async def get_online_users(
         
         return OnlineUsersResponse(status=True, data=online_users)
     except Exception as e:
-        logger.error(f"Ошибка получения онлайн пользователей: {e}")
+        logger.error("Ошибка получения онлайн пользователей: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка получения онлайн пользователей: {str(e)}"
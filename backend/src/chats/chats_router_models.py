@@ -10,6 +10,8 @@ from src.chats.chats_storage_models import (
     ChatToGet,
     ChatMessageToGet,
     ChatParticipant,
+    ChatLastMessage,
+    ChatMessageSearchHit,
 )
 
 
@@ -24,6 +26,10 @@ class CreateChatParams(BaseModel):
 
 class SendMessageParams(BaseModel):
     """Параметры для отправки сообщения"""
+    id: Optional[UUID] = Field(
+        default=None,
+        description="ID сообщения от клиента: повтор отправки с тем же ID не создает дубль",
+    )
     content: str = Field(..., description="Текст сообщения")
     message_type: str = Field(default="text", description="Тип сообщения: text, file, image")
     file_url: Optional[str] = Field(default=None, description="URL файла")
@@ -79,6 +85,7 @@ class ChatResponse(BaseModel):
     deal_id: Optional[UUID] = Field(default=None)
     buyer_id: Optional[UUID] = Field(default=None)
     last_message_at: Optional[dt.datetime] = Field(default=None)
+    last_message: Optional[ChatLastMessage] = Field(default=None)
     unread_count: int = Field(default=0)
 
     @classmethod
@@ -108,6 +115,7 @@ class ChatResponse(BaseModel):
             deal_id=chat.deal_id,
             buyer_id=chat.buyer_id,
             last_message_at=chat.last_message_at,
+            last_message=chat.last_message,
             unread_count=chat.unread_count
         )
 
@@ -143,6 +151,26 @@ class ChatMessageResponse(BaseModel):
         )
 
 
+class ChatMessageSearchHitResponse(BaseModel):
+    """Модель найденного сообщения для ответа API"""
+    message: ChatMessageResponse = Field(...)
+    score: int = Field(..., description="Релевантность")
+    snippet: str = Field(..., description="Фрагмент текста вокруг найденных слов")
+    highlights: List[List[int]] = Field(
+        default_factory=list,
+        description="Позиции найденных слов во фрагменте: [начало, конец) в символах",
+    )
+
+    @classmethod
+    def from_hit(cls, hit: ChatMessageSearchHit):
+        return cls(
+            message=ChatMessageResponse.from_message(hit.message),
+            score=hit.score,
+            snippet=hit.snippet,
+            highlights=[list(span) for span in hit.highlights],
+        )
+
+
 class ChatApiResponse(BaseModel):
     """Ответ API с чатом"""
     status: bool = Field(default=True)
@@ -171,6 +199,14 @@ class ChatMessagesListApiResponse(BaseModel):
     message: Optional[dict] = Field(default=None)
 
 
+class ChatSearchApiResponse(BaseModel):
+    """Ответ API с результатами поиска по сообщениям"""
+    status: bool = Field(default=True)
+    data: Optional[List[ChatMessageSearchHitResponse]] = Field(default=None)
+    next_cursor: Optional[str] = Field(default=None, description="Курсор следующей страницы")
+    message: Optional[dict] = Field(default=None)
+
+
 class OnlineUsersResponse(BaseModel):
     """Ответ со списком онлайн пользователей"""
     status: bool = Field(default=True)
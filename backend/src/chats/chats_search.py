@@ -0,0 +1,100 @@
+"""
+Поиск по сообщениям чатов. Вместе с сообщением хранятся нормализованные слова его текста
+(search_tokens), по ним построен индекс. Слово запроса совпадает со словом сообщения целиком
+или с его началом ("сдел" находит "сделка" и "сделки"); сообщение должно содержать все слова запроса.
+"""
+
+import base64
+import binascii
+import datetime as dt
+import json
+import re
+import unicodedata
+from typing import (
+    List,
+    Optional,
+    Tuple,
+)
+from uuid import UUID
+
+
+TOKEN_RE = re.compile(r"\w+")
+MIN_TOKEN_LENGTH = 2
+# Слова запроса сверх этого количества не учитываются
+MAX_QUERY_TOKENS = 8
+# Баллы слова запроса: совпадение слова целиком и совпадение с началом слова
+EXACT_TOKEN_SCORE = 2
+PREFIX_TOKEN_SCORE = 1
+
+
+class ChatSearchError(Exception):
+    pass
+
+
+def normalize_word(word: str) -> str:
+    return unicodedata.normalize("NFKC", word).lower().replace("ё", "е")
+
+
+def tokenize(text: str, max_tokens: Optional[int] = None) -> List[str]:
+    """Уникальные нормализованные слова текста в порядке появления"""
+    tokens = []
+    seen = set()
+    for match in TOKEN_RE.finditer(text or ""):
+        token = normalize_word(match.group())
+        if len(token) < MIN_TOKEN_LENGTH or token in seen:
+            continue
+        seen.add(token)
+        tokens.append(token)
+        if max_tokens is not None and len(tokens) >= max_tokens:
+            break
+    return tokens
+
+
+def query_tokens(query: str) -> List[str]:
+    return tokenize(query, MAX_QUERY_TOKENS)
+
+
+def build_snippet(
+    content: str,
+    tokens: List[str],
+    length: int,
+) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Фрагмент текста вокруг первого найденного слова и позиции найденных слов в нем
+    ([начало, конец) в символах фрагмента). Разметку подсветки строит клиент.
+    """
+    spans = [
+        (match.start(), match.end())
+        for match in TOKEN_RE.finditer(content)
+        if any(normalize_word(match.group()).startswith(token) for token in tokens)
+    ]
+    start = 0
+    if spans:
+        # Первое совпадение - примерно на трети фрагмента, чтобы был виден контекст перед ним
+        start = max(0, spans[0][0] - length // 3)
+    end = min(len(content), start + length)
+    start = max(0, end - length)
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(content) else ""
+    shift = len(prefix) - start
+    highlights = [
+        (span_start + shift, span_end + shift)
+        for span_start, span_end in spans
+        if span_start >= start and span_end <= end
+    ]
+    return prefix + content[start:end] + suffix, highlights
+
+
+def encode_cursor(score: int, created_at: dt.datetime, message_id: UUID) -> str:
+    """Курсор следующей страницы: позиция последнего результата в порядке выдачи"""
+    payload = json.dumps([score, created_at.isoformat(), str(message_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, dt.datetime, UUID]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, created_at, message_id = json.loads(payload)
+        return int(score), dt.datetime.fromisoformat(created_at), UUID(message_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ChatSearchError(f"Неверный курсор поиска: {e}")
@@ -2,11 +2,13 @@
 
 import datetime as dt
 import logging
-from typing import List, Optional
+import re
+from typing import List, Optional, Tuple
 from uuid import UUID
 
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorCollection
 from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
 
 from src.chats.chats_storage_models import (
     ChatToCreate,
@@ -14,39 +16,107 @@ from src.chats.chats_storage_models import (
     ChatMessageToCreate,
     ChatMessageToGet,
     ChatParticipant,
+    ChatLastMessage,
+    ChatMessageSearchHit,
+)
+from src.chats.chats_search import (
+    EXACT_TOKEN_SCORE,
+    PREFIX_TOKEN_SCORE,
+    tokenize,
+)
+from src.clients.mongo.client import (
+    MClient,
+    codec_options,
 )
 from src.misc.misc_lib import utc_now
+from src.model import ChatSearchConfig
 
 
 logger = logging.getLogger(__name__)
 
+# UUID хранятся в бинарном виде (UuidRepresentation.STANDARD), даты - как BSON datetime.
+# Даты читаются с часовым поясом UTC, как их отдавала прежняя строковая схема
+chats_codec_options = codec_options.with_options(
+    tz_aware=True,
+    tzinfo=dt.timezone.utc,
+)
+# Длина текста последнего сообщения, которая хранится в чате для списка чатов
+MESSAGE_PREVIEW_LENGTH = 200
+# Сколько последних ID сообщений хранится в чате, чтобы повтор добавления не обновил счетчики дважды
+RECENT_MESSAGE_IDS_LIMIT = 50
+# Служебные поля чата, которые не нужны при чтении
+CHAT_PROJECTION = {
+    "_id": False,
+    "recent_message_ids": False,
+}
+MESSAGE_PROJECTION = {
+    "_id": False,
+    "search_tokens": False,
+}
+
+
+class ChatsStorageException(Exception):
+    pass
+
+
+def message_preview(content: str) -> str:
+    return content[:MESSAGE_PREVIEW_LENGTH]
+
 
 class ChatsStorage:
     """Класс для работы с хранилищем чатов"""
 
-    def __init__(self, mongo_client: AsyncIOMotorClient, db_name: str):
+    def __init__(
+        self,
+        mongo_client: MClient,
+        search_config: Optional[ChatSearchConfig] = None,
+        legacy_string_ids: bool = False,
+    ):
         self.mongo_client = mongo_client
-        self.db_name = db_name
-        self.db = mongo_client[db_name]
-        self.chats_collection = self.db["chats"]
-        self.messages_collection = self.db["chat_messages"]
+        self.search_config = search_config or ChatSearchConfig()
+        # Пока tools/migrate_chats_binary_uuids.py не перевел старые документы, UUID в запросах
+        # совпадают и с бинарным, и со строковым видом
+        self.legacy_string_ids = legacy_string_ids
+        self.chats_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            "chats",
+        ).with_options(codec_options=chats_codec_options)
+        self.messages_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            "chat_messages",
+        ).with_options(codec_options=chats_codec_options)
+
+    def _uuid(self, value: UUID):
+        """Условие равенства UUID"""
+        if self.legacy_string_ids:
+            return {"$in": [value, str(value)]}
+        return value
+
+    def _not_uuid(self, value: UUID) -> dict:
+        """Условие неравенства UUID (для массивов - UUID нет среди элементов)"""
+        if self.legacy_string_ids:
+            return {"$nin": [value, str(value)]}
+        return {"$ne": value}
+
+    def _uuid_in(self, values: List[UUID]) -> dict:
+        if self.legacy_string_ids:
+            return {"$in": [*values, *(str(value) for value in values)]}
+        return {"$in": values}
 
     # ==================== Методы для работы с чатами ====================
 
     async def create_chat(self, chat: ChatToCreate) -> ChatToGet:
         """Создать новый чат"""
-        logger.info(f"Создание нового чата: {chat.id}")
+        logger.info("Создание нового чата: %s", chat.id)
         
-        chat_dict = chat.model_dump(mode="json")
+        chat_dict = chat.model_dump()
         await self.chats_collection.insert_one(chat_dict)
         
         return ChatToGet(**chat_dict)
 
     async def get_chat(self, chat_id: UUID) -> Optional[ChatToGet]:
         """Получить чат по ID"""
-        logger.info(f"Получение чата: {chat_id}")
+        logger.debug("Получение чата: %s", chat_id)
         
-        chat_dict = await self.chats_collection.find_one({"id": str(chat_id)})
+        chat_dict = await self.chats_collection.find_one({"id": self._uuid(chat_id)}, CHAT_PROJECTION)
         if not chat_dict:
             return None
         
@@ -60,75 +130,71 @@ class ChatsStorage:
         limit: int = 50
     ) -> List[ChatToGet]:
         """Получить список чатов пользователя"""
-        logger.info(f"Получение чатов для пользователя: {user_id}")
+        logger.debug("Получение чатов для пользователя: %s", user_id)
         
-        query = {"participants.user_id": str(user_id)}
+        query = {"participants.user_id": self._uuid(user_id)}
         if active_only:
             query["is_active"] = True
         
-        cursor = self.chats_collection.find(query).sort("updated_at", DESCENDING).skip(skip).limit(limit)
+        cursor = self.chats_collection.find(query, CHAT_PROJECTION).sort("updated_at", DESCENDING).skip(skip).limit(limit)
         chats = await cursor.to_list(length=limit)
         
         return [ChatToGet(**chat) for chat in chats]
 
     async def get_direct_chat(self, user1_id: UUID, user2_id: UUID) -> Optional[ChatToGet]:
         """Найти личный чат между двумя пользователями"""
-        logger.info(f"Поиск личного чата между {user1_id} и {user2_id}")
+        logger.debug("Поиск личного чата между %s и %s", user1_id, user2_id)
         
         chat_dict = await self.chats_collection.find_one({
             "chat_type": "direct",
             "is_active": True,
-            "participants.user_id": {"$all": [str(user1_id), str(user2_id)]},
+            "$and": [
+                {"participants.user_id": self._uuid(user1_id)},
+                {"participants.user_id": self._uuid(user2_id)},
+            ],
             "$expr": {"$eq": [{"$size": "$participants"}, 2]}
-        })
+        }, CHAT_PROJECTION)
         
         if not chat_dict:
             return None
         
         return ChatToGet(**chat_dict)
 
-    async def update_chat_timestamp(self, chat_id: UUID) -> None:
-        """Обновить timestamp последнего сообщения"""
-        await self.chats_collection.update_one(
-            {"id": str(chat_id)},
-            {"$set": {"updated_at": utc_now(), "last_message_at": utc_now()}}
-        )
-
     async def update_last_read(self, chat_id: UUID, user_id: UUID) -> None:
-        """Обновить время последнего прочтения для пользователя"""
+        """Обновить время последнего прочтения для пользователя и обнулить его счетчик непрочитанных"""
         await self.chats_collection.update_one(
-            {"id": str(chat_id), "participants.user_id": str(user_id)},
-            {"$set": {"participants.$.last_read_at": utc_now()}}
+            {"id": self._uuid(chat_id), "participants.user_id": self._uuid(user_id)},
+            {"$set": {"participants.$.last_read_at": utc_now(), "participants.$.unread_count": 0}}
         )
 
     async def add_participant(self, chat_id: UUID, participant: ChatParticipant) -> bool:
         """Добавить участника в чат"""
-        logger.info(f"Добавление участника {participant.user_id} в чат {chat_id}")
+        logger.info("Добавление участника %s в чат %s", participant.user_id, chat_id)
         
         result = await self.chats_collection.update_one(
-            {"id": str(chat_id)},
-            {"$addToSet": {"participants": participant.model_dump(mode="json")}}
+            {"id": self._uuid(chat_id)},
+            {"$addToSet": {"participants": participant.model_dump()}}
         )
         
         return result.modified_count > 0
 
     async def remove_participant(self, chat_id: UUID, user_id: UUID) -> bool:
         """Удалить участника из чата"""
-        logger.info(f"Удаление участника {user_id} из чата {chat_id}")
+        logger.info("Удаление участника %s из чата %s", user_id, chat_id)
         
         result = await self.chats_collection.update_one(
-            {"id": str(chat_id)},
-            {"$pull": {"participants": {"user_id": str(user_id)}}}
+            {"id": self._uuid(chat_id)},
+            {"$pull": {"participants": {"user_id": self._uuid(user_id)}}}
         )
         
         return result.modified_count > 0
 
     async def deactivate_chat(self, chat_id: UUID) -> bool:
         """Деактивировать чат (мягкое удаление)"""
-        logger.info(f"Деактивация чата: {chat_id}")
+        logger.info("Деактивация чата: %s", chat_id)
         
         result = await self.chats_collection.update_one(
-            {"id": str(chat_id)},
+            {"id": self._uuid(chat_id)},
             {"$set": {"is_active": False, "updated_at": utc_now()}}
         )
         
@@ -137,20 +203,72 @@ class ChatsStorage:
     # ==================== Методы для работы с сообщениями ====================
 
     async def create_message(self, message: ChatMessageToCreate) -> ChatMessageToGet:
-        """Создать новое сообщение"""
-        logger.info(f"Создание сообщения в чате: {message.chat_id}")
-        
-        message_dict = message.model_dump(mode="json")
-        await self.messages_collection.insert_one(message_dict)
-        
-        # Обновляем timestamp чата
-        await self.update_chat_timestamp(message.chat_id)
-        
-        return ChatMessageToGet(**message_dict)
+        """
+        Добавить сообщение в чат: запись сообщения и одно обновление чата (время и текст последнего
+        сообщения, счетчики непрочитанных). Повтор с тем же ID сообщения не создает дубль и
+        не увеличивает счетчики второй раз, поэтому отправку можно безопасно повторить после сбоя.
+        """
+        logger.debug("Создание сообщения в чате: %s", message.chat_id)
+        
+        message_dict = message.model_dump()
+        message_dict["search_tokens"] = tokenize(message.content, self.search_config.max_tokens)
+        try:
+            await self.messages_collection.insert_one(message_dict)
+        except DuplicateKeyError:
+            # Повтор отправки: сообщение уже записано, обновление чата могло не выполниться
+            saved_message = await self.get_message(message.id)
+            if saved_message is None or (saved_message.chat_id, saved_message.sender_id) != (
+                message.chat_id,
+                message.sender_id,
+            ):
+                raise ChatsStorageException(f"Сообщение с ID {message.id} уже существует")
+        else:
+            saved_message = ChatMessageToGet(**message_dict)
+        
+        await self._append_to_chat(saved_message)
+        return saved_message
+
+    async def _append_to_chat(self, message: ChatMessageToGet) -> None:
+        last_message = ChatLastMessage(
+            id=message.id,
+            sender_id=message.sender_id,
+            message_type=message.message_type,
+            content=message_preview(message.content),
+            created_at=message.created_at,
+        )
+        # Обновление выполняется, только если ID сообщения еще нет среди последних добавленных.
+        # Счетчик увеличивается у участников, для которых он уже ведется; у остальных непрочитанные
+        # считаются запросом, пока участник не прочитает чат
+        await self.chats_collection.update_one(
+            {"id": self._uuid(message.chat_id), "recent_message_ids": {"$ne": message.id}},
+            {
+                "$set": {"last_message": last_message.model_dump()},
+                "$max": {"last_message_at": message.created_at, "updated_at": message.created_at},
+                "$inc": {"participants.$[recipient].unread_count": 1},
+                "$push": {
+                    "recent_message_ids": {
+                        "$each": [message.id],
+                        "$slice": -RECENT_MESSAGE_IDS_LIMIT,
+                    },
+                },
+            },
+            array_filters=[
+                {
+                    "recipient.user_id": self._not_uuid(message.sender_id),
+                    "recipient.unread_count": {"$type": "number"},
+                },
+            ],
+        )
+
+    async def _update_last_message_preview(self, chat_id: UUID, message_id: UUID, content: str) -> None:
+        await self.chats_collection.update_one(
+            {"id": self._uuid(chat_id), "last_message.id": message_id},
+            {"$set": {"last_message.content": message_preview(content)}},
+        )
 
     async def get_message(self, message_id: UUID) -> Optional[ChatMessageToGet]:
         """Получить сообщение по ID"""
-        message_dict = await self.messages_collection.find_one({"id": str(message_id)})
+        message_dict = await self.messages_collection.find_one({"id": self._uuid(message_id)}, MESSAGE_PROJECTION)
         if not message_dict:
             return None
         
@@ -164,76 +282,165 @@ class ChatsStorage:
         include_deleted: bool = False
     ) -> List[ChatMessageToGet]:
         """Получить сообщения чата"""
-        logger.info(f"Получение сообщений для чата: {chat_id}")
+        logger.debug("Получение сообщений для чата: %s", chat_id)
         
-        query = {"chat_id": str(chat_id)}
+        query = {"chat_id": self._uuid(chat_id)}
         if not include_deleted:
             query["is_deleted"] = False
         
-        cursor = self.messages_collection.find(query).sort("created_at", DESCENDING).skip(skip).limit(limit)
+        cursor = self.messages_collection.find(query, MESSAGE_PROJECTION).sort("created_at", DESCENDING).skip(skip).limit(limit)
         messages = await cursor.to_list(length=limit)
         
         # Возвращаем в прямом порядке (от старых к новым)
         return [ChatMessageToGet(**msg) for msg in reversed(messages)]
 
-    async def update_message(self, message_id: UUID, content: str) -> bool:
-        """Обновить содержимое сообщения"""
-        logger.info(f"Обновление сообщения: {message_id}")
+    async def update_message(self, message_id: UUID, content: str, chat_id: Optional[UUID] = None) -> bool:
+        """Обновить содержимое сообщения; с chat_id обновляется и текст последнего сообщения чата"""
+        logger.info("Обновление сообщения: %s", message_id)
         
         result = await self.messages_collection.update_one(
-            {"id": str(message_id)},
-            {"$set": {"content": content, "is_edited": True, "updated_at": utc_now()}}
+            {"id": self._uuid(message_id)},
+            {
+                "$set": {
+                    "content": content,
+                    "search_tokens": tokenize(content, self.search_config.max_tokens),
+                    "is_edited": True,
+                    "updated_at": utc_now(),
+                },
+            }
         )
+        if result.modified_count > 0 and chat_id is not None:
+            await self._update_last_message_preview(chat_id, message_id, content)
         
         return result.modified_count > 0
 
-    async def delete_message(self, message_id: UUID) -> bool:
-        """Удалить сообщение (мягкое удаление)"""
-        logger.info(f"Удаление сообщения: {message_id}")
+    async def delete_message(self, message_id: UUID, chat_id: Optional[UUID] = None) -> bool:
+        """Удалить сообщение (мягкое удаление); с chat_id обновляется и текст последнего сообщения чата"""
+        logger.info("Удаление сообщения: %s", message_id)
         
+        content = "[удалено]"
         result = await self.messages_collection.update_one(
-            {"id": str(message_id)},
-            {"$set": {"is_deleted": True, "content": "[удалено]", "updated_at": utc_now()}}
+            {"id": self._uuid(message_id)},
+            {
+                "$set": {"is_deleted": True, "content": content, "updated_at": utc_now()},
+                "$unset": {"search_tokens": ""},
+            }
         )
+        if result.modified_count > 0 and chat_id is not None:
+            await self._update_last_message_preview(chat_id, message_id, content)
         
         return result.modified_count > 0
 
     async def mark_message_as_read(self, message_id: UUID, user_id: UUID) -> bool:
         """Отметить сообщение как прочитанное"""
         result = await self.messages_collection.update_one(
-            {"id": str(message_id)},
-            {"$addToSet": {"read_by": str(user_id)}}
+            {"id": self._uuid(message_id)},
+            {"$addToSet": {"read_by": user_id}}
         )
         
         return result.modified_count > 0
 
     async def mark_chat_messages_as_read(self, chat_id: UUID, user_id: UUID, until_time: dt.datetime) -> int:
         """Отметить все сообщения чата как прочитанные до определенного времени"""
-        logger.info(f"Отметка сообщений как прочитанных в чате {chat_id} до {until_time}")
+        logger.info("Отметка сообщений как прочитанных в чате %s до %s", chat_id, until_time)
+        
+        # Счетчик обнуляется до отметки сообщений: сообщение, добавленное после обнуления, учитывается в счетчике
+        await self.update_last_read(chat_id, user_id)
         
+        query = {
+            "chat_id": self._uuid(chat_id),
+            "created_at": {"$lte": until_time},
+            "sender_id": self._not_uuid(user_id),  # Не отмечаем свои сообщения
+            "read_by": self._not_uuid(user_id),  # Только непрочитанные
+        }
+        if self.legacy_string_ids:
+            # У непереведенных сообщений дата - строка, и они заведомо старше until_time
+            del query["created_at"]
+            query["$or"] = [{"created_at": {"$lte": until_time}}, {"created_at": {"$type": "string"}}]
         result = await self.messages_collection.update_many(
-            {
-                "chat_id": str(chat_id),
-                "created_at": {"$lte": until_time},
-                "sender_id": {"$ne": str(user_id)},  # Не отмечаем свои сообщения
-                "read_by": {"$ne": str(user_id)}  # Только непрочитанные
-            },
-            {"$addToSet": {"read_by": str(user_id)}}
+            query,
+            {"$addToSet": {"read_by": user_id}}
         )
         
-        # Обновляем last_read_at у пользователя
-        await self.update_last_read(chat_id, user_id)
-        
         return result.modified_count
 
     async def get_unread_count(self, chat_id: UUID, user_id: UUID) -> int:
         """Получить количество непрочитанных сообщений в чате"""
         count = await self.messages_collection.count_documents({
-            "chat_id": str(chat_id),
-            "sender_id": {"$ne": str(user_id)},
-            "read_by": {"$ne": str(user_id)},
+            "chat_id": self._uuid(chat_id),
+            "sender_id": self._not_uuid(user_id),
+            "read_by": self._not_uuid(user_id),
             "is_deleted": False
         })
         
         return count
 
+    # ==================== Поиск по сообщениям ====================
+
+    async def get_user_chat_ids(self, user_id: UUID, active_only: bool = True) -> List[UUID]:
+        """ID чатов, в которых участвует пользователь"""
+        query = {"participants.user_id": self._uuid(user_id)}
+        if active_only:
+            query["is_active"] = True
+        cursor = self.chats_collection.find(query, {"_id": False, "id": True})
+        return [chat["id"] if isinstance(chat["id"], UUID) else UUID(chat["id"]) async for chat in cursor]
+
+    async def search_messages(
+        self,
+        chat_ids: List[UUID],
+        tokens: List[str],
+        limit: int,
+        after: Optional[Tuple[int, dt.datetime, UUID]] = None,
+    ) -> List[ChatMessageSearchHit]:
+        """
+        Сообщения чатов, содержащие все слова запроса (целиком или началом слова), по убыванию
+        релевантности и времени. Ранжируются только scan_limit последних подходящих сообщений.
+        after - позиция (релевантность, время, ID) последнего результата предыдущей страницы.
+        """
+        if not chat_ids or not tokens:
+            return []
+        pipeline = [
+            {
+                "$match": {
+                    "chat_id": self._uuid_in(chat_ids),
+                    "is_deleted": False,
+                    # Регулярное выражение с ^ ищется по диапазону индекса search_tokens
+                    "$and": [{"search_tokens": {"$regex": f"^{re.escape(token)}"}} for token in tokens],
+                },
+            },
+            {"$sort": {"created_at": DESCENDING}},
+            {"$limit": self.search_config.scan_limit},
+            {
+                "$addFields": {
+                    "search_score": {
+                        "$add": [
+                            {"$cond": [{"$in": [token, "$search_tokens"]}, EXACT_TOKEN_SCORE, PREFIX_TOKEN_SCORE]}
+                            for token in tokens
+                        ],
+                    },
+                },
+            },
+        ]
+        if after is not None:
+            score, created_at, message_id = after
+            pipeline.append(
+                {
+                    "$match": {
+                        "$or": [
+                            {"search_score": {"$lt": score}},
+                            {"search_score": score, "created_at": {"$lt": created_at}},
+                            {"search_score": score, "created_at": created_at, "id": {"$lt": message_id}},
+                        ],
+                    },
+                },
+            )
+        pipeline += [
+            {"$sort": {"search_score": DESCENDING, "created_at": DESCENDING, "id": DESCENDING}},
+            {"$limit": limit},
+            {"$project": MESSAGE_PROJECTION},
+        ]
+        hits = []
+        async for message_dict in self.messages_collection.aggregate(pipeline):
+            score = message_dict.pop("search_score")
+            hits.append(ChatMessageSearchHit(message=ChatMessageToGet(**message_dict), score=score))
+        return hits
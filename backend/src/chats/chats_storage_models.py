@@ -1,7 +1,7 @@
 """Модели для хранения данных чатов"""
 
 import datetime as dt
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from uuid import UUID, uuid4
 
 from pydantic import BaseModel, Field
@@ -14,6 +14,19 @@ class ChatParticipant(BaseModel):
     user_id: UUID = Field(..., description="ID пользователя")
     joined_at: dt.datetime = Field(default_factory=utc_now, description="Дата присоединения к чату")
     last_read_at: Optional[dt.datetime] = Field(default=None, description="Время последнего прочтения")
+    unread_count: Optional[int] = Field(
+        default=None,
+        description="Непрочитанные сообщения (None - счетчик еще не ведется, непрочитанные считаются запросом)",
+    )
+
+
+class ChatLastMessage(BaseModel):
+    """Последнее сообщение чата для списка чатов"""
+    id: UUID = Field(...)
+    sender_id: UUID = Field(...)
+    message_type: str = Field(...)
+    content: str = Field(..., description="Начало текста сообщения")
+    created_at: dt.datetime = Field(...)
 
 
 class ChatToCreate(BaseModel):
@@ -45,6 +58,7 @@ class ChatToGet(BaseModel):
     buyer_id: Optional[UUID] = Field(default=None)
     # Дополнительные поля для UI
     last_message_at: Optional[dt.datetime] = Field(default=None, description="Время последнего сообщения")
+    last_message: Optional[ChatLastMessage] = Field(default=None, description="Последнее сообщение")
     unread_count: int = Field(default=0, description="Количество непрочитанных сообщений")
 
 
@@ -79,6 +93,14 @@ class ChatMessageToGet(BaseModel):
     read_by: List[UUID] = Field(default_factory=list)
 
 
+class ChatMessageSearchHit(BaseModel):
+    """Сообщение, найденное поиском"""
+    message: ChatMessageToGet = Field(...)
+    score: int = Field(..., description="Релевантность: слова, совпавшие целиком, весят больше совпавших началом")
+    snippet: str = Field(default="", description="Фрагмент текста вокруг найденных слов")
+    highlights: List[Tuple[int, int]] = Field(default_factory=list, description="Позиции найденных слов во фрагменте")
+
+
 class TypingIndicator(BaseModel):
     """Модель индикатора набора текста"""
     chat_id: UUID = Field(..., description="ID чата")
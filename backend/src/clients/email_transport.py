@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import smtplib
+import ssl
+import threading
+import uuid
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from enum import Enum
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Optional,
+)
+
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+from src.misc.misc_lib import utc_now
+from src.model import (
+    AppConfig,
+    EmailConfig,
+    SmtpConfig,
+)
+
+if TYPE_CHECKING:
+    from src.clients.exchange_client import ExchangeClient
+
+
+_LOG = logging.getLogger(__name__)
+
+
+class EmailTransportError(Exception):
+    pass
+
+
+class EmailTransportType(str, Enum):
+    EXCHANGE = "exchange"
+    SMTP = "smtp"
+    FILE = "file"
+
+
+class OutgoingEmail(BaseModel):
+    email_to: str = Field(...)
+    subject: str = Field(...)
+    html_string: str = Field(...)
+
+
+class EmailTransport(ABC):
+    """
+    Отправка писем. Блокирующие отправки выполняются в собственном пуле потоков,
+    письма делятся на пачки по batch_size, пачки отправляются параллельно.
+    """
+
+    def __init__(self, config: EmailConfig):
+        self.config = config
+        self.executor = ThreadPoolExecutor(
+            max_workers=config.max_workers,
+            thread_name_prefix="email-transport",
+        )
+
+    @abstractmethod
+    def _send_batch_sync(
+        self,
+        emails: List[OutgoingEmail],
+    ) -> List[Optional[Exception]]:
+        """Отправить пачку писем в потоке пула; вернуть ошибку для каждого письма (None - отправлено)"""
+
+    async def send(self, email: OutgoingEmail):
+        """Отправить одно письмо; при ошибке выбрасывает EmailTransportError"""
+        [error] = await self.send_batch([email])
+        if error is not None:
+            raise EmailTransportError(f"Failed to send email to {email.email_to}: {error}") from error
+
+    async def send_batch(
+        self,
+        emails: List[OutgoingEmail],
+    ) -> List[Optional[Exception]]:
+        """Отправить письма; порядок ошибок соответствует порядку писем"""
+        loop = asyncio.get_running_loop()
+        batch_size = max(self.config.batch_size, 1)
+        batches = [emails[i:i + batch_size] for i in range(0, len(emails), batch_size)]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self.executor, self._send_batch_safe, batch) for batch in batches),
+        )
+        return [error for batch_errors in results for error in batch_errors]
+
+    def _send_batch_safe(
+        self,
+        emails: List[OutgoingEmail],
+    ) -> List[Optional[Exception]]:
+        try:
+            return self._send_batch_sync(emails)
+        except Exception as e:
+            # Пачка не отправлена целиком (нет соединения, ошибка авторизации)
+            _LOG.error(f"Ошибка отправки пачки писем: {len(emails)=} {e}")
+            return [e] * len(emails)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class ExchangeEmailTransport(EmailTransport):
+    """Отправка через EWS: общий Account с пулом сессий, пачка - один запрос CreateItem"""
+
+    def __init__(
+        self,
+        config: EmailConfig,
+        exchange_client: "ExchangeClient",
+    ):
+        super().__init__(config)
+        self.exchange_client = exchange_client
+
+    def _send_batch_sync(
+        self,
+        emails: List[OutgoingEmail],
+    ) -> List[Optional[Exception]]:
+        return self.exchange_client.send_emails(
+            [(email.email_to, email.subject, email.html_string) for email in emails],
+        )
+
+
+class SmtpEmailTransport(EmailTransport):
+    """Отправка через SMTP: у каждого потока пула свое долгоживущее соединение"""
+
+    def __init__(
+        self,
+        config: EmailConfig,
+        smtp_config: SmtpConfig,
+    ):
+        super().__init__(config)
+        self.smtp_config = smtp_config
+        self.email_from = smtp_config.email_from or smtp_config.login
+        self._local = threading.local()
+        self._connections: List[smtplib.SMTP] = []
+        self._connections_lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        config = self.smtp_config
+        host = config.host
+        if not host:
+            raise EmailTransportError("SMTP_HOST is not set")
+        if config.use_ssl:
+            connection: smtplib.SMTP = smtplib.SMTP_SSL(
+                host,
+                config.port,
+                timeout=config.timeout,
+                context=ssl.create_default_context(),
+            )
+        else:
+            connection = smtplib.SMTP(host, config.port, timeout=config.timeout)
+            if config.use_tls:
+                connection.starttls(context=ssl.create_default_context())
+        if config.login:
+            connection.login(config.login, config.password or "")
+        with self._connections_lock:
+            self._connections.append(connection)
+        return connection
+
+    def _get_connection(self) -> smtplib.SMTP:
+        connection: Optional[smtplib.SMTP] = getattr(self._local, "connection", None)
+        if connection is not None:
+            try:
+                # Сервер мог закрыть простаивающее соединение
+                if connection.noop()[0] == 250:
+                    return connection
+            except smtplib.SMTPException:
+                pass
+            self._drop_connection(connection)
+        connection = self._connect()
+        self._local.connection = connection
+        return connection
+
+    def _drop_connection(self, connection: smtplib.SMTP):
+        self._local.connection = None
+        with self._connections_lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+        try:
+            connection.close()
+        except Exception as e:
+            _LOG.debug(f"Не удалось закрыть SMTP-соединение: {e!r}")
+
+    def _send_batch_sync(
+        self,
+        emails: List[OutgoingEmail],
+    ) -> List[Optional[Exception]]:
+        connection = self._get_connection()
+        errors: List[Optional[Exception]] = []
+        for index, email in enumerate(emails):
+            message = EmailMessage()
+            message["From"] = self.email_from
+            message["To"] = email.email_to
+            message["Subject"] = email.subject
+            message.set_content(email.html_string, subtype="html")
+            try:
+                connection.send_message(message)
+                errors.append(None)
+            except smtplib.SMTPServerDisconnected as e:
+                errors.append(e)
+                try:
+                    connection = self._get_connection()
+                except OSError as reconnect_error:
+                    # Ошибка только для неотправленных писем: отправленные не должны уйти повторно
+                    _LOG.error(f"Не удалось переподключиться к SMTP: {reconnect_error!r}")
+                    errors.extend([reconnect_error] * (len(emails) - index - 1))
+                    break
+            except smtplib.SMTPException as e:
+                errors.append(e)
+        return errors
+
+    def close(self):
+        super().close()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                connection.quit()
+            except Exception as e:
+                _LOG.debug(f"Не удалось завершить SMTP-сессию: {e!r}")
+
+
+class FileEmailTransport(EmailTransport):
+    """Письма сохраняются в каталог как .eml файлы (для тестов и локального запуска)"""
+
+    def __init__(self, config: EmailConfig):
+        super().__init__(config)
+        self.directory = Path(config.file_directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _send_batch_sync(
+        self,
+        emails: List[OutgoingEmail],
+    ) -> List[Optional[Exception]]:
+        errors: List[Optional[Exception]] = []
+        for email in emails:
+            message = EmailMessage()
+            message["To"] = email.email_to
+            message["Subject"] = email.subject
+            message.set_content(email.html_string, subtype="html")
+            file_name = f"{utc_now():%Y%m%dT%H%M%S}_{uuid.uuid4().hex[:8]}.eml"
+            try:
+                (self.directory / file_name).write_bytes(message.as_bytes())
+                errors.append(None)
+            except OSError as e:
+                errors.append(e)
+        return errors
+
+
+def build_email_transport(app_config: AppConfig) -> EmailTransport:
+    """Создать транспорт писем по EMAIL_TRANSPORT"""
+    config = app_config.email_config
+    transport_type = EmailTransportType(config.transport)
+    _LOG.info(f"Транспорт писем: {transport_type.value}")
+    if transport_type == EmailTransportType.SMTP:
+        if not app_config.smtp_config.host:
+            raise EmailTransportError("SMTP_HOST must be set for the smtp email transport")
+        return SmtpEmailTransport(config, app_config.smtp_config)
+    if transport_type == EmailTransportType.FILE:
+        return FileEmailTransport(config)
+    # exchangelib импортируется только для транспорта exchange
+    from src.clients.exchange_client import ExchangeClient
+    return ExchangeEmailTransport(config, ExchangeClient(app_config.exchange_config))
@@ -1,25 +1,76 @@
 #!/usr/bin/env python
 
+import logging
+import threading
+from typing import (
+    List,
+    Optional,
+    Tuple,
+)
+
 from exchangelib import (
     Credentials,
     Account,
+    Configuration,
+    DELEGATE,
     Message,
     Mailbox,
     HTMLBody,
 )
+from exchangelib.items import SEND_AND_SAVE_COPY
 from src.model import ExchangeConfig
 
 
+_LOG = logging.getLogger(__name__)
+
+
 class ExchangeClient:
+    """
+    Синхронный клиент EWS. Подключение (и autodiscover) выполняется при первой отправке,
+    а не при создании клиента. Account потокобезопасен: один экземпляр с пулом сессий
+    используется всеми потоками отправки.
+    """
+
     def __init__(self, config: ExchangeConfig):
+        self.config = config
         self.credentials = Credentials(
             config.login,
             config.password,
         )
-        self.account = Account(
-            config.email,
-            credentials=self.credentials,
-            autodiscover=True,
+        self._account: Optional[Account] = None
+        self._account_lock = threading.Lock()
+
+    @property
+    def account(self) -> Account:
+        if self._account is None:
+            with self._account_lock:
+                if self._account is None:
+                    self._account = self._connect()
+        return self._account
+
+    def _connect(self) -> Account:
+        service_endpoint = self.config.ews_url
+        auth_type = None
+        if not service_endpoint:
+            # autodiscover выполняется один раз, дальше работаем с найденным адресом EWS и своим пулом сессий
+            discovered = Account(
+                self.config.email,
+                credentials=self.credentials,
+                autodiscover=True,
+            )
+            service_endpoint = discovered.protocol.service_endpoint
+            auth_type = discovered.protocol.auth_type
+            _LOG.info(f"Exchange autodiscover: {service_endpoint=}")
+        return Account(
+            self.config.email,
+            config=Configuration(
+                service_endpoint=service_endpoint,
+                credentials=self.credentials,
+                auth_type=auth_type,
+                max_connections=self.config.max_connections,
+            ),
+            autodiscover=False,
+            access_type=DELEGATE,
         )
 
     def send_email(
@@ -37,3 +88,31 @@ class ExchangeClient:
             ],
         )
         return m.send()
+
+    def send_emails(
+        self,
+        emails: List[Tuple[str, str, str]],
+    ) -> List[Optional[Exception]]:
+        """
+        Отправить несколько писем (email_to, subject, html_string) одним запросом CreateItem.
+        Возвращает ошибку для каждого письма (None - отправлено).
+        """
+        account = self.account
+        messages = [
+            Message(
+                account=account,
+                folder=account.sent,
+                subject=subject,
+                body=HTMLBody(html_string),
+                to_recipients=[
+                    Mailbox(email_address=email_to),
+                ],
+            )
+            for email_to, subject, html_string in emails
+        ]
+        results = account.bulk_create(
+            folder=account.sent,
+            items=messages,
+            message_disposition=SEND_AND_SAVE_COPY,
+        )
+        return [result if isinstance(result, Exception) else None for result in results]
@@ -0,0 +1,153 @@
+import asyncio
+import importlib.util
+import logging
+import random
+from typing import (
+    Any,
+    Dict,
+    Optional,
+)
+
+import httpx
+
+from src.model import HttpClientConfig
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+# Методы, которые безопасно повторять по умолчанию
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def backoff_delay(
+    attempt: int,
+    base: float,
+    maximum: float,
+) -> float:
+    """Экспоненциальная задержка с полным джиттером"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))  # noqa: S311 - джиттер, не криптография
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+class ManagedHttpClient:
+    """
+    Пул keep-alive соединений одной интеграции с ограничением параллельных запросов
+    на хост и повторами с джиттером.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        config: HttpClientConfig,
+    ):
+        self.name: str = name
+        self.config: HttpClientConfig = config
+        http2 = config.http2 and HTTP2_AVAILABLE
+        if config.http2 and not HTTP2_AVAILABLE:
+            _LOG.warning(f"HTTP/2 для клиента {name} недоступен: пакет h2 не установлен")
+        self.client: httpx.AsyncClient = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                connect=config.connect_timeout,
+                read=config.read_timeout,
+                write=config.write_timeout,
+                pool=config.pool_timeout,
+            ),
+        )
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.config.per_host_concurrency)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        retry: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Выполнить запрос. По умолчанию повторяются только идемпотентные методы;
+        retry=True разрешает повторы для запросов, которые заведомо ничего не изменяют.
+        """
+        if retry is None:
+            retry = method.upper() in IDEMPOTENT_METHODS
+        max_attempts = self.config.max_retries + 1 if retry else 1
+        semaphore = self._host_semaphore(httpx.URL(url).host)
+
+        attempt = 0
+        while True:
+            is_last_attempt = attempt >= max_attempts - 1
+            try:
+                async with semaphore:
+                    response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if is_last_attempt:
+                    raise
+                delay = backoff_delay(attempt, self.config.backoff_base, self.config.backoff_max)
+                _LOG.warning(f"{self.name}: {method} {url} ошибка соединения ({e}), повтор через {delay:.2f} с")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or is_last_attempt:
+                    return response
+                delay = _retry_after_seconds(response)
+                if delay is None:
+                    delay = backoff_delay(attempt, self.config.backoff_base, self.config.backoff_max)
+                delay = min(delay, self.config.backoff_max)
+                _LOG.warning(f"{self.name}: {method} {url} ответ {response.status_code}, повтор через {delay:.2f} с")
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class HttpClientRegistry:
+    """Реестр общих HTTP-клиентов интеграций: создаются при первом обращении, закрываются при остановке приложения"""
+
+    def __init__(
+        self,
+        config: HttpClientConfig,
+    ):
+        self.config: HttpClientConfig = config
+        self._clients: Dict[str, ManagedHttpClient] = {}
+
+    def get(
+        self,
+        name: str,
+    ) -> ManagedHttpClient:
+        client = self._clients.get(name)
+        if client is None:
+            client = ManagedHttpClient(name, self.config)
+            self._clients[name] = client
+            _LOG.info(f"Создан HTTP-клиент интеграции {name}")
+        return client
+
+    async def aclose(self):
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                _LOG.error(f"Ошибка при закрытии HTTP-клиента {client.name}: {e}")
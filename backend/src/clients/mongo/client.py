@@ -1,9 +1,34 @@
 import datetime as dt
+import importlib.util
 import logging
+from typing import (
+    Dict,
+    List,
+    Optional,
+)
 
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import (
+    AsyncIOMotorClient,
+    AsyncIOMotorCollection,
+)
+from pymongo import (
+    MongoClient,
+    monitoring,
+)
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+    _ServerMode,
+)
 
-from src.model import MongoConfig
+from src.clients.mongo.slow_queries import SlowQueryDetector
+from src.model import (
+    MongoConfig,
+    SlowQueryConfig,
+)
 
 from bson.binary import UuidRepresentation
 from bson.codec_options import (
@@ -14,6 +39,20 @@ from bson.codec_options import (
 
 _LOG = logging.getLogger("uvicorn.info")
 
+# Модули сжатия: zstandard ставится из requirements.txt, python-snappy - по желанию, zlib встроен
+COMPRESSORS_AVAILABLE = {
+    "zstd": importlib.util.find_spec("zstandard") is not None,
+    "snappy": importlib.util.find_spec("snappy") is not None,
+    "zlib": True,
+}
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
 
 def fallback_encoder(value):
     """
@@ -25,6 +64,31 @@ def fallback_encoder(value):
     return value
 
 
+def get_compressors(names: str) -> List[str]:
+    """Компрессоры из списка через запятую, для которых установлены модули; остальные пропускаются с предупреждением"""
+    compressors = []
+    for name in names.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in COMPRESSORS_AVAILABLE:
+            raise ValueError(f"Unknown MongoDB compressor {name!r}, available: {', '.join(COMPRESSORS_AVAILABLE)}")
+        if COMPRESSORS_AVAILABLE[name]:
+            compressors.append(name)
+        else:
+            _LOG.warning("MongoDB compressor %s is skipped: its module is not installed", name)
+    return compressors
+
+
+def build_read_preference(mode: str, max_staleness_seconds: Optional[int] = None) -> _ServerMode:
+    if mode not in READ_PREFERENCES:
+        raise ValueError(f"Unknown MongoDB read preference {mode!r}, available: {', '.join(READ_PREFERENCES)}")
+    if mode == "primary":
+        # primary не допускает maxStalenessSeconds
+        return Primary()
+    return READ_PREFERENCES[mode](max_staleness=max_staleness_seconds if max_staleness_seconds is not None else -1)
+
+
 type_registry = TypeRegistry(fallback_encoder=fallback_encoder)
 codec_options: CodecOptions = CodecOptions(
     type_registry=type_registry,
@@ -33,7 +97,12 @@ codec_options: CodecOptions = CodecOptions(
 
 
 class MClient:
-    def __init__(self, config: MongoConfig):
+    def __init__(
+        self,
+        config: MongoConfig,
+        event_listeners: Optional[List[monitoring.CommandListener]] = None,
+        slow_query_config: Optional[SlowQueryConfig] = None,
+    ):
         if not config.db_name:
             raise ValueError("MongoDB db_name is required but not set in configuration")
         if not config.host:
@@ -45,10 +114,33 @@ class MClient:
         self.port = config.port
         self.db_name = config.db_name
         self.enable_ssl = config.enable_ssl
+        self.config = config
+        self.compressors = get_compressors(config.compressors)
+        if config.max_staleness_seconds is not None and config.max_staleness_seconds < 90:
+            raise ValueError("MongoDB max_staleness_seconds must be at least 90")
+        self.read_preference = build_read_preference(config.read_preference, config.max_staleness_seconds)
+        self.analytics_read_preference = build_read_preference(
+            config.analytics_read_preference,
+            config.max_staleness_seconds,
+        )
+        # {коллекция: read preference}, задается для всех чтений коллекции, включая аналитические
+        self.read_preference_overrides: Dict[str, _ServerMode] = {
+            collection: build_read_preference(mode, config.max_staleness_seconds)
+            for collection, mode in config.get_read_preference_overrides().items()
+        }
+        # Слушатели команд драйвера (метрики); подключаются только при создании клиента
+        self.event_listeners = list(event_listeners or [])
+        self.slow_query_detector: Optional[SlowQueryDetector] = None
+        if slow_query_config and slow_query_config.enabled:
+            self.slow_query_detector = SlowQueryDetector(slow_query_config)
+            self.event_listeners.append(self.slow_query_detector)
+            if slow_query_config.explain:
+                # explain выполняется отдельным клиентом без слушателей, чтобы не учитывать сам себя
+                self.slow_query_detector.enable_explain(MongoClient(**self.get_client_params()))
         self.client = self.get_mongo_client()
         self.db = self.client.get_database(self.db_name)
 
-    def get_mongo_client(self) -> AsyncIOMotorClient:
+    def get_client_params(self) -> dict:
         # Формируем параметры подключения
         client_params = {
             "host": self.host,
@@ -56,7 +148,20 @@ class MClient:
             "tls": self.enable_ssl,
             "tlsAllowInvalidCertificates": True,
             "uuidRepresentation": "standard",
+            "minPoolSize": self.config.min_pool_size,
+            "maxPoolSize": self.config.max_pool_size,
+            "retryReads": self.config.retry_reads,
+            "retryWrites": self.config.retry_writes,
+            "readPreference": self.config.read_preference,
         }
+        if self.config.max_idle_time_ms is not None:
+            client_params["maxIdleTimeMS"] = self.config.max_idle_time_ms
+        if self.config.wait_queue_timeout_ms is not None:
+            client_params["waitQueueTimeoutMS"] = self.config.wait_queue_timeout_ms
+        if self.compressors:
+            client_params["compressors"] = self.compressors
+        if self.config.max_staleness_seconds is not None and self.config.read_preference != "primary":
+            client_params["maxStalenessSeconds"] = self.config.max_staleness_seconds
         
         # Добавляем username и password только если они указаны (не None и не пустая строка)
         if self.user and self.user.strip():
@@ -64,8 +169,34 @@ class MClient:
         if self.password and self.password.strip():
             client_params["password"] = self.password
         
+        return client_params
+
+    def get_mongo_client(self) -> AsyncIOMotorClient:
+        client_params = self.get_client_params()
+        if self.event_listeners:
+            client_params["event_listeners"] = self.event_listeners
         return AsyncIOMotorClient(**client_params)
 
+    def get_collection(self, name: str, analytics: bool = False) -> AsyncIOMotorCollection:
+        """
+        Коллекция с общими codec_options. analytics=True - для выгрузок, счетчиков и агрегаций,
+        которые можно читать со вторичной реплики. Read preference коллекции из
+        read_preference_overrides важнее обоих режимов.
+        """
+        read_preference = self.read_preference_overrides.get(name)
+        if read_preference is None:
+            read_preference = self.analytics_read_preference if analytics else self.read_preference
+        return self.db.get_collection(
+            name,
+            codec_options=codec_options,
+            read_preference=read_preference,
+        )
+
+    def close(self):
+        self.client.close()
+        if self.slow_query_detector:
+            self.slow_query_detector.close()
+
     # Infrastructure
     async def ping(self):
         try:
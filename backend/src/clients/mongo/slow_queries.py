@@ -0,0 +1,283 @@
+"""
+Обнаружение медленных команд Mongo: команды дольше порога логируются вместе с формой фильтра
+(значения заменены на "?"). В режиме explain для таких команд запрашивается план выполнения,
+и планы с полным сканированием коллекции (COLLSCAN) отмечаются отдельно.
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from pymongo import (
+    MongoClient,
+    monitoring,
+)
+
+from src.model import SlowQueryConfig
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+# Команды чтения и изменения, для которых есть фильтр и можно получить план
+FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+}
+# Команды изменения, в которых может быть несколько операторов (bulk_write)
+STATEMENT_FIELDS = {
+    "update": "updates",
+    "delete": "deletes",
+}
+EXPLAINABLE_COMMANDS = frozenset(
+    {
+        "find",
+        "aggregate",
+        "count",
+        "distinct",
+        "findAndModify",
+        "update",
+        "delete",
+    },
+)
+# Поля сессии и транзакции не допускаются внутри explain
+_NOT_EXPLAINABLE_FIELDS = frozenset(
+    {
+        "lsid",
+        "txnNumber",
+        "autocommit",
+        "startTransaction",
+        "writeConcern",
+        "readConcern",
+    },
+)
+
+
+def query_shape(value: Any) -> Any:
+    """Форма фильтра: ключи и операторы сохраняются, значения заменяются на "?" """
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [query_shape(item) for item in value]
+        return ["?"]
+    return "?"
+
+
+def command_shape(command_name: str, command: Mapping[str, Any]) -> Dict[str, Any]:
+    """Форма команды: фильтр (или стадии pipeline) и ключи сортировки"""
+    if command_name == "aggregate":
+        return {"pipeline": query_shape(command.get("pipeline", []))}
+    if command_name in STATEMENT_FIELDS:
+        statements = command.get(STATEMENT_FIELDS[command_name]) or [{}]
+        return {"filter": query_shape(statements[0].get("q", {}))}
+    shape = {"filter": query_shape(command.get(FILTER_FIELDS.get(command_name, "filter"), {}))}
+    if command.get("sort"):
+        shape["sort"] = list(command["sort"])
+    return shape
+
+
+def find_collscans(explain: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Стадии COLLSCAN выбранных планов (отвергнутые планы не учитываются)"""
+    stages = []
+
+    def walk(value):
+        if isinstance(value, dict):
+            if value.get("stage") == "COLLSCAN":
+                stages.append(value)
+            for key, item in value.items():
+                if key != "rejectedPlans":
+                    walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+
+    walk(explain)
+    return stages
+
+
+class SlowQueryDetector(monitoring.CommandListener):
+    """
+    Слушатель команд драйвера. Вызывается из потоков драйвера, поэтому explain выполняется
+    отдельным синхронным клиентом в собственном потоке и не задерживает ни запрос, ни event loop.
+    """
+
+    def __init__(self, config: SlowQueryConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        # {(connection_id, request_id): (база, коллекция, команда, документ команды)}
+        self._started: Dict[Tuple[object, int], Tuple[str, str, str, Mapping[str, Any]]] = {}
+        # {(коллекция, форма): время последнего explain}
+        self._explained_at: Dict[Tuple[str, str], float] = {}
+        self._explained_pruned_at = time.monotonic()
+        self._explain_pending = 0
+        self._explain_client: Optional[MongoClient] = None
+        self._explain_executor: Optional[ThreadPoolExecutor] = None
+        # Формы команд, выполненных полным сканированием коллекции: {(коллекция, форма): количество}
+        self.collscans: Dict[Tuple[str, str], int] = {}
+
+    def enable_explain(self, client: MongoClient):
+        """Запрашивать план медленных команд через отдельный синхронный клиент"""
+        executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="mongo-explain",
+        )
+        with self._lock:
+            self._explain_client = client
+            self._explain_executor = executor
+
+    def close(self):
+        # Потоки драйвера читают клиент и пул под блокировкой, поэтому после нее их уже не увидят
+        with self._lock:
+            executor, self._explain_executor = self._explain_executor, None
+            client, self._explain_client = self._explain_client, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if client:
+            client.close()
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            return
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (
+                event.database_name,
+                collection,
+                event.command_name,
+                event.command,
+            )
+
+    def _pop(self, event) -> Optional[Tuple[str, str, str, Mapping[str, Any]]]:
+        with self._lock:
+            return self._started.pop((event.connection_id, event.request_id), None)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._pop(event)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        started = self._pop(event)
+        if started is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.config.threshold_ms:
+            return
+        database_name, collection, command_name, command = started
+        shape = json.dumps(command_shape(command_name, command), ensure_ascii=False, default=str)
+        _LOG.warning(
+            "Медленная команда Mongo %s.%s %.1f ms: %s",
+            collection,
+            command_name,
+            duration_ms,
+            shape,
+            extra={
+                "mongo_collection": collection,
+                "mongo_command": command_name,
+                "duration_ms": round(duration_ms, 1),
+                "query_shape": shape,
+            },
+        )
+        if self._explain_executor is not None:
+            self._schedule_explain(database_name, collection, command_name, command, shape)
+
+    def _schedule_explain(
+        self,
+        database_name: str,
+        collection: str,
+        command_name: str,
+        command: Mapping[str, Any],
+        shape: str,
+    ):
+        key = (collection, shape)
+        now = time.monotonic()
+        with self._lock:
+            executor = self._explain_executor
+            client = self._explain_client
+            if executor is None or client is None:
+                # close() уже выполнен
+                return
+            if now - self._explained_pruned_at >= self.config.explain_interval:
+                # Устаревшие отметки больше ничего не ограничивают - не копим их по всем формам
+                self._explained_at = {
+                    explained_key: explained_at
+                    for explained_key, explained_at in self._explained_at.items()
+                    if now - explained_at < self.config.explain_interval
+                }
+                self._explained_pruned_at = now
+            # Одна форма запроса объясняется не чаще раза в explain_interval секунд
+            explained_at = self._explained_at.get(key)
+            if explained_at is not None and now - explained_at < self.config.explain_interval:
+                return
+            if self._explain_pending >= self.config.explain_queue_size:
+                return
+            self._explained_at[key] = now
+            self._explain_pending += 1
+        explain_command = {
+            name: value
+            for name, value in command.items()
+            if not name.startswith("$") and name not in _NOT_EXPLAINABLE_FIELDS
+        }
+        statements_field = STATEMENT_FIELDS.get(command_name)
+        if statements_field and explain_command.get(statements_field):
+            # explain принимает один оператор, а bulk_write присылает пачку - объясняем первый, по нему и форма
+            explain_command[statements_field] = explain_command[statements_field][:1]
+        try:
+            executor.submit(self._explain, client, database_name, collection, command_name, explain_command, shape)
+        except RuntimeError:
+            # Пул остановлен close() после того, как мы его взяли
+            with self._lock:
+                self._explain_pending -= 1
+
+    def _explain(
+        self,
+        client: MongoClient,
+        database_name: str,
+        collection: str,
+        command_name: str,
+        command: Dict[str, Any],
+        shape: str,
+    ):
+        try:
+            explain = client.get_database(database_name).command(
+                {
+                    "explain": command,
+                    "verbosity": "queryPlanner",
+                },
+            )
+            collscans = find_collscans(explain)
+            if collscans:
+                key = (collection, shape)
+                with self._lock:
+                    self.collscans[key] = self.collscans.get(key, 0) + 1
+                _LOG.warning(
+                    "COLLSCAN в плане команды Mongo %s.%s: %s",
+                    collection,
+                    command_name,
+                    shape,
+                    extra={
+                        "mongo_collection": collection,
+                        "mongo_command": command_name,
+                        "query_shape": shape,
+                        "collscan": True,
+                    },
+                )
+            else:
+                _LOG.info("План медленной команды Mongo %s.%s использует индекс: %s", collection, command_name, shape)
+        except Exception as e:
+            _LOG.error("Ошибка explain для %s.%s: %s", collection, command_name, e)
+        finally:
+            with self._lock:
+                self._explain_pending -= 1
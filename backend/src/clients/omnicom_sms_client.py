@@ -1,15 +1,36 @@
 #!/usr/bin/env python
 
+import asyncio
+from typing import (
+    List,
+    Optional,
+    Tuple,
+)
+
+from src.clients.http_client import ManagedHttpClient
+from src.clients.rate_limiter import AsyncRateLimiter
 from src.model import OmnicomConfig
 import requests
 
 
+OMNICOM_API_URL = "https://gateway.api.sc"
+
+
+class OmnicomSmsClientError(Exception):
+    pass
+
+
+def _reformat_phone(phone_to: str) -> str:
+    return phone_to.replace("tel:", "").replace(
+        "+", "").replace("-", "")
+
+
 class OmnicomSmsClient:
     def __init__(self, config: OmnicomConfig):
         self.sadr = config.sadr
         self.user = config.user
         self.pwd = config.pwd
-        self.api_url = "https://gateway.api.sc"
+        self.api_url = OMNICOM_API_URL
 
     def send_sms(
         self,
@@ -17,8 +38,7 @@ class OmnicomSmsClient:
         message_string: str,
     ) -> bool:
         url = f"{self.api_url}/get"
-        phone_to_reformated = phone_to.replace("tel:", "").replace(
-            "+", "").replace("-", "")
+        phone_to_reformated = _reformat_phone(phone_to)
         params = {
             "sadr": self.sadr,
             "dadr": phone_to_reformated,
@@ -36,3 +56,59 @@ class OmnicomSmsClient:
             return True
         else:
             return False
+
+
+class AsyncOmnicomSmsClient:
+    """
+    Асинхронный клиент Omnicom поверх общего пула соединений.
+    Шлюз принимает одно сообщение на запрос, поэтому пачка отправляется параллельными
+    запросами в пределах ограничения частоты.
+    """
+
+    def __init__(
+        self,
+        config: OmnicomConfig,
+        http_client: ManagedHttpClient,
+    ):
+        self.config = config
+        self.http_client = http_client
+        self.api_url = OMNICOM_API_URL
+        self.rate_limiter = AsyncRateLimiter(config.rate_limit, config.rate_burst)
+
+    async def send_sms(
+        self,
+        phone_to: str,
+        message_string: str,
+    ):
+        """Отправить SMS; при отказе шлюза выбрасывает OmnicomSmsClientError"""
+        params = {
+            "sadr": self.config.sadr,
+            "dadr": _reformat_phone(phone_to),
+            "pwd": self.config.pwd,
+            "user": self.config.user,
+            "text": message_string,
+        }
+        await self.rate_limiter.acquire()
+        # Повтор GET-запроса может отправить SMS дважды
+        response = await self.http_client.request(
+            "GET",
+            f"{self.api_url}/get",
+            retry=False,
+            params=params,
+        )
+        # В ответ на успешную отправку шлюз возвращает ID сообщения
+        if response.status_code != 200 or not response.text.isalnum():
+            raise OmnicomSmsClientError(
+                f"SMS not accepted: status={response.status_code} response={response.text[:200]}",
+            )
+
+    async def send_batch(
+        self,
+        messages: List[Tuple[str, str]],
+    ) -> List[Optional[Exception]]:
+        """Отправить сообщения (phone_to, message_string); вернуть ошибку для каждого (None - отправлено)"""
+        results = await asyncio.gather(
+            *(self.send_sms(phone_to, message_string) for phone_to, message_string in messages),
+            return_exceptions=True,
+        )
+        return [result if isinstance(result, Exception) else None for result in results]
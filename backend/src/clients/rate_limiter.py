@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+
+class AsyncRateLimiter:
+    """
+    Ограничение частоты запросов к провайдеру (token bucket): rate запросов в секунду,
+    до burst запросов подряд без ожидания. rate <= 0 - без ограничения.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+    ):
+        self.rate: float = rate
+        self.burst: int = max(burst, 1)
+        self._tokens: float = float(self.burst)
+        self._updated_at: float = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        # Ожидающие получают разрешения по очереди
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
@@ -1,5 +1,14 @@
+import json
 import requests
+from typing import (
+    Any,
+    List,
+    Optional,
+    Tuple,
+)
 
+from src.clients.http_client import ManagedHttpClient
+from src.clients.rate_limiter import AsyncRateLimiter
 from src.model import TelegramConfig
 from logging import getLogger
 from io import BytesIO
@@ -7,6 +16,14 @@ from io import BytesIO
 
 _LOG = getLogger(__name__)
 
+TELEGRAM_API_URL = "https://api.telegram.org"
+# sendMediaGroup принимает от 2 до 10 файлов
+MEDIA_GROUP_MAX_SIZE = 10
+
+
+class TgClientError(Exception):
+    pass
+
 
 class TgClient:
     def __init__(
@@ -60,3 +77,108 @@ class TgClient:
         _LOG.info(result)
         _LOG.info(result.text)
         _LOG.info(result.json())
+
+
+class AsyncTgClient:
+    """
+    Асинхронный клиент Telegram Bot API поверх общего пула соединений
+    с ограничением частоты отправки в чат.
+    """
+
+    def __init__(
+        self,
+        tg_config: TelegramConfig,
+        http_client: ManagedHttpClient,
+    ):
+        self.tg_config = tg_config
+        self.chat_id = tg_config.chat_id
+        self.http_client = http_client
+        self.rate_limiter = AsyncRateLimiter(tg_config.rate_limit, tg_config.rate_burst)
+
+    async def _call(
+        self,
+        method: str,
+        **kwargs: Any,
+    ) -> Any:
+        await self.rate_limiter.acquire()
+        response = await self.http_client.request(
+            "POST",
+            f"{TELEGRAM_API_URL}/bot{self.tg_config.token}/{method}",
+            **kwargs,
+        )
+        try:
+            data = response.json()
+        except ValueError:
+            raise TgClientError(f"{method}: unexpected response {response.status_code} {response.text[:200]}")
+        if not data.get("ok"):
+            raise TgClientError(f"{method}: {data.get('error_code')} {data.get('description')}")
+        return data.get("result")
+
+    async def send_message(
+        self,
+        text: str,
+        to: str | None = None,
+    ):
+        message = text
+        if to:
+            message = f"Сообщение для {to}:\n{text}"
+        await self._call(
+            "sendMessage",
+            json={
+                "chat_id": self.chat_id,
+                "text": message,
+                "parse_mode": "markdown",
+            },
+        )
+
+    async def send_file(
+        self,
+        text: str,
+        to: str | None = None,
+    ):
+        await self._call(
+            "sendDocument",
+            files={
+                "document": (f"{to}.html", text.encode("utf-8")),
+            },
+            data={
+                "chat_id": self.chat_id,
+            },
+        )
+
+    async def send_files(
+        self,
+        files: List[Tuple[str, Optional[str]]],
+    ) -> List[Optional[Exception]]:
+        """
+        Отправить файлы (text, to) группами до 10 штук одним запросом sendMediaGroup.
+        Возвращает ошибку для каждого файла (None - отправлен).
+        """
+        errors: List[Optional[Exception]] = []
+        for i in range(0, len(files), MEDIA_GROUP_MAX_SIZE):
+            group = files[i:i + MEDIA_GROUP_MAX_SIZE]
+            try:
+                if len(group) == 1:
+                    await self.send_file(*group[0])
+                else:
+                    await self._call(
+                        "sendMediaGroup",
+                        files={
+                            f"file{n}": (f"{to}.html", text.encode("utf-8"))
+                            for n, (text, to) in enumerate(group)
+                        },
+                        data={
+                            "chat_id": self.chat_id,
+                            "media": json.dumps(
+                                [
+                                    {"type": "document", "media": f"attach://file{n}"}
+                                    for n in range(len(group))
+                                ],
+                            ),
+                        },
+                    )
+                errors.extend([None] * len(group))
+            except Exception as e:
+                _LOG.error(f"Ошибка отправки файлов в Telegram: {len(group)=} {e}")
+                errors.extend([e] * len(group))
+        return errors
@@ -0,0 +1,229 @@
+"""
+Логирование приложения: JSON-формат записей, идентификатор запроса в каждой записи,
+выборка DEBUG-логов горячих путей и запись в поток отдельным потоком через очередь.
+"""
+
+import copy
+import datetime as dt
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from typing import (
+    Any,
+    Dict,
+    Optional,
+)
+
+from src.model import LoggingConfig
+
+
+REQUEST_ID: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+# Попал ли текущий запрос в выборку DEBUG-логов (None - вне запроса)
+_DEBUG_SAMPLED: ContextVar[Optional[bool]] = ContextVar("debug_sampled", default=None)
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s"
+# Идентификатор от клиента принимается, только если он не сломает строку лога
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+# Логгеры библиотек, которые пишут запись на каждый запрос
+_QUIET_LOGGERS = (
+    "httpx",
+    "httpcore",
+    "pymongo",
+)
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {
+    "message",
+    "asctime",
+    "request_id",
+    "taskName",
+}
+
+_LISTENER: Optional[logging.handlers.QueueListener] = None
+
+
+def is_debug_sampled(logger: logging.Logger) -> bool:
+    """
+    Писать ли DEBUG-лог горячего пути: уровень включен и текущий запрос попал в выборку.
+    Проверка нужна перед дорогим вычислением аргументов лога.
+    """
+    return logger.isEnabledFor(logging.DEBUG) and _DEBUG_SAMPLED.get() is not False
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет к записи идентификатор текущего запроса"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = REQUEST_ID.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Пропускает DEBUG-записи только запросов, попавших в выборку"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or _DEBUG_SAMPLED.get() is not False
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись; поля из extra попадают в запись как есть"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": dt.datetime.fromtimestamp(record.created, tz=dt.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(
+            entry,
+            ensure_ascii=False,
+            default=str,
+        )
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Кладет записи в ограниченную очередь и не ждет записи в поток.
+    Если поток не успевает, записи отбрасываются, а не блокируют event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Сообщение подставляется здесь: аргументы могут измениться после возврата из вызова лога.
+        # Форматирование в JSON и запись выполняет поток QueueListener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware: идентификатор запроса из заголовка (или новый) для всех логов запроса,
+    возвращается клиенту в том же заголовке. Здесь же решается, попадает ли запрос в выборку DEBUG-логов.
+    """
+
+    def __init__(
+        self,
+        app,
+        header: str = "X-Request-ID",
+        debug_sample_rate: float = 0.0,
+    ):
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+        self.debug_sample_rate = debug_sample_rate
+
+    def _get_request_id(self, scope) -> str:
+        for name, value in scope.get("headers", []):
+            if name == self.header:
+                request_id = value.decode("latin-1")
+                if _REQUEST_ID_RE.match(request_id):
+                    return request_id
+                break
+        return uuid.uuid4().hex
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = self._get_request_id(scope)
+        request_id_token = REQUEST_ID.set(request_id)
+        sampled_token = _DEBUG_SAMPLED.set(random.random() < self.debug_sample_rate)  # noqa: S311 - сэмплирование логов
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (self.header, request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(
+                scope,
+                receive,
+                send_with_request_id if scope["type"] == "http" else send,
+            )
+        finally:
+            REQUEST_ID.reset(request_id_token)
+            _DEBUG_SAMPLED.reset(sampled_token)
+
+
+def setup_logging(config: LoggingConfig):
+    """
+    Настроить корневой логгер и логгеры uvicorn: все записи идут через один обработчик.
+    Повторный вызов заменяет предыдущую настройку.
+    """
+    global _LISTENER
+    stop_logging()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if config.json_format else logging.Formatter(TEXT_FORMAT))
+
+    handler: logging.Handler = stream_handler
+    if config.use_queue:
+        handler = NonBlockingQueueHandler(queue.Queue(config.queue_size))
+        _LISTENER = logging.handlers.QueueListener(handler.queue, stream_handler)
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(DebugSamplingFilter())
+
+    level = logging.getLevelName(config.level.upper())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+    # uvicorn настраивает свои логгеры с собственными обработчиками; переводим их на общий
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    logging.getLogger("uvicorn").setLevel(level)
+    for name in _QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(level, logging.WARNING))
+
+    if _LISTENER:
+        _LISTENER.start()
+
+
+def stop_logging():
+    """Дописать записи из очереди и остановить поток записи; дальше логи пишутся в поток напрямую"""
+    global _LISTENER
+    if _LISTENER is None:
+        return
+    _LISTENER.stop()
+    root = logging.getLogger()
+    for i, handler in enumerate(root.handlers):
+        if isinstance(handler, NonBlockingQueueHandler):
+            if handler.dropped:
+                sys.stderr.write(f"Отброшено записей лога при переполнении очереди: {handler.dropped}\n")
+            for stream_handler in _LISTENER.handlers:
+                stream_handler.filters = list(handler.filters)
+            root.handlers[i:i + 1] = list(_LISTENER.handlers)
+    _LISTENER = None
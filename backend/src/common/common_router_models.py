@@ -2,6 +2,7 @@ from enum import Enum
 from typing import (
     Any,
     Optional,
+    Self,
 )
 
 from pydantic import BaseModel
@@ -48,7 +49,7 @@ class ApiResponse(BaseModel):
         cls,
         data: Optional[Any] = None,
         message_text: Optional[str] = "",
-    ) -> "ApiResponse":
+    ) -> Self:
         response_message = ResponseMessage(text=message_text)
         if data is not None:
             d = data
@@ -65,7 +66,7 @@ class ApiResponse(BaseModel):
         cls,
         errors: list[ResponseError],
         message_text: Optional[str] = "",
-    ) -> "ApiResponse":
+    ) -> Self:
         response_message = ResponseMessage(
             text=message_text,
             errors=errors,
@@ -0,0 +1,86 @@
+"""
+Быстрая отдача больших списков: строки из Mongo не валидируются моделями,
+а дополняются значениями по умолчанию и кодируются в JSON один раз.
+"""
+
+import datetime as dt
+import functools
+from enum import Enum
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Type,
+)
+from uuid import UUID
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Тип {type(value)} не сериализуется в JSON")
+
+
+def json_dumps(content: Any) -> bytes:
+    """JSON в байтах через orjson: UUID, datetime и Enum кодируются без Python-хука"""
+    # OPT_UTC_Z - как pydantic: aware UTC datetime записывается с суффиксом Z
+    return orjson.dumps(content, default=_json_default, option=orjson.OPT_UTC_Z)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+
+@functools.lru_cache(maxsize=None)
+def _model_defaults(model: Type[BaseModel]) -> Dict[str, Any]:
+    return {
+        name: field.get_default(call_default_factory=True)
+        for name, field in model.model_fields.items()
+        if not field.is_required()
+    }
+
+
+def model_rows(
+    model: Type[BaseModel],
+    rows: Iterable[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """
+    Привести доверенные строки хранилища к полям модели ответа без валидации:
+    лишние поля отбрасываются, отсутствующие заполняются значениями по умолчанию.
+    """
+    fields = list(model.model_fields)
+    defaults = _model_defaults(model)
+    return [
+        {field: row.get(field, defaults.get(field)) for field in fields}
+        for row in rows
+    ]
+
+
+def fast_list_response(
+    model: Type[BaseModel],
+    rows: Iterable[Dict[str, Any]],
+    message_text: str = "",
+) -> FastJSONResponse:
+    """Успешный ответ в формате ApiResponse со списком строк, закодированный за один проход"""
+    return FastJSONResponse(
+        {
+            "status": True,
+            "data": model_rows(model, rows),
+            "message": {
+                "text": message_text,
+                "errors": [],
+            },
+        },
+    )
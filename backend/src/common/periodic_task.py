@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Optional,
+)
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+
+class PeriodicTask:
+    """
+    Фоновая задача, которая вызывает job раз в interval секунд.
+    Ошибки прохода логируются и не останавливают задачу.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        job: Callable[[], Awaitable[Any]],
+        interval: float,
+        enabled: bool = True,
+    ):
+        self.name = name
+        self.job = job
+        self.interval = interval
+        self.enabled = enabled
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Запустить задачу (если включена)"""
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+        _LOG.info(f"Фоновая задача {self.name} запущена: interval={self.interval}")
+
+    async def stop(self):
+        """Остановить задачу"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        while True:
+            try:
+                await self.job()
+            except Exception as e:
+                _LOG.error(f"Ошибка фоновой задачи {self.name}: {e}")
+            await asyncio.sleep(self.interval)
@@ -1,31 +1,52 @@
+import datetime as dt
 import logging
 from typing import (
+    Any,
+    AsyncIterator,
     List,
     Optional,
+    cast,
 )
 from uuid import UUID
 
 from src.deals.deals_storage import (
     DealsStorage,
-    NoSuchDealError,
-    NoSuchDealCategoryError,
+    DealsStorageError,
+    NoSuchDealError as StorageNoSuchDealError,
+    NoSuchDealCategoryError as StorageNoSuchDealCategoryError,
     DealsStorageException,
 )
 from src.deals.deals_storage_models import (
     DealToGet,
     DealCategoryToGet,
     DealStage,
+    DealBulkItemResult,
+    DealTimelineEntry,
+    DealStageTransitionToGet,
 )
+from src.deals.deals_storage_models_common import DealBulkAction
+from src.misc.misc_lib import utc_now
 from src.users.users_storage import (
     UsersStorage,
     UsersStorageNoSuchUserException,
 )
-from src.permissions.permissions_manager import PermissionsManager
+from src.permissions.permissions_manager import (
+    PermissionsManager,
+    PermissionsManagerError,
+)
+from src.permissions.permissions_manager_models import Permissions
 
 
 _LOG = logging.getLogger("uvicorn.error")
 
 
+def _as_utc(value: dt.datetime) -> dt.datetime:
+    """Привести дату к aware UTC: Mongo отдает naive datetime, которые хранятся в UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=dt.UTC)
+    return value.astimezone(dt.UTC)
+
+
 class DealsManagerException(Exception):
     pass
 
@@ -42,6 +63,10 @@ class InvalidStageError(DealsManagerException):
     pass
 
 
+class DealsPermissionError(DealsManagerException):
+    pass
+
+
 class DealsManager:
     def __init__(
         self,
@@ -83,7 +108,7 @@ class DealsManager:
         """Получить категорию по ID"""
         try:
             return await self.deals_storage.get_category(category_id)
-        except NoSuchDealCategoryError as e:
+        except StorageNoSuchDealCategoryError as e:
             _LOG.error(e)
             raise NoSuchDealCategoryError(str(e))
 
@@ -292,10 +317,59 @@ class DealsManager:
         """Получить сделку по ID"""
         try:
             return await self.deals_storage.get_deal(deal_id)
-        except NoSuchDealError as e:
+        except StorageNoSuchDealError as e:
+            _LOG.error(e)
+            raise NoSuchDealError(str(e))
+
+    async def get_deal_revision(
+        self,
+        actor_id: UUID,
+        deal_id: UUID,
+        revision: int,
+    ) -> DealToGet:
+        """Получить сделку в состоянии на заданной ревизии"""
+        try:
+            return await self.deals_storage.get_deal_revision(deal_id, revision)
+        except StorageNoSuchDealError as e:
+            _LOG.error(e)
+            raise NoSuchDealError(str(e))
+
+    async def get_deal_timeline(
+        self,
+        actor_id: UUID,
+        deal_id: UUID,
+        before_revision: Optional[int] = None,
+        limit: int = 20,
+    ) -> tuple[List[DealTimelineEntry], Optional[int]]:
+        """Получить страницу истории изменений сделки"""
+        try:
+            return await self.deals_storage.get_deal_timeline(
+                deal_id=deal_id,
+                before_revision=before_revision,
+                limit=limit,
+            )
+        except StorageNoSuchDealError as e:
             _LOG.error(e)
             raise NoSuchDealError(str(e))
 
+    async def get_deal_stage_transitions(
+        self,
+        actor_id: UUID,
+        deal_id: UUID,
+    ) -> List[DealStageTransitionToGet]:
+        """Получить переходы сделки по стадиям со временем пребывания в каждой стадии"""
+        deal = await self.get_deal(actor_id, deal_id)
+        transitions = await self.deals_storage.get_deal_stage_transitions(deal_id)
+
+        # Пребывание в последней стадии длится до закрытия сделки или до текущего момента
+        finished_at = _as_utc(deal.closed_at) if not deal.is_active and deal.closed_at else utc_now()
+        for transition, next_transition in zip(transitions, transitions[1:] + [None], strict=True):
+            left_at = _as_utc(next_transition.transitioned_at) if next_transition else finished_at
+            transition.duration_seconds = (
+                left_at - _as_utc(transition.transitioned_at)
+            ).total_seconds()
+        return transitions
+
     async def get_deals_by_category(
         self,
         actor_id: UUID,
@@ -307,11 +381,33 @@ class DealsManager:
         sort_direction: str = "asc",
     ) -> List[DealToGet]:
         """Получить все сделки в категории с поддержкой поиска, фильтрации и сортировки"""
+        rows = await self.get_deal_rows_by_category(
+            actor_id=actor_id,
+            category_id=category_id,
+            active_only=active_only,
+            search=search,
+            stage_id=stage_id,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+        )
+        return [DealToGet(**row) for row in rows]
+
+    async def get_deal_rows_by_category(
+        self,
+        actor_id: UUID,
+        category_id: UUID,
+        active_only: bool = True,
+        search: Optional[str] = None,
+        stage_id: Optional[UUID] = None,
+        sort_field: str = "order",
+        sort_direction: str = "asc",
+    ) -> List[dict]:
+        """Сырые документы сделок категории для быстрой отдачи списка"""
         # Проверяем, что категория существует
         await self.get_category(actor_id, category_id)
         
         try:
-            return await self.deals_storage.get_deals_by_category(
+            return await self.deals_storage.get_deal_rows_by_category(
                 category_id=category_id,
                 active_only=active_only,
                 search=search,
@@ -325,6 +421,29 @@ class DealsManager:
                 f"Ошибка при получении сделок: {str(e)}",
             )
 
+    async def export_deals_by_category(
+        self,
+        actor_id: UUID,
+        category_id: UUID,
+        active_only: bool = True,
+        search: Optional[str] = None,
+        stage_id: Optional[UUID] = None,
+        sort_field: str = "order",
+        sort_direction: str = "asc",
+    ) -> AsyncIterator[dict]:
+        """Потоковая выгрузка сделок категории (сырые документы, без буферизации в памяти)"""
+        # Проверяем, что категория существует, до начала отдачи потока
+        await self.get_category(actor_id, category_id)
+
+        return self.deals_storage.iter_deals_by_category(
+            category_id=category_id,
+            active_only=active_only,
+            search=search,
+            stage_id=stage_id,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+        )
+
     async def get_deals_by_responsible_user(
         self,
         actor_id: UUID,
@@ -332,6 +451,20 @@ class DealsManager:
         active_only: bool = True,
     ) -> List[DealToGet]:
         """Получить все сделки ответственного пользователя"""
+        rows = await self.get_deal_rows_by_responsible_user(
+            actor_id=actor_id,
+            user_id=user_id,
+            active_only=active_only,
+        )
+        return [DealToGet(**row) for row in rows]
+
+    async def get_deal_rows_by_responsible_user(
+        self,
+        actor_id: UUID,
+        user_id: UUID,
+        active_only: bool = True,
+    ) -> List[dict]:
+        """Сырые документы сделок ответственного пользователя для быстрой отдачи списка"""
         try:
             await self.users_storage.get(user_id)
         except UsersStorageNoSuchUserException:
@@ -340,7 +473,7 @@ class DealsManager:
             )
         
         try:
-            return await self.deals_storage.get_deals_by_responsible_user(
+            return await self.deals_storage.get_deal_rows_by_responsible_user(
                 user_id=user_id,
                 active_only=active_only,
             )
@@ -545,3 +678,121 @@ class DealsManager:
             raise DealsManagerException(
                 f"Ошибка при закрытии сделки: {str(e)}",
             )
+
+
+    async def bulk_update_deals(
+        self,
+        actor_id: UUID,
+        action: DealBulkAction,
+        deal_ids: List[UUID],
+        stage_id: Optional[UUID] = None,
+        responsible_user_id: Optional[UUID] = None,
+    ) -> List[DealBulkItemResult]:
+        """
+        Массовая операция над сделками: перемещение, закрытие, переназначение или удаление.
+
+        Права проверяются один раз на весь запрос, сделки читаются одним запросом,
+        обновления и ревизии пишутся пачкой. Результат возвращается по каждой сделке.
+        """
+        try:
+            await self.permissions_manager.is_action_allowed(
+                actor_id,
+                actor_id,
+                [Permissions.DEAL_BULK_UPDATE_OTHER],
+            )
+        except PermissionsManagerError as e:
+            _LOG.error(e)
+            raise DealsPermissionError(
+                "Недостаточно прав для массовых операций со сделками",
+            )
+
+        if action == DealBulkAction.MOVE and stage_id is None:
+            raise InvalidStageError("Для перемещения сделок необходимо указать стадию")
+        if action == DealBulkAction.REASSIGN:
+            if responsible_user_id is None:
+                raise DealsManagerException(
+                    "Для переназначения сделок необходимо указать ответственного пользователя",
+                )
+            try:
+                await self.users_storage.get(
+                    responsible_user_id,
+                )
+            except UsersStorageNoSuchUserException:
+                raise DealsManagerException(
+                    f"Ответственный пользователь не найден: {responsible_user_id}",
+                )
+
+        # Убираем дубликаты, сохраняя порядок
+        unique_deal_ids = list(dict.fromkeys(deal_ids))
+        deals = await self.deals_storage.get_deals_full_by_ids(unique_deal_ids)
+
+        errors: dict[UUID, str] = {}
+        for deal_id in unique_deal_ids:
+            if deal_id not in deals:
+                errors[deal_id] = f"Сделка не найдена. {deal_id=}"
+
+        if action == DealBulkAction.MOVE:
+            category_ids = {deal.category_id for deal in deals.values()}
+            categories_stage_ids: dict[UUID, set[UUID]] = {}
+            for category_id in category_ids:
+                try:
+                    category = await self.deals_storage.get_category(category_id)
+                    categories_stage_ids[category_id] = {stage.id for stage in category.stages}
+                except DealsStorageError:
+                    categories_stage_ids[category_id] = set()
+            for deal in deals.values():
+                if stage_id not in categories_stage_ids[deal.category_id]:
+                    errors[deal.id] = (
+                        f"Стадия {stage_id} не найдена в категории {deal.category_id}"
+                    )
+
+        deals_to_update = [
+            deals[deal_id]
+            for deal_id in unique_deal_ids
+            if deal_id in deals and deal_id not in errors
+        ]
+
+        try:
+            if action == DealBulkAction.MOVE:
+                storage_errors = await self.deals_storage.bulk_move_deals_to_stage(
+                    actor_id=actor_id,
+                    deals=deals_to_update,
+                    # Наличие stage_id для перемещения проверено в начале метода
+                    new_stage_id=cast(UUID, stage_id),
+                )
+            else:
+                update_query: dict[str, dict[str, Any]]
+                if action == DealBulkAction.REASSIGN:
+                    update_query = {
+                        "$set": {
+                            "responsible_user_id": responsible_user_id,
+                        },
+                    }
+                else:
+                    # Закрытие и мягкое удаление сделки выполняются одинаково
+                    update_query = {
+                        "$set": {
+                            "is_active": False,
+                            "closed_at": utc_now(),
+                        },
+                    }
+                storage_errors = await self.deals_storage.bulk_update_deals_with_revision(
+                    actor_id=actor_id,
+                    deals=deals_to_update,
+                    update_queries={deal.id: update_query for deal in deals_to_update},
+                )
+        except Exception as e:
+            _LOG.error(e)
+            raise DealsManagerException(
+                f"Ошибка при массовой операции со сделками: {str(e)}",
+            )
+        errors.update(storage_errors)
+
+        return [
+            DealBulkItemResult(
+                deal_id=deal_id,
+                success=deal_id not in errors,
+                error=errors.get(deal_id),
+            )
+            for deal_id in unique_deal_ids
+        ]
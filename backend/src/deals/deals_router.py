@@ -7,19 +7,23 @@ from fastapi import (
     Body,
     Depends,
     Request,
+    Response,
     Query,
 )
+from fastapi.responses import StreamingResponse
 
 from src.auth.auth_cookie import CookieAuthMiddleware
 from src.common.common_router_models import (
     ResponseError,
     ApiErrorCodes,
 )
+from src.common.fast_response import fast_list_response
 from src.deals.deals_manager import (
     DealsManager,
     NoSuchDealError,
     NoSuchDealCategoryError,
     DealsManagerException,
+    DealsPermissionError,
     InvalidStageError,
 )
 from src.deals.deals_router_models import (
@@ -39,8 +43,26 @@ from src.deals.deals_router_models import (
     DealsCountApiResponse,
     DealsSumResponse,
     DealsSumApiResponse,
+    BulkDealsParams,
+    DealBulkItemResponse,
+    DealsBulkResponse,
+    DealsBulkApiResponse,
+    DealTimelineEntryResponse,
+    DealTimelineResponse,
+    DealTimelineApiResponse,
+    DealStageTransitionResponse,
+    DealStageTransitionsApiResponse,
+)
+from src.deals.deals_storage_models import (
+    DealStage,
+    DealToGet,
+)
+from src.exports.exports_serializers import (
+    ExportFormat,
+    build_export_headers,
+    build_export_stream,
+    get_export_media_type,
 )
-from src.deals.deals_storage_models import DealStage
 
 
 _LOG = logging.getLogger("uvicorn.error")
@@ -479,6 +501,74 @@ async def create_deal(
         )
 
 
+@router.post(
+    "/bulk",
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def bulk_update_deals(
+    request: Request,
+    bulk_data: BulkDealsParams = Body(...),
+) -> DealsBulkApiResponse | None:
+    """Массовая операция со сделками: перемещение, закрытие, переназначение или удаление"""
+    deals_manager: DealsManager = request.app.state.deals_manager
+    user_id = request.state.jwt_payload["user_id"]
+
+    errors = []
+    try:
+        items = await deals_manager.bulk_update_deals(
+            actor_id=user_id,
+            action=bulk_data.action,
+            deal_ids=bulk_data.deal_ids,
+            stage_id=bulk_data.stage_id,
+            responsible_user_id=bulk_data.responsible_user_id,
+        )
+        succeeded = sum(1 for item in items if item.success)
+        bulk_response = DealsBulkResponse(
+            action=bulk_data.action,
+            succeeded=succeeded,
+            failed=len(items) - succeeded,
+            items=[DealBulkItemResponse.from_item(item) for item in items],
+        )
+
+        return DealsBulkApiResponse.success_response(
+            data=bulk_response,
+        )
+    except DealsPermissionError as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except InvalidStageError as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except DealsManagerException as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except Exception as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=f"Неизвестная ошибка. {str(e)}",
+        )
+        errors.append(error)
+
+    if errors:
+        return DealsBulkApiResponse.error_response(
+            errors=errors,
+            message_text="Ошибка при массовой операции со сделками.",
+        )
+
+
 @router.get(
     "/{deal_id}",
     dependencies=[Depends(CookieAuthMiddleware())],
@@ -524,9 +614,157 @@ async def get_deal(
         )
 
 
+@router.get(
+    "/{deal_id}/revisions/{revision}",
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def get_deal_revision(
+    request: Request,
+    deal_id: UUID,
+    revision: int,
+) -> DealApiResponse | None:
+    """Получить сделку в состоянии на заданной ревизии"""
+    deals_manager: DealsManager = request.app.state.deals_manager
+    user_id = request.state.jwt_payload["user_id"]
+
+    errors = []
+    try:
+        deal = await deals_manager.get_deal_revision(
+            actor_id=user_id,
+            deal_id=deal_id,
+            revision=revision,
+        )
+        deal_response = DealResponse.from_deal(deal)
+
+        return DealApiResponse.success_response(
+            data=deal_response,
+        )
+    except NoSuchDealError as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except Exception as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=f"Неизвестная ошибка. {str(e)}",
+        )
+        errors.append(error)
+
+    if errors:
+        return DealApiResponse.error_response(
+            errors=errors,
+            message_text="Ошибка при получении ревизии сделки.",
+        )
+
+
+@router.get(
+    "/{deal_id}/timeline",
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def get_deal_timeline(
+    request: Request,
+    deal_id: UUID,
+    before_revision: Optional[int] = Query(
+        default=None,
+        ge=1,
+        description="Вернуть ревизии старше указанной (курсор следующей страницы)",
+    ),
+    limit: int = Query(default=20, ge=1, le=100, description="Количество ревизий на странице"),
+) -> DealTimelineApiResponse | None:
+    """Получить историю изменений сделки с изменениями по полям"""
+    deals_manager: DealsManager = request.app.state.deals_manager
+    user_id = request.state.jwt_payload["user_id"]
+
+    errors = []
+    try:
+        entries, next_before_revision = await deals_manager.get_deal_timeline(
+            actor_id=user_id,
+            deal_id=deal_id,
+            before_revision=before_revision,
+            limit=limit,
+        )
+        timeline_response = DealTimelineResponse(
+            items=[DealTimelineEntryResponse.from_entry(entry) for entry in entries],
+            next_before_revision=next_before_revision,
+        )
+
+        return DealTimelineApiResponse.success_response(
+            data=timeline_response,
+        )
+    except NoSuchDealError as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except Exception as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=f"Неизвестная ошибка. {str(e)}",
+        )
+        errors.append(error)
+
+    if errors:
+        return DealTimelineApiResponse.error_response(
+            errors=errors,
+            message_text="Ошибка при получении истории сделки.",
+        )
+
+
+@router.get(
+    "/{deal_id}/stage-transitions",
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def get_deal_stage_transitions(
+    request: Request,
+    deal_id: UUID,
+) -> DealStageTransitionsApiResponse | None:
+    """Получить переходы сделки по стадиям со временем пребывания в каждой стадии"""
+    deals_manager: DealsManager = request.app.state.deals_manager
+    user_id = request.state.jwt_payload["user_id"]
+
+    errors = []
+    try:
+        transitions = await deals_manager.get_deal_stage_transitions(
+            actor_id=user_id,
+            deal_id=deal_id,
+        )
+
+        return DealStageTransitionsApiResponse.success_response(
+            data=[DealStageTransitionResponse.from_transition(transition) for transition in transitions],
+        )
+    except NoSuchDealError as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except Exception as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=f"Неизвестная ошибка. {str(e)}",
+        )
+        errors.append(error)
+
+    if errors:
+        return DealStageTransitionsApiResponse.error_response(
+            errors=errors,
+            message_text="Ошибка при получении переходов сделки по стадиям.",
+        )
+
+
 @router.get(
     "/category/{category_id}/deals",
     dependencies=[Depends(CookieAuthMiddleware())],
+    response_model=DealsListApiResponse,
 )
 async def get_deals_by_category(
     request: Request,
@@ -551,14 +789,89 @@ async def get_deals_by_category(
         default="asc",
         description="Направление сортировки: asc или desc",
     ),
-) -> DealsListApiResponse | None:
+) -> Response | DealsListApiResponse:
     """Получить все сделки в категории с поддержкой поиска, фильтрации и сортировки"""
     deals_manager: DealsManager = request.app.state.deals_manager
     user_id = request.state.jwt_payload["user_id"]
 
     errors = []
     try:
-        deals = await deals_manager.get_deals_by_category(
+        rows = await deals_manager.get_deal_rows_by_category(
+            actor_id=user_id,
+            category_id=category_id,
+            active_only=active_only,
+            search=search,
+            stage_id=stage_id,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+        )
+        # Строки хранилища кодируются в JSON один раз, без DealToGet/DealResponse
+        return fast_list_response(DealResponse, rows)
+    except NoSuchDealCategoryError as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except Exception as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=f"Неизвестная ошибка. {str(e)}",
+        )
+        errors.append(error)
+
+    return DealsListApiResponse.error_response(
+        errors=errors,
+        message_text="Ошибка при получении сделок.",
+    )
+
+
+@router.get(
+    "/category/{category_id}/deals/export",
+    dependencies=[Depends(CookieAuthMiddleware())],
+    response_model=None,
+)
+async def export_deals_by_category(
+    request: Request,
+    category_id: UUID,
+    data_format: ExportFormat = Query(
+        default=ExportFormat.CSV,
+        description="Формат выгрузки: csv или ndjson",
+    ),
+    compress: bool = Query(
+        default=False,
+        description="Сжать выгрузку в gzip",
+    ),
+    active_only: bool = Query(
+        default=True,
+        description="Только активные сделки",
+    ),
+    search: Optional[str] = Query(
+        default=None,
+        description="Поиск по названию",
+    ),
+    stage_id: Optional[UUID] = Query(
+        default=None,
+        description="Фильтр по ID стадии",
+    ),
+    sort_field: str = Query(
+        default="order",
+        description="Поле сортировки: order, created_at, amount, title",
+    ),
+    sort_direction: str = Query(
+        default="asc",
+        description="Направление сортировки: asc или desc",
+    ),
+) -> StreamingResponse | DealsListApiResponse | None:
+    """Потоковая выгрузка сделок категории в CSV/NDJSON (память не зависит от размера выгрузки)"""
+    deals_manager: DealsManager = request.app.state.deals_manager
+    user_id = request.state.jwt_payload["user_id"]
+
+    errors = []
+    try:
+        rows = await deals_manager.export_deals_by_category(
             actor_id=user_id,
             category_id=category_id,
             active_only=active_only,
@@ -567,10 +880,20 @@ async def get_deals_by_category(
             sort_field=sort_field,
             sort_direction=sort_direction,
         )
-        deals_response = [DealResponse.from_deal(deal) for deal in deals]
 
-        return DealsListApiResponse.success_response(
-            data=deals_response,
+        return StreamingResponse(
+            build_export_stream(
+                rows,
+                fields=list(DealToGet.model_fields),
+                data_format=data_format,
+                compress=compress,
+            ),
+            media_type=get_export_media_type(data_format, compress),
+            headers=build_export_headers(
+                f"deals_{category_id}",
+                data_format,
+                compress,
+            ),
         )
     except NoSuchDealCategoryError as e:
         _LOG.error(e)
@@ -590,7 +913,7 @@ async def get_deals_by_category(
     if errors:
         return DealsListApiResponse.error_response(
             errors=errors,
-            message_text="Ошибка при получении сделок.",
+            message_text="Ошибка при выгрузке сделок.",
         )
 
 
@@ -703,6 +1026,7 @@ async def sum_deals_by_category(
 @router.get(
     "/user/{user_id}/deals",
     dependencies=[Depends(CookieAuthMiddleware())],
+    response_model=DealsListApiResponse,
 )
 async def get_deals_by_responsible_user(
     request: Request,
@@ -711,23 +1035,20 @@ async def get_deals_by_responsible_user(
         default=True,
         description="Только активные сделки",
     ),
-) -> DealsListApiResponse | None:
+) -> Response | DealsListApiResponse:
     """Получить все сделки ответственного пользователя"""
     deals_manager: DealsManager = request.app.state.deals_manager
     actor_id = request.state.jwt_payload["user_id"]
 
     errors = []
     try:
-        deals = await deals_manager.get_deals_by_responsible_user(
+        rows = await deals_manager.get_deal_rows_by_responsible_user(
             actor_id=actor_id,
             user_id=user_id,
             active_only=active_only,
         )
-        deals_response = [DealResponse.from_deal(deal) for deal in deals]
-
-        return DealsListApiResponse.success_response(
-            data=deals_response,
-        )
+        # Строки хранилища кодируются в JSON один раз, без DealToGet/DealResponse
+        return fast_list_response(DealResponse, rows)
     except DealsManagerException as e:
         _LOG.error(e)
         error = ResponseError(
@@ -743,11 +1064,10 @@ async def get_deals_by_responsible_user(
         )
         errors.append(error)
 
-    if errors:
-        return DealsListApiResponse.error_response(
-            errors=errors,
-            message_text="Ошибка при получении сделок.",
-        )
+    return DealsListApiResponse.error_response(
+        errors=errors,
+        message_text="Ошибка при получении сделок.",
+    )
 
 
 @router.patch(
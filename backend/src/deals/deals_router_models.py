@@ -15,7 +15,12 @@ from src.deals.deals_storage_models import (
     DealToGet,
     DealCategoryToGet,
     DealStage,
+    DealBulkItemResult,
+    DealTimelineEntry,
+    DealStageTransitionToGet,
 )
+from src.deals.deals_storage_models_common import DealBulkAction
+from src.revisions.revisions_storage_models import RevisionFieldChange
 
 
 class DealStageRequest(BaseModel):
@@ -209,3 +214,105 @@ class DealsSumResponse(BaseModel):
 class DealsSumApiResponse(ApiResponse):
     """API ответ с суммой сделок"""
     data: DealsSumResponse | dict = Field(default={})
+
+
+class BulkDealsParams(BaseModel):
+    """Параметры для массовой операции со сделками"""
+    action: DealBulkAction = Field(..., description="Операция: MOVE, CLOSE, REASSIGN или DELETE")
+    deal_ids: List[UUID] = Field(..., min_length=1, max_length=1000, description="ID сделок")
+    stage_id: Optional[UUID] = Field(default=None, description="ID новой стадии (для MOVE)")
+    responsible_user_id: Optional[UUID] = Field(
+        default=None,
+        description="ID нового ответственного пользователя (для REASSIGN)",
+    )
+
+
+class DealBulkItemResponse(BaseModel):
+    """Результат массовой операции для одной сделки"""
+    deal_id: UUID = Field(...)
+    success: bool = Field(...)
+    error: Optional[str] = Field(default=None)
+
+    @classmethod
+    def from_item(cls, item: DealBulkItemResult):
+        return cls(
+            deal_id=item.deal_id,
+            success=item.success,
+            error=item.error,
+        )
+
+
+class DealsBulkResponse(BaseModel):
+    """Модель для ответа на массовую операцию со сделками"""
+    action: DealBulkAction = Field(...)
+    succeeded: int = Field(..., description="Количество успешно обработанных сделок")
+    failed: int = Field(..., description="Количество сделок с ошибкой")
+    items: List[DealBulkItemResponse] = Field(default_factory=list)
+
+
+class DealsBulkApiResponse(ApiResponse):
+    """API ответ на массовую операцию со сделками"""
+    data: DealsBulkResponse | dict = Field(default={})
+
+
+class DealTimelineEntryResponse(BaseModel):
+    """Запись истории сделки"""
+    revision: int = Field(...)
+    changed_at: Optional[dt.datetime] = Field(default=None)
+    changed_by: UUID | None = Field(default=None)
+    changes: List[RevisionFieldChange] = Field(default_factory=list)
+
+    @classmethod
+    def from_entry(cls, entry: DealTimelineEntry):
+        return cls(
+            revision=entry.revision,
+            changed_at=entry.changed_at,
+            changed_by=entry.changed_by,
+            changes=entry.changes,
+        )
+
+
+class DealTimelineResponse(BaseModel):
+    """Страница истории сделки"""
+    items: List[DealTimelineEntryResponse] = Field(default_factory=list)
+    next_before_revision: Optional[int] = Field(
+        default=None,
+        description="Значение before_revision для следующей страницы (None, если страниц больше нет)",
+    )
+
+
+class DealTimelineApiResponse(ApiResponse):
+    """API ответ с историей сделки"""
+    data: DealTimelineResponse | dict = Field(default={})
+
+
+class DealStageTransitionResponse(BaseModel):
+    """Переход сделки между стадиями"""
+    id: UUID = Field(...)
+    deal_id: UUID = Field(...)
+    category_id: UUID = Field(...)
+    from_stage_id: Optional[UUID] = Field(default=None)
+    to_stage_id: UUID = Field(...)
+    revision: int = Field(...)
+    transitioned_at: dt.datetime = Field(...)
+    transitioned_by: UUID | None = Field(default=None)
+    duration_seconds: Optional[float] = Field(default=None)
+
+    @classmethod
+    def from_transition(cls, transition: DealStageTransitionToGet):
+        return cls(
+            id=transition.id,
+            deal_id=transition.deal_id,
+            category_id=transition.category_id,
+            from_stage_id=transition.from_stage_id,
+            to_stage_id=transition.to_stage_id,
+            revision=transition.revision,
+            transitioned_at=transition.transitioned_at,
+            transitioned_by=transition.transitioned_by,
+            duration_seconds=transition.duration_seconds,
+        )
+
+
+class DealStageTransitionsApiResponse(ApiResponse):
+    """API ответ со списком переходов сделки между стадиями"""
+    data: List[DealStageTransitionResponse] | dict = Field(default={})
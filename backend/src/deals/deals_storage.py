@@ -1,5 +1,6 @@
 import logging
 from typing import (
+    AsyncIterator,
     Optional,
     List,
 )
@@ -10,24 +11,39 @@ from uuid import (
 
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
-from pymongo.errors import DuplicateKeyError
-
-from src.clients.mongo.client import (
-    MClient,
-    codec_options,
+import pymongo
+from pymongo import UpdateOne
+from pymongo.errors import (
+    BulkWriteError,
+    DuplicateKeyError,
 )
+
+from src.clients.mongo.client import MClient
+from src.model import RevisionsConfig
 from src.misc.misc_lib import utc_now
+from src.revisions.revisions_patch import diff_fields
+from src.revisions.revisions_storage import (
+    RevisionsStorage,
+    NoSuchRevisionError,
+)
+from src.revisions.revisions_storage_models import RevisionFieldChange
 from .deals_storage_models import (
     DealToCreate,
     DealToGet,
     DealCategoryToCreate,
     DealCategoryToGet,
     DealStage,
+    DealTimelineEntry,
+    DealStageTransitionToCreate,
+    DealStageTransitionToGet,
 )
 
 
 _LOG = logging.getLogger("uvicorn.info")
 
+# Служебные поля, которые меняются при каждом обновлении и не показываются в истории
+TIMELINE_IGNORED_FIELDS = ("revision", "updated_at", "updated_by")
+
 
 class DealsStorageError(Exception):
     pass
@@ -49,28 +65,50 @@ class DealsStorage:
     def __init__(
         self,
         mongo_client: MClient,
+        revisions_config: Optional[RevisionsConfig] = None,
     ):
         self.mongo_client: MClient = mongo_client
         self.deals_collection_name: str = "deals"
         self.categories_collection_name: str = "deal_categories"
-        self.deals_revisions_collection_name: str = f"{self.deals_collection_name}_revisions"
-        self.categories_revisions_collection_name: str = f"{self.categories_collection_name}_revisions"
+        self.stage_transitions_collection_name: str = "deal_stage_transitions"
         
-        self.deals_collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
+        self.deals_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
             self.deals_collection_name,
-            codec_options=codec_options,
         )
-        self.categories_collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
+        # Выгрузки, счетчики и итоги по воронке допускают отставание реплики и читаются с analytics read preference.
+        # Списки канбана остаются на основном read preference: сразу после изменения UI должен увидеть свою запись
+        self.deals_analytics_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            self.deals_collection_name,
+            analytics=True,
+        )
+        self.categories_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
             self.categories_collection_name,
-            codec_options=codec_options,
         )
-        self.deals_revisions_collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
-            self.deals_revisions_collection_name,
-            codec_options=codec_options,
+        self.stage_transitions_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            self.stage_transitions_collection_name,
         )
-        self.categories_revisions_collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
-            self.categories_revisions_collection_name,
-            codec_options=codec_options,
+        self.deals_revisions: RevisionsStorage = RevisionsStorage(
+            self.mongo_client,
+            self.deals_collection_name,
+            revisions_config,
+        )
+        self.categories_revisions: RevisionsStorage = RevisionsStorage(
+            self.mongo_client,
+            self.categories_collection_name,
+            revisions_config,
+        )
+
+    async def create_indexes(self):
+        """Создать индексы для истории переходов по стадиям"""
+        await self.stage_transitions_collection.create_index(
+            [("deal_id", pymongo.ASCENDING), ("transitioned_at", pymongo.ASCENDING)],
+        )
+        await self.stage_transitions_collection.create_index(
+            [
+                ("category_id", pymongo.ASCENDING),
+                ("to_stage_id", pymongo.ASCENDING),
+                ("transitioned_at", pymongo.ASCENDING),
+            ],
         )
 
     async def add_category(
@@ -126,7 +164,7 @@ class DealsStorage:
         category_id: UUID,
     ) -> DealCategoryToGet:
         """Получить категорию по ID"""
-        _LOG.info(f"Запрашиваю категорию по id: {category_id}")
+        _LOG.debug("Запрашиваю категорию по id: %s", category_id)
         projection = {
             "_id": False,
         }
@@ -138,7 +176,7 @@ class DealsStorage:
         )
         if data:
             return DealCategoryToGet(**data)
-        _LOG.info(f"Категория не найдена. {category_id=}")
+        _LOG.debug("Категория не найдена. category_id=%r", category_id)
         raise NoSuchDealCategoryError(
             f"Категория не найдена. {category_id=}",
         )
@@ -148,7 +186,7 @@ class DealsStorage:
         _id: ObjectId,
     ) -> Optional[DealCategoryToGet]:
         """Получить категорию по ObjectId"""
-        _LOG.info(f"Запрашиваю категорию по ObjectID: {_id}")
+        _LOG.debug("Запрашиваю категорию по ObjectID: %s", _id)
         projection = {
             "_id": False,
         }
@@ -169,7 +207,7 @@ class DealsStorage:
         active_only: bool = False,
     ) -> List[DealCategoryToGet]:
         """Получить все категории"""
-        _LOG.info("Запрашиваю все категории")
+        _LOG.debug("Запрашиваю все категории")
         query = {}
         if active_only:
             query["is_active"] = True
@@ -222,17 +260,30 @@ class DealsStorage:
             },
             current_update_query,
         )
-        _LOG.info(f"Результат обновления категории: {category_id=} {result=}")
-        await self.categories_revisions_collection.insert_one(
+        _LOG.info("Результат обновления категории: category_id=%r result=%r", category_id, result)
+        await self.categories_revisions.add_revision(
+            actor_id,
             category.model_dump(),
         )
 
+    async def get_category_revision(
+        self,
+        category_id: UUID,
+        revision: int,
+    ) -> DealCategoryToGet:
+        """Восстановить категорию на заданной ревизии"""
+        try:
+            data = await self.categories_revisions.get_revision(category_id, revision)
+        except NoSuchRevisionError as e:
+            raise NoSuchDealCategoryError(str(e))
+        return DealCategoryToGet(**data)
+
     async def get_category_full(
         self,
         category_id: UUID,
     ) -> Optional[DealCategoryToCreate]:
         """Получить полную категорию (для ревизий)"""
-        _LOG.info(f"Запрашиваю полную категорию по id: {category_id}")
+        _LOG.debug("Запрашиваю полную категорию по id: %s", category_id)
         projection = {
             "_id": False,
         }
@@ -272,7 +323,7 @@ class DealsStorage:
         category_id: UUID,
     ):
         """Мягкое удаление категории (установка is_active = False)"""
-        _LOG.info(f"Мягкое удаление категории: {category_id}")
+        _LOG.info("Мягкое удаление категории: %s", category_id)
         
         update_query = {
             "$set": {
@@ -293,7 +344,7 @@ class DealsStorage:
         stage_id: UUID,
     ):
         """Мягкое удаление стадии (установка is_active = False)"""
-        _LOG.info(f"Мягкое удаление стадии: {stage_id} в категории: {category_id}")
+        _LOG.info("Мягкое удаление стадии: %s в категории: %s", stage_id, category_id)
         
         # Получаем категорию
         category = await self.get_category(category_id)
@@ -361,6 +412,18 @@ class DealsStorage:
         result = await self.deals_collection.insert_one(
             deal.model_dump(),
         )
+        await self._add_stage_transitions(
+            [
+                DealStageTransitionToCreate(
+                    deal_id=deal.id,
+                    category_id=deal.category_id,
+                    to_stage_id=deal.stage_id,
+                    revision=deal.revision,
+                    transitioned_at=deal.created_at,
+                    transitioned_by=actor_id,
+                ),
+            ],
+        )
         new_deal = await self.get_deal_by_object_id(
             result.inserted_id,
         )
@@ -382,7 +445,7 @@ class DealsStorage:
         deal_id: UUID,
     ) -> DealToGet:
         """Получить сделку по ID"""
-        _LOG.info(f"Запрашиваю сделку по id: {deal_id}")
+        _LOG.debug("Запрашиваю сделку по id: %s", deal_id)
         projection = {
             "_id": False,
         }
@@ -396,7 +459,7 @@ class DealsStorage:
         )
         if data:
             return DealToGet(**data)
-        _LOG.info(f"Сделка не найдена. {deal_id=}")
+        _LOG.debug("Сделка не найдена. deal_id=%r", deal_id)
         raise NoSuchDealError(
             f"Сделка не найдена. {deal_id=}",
         )
@@ -406,7 +469,7 @@ class DealsStorage:
         _id: ObjectId,
     ) -> Optional[DealToGet]:
         """Получить сделку по ObjectId"""
-        _LOG.info(f"Запрашиваю сделку по ObjectID: {_id}")
+        _LOG.debug("Запрашиваю сделку по ObjectID: %s", _id)
         projection = {
             "_id": False,
         }
@@ -422,17 +485,16 @@ class DealsStorage:
             return DealToGet(**data)
         return None
 
-    async def get_deals_by_category(
-        self,
+    @staticmethod
+    def _build_deals_by_category_query(
         category_id: UUID,
         active_only: bool = True,
         search: Optional[str] = None,
         stage_id: Optional[UUID] = None,
         sort_field: str = "order",
         sort_direction: str = "asc",
-    ) -> List[DealToGet]:
-        """Получить все сделки в категории с поддержкой поиска, фильтрации и сортировки"""
-        _LOG.info(f"Запрашиваю сделки по категории: {category_id}")
+    ) -> tuple[dict, str, int]:
+        """Собрать фильтр и сортировку для выборки по категории"""
         query: dict = {
             "category_id": category_id,
         }
@@ -447,10 +509,6 @@ class DealsStorage:
         if search:
             query["title"] = {"$regex": search, "$options": "i"}
         
-        projection = {"_id": False}
-        for key in DealToGet.model_fields:
-            projection[key] = True
-        
         # Определяем направление сортировки
         sort_dir = 1 if sort_direction == "asc" else -1
         
@@ -465,16 +523,94 @@ class DealsStorage:
             sort_field,
             "order",
         )
+        return query, mongo_sort_field, sort_dir
+
+    async def get_deals_by_category(
+        self,
+        category_id: UUID,
+        active_only: bool = True,
+        search: Optional[str] = None,
+        stage_id: Optional[UUID] = None,
+        sort_field: str = "order",
+        sort_direction: str = "asc",
+    ) -> List[DealToGet]:
+        """Получить все сделки в категории с поддержкой поиска, фильтрации и сортировки"""
+        rows = await self.get_deal_rows_by_category(
+            category_id=category_id,
+            active_only=active_only,
+            search=search,
+            stage_id=stage_id,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+        )
+        return [DealToGet(**row) for row in rows]
+
+    async def get_deal_rows_by_category(
+        self,
+        category_id: UUID,
+        active_only: bool = True,
+        search: Optional[str] = None,
+        stage_id: Optional[UUID] = None,
+        sort_field: str = "order",
+        sort_direction: str = "asc",
+    ) -> List[dict]:
+        """То же, что get_deals_by_category, но сырыми документами (поля DealToGet) без валидации"""
+        _LOG.debug("Запрашиваю сделки по категории: %s", category_id)
+        query, mongo_sort_field, sort_dir = self._build_deals_by_category_query(
+            category_id=category_id,
+            active_only=active_only,
+            search=search,
+            stage_id=stage_id,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+        )
+        
+        projection = {"_id": False}
+        for key in DealToGet.model_fields:
+            projection[key] = True
         
         cursor = self.deals_collection.find(
             query,
             projection=projection,
         ).sort(mongo_sort_field, sort_dir)
         
-        deals = []
+        return await cursor.to_list(None)
+
+    async def iter_deals_by_category(
+        self,
+        category_id: UUID,
+        active_only: bool = True,
+        search: Optional[str] = None,
+        stage_id: Optional[UUID] = None,
+        sort_field: str = "order",
+        sort_direction: str = "asc",
+        batch_size: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """
+        Потоково отдать сделки категории сырыми документами (для экспорта).
+        Курсор читается пачками batch_size, в памяти не накапливается.
+        """
+        _LOG.debug("Экспортирую сделки по категории: %s", category_id)
+        query, mongo_sort_field, sort_dir = self._build_deals_by_category_query(
+            category_id=category_id,
+            active_only=active_only,
+            search=search,
+            stage_id=stage_id,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+        )
+        
+        projection = {"_id": False}
+        for key in DealToGet.model_fields:
+            projection[key] = True
+        
+        cursor = self.deals_analytics_collection.find(
+            query,
+            projection=projection,
+            batch_size=batch_size,
+        ).sort(mongo_sort_field, sort_dir)
         async for deal in cursor:
-            deals.append(DealToGet(**deal))
-        return deals
+            yield deal
 
     async def count_deals_by_category(
         self,
@@ -482,14 +618,14 @@ class DealsStorage:
         active_only: bool = True,
     ) -> int:
         """Получить количество сделок в категории"""
-        _LOG.info(f"Считаю сделки по категории: {category_id}")
+        _LOG.debug("Считаю сделки по категории: %s", category_id)
         query = {
             "category_id": category_id,
         }
         if active_only:
             query["is_active"] = True
         
-        count = await self.deals_collection.count_documents(query)
+        count = await self.deals_analytics_collection.count_documents(query)
         return count
 
     async def sum_deals_amount_by_category(
@@ -498,7 +634,7 @@ class DealsStorage:
         active_only: bool = True,
     ) -> float:
         """Получить сумму всех сделок в категории"""
-        _LOG.info(f"Суммирую сделки по категории: {category_id}")
+        _LOG.debug("Суммирую сделки по категории: %s", category_id)
         match_query = {
             "category_id": category_id,
         }
@@ -514,7 +650,7 @@ class DealsStorage:
                 },
         ]
         
-        cursor = self.deals_collection.aggregate(pipeline)
+        cursor = self.deals_analytics_collection.aggregate(pipeline)
         result = await cursor.to_list(length=1)
         
         if result and len(result) > 0:
@@ -527,7 +663,19 @@ class DealsStorage:
         active_only: bool = True,
     ) -> List[DealToGet]:
         """Получить все сделки ответственного пользователя"""
-        _LOG.info(f"Запрашиваю сделки по ответственному пользователю: {user_id}")
+        rows = await self.get_deal_rows_by_responsible_user(
+            user_id=user_id,
+            active_only=active_only,
+        )
+        return [DealToGet(**row) for row in rows]
+
+    async def get_deal_rows_by_responsible_user(
+        self,
+        user_id: UUID,
+        active_only: bool = True,
+    ) -> List[dict]:
+        """То же, что get_deals_by_responsible_user, но сырыми документами (поля DealToGet) без валидации"""
+        _LOG.debug("Запрашиваю сделки по ответственному пользователю: %s", user_id)
         query = {
             "responsible_user_id": user_id,
         }
@@ -544,10 +692,7 @@ class DealsStorage:
             query,
             projection=projection,
         ).sort("order", 1)  # Сортируем по order по возрастанию
-        deals = []
-        async for deal in cursor:
-            deals.append(DealToGet(**deal))
-        return deals
+        return await cursor.to_list(None)
 
     async def update_deal_with_revision(
         self,
@@ -582,17 +727,33 @@ class DealsStorage:
             },
             current_update_query,
         )
-        _LOG.info(f"Результат обновления сделки: {deal_id=} {result=}")
-        await self.deals_revisions_collection.insert_one(
+        _LOG.info("Результат обновления сделки: deal_id=%r result=%r", deal_id, result)
+        await self.deals_revisions.add_revision(
+            actor_id,
             deal.model_dump(),
         )
+        transition = self._build_stage_transition(actor_id, deal, current_update_query)
+        if transition:
+            await self._add_stage_transitions([transition])
+
+    async def get_deal_revision(
+        self,
+        deal_id: UUID,
+        revision: int,
+    ) -> DealToGet:
+        """Восстановить сделку на заданной ревизии"""
+        try:
+            data = await self.deals_revisions.get_revision(deal_id, revision)
+        except NoSuchRevisionError as e:
+            raise NoSuchDealError(str(e))
+        return DealToGet(**data)
 
     async def get_deal_full(
         self,
         deal_id: UUID,
     ) -> Optional[DealToCreate]:
         """Получить полную сделку (для ревизий)"""
-        _LOG.info(f"Запрашиваю полную сделку по id: {deal_id}")
+        _LOG.debug("Запрашиваю полную сделку по id: %s", deal_id)
         projection = {
             "_id": False,
         }
@@ -614,7 +775,7 @@ class DealsStorage:
         deal_id: UUID,
     ):
         """Мягкое удаление сделки (установка is_active = False)"""
-        _LOG.info(f"Мягкое удаление сделки: {deal_id}")
+        _LOG.info("Мягкое удаление сделки: %s", deal_id)
         
         update_query = {
             "$set": {
@@ -741,3 +902,344 @@ class DealsStorage:
             deal_id,
             update_query,
         )
+
+
+    async def get_deals_full_by_ids(
+        self,
+        deal_ids: List[UUID],
+    ) -> dict[UUID, DealToCreate]:
+        """Получить полные сделки по списку ID одним запросом (для массовых операций)"""
+        _LOG.debug("Запрашиваю полные сделки по id: %s шт.", len(deal_ids))
+        projection = {
+            "_id": False,
+        }
+        for key in DealToCreate.model_fields:
+            projection[key] = True
+        cursor = self.deals_collection.find(
+            {
+                "id": {"$in": deal_ids},
+            },
+            projection=projection,
+        )
+        deals = {}
+        async for data in cursor:
+            deal = DealToCreate(**data)
+            deals[deal.id] = deal
+        return deals
+
+    async def bulk_update_deals_with_revision(
+        self,
+        actor_id: UUID,
+        deals: List[DealToCreate],
+        update_queries: dict[UUID, dict],
+    ) -> dict[UUID, str]:
+        """
+        Массово обновить сделки с созданием ревизий.
+
+        Все обновления уходят одним неупорядоченным bulk_write, ревизии - одной пачкой.
+        Возвращает словарь {deal_id: текст ошибки} для сделок, которые не удалось обновить.
+        """
+        if not deals:
+            return {}
+
+        now = utc_now()
+        operations = []
+        for deal in deals:
+            current_update_query = {
+                key: value.copy()
+                for key, value in update_queries[deal.id].items()
+            }
+            current_update_query.setdefault("$inc", {})["revision"] = 1
+            current_update_query.setdefault("$set", {})
+            current_update_query["$set"]["updated_at"] = now
+            current_update_query["$set"]["updated_by"] = actor_id
+            operations.append(
+                UpdateOne(
+                    {
+                        "id": deal.id,
+                    },
+                    current_update_query,
+                ),
+            )
+
+        errors: dict[UUID, str] = {}
+        try:
+            result = await self.deals_collection.bulk_write(
+                operations,
+                ordered=False,
+            )
+            _LOG.info("Результат массового обновления сделок: %s", result.bulk_api_result)
+        except BulkWriteError as e:
+            _LOG.error(e)
+            for write_error in e.details.get("writeErrors", []):
+                errors[deals[write_error["index"]].id] = write_error.get("errmsg", str(e))
+
+        updated_deals = [deal for deal in deals if deal.id not in errors]
+        await self.deals_revisions.add_revisions(
+            actor_id,
+            [deal.model_dump() for deal in updated_deals],
+        )
+        await self._add_stage_transitions(
+            [
+                transition
+                for transition in (
+                    self._build_stage_transition(actor_id, deal, update_queries[deal.id])
+                    for deal in updated_deals
+                )
+                if transition
+            ],
+        )
+        return errors
+
+    async def get_next_order_in_stage(
+        self,
+        stage_id: UUID,
+    ) -> int:
+        """Получить следующий свободный order в конце стадии"""
+        max_order_deal = await self.deals_collection.find_one(
+            {"stage_id": stage_id},
+            sort=[("order", -1)],
+        )
+        return (max_order_deal.get("order", -1) + 1) if max_order_deal else 0
+
+    async def bulk_move_deals_to_stage(
+        self,
+        actor_id: UUID,
+        deals: List[DealToCreate],
+        new_stage_id: UUID,
+    ) -> dict[UUID, str]:
+        """
+        Массово переместить сделки в конец стадии.
+
+        Сделки, уже находящиеся в этой стадии, не изменяются.
+        После перемещения порядок в исходных стадиях уплотняется.
+        """
+        deals_to_move = [deal for deal in deals if deal.stage_id != new_stage_id]
+        if not deals_to_move:
+            return {}
+
+        order = await self.get_next_order_in_stage(new_stage_id)
+        update_queries = {}
+        for deal in deals_to_move:
+            update_queries[deal.id] = {
+                "$set": {
+                    "stage_id": new_stage_id,
+                    "order": order,
+                },
+            }
+            order += 1
+
+        errors = await self.bulk_update_deals_with_revision(
+            actor_id=actor_id,
+            deals=deals_to_move,
+            update_queries=update_queries,
+        )
+        await self._compact_orders_in_stages(
+            list({deal.stage_id for deal in deals_to_move if deal.id not in errors}),
+        )
+        return errors
+
+    async def _compact_orders_in_stages(
+        self,
+        stage_ids: List[UUID],
+    ):
+        """Уплотнить order сделок в стадиях (0, 1, 2, ...) после массового перемещения"""
+        if not stage_ids:
+            return
+
+        cursor = self.deals_collection.find(
+            {
+                "stage_id": {"$in": stage_ids},
+            },
+            projection={
+                "_id": False,
+                "id": True,
+                "stage_id": True,
+                "order": True,
+            },
+        ).sort([("stage_id", 1), ("order", 1)])
+
+        operations = []
+        current_stage_id = None
+        expected_order = 0
+        async for deal in cursor:
+            if deal["stage_id"] != current_stage_id:
+                current_stage_id = deal["stage_id"]
+                expected_order = 0
+            if deal.get("order") != expected_order:
+                operations.append(
+                    UpdateOne(
+                        {"id": deal["id"]},
+                        {"$set": {"order": expected_order}},
+                    ),
+                )
+            expected_order += 1
+
+        if operations:
+            await self.deals_collection.bulk_write(
+                operations,
+                ordered=False,
+            )
+
+
+    async def get_max_orders_by_stage(
+        self,
+        category_id: UUID,
+    ) -> dict[UUID, int]:
+        """Получить максимальный order по каждой стадии категории одним агрегатом"""
+        pipeline = [
+            {
+                "$match": {"category_id": category_id},
+            },
+            {
+                "$group": {"_id": "$stage_id", "max_order": {"$max": "$order"}},
+            },
+        ]
+        cursor = self.deals_collection.aggregate(pipeline)
+        max_orders = {}
+        async for item in cursor:
+            # $max по стадии без order дает null
+            max_order = item.get("max_order")
+            max_orders[item["_id"]] = max_order if max_order is not None else -1
+        return max_orders
+
+    async def insert_deals_batch(
+        self,
+        deals: List[DealToCreate],
+    ) -> dict[int, str]:
+        """
+        Вставить пачку сделок одним неупорядоченным insert_many.
+
+        Возвращает словарь {индекс в пачке: текст ошибки} для документов, которые не вставились.
+        """
+        if not deals:
+            return {}
+        errors: dict[int, str] = {}
+        try:
+            await self.deals_collection.insert_many(
+                [deal.model_dump() for deal in deals],
+                ordered=False,
+            )
+        except BulkWriteError as e:
+            _LOG.error(e)
+            for write_error in e.details.get("writeErrors", []):
+                errors[write_error["index"]] = write_error.get("errmsg", str(e))
+        await self._add_stage_transitions(
+            [
+                DealStageTransitionToCreate(
+                    deal_id=deal.id,
+                    category_id=deal.category_id,
+                    to_stage_id=deal.stage_id,
+                    revision=deal.revision,
+                    transitioned_at=deal.created_at,
+                    transitioned_by=deal.created_by,
+                )
+                for index, deal in enumerate(deals)
+                if index not in errors
+            ],
+        )
+        return errors
+
+    @staticmethod
+    def _build_stage_transition(
+        actor_id: UUID,
+        deal: DealToCreate,
+        update_query: dict,
+    ) -> Optional[DealStageTransitionToCreate]:
+        """Построить событие перехода, если обновление меняет стадию сделки"""
+        new_stage_id = update_query.get("$set", {}).get("stage_id")
+        if new_stage_id is None or new_stage_id == deal.stage_id:
+            return None
+        return DealStageTransitionToCreate(
+            deal_id=deal.id,
+            category_id=deal.category_id,
+            from_stage_id=deal.stage_id,
+            to_stage_id=new_stage_id,
+            revision=deal.revision + 1,
+            transitioned_by=actor_id,
+        )
+
+    async def _add_stage_transitions(
+        self,
+        transitions: List[DealStageTransitionToCreate],
+    ):
+        """Сохранить события переходов между стадиями"""
+        if not transitions:
+            return
+        await self.stage_transitions_collection.insert_many(
+            [transition.model_dump() for transition in transitions],
+            ordered=False,
+        )
+
+    async def get_deal_stage_transitions(
+        self,
+        deal_id: UUID,
+    ) -> List[DealStageTransitionToGet]:
+        """Получить переходы сделки между стадиями в хронологическом порядке"""
+        projection = {
+            "_id": False,
+        }
+        for key in DealStageTransitionToCreate.model_fields:
+            projection[key] = True
+        cursor = self.stage_transitions_collection.find(
+            {"deal_id": deal_id},
+            projection=projection,
+        ).sort("transitioned_at", pymongo.ASCENDING)
+        transitions = []
+        async for data in cursor:
+            transitions.append(DealStageTransitionToGet(**data))
+        return transitions
+
+    async def get_deal_timeline(
+        self,
+        deal_id: UUID,
+        before_revision: Optional[int] = None,
+        limit: int = 20,
+    ) -> tuple[List[DealTimelineEntry], Optional[int]]:
+        """
+        Получить страницу истории сделки (от новых ревизий к старым) с изменениями полей.
+
+        Возвращает записи и курсор before_revision для следующей страницы (None, если страниц больше нет).
+        """
+        deal = await self.get_deal_full(deal_id)
+        if not deal:
+            raise NoSuchDealError(f"Сделка не найдена. {deal_id=}")
+
+        top = deal.revision if before_revision is None else min(before_revision - 1, deal.revision)
+        if top < 1:
+            return [], None
+        bottom = max(1, top - limit + 1)
+
+        # Текущее состояние не хранится в ревизиях, остальные восстанавливаем одним проходом
+        states = await self.deals_revisions.get_revisions_range(
+            deal_id,
+            max(1, bottom - 1),
+            min(top, deal.revision - 1),
+        )
+        states[deal.revision] = deal.model_dump()
+
+        entries = []
+        for revision in range(top, bottom - 1, -1):
+            state = states.get(revision)
+            if state is None:
+                continue
+            previous_state = states.get(revision - 1)
+            changes = []
+            if previous_state is not None:
+                changes = [
+                    RevisionFieldChange(field=field, old_value=old_value, new_value=new_value)
+                    for field, old_value, new_value in diff_fields(
+                        previous_state,
+                        state,
+                        ignore=TIMELINE_IGNORED_FIELDS,
+                    )
+                ]
+            entries.append(
+                DealTimelineEntry(
+                    revision=revision,
+                    changed_at=state.get("updated_at") or state.get("created_at"),
+                    changed_by=state.get("updated_by") or state.get("created_by"),
+                    changes=changes,
+                ),
+            )
+        return entries, (bottom if bottom > 1 else None)
@@ -14,6 +14,7 @@ from pydantic import (
 )
 
 from src.misc.misc_lib import utc_now
+from src.revisions.revisions_storage_models import RevisionFieldChange
 
 
 class DealStage(BaseModel):
@@ -95,3 +96,46 @@ class DealToGet(BaseModel):
     revision: int = Field(...)
     is_active: bool = Field(default=True)
     closed_at: Optional[dt.datetime] = Field(default=None)
+
+
+class DealBulkItemResult(BaseModel):
+    """Результат массовой операции для одной сделки"""
+    deal_id: UUID = Field(...)
+    success: bool = Field(...)
+    error: Optional[str] = Field(default=None)
+
+
+class DealTimelineEntry(BaseModel):
+    """Запись истории сделки: ревизия и изменившиеся поля"""
+    revision: int = Field(...)
+    changed_at: Optional[dt.datetime] = Field(default=None)
+    changed_by: UUID | None = Field(default=None)
+    changes: List[RevisionFieldChange] = Field(default_factory=list)
+
+
+class DealStageTransitionToCreate(BaseModel):
+    """Модель перехода сделки между стадиями"""
+    id: UUID = Field(default_factory=uuid4)
+    deal_id: UUID = Field(...)
+    category_id: UUID = Field(...)
+    from_stage_id: Optional[UUID] = Field(default=None, description="Предыдущая стадия (None при создании сделки)")
+    to_stage_id: UUID = Field(...)
+    revision: int = Field(..., description="Ревизия сделки после перехода")
+    transitioned_at: dt.datetime = Field(default_factory=utc_now)
+    transitioned_by: UUID | None = Field(default=None)
+
+
+class DealStageTransitionToGet(BaseModel):
+    """Модель перехода сделки между стадиями для получения"""
+    id: UUID = Field(...)
+    deal_id: UUID = Field(...)
+    category_id: UUID = Field(...)
+    from_stage_id: Optional[UUID] = Field(default=None)
+    to_stage_id: UUID = Field(...)
+    revision: int = Field(...)
+    transitioned_at: dt.datetime = Field(...)
+    transitioned_by: UUID | None = Field(default=None)
+    duration_seconds: Optional[float] = Field(
+        default=None,
+        description="Сколько сделка провела в стадии to_stage_id (до следующего перехода, закрытия или текущего момента)",
+    )
@@ -1 +1,8 @@
+from enum import Enum
 
+
+class DealBulkAction(str, Enum):
+    MOVE = "MOVE"
+    CLOSE = "CLOSE"
+    REASSIGN = "REASSIGN"
+    DELETE = "DELETE"
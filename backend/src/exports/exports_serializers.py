@@ -0,0 +1,135 @@
+"""Потоковая сериализация выгрузок в CSV/NDJSON с опциональным gzip"""
+
+import csv
+import datetime as dt
+import io
+import json
+import zlib
+from enum import Enum
+from typing import (
+    Any,
+    AsyncIterator,
+)
+from uuid import UUID
+
+
+# Сколько строк копим в буфере перед отправкой очередного чанка клиенту
+EXPORT_FLUSH_ROWS = 500
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+def _to_csv_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value)} не сериализуется в JSON")
+
+
+async def serialize_csv(
+    rows: AsyncIterator[dict],
+    fields: list[str],
+) -> AsyncIterator[bytes]:
+    """CSV с BOM (чтобы Excel корректно открывал кириллицу) и заголовком из fields"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(fields)
+    buffered_rows = 0
+    async for row in rows:
+        writer.writerow([_to_csv_value(row.get(field)) for field in fields])
+        buffered_rows += 1
+        if buffered_rows >= EXPORT_FLUSH_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            buffered_rows = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+async def serialize_ndjson(
+    rows: AsyncIterator[dict],
+    fields: list[str],
+) -> AsyncIterator[bytes]:
+    """По одному JSON-объекту на строку, только поля из fields"""
+    lines: list[str] = []
+    async for row in rows:
+        lines.append(
+            json.dumps(
+                {field: row.get(field) for field in fields},
+                ensure_ascii=False,
+                default=_json_default,
+            ),
+        )
+        if len(lines) >= EXPORT_FLUSH_ROWS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def gzip_stream(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[bytes]:
+    """Сжать поток чанков в gzip, не собирая его целиком"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def build_export_stream(
+    rows: AsyncIterator[dict],
+    fields: list[str],
+    data_format: ExportFormat,
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    if data_format == ExportFormat.CSV:
+        stream = serialize_csv(rows, fields)
+    else:
+        stream = serialize_ndjson(rows, fields)
+    if compress:
+        return gzip_stream(stream)
+    return stream
+
+
+def build_export_headers(
+    file_name: str,
+    data_format: ExportFormat,
+    compress: bool = False,
+) -> dict[str, str]:
+    file_name = f"{file_name}.{data_format.value}"
+    if compress:
+        file_name += ".gz"
+    return {
+        "Content-Disposition": f'attachment; filename="{file_name}"',
+    }
+
+
+def get_export_media_type(
+    data_format: ExportFormat,
+    compress: bool = False,
+) -> str:
+    if compress:
+        return "application/gzip"
+    return EXPORT_MEDIA_TYPES[data_format]
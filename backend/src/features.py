@@ -0,0 +1,84 @@
+"""
+Подсистемы приложения, которые включаются конфигурацией (FEATURES_ENABLED).
+Модули выключенных подсистем не импортируются: воркер, обслуживающий только чаты или сделки,
+не загружает клиенты телефонии, Zoom и их зависимости.
+"""
+
+import importlib
+import logging
+import time
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Tuple,
+)
+
+from fastapi import APIRouter
+
+
+_LOG = logging.getLogger("uvicorn")
+
+# {подсистема: (модуль роутера, подсистемы, без которых она не работает)}
+FEATURE_MODULES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "signs": ("src.signs.signs_router", ()),
+    "deals": ("src.deals.deals_router", ()),
+    "buyers": ("src.buyers.buyers_router", ()),
+    "chats": ("src.chats.chats_router", ()),
+    "integrations": ("src.integrations.integrations_router", ()),
+    "telephony": ("src.integrations.telephony.telephony_router", ("integrations",)),
+    "zoom": ("src.integrations.zoom.zoom_router", ("integrations",)),
+    "imports": ("src.imports.imports_router", ("deals", "buyers")),
+}
+
+
+class FeatureModulesError(Exception):
+    pass
+
+
+def resolve_features(names: Iterable[str]) -> List[str]:
+    """Включенные подсистемы вместе с зависимостями, в порядке FEATURE_MODULES"""
+    resolved = set()
+
+    def add(name: str):
+        if name not in FEATURE_MODULES:
+            raise FeatureModulesError(
+                f"Неизвестная подсистема {name!r}, доступны: {', '.join(FEATURE_MODULES)}",
+            )
+        if name in resolved:
+            return
+        resolved.add(name)
+        for dependency in FEATURE_MODULES[name][1]:
+            add(dependency)
+
+    for name in names:
+        add(name)
+    return [name for name in FEATURE_MODULES if name in resolved]
+
+
+def load_feature_routers(
+    features: List[str],
+    log_import_time: bool = True,
+) -> List[APIRouter]:
+    """
+    Импортировать роутеры подсистем. Время импорта включает зависимости, которые
+    еще не были загружены предыдущими подсистемами.
+    """
+    routers = []
+    total_ms = 0.0
+    for name in features:
+        started_at = time.perf_counter()
+        module = importlib.import_module(FEATURE_MODULES[name][0])
+        import_ms = (time.perf_counter() - started_at) * 1000
+        total_ms += import_ms
+        if log_import_time:
+            _LOG.info(
+                "Подсистема %s импортирована за %.1f ms",
+                name,
+                import_ms,
+                extra={"feature": name, "import_ms": round(import_ms, 1)},
+            )
+        routers.append(module.router)
+    if log_import_time:
+        _LOG.info("Подсистемы (%s) импортированы за %.1f ms", ", ".join(features), total_ms)
+    return routers
@@ -0,0 +1,426 @@
+import asyncio
+import functools
+import logging
+import tempfile
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    IO,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+from uuid import UUID
+
+from pydantic import ValidationError
+
+from src.buyers.buyers_storage import (
+    BuyersStorage,
+    BuyersStorageError,
+)
+from src.buyers.buyers_storage_models import (
+    BuyerStage,
+    BuyerToCreate,
+)
+from src.deals.deals_storage import (
+    DealsStorage,
+    DealsStorageError,
+)
+from src.deals.deals_storage_models import (
+    DealStage,
+    DealToCreate,
+)
+from src.model import ImportsConfig
+from src.users.users_storage import UsersStorage
+from .imports_parsers import (
+    ParsedRow,
+    iter_csv_rows,
+    iter_ndjson_rows,
+)
+from .imports_storage import (
+    ImportsStorage,
+    NoSuchImportJobError as StorageNoSuchImportJobError,
+)
+from .imports_storage_models import (
+    ImportEntityType,
+    ImportFormat,
+    ImportJobStatus,
+    ImportJobToGet,
+    ImportRowError,
+)
+
+
+_LOG = logging.getLogger("uvicorn.error")
+
+# Сколько строк валидируем и вставляем за один insert_many
+IMPORT_CHUNK_SIZE = 1000
+# Загруженный файл держим в памяти до этого размера, дальше он уходит во временный файл на диске
+IMPORT_SPOOL_MAX_MEMORY = 1024 * 1024
+# Размер куска, которым фоновый импорт читает сохраненный файл
+IMPORT_READ_CHUNK_SIZE = 64 * 1024
+
+ImportItem = Union[DealToCreate, BuyerToCreate]
+Stage = Union[DealStage, BuyerStage]
+
+
+class ImportsManagerException(Exception):
+    pass
+
+
+class NoSuchImportJobError(ImportsManagerException):
+    pass
+
+
+class NoSuchImportCategoryError(ImportsManagerException):
+    pass
+
+
+class ImportTooLargeError(ImportsManagerException):
+    pass
+
+
+def _format_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+        for error in e.errors()
+    )
+
+
+def _resolve_stage_id(
+    row: dict[str, Any],
+    stages: Sequence[Stage],
+) -> UUID:
+    """
+    Определить стадию строки: по stage_id, по названию стадии (stage)
+    или первая активная стадия воронки, если ни то ни другое не указано.
+    """
+    raw_stage_id = row.get("stage_id")
+    if raw_stage_id:
+        try:
+            stage_id = UUID(str(raw_stage_id))
+        except ValueError:
+            raise ValueError(f"stage_id: некорректный UUID {raw_stage_id}")
+        if not any(stage.id == stage_id for stage in stages):
+            raise ValueError(f"stage_id: стадия {stage_id} не найдена в категории")
+        return stage_id
+
+    stage_name = row.get("stage")
+    if stage_name:
+        normalized_name = str(stage_name).strip().lower()
+        for stage in stages:
+            if stage.name.strip().lower() == normalized_name:
+                return stage.id
+        raise ValueError(f"stage: стадия '{stage_name}' не найдена в категории")
+
+    active_stages = sorted(
+        (stage for stage in stages if stage.is_active),
+        key=lambda stage: stage.order,
+    )
+    if not active_stages:
+        raise ValueError("В категории нет активных стадий")
+    return active_stages[0].id
+
+
+class ImportsManager:
+    def __init__(
+        self,
+        imports_storage: ImportsStorage,
+        deals_storage: DealsStorage,
+        buyers_storage: BuyersStorage,
+        users_storage: UsersStorage,
+        imports_config: Optional[ImportsConfig] = None,
+    ):
+        self.imports_storage: ImportsStorage = imports_storage
+        self.deals_storage: DealsStorage = deals_storage
+        self.buyers_storage: BuyersStorage = buyers_storage
+        self.users_storage: UsersStorage = users_storage
+        self.imports_config: ImportsConfig = imports_config or ImportsConfig()
+        # Импорты, которые выполняет этот воркер
+        self._import_tasks: Dict[UUID, asyncio.Task] = {}
+
+    async def get_job(
+        self,
+        actor_id: UUID,
+        job_id: UUID,
+    ) -> ImportJobToGet:
+        """Получить задачу импорта (прогресс и ошибки по строкам). Доступна только ее автору."""
+        try:
+            job = await self.imports_storage.get_job(job_id)
+        except StorageNoSuchImportJobError as e:
+            _LOG.error(e)
+            raise NoSuchImportJobError(str(e))
+        if job.created_by != UUID(str(actor_id)):
+            raise NoSuchImportJobError(f"Задача импорта не найдена. {job_id=}")
+        return job
+
+    async def close(self):
+        """Остановить незавершенные импорты этого воркера (задачи помечаются прерванными)"""
+        tasks = list(self._import_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def import_deals(
+        self,
+        actor_id: UUID,
+        category_id: UUID,
+        data_format: ImportFormat,
+        stream: AsyncIterator[bytes],
+    ) -> ImportJobToGet:
+        """Принять файл сделок и запустить его импорт в категорию в фоне"""
+        try:
+            category = await self.deals_storage.get_category(category_id)
+        except DealsStorageError as e:
+            _LOG.error(e)
+            raise NoSuchImportCategoryError(str(e))
+
+        def build_deal(row: dict[str, Any]) -> DealToCreate:
+            return DealToCreate(
+                category_id=category_id,
+                stage_id=_resolve_stage_id(row, category.stages),
+                title=row.get("title"),
+                description=row.get("description"),
+                amount=row.get("amount"),
+                currency=row.get("currency") or "RUB",
+                client_id=row.get("client_id"),
+                responsible_user_id=row.get("responsible_user_id") or actor_id,
+                created_by=actor_id,
+                updated_by=actor_id,
+            )
+
+        return await self._start_import(
+            actor_id=actor_id,
+            entity_type=ImportEntityType.DEALS,
+            category_id=category_id,
+            data_format=data_format,
+            stream=stream,
+            build_item=build_deal,
+            insert_batch=self.deals_storage.insert_deals_batch,
+            max_orders=await self.deals_storage.get_max_orders_by_stage(category_id),
+        )
+
+    async def import_buyers(
+        self,
+        actor_id: UUID,
+        category_id: UUID,
+        data_format: ImportFormat,
+        stream: AsyncIterator[bytes],
+    ) -> ImportJobToGet:
+        """Принять файл покупателей и запустить его импорт в категорию в фоне"""
+        try:
+            category = await self.buyers_storage.get_category(category_id)
+        except BuyersStorageError as e:
+            _LOG.error(e)
+            raise NoSuchImportCategoryError(str(e))
+
+        def build_buyer(row: dict[str, Any]) -> BuyerToCreate:
+            return BuyerToCreate(
+                category_id=category_id,
+                stage_id=_resolve_stage_id(row, category.stages),
+                name=row.get("name"),
+                email=row.get("email"),
+                phone=row.get("phone"),
+                company=row.get("company"),
+                address=row.get("address"),
+                notes=row.get("notes"),
+                potential_value=row.get("potential_value"),
+                responsible_user_id=row.get("responsible_user_id") or actor_id,
+                created_by=actor_id,
+                updated_by=actor_id,
+            )
+
+        return await self._start_import(
+            actor_id=actor_id,
+            entity_type=ImportEntityType.BUYERS,
+            category_id=category_id,
+            data_format=data_format,
+            stream=stream,
+            build_item=build_buyer,
+            insert_batch=self.buyers_storage.insert_buyers_batch,
+            max_orders=await self.buyers_storage.get_max_orders_by_stage(category_id),
+        )
+
+    async def _start_import(
+        self,
+        actor_id: UUID,
+        entity_type: ImportEntityType,
+        category_id: UUID,
+        data_format: ImportFormat,
+        stream: AsyncIterator[bytes],
+        build_item: Callable[[dict[str, Any]], ImportItem],
+        insert_batch: Callable[[List[Any]], Awaitable[dict[int, str]]],
+        max_orders: dict[UUID, int],
+    ) -> ImportJobToGet:
+        """
+        Сохранить тело запроса во временный файл, создать задачу и запустить импорт в фоне.
+        Задача возвращается сразу, ее прогресс отдает get_job.
+        """
+        file = await self._spool_stream(stream)
+        try:
+            job = await self.imports_storage.add_job(
+                actor_id=actor_id,
+                entity_type=entity_type,
+                data_format=data_format,
+                category_id=category_id,
+            )
+        except Exception:
+            file.close()
+            raise
+        _LOG.info(f"Запущен импорт {entity_type.value}: {job.id=} {category_id=}")
+
+        task = asyncio.create_task(
+            self._run_import(job.id, data_format, file, build_item, insert_batch, max_orders),
+        )
+        self._import_tasks[job.id] = task
+        task.add_done_callback(functools.partial(self._forget_import_task, job.id))
+        return job
+
+    def _forget_import_task(self, job_id: UUID, _: asyncio.Task):
+        self._import_tasks.pop(job_id, None)
+
+    async def _spool_stream(self, stream: AsyncIterator[bytes]) -> IO[bytes]:
+        """
+        Дочитать тело запроса: оно доступно только до ответа, а импорт идет после него.
+        Файл больше max_upload_bytes отклоняется, не дочитываясь.
+        """
+        max_upload_bytes = self.imports_config.max_upload_bytes
+        file = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_MAX_MEMORY)
+        size = 0
+        try:
+            async for chunk in stream:
+                size += len(chunk)
+                if size > max_upload_bytes:
+                    raise ImportTooLargeError(
+                        f"Файл импорта больше допустимого размера ({max_upload_bytes} байт)",
+                    )
+                file.write(chunk)
+            file.seek(0)
+        except Exception:
+            file.close()
+            raise
+        return file
+
+    @staticmethod
+    async def _iter_file(file: IO[bytes]) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await asyncio.to_thread(file.read, IMPORT_READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    async def _run_import(
+        self,
+        job_id: UUID,
+        data_format: ImportFormat,
+        file: IO[bytes],
+        build_item: Callable[[dict[str, Any]], ImportItem],
+        insert_batch: Callable[[List[Any]], Awaitable[dict[int, str]]],
+        max_orders: dict[UUID, int],
+    ):
+        """
+        Общий конвейер импорта: разбор файла -> валидация пачками ->
+        назначение order по стадиям -> неупорядоченный insert_many -> прогресс в задаче.
+        """
+        rows: AsyncIterator[ParsedRow]
+        if data_format == ImportFormat.CSV:
+            rows = iter_csv_rows(self._iter_file(file))
+        else:
+            rows = iter_ndjson_rows(self._iter_file(file))
+
+        # Следующий свободный order по каждой стадии считаем один раз и дальше ведем в памяти
+        next_orders = {stage_id: max_order + 1 for stage_id, max_order in max_orders.items()}
+        chunk: list[tuple[int, ImportItem]] = []
+        row_errors: list[ImportRowError] = []
+        processed = 0
+        try:
+            async for row_number, row, parse_error in rows:
+                processed += 1
+                if row is None:
+                    row_errors.append(ImportRowError(row=row_number, error=parse_error or "Строка не разобрана"))
+                else:
+                    try:
+                        chunk.append((row_number, build_item(row)))
+                    except ValidationError as e:
+                        row_errors.append(
+                            ImportRowError(row=row_number, error=_format_validation_error(e)),
+                        )
+                    except ValueError as e:
+                        row_errors.append(ImportRowError(row=row_number, error=str(e)))
+
+                if processed >= IMPORT_CHUNK_SIZE:
+                    await self._flush_chunk(job_id, chunk, row_errors, processed, next_orders, insert_batch)
+                    chunk, row_errors, processed = [], [], 0
+
+            await self._flush_chunk(job_id, chunk, row_errors, processed, next_orders, insert_batch)
+        except asyncio.CancelledError:
+            _LOG.warning(f"Импорт прерван остановкой приложения: {job_id=}")
+            await self.imports_storage.finish_job(
+                job_id,
+                ImportJobStatus.FAILED,
+                error="Импорт прерван остановкой приложения",
+            )
+            raise
+        except Exception as e:
+            _LOG.error(f"Импорт прерван: {job_id=} {e}")
+            await self.imports_storage.finish_job(
+                job_id,
+                ImportJobStatus.FAILED,
+                error=str(e),
+            )
+            return
+        finally:
+            file.close()
+
+        await self.imports_storage.finish_job(
+            job_id,
+            ImportJobStatus.COMPLETED,
+        )
+        _LOG.info(f"Импорт завершен: {job_id=}")
+
+    async def _flush_chunk(
+        self,
+        job_id: UUID,
+        chunk: list[tuple[int, ImportItem]],
+        row_errors: list[ImportRowError],
+        processed: int,
+        next_orders: dict[UUID, int],
+        insert_batch: Callable[[List[Any]], Awaitable[dict[int, str]]],
+    ):
+        """Проверить ответственных, проставить order, вставить пачку и обновить прогресс задачи"""
+        valid: list[tuple[int, ImportItem]] = []
+        if chunk:
+            existing_user_ids = await self.users_storage.get_existing_user_ids(
+                list({item.responsible_user_id for _, item in chunk}),
+            )
+            for row_number, item in chunk:
+                if item.responsible_user_id not in existing_user_ids:
+                    row_errors.append(
+                        ImportRowError(
+                            row=row_number,
+                            error=f"Ответственный пользователь не найден: {item.responsible_user_id}",
+                        ),
+                    )
+                    continue
+                item.order = next_orders.get(item.stage_id, 0)
+                next_orders[item.stage_id] = item.order + 1
+                valid.append((row_number, item))
+
+        insert_errors: dict[int, str] = {}
+        if valid:
+            insert_errors = await insert_batch([item for _, item in valid])
+        for index, error in insert_errors.items():
+            row_errors.append(ImportRowError(row=valid[index][0], error=error))
+
+        if not processed:
+            return
+        row_errors.sort(key=lambda row_error: row_error.row)
+        await self.imports_storage.update_job_progress(
+            job_id,
+            processed_rows=processed,
+            inserted_rows=len(valid) - len(insert_errors),
+            row_errors=row_errors,
+        )
@@ -0,0 +1,102 @@
+"""Потоковый разбор загружаемых файлов импорта (CSV и NDJSON)"""
+
+import codecs
+import csv
+import json
+from typing import (
+    Any,
+    AsyncIterator,
+    Optional,
+)
+
+
+ParsedRow = tuple[int, Optional[dict[str, Any]], Optional[str]]
+
+
+async def iter_lines(
+    stream: AsyncIterator[bytes],
+    encoding: str = "utf-8-sig",
+) -> AsyncIterator[str]:
+    """
+    Разбивает поток байтов на строки, не накапливая файл в памяти.
+    Многобайтовые символы на границе чанков корректно собираются инкрементальным декодером.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    tail = ""
+    async for chunk in stream:
+        text = tail + decoder.decode(chunk)
+        lines = text.split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail.rstrip("\r")
+
+
+async def iter_csv_rows(
+    stream: AsyncIterator[bytes],
+    delimiter: str = ",",
+) -> AsyncIterator[ParsedRow]:
+    """
+    Возвращает (номер строки данных, словарь по заголовку, ошибка) для каждой записи CSV.
+    Первая непустая запись считается заголовком. Пустые значения превращаются в None.
+    Поддерживаются значения в кавычках, содержащие перевод строки.
+    """
+    header: Optional[list[str]] = None
+    row_number = 0
+    record_lines: list[str] = []
+    quotes_count = 0
+    async for line in iter_lines(stream):
+        record_lines.append(line)
+        quotes_count += line.count('"')
+        if quotes_count % 2:
+            # Кавычка не закрыта - значение продолжается на следующей строке
+            continue
+        record = "\n".join(record_lines)
+        record_lines = []
+        quotes_count = 0
+        if not record.strip():
+            continue
+
+        values = next(csv.reader([record], delimiter=delimiter))
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+
+        row_number += 1
+        if len(values) != len(header):
+            yield (
+                row_number,
+                None,
+                f"Количество колонок ({len(values)}) не совпадает с заголовком ({len(header)})",
+            )
+            continue
+        yield (
+            row_number,
+            {key: (value if value != "" else None) for key, value in zip(header, values, strict=True)},
+            None,
+        )
+
+    if record_lines:
+        yield row_number + 1, None, "Незакрытая кавычка в конце файла"
+
+
+async def iter_ndjson_rows(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[ParsedRow]:
+    """Возвращает (номер строки данных, объект, ошибка) для каждой непустой строки NDJSON"""
+    row_number = 0
+    async for line in iter_lines(stream):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Некорректный JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, "Строка должна содержать JSON-объект"
+            continue
+        yield row_number, data, None
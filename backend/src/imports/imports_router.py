@@ -0,0 +1,219 @@
+import logging
+from uuid import UUID
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Request,
+    Response,
+    Query,
+    status,
+)
+
+from src.auth.auth_cookie import CookieAuthMiddleware
+from src.common.common_router_models import (
+    ResponseError,
+    ApiErrorCodes,
+)
+from .imports_manager import (
+    ImportsManager,
+    ImportsManagerException,
+    ImportTooLargeError,
+    NoSuchImportJobError,
+    NoSuchImportCategoryError,
+)
+from .imports_router_models import (
+    ImportJobResponse,
+    ImportJobApiResponse,
+)
+from .imports_storage_models import ImportFormat
+
+
+_LOG = logging.getLogger("uvicorn.error")
+
+router = APIRouter(
+    prefix="/imports",
+    tags=["Imports"],
+)
+
+IMPORT_BODY_DESCRIPTION = (
+    "Тело запроса - сам файл (text/csv или application/x-ndjson), без multipart. "
+    "Файл сохраняется во временный файл, импорт идет в фоне: ответ содержит задачу, "
+    "прогресс и ошибки по строкам отдает GET /imports/{job_id}. "
+    "Файл больше IMPORTS_MAX_UPLOAD_BYTES отклоняется с 413."
+)
+
+
+@router.post(
+    "/deals/{category_id}",
+    dependencies=[Depends(CookieAuthMiddleware())],
+    description=IMPORT_BODY_DESCRIPTION,
+)
+async def import_deals(
+    request: Request,
+    response: Response,
+    category_id: UUID,
+    data_format: ImportFormat = Query(
+        default=ImportFormat.CSV,
+        description="Формат файла: csv или ndjson",
+    ),
+) -> ImportJobApiResponse:
+    """Импортировать сделки в категорию из CSV/NDJSON"""
+    imports_manager: ImportsManager = request.app.state.imports_manager
+    user_id = request.state.jwt_payload["user_id"]
+
+    errors = []
+    try:
+        job = await imports_manager.import_deals(
+            actor_id=user_id,
+            category_id=category_id,
+            data_format=data_format,
+            stream=request.stream(),
+        )
+
+        return ImportJobApiResponse.success_response(
+            data=ImportJobResponse.from_job(job),
+        )
+    except ImportTooLargeError as e:
+        _LOG.warning(e)
+        response.status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except NoSuchImportCategoryError as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except ImportsManagerException as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except Exception as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=f"Неизвестная ошибка. {str(e)}",
+        )
+        errors.append(error)
+
+    return ImportJobApiResponse.error_response(
+        errors=errors,
+        message_text="Ошибка при импорте сделок.",
+    )
+
+
+@router.post(
+    "/buyers/{category_id}",
+    dependencies=[Depends(CookieAuthMiddleware())],
+    description=IMPORT_BODY_DESCRIPTION,
+)
+async def import_buyers(
+    request: Request,
+    response: Response,
+    category_id: UUID,
+    data_format: ImportFormat = Query(
+        default=ImportFormat.CSV,
+        description="Формат файла: csv или ndjson",
+    ),
+) -> ImportJobApiResponse:
+    """Импортировать покупателей в категорию из CSV/NDJSON"""
+    imports_manager: ImportsManager = request.app.state.imports_manager
+    user_id = request.state.jwt_payload["user_id"]
+
+    errors = []
+    try:
+        job = await imports_manager.import_buyers(
+            actor_id=user_id,
+            category_id=category_id,
+            data_format=data_format,
+            stream=request.stream(),
+        )
+
+        return ImportJobApiResponse.success_response(
+            data=ImportJobResponse.from_job(job),
+        )
+    except ImportTooLargeError as e:
+        _LOG.warning(e)
+        response.status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except NoSuchImportCategoryError as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except ImportsManagerException as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except Exception as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=f"Неизвестная ошибка. {str(e)}",
+        )
+        errors.append(error)
+
+    return ImportJobApiResponse.error_response(
+        errors=errors,
+        message_text="Ошибка при импорте покупателей.",
+    )
+
+
+@router.get(
+    "/{job_id}",
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def get_import_job(
+    request: Request,
+    job_id: UUID,
+) -> ImportJobApiResponse:
+    """Получить прогресс и ошибки задачи импорта"""
+    imports_manager: ImportsManager = request.app.state.imports_manager
+    user_id = request.state.jwt_payload["user_id"]
+
+    errors = []
+    try:
+        job = await imports_manager.get_job(
+            actor_id=user_id,
+            job_id=job_id,
+        )
+
+        return ImportJobApiResponse.success_response(
+            data=ImportJobResponse.from_job(job),
+        )
+    except NoSuchImportJobError as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=str(e),
+        )
+        errors.append(error)
+    except Exception as e:
+        _LOG.error(e)
+        error = ResponseError(
+            code=ApiErrorCodes.BASE_EXCEPTION,
+            text=f"Неизвестная ошибка. {str(e)}",
+        )
+        errors.append(error)
+
+    return ImportJobApiResponse.error_response(
+        errors=errors,
+        message_text="Ошибка при получении задачи импорта.",
+    )
@@ -0,0 +1,62 @@
+import datetime as dt
+from typing import (
+    Optional,
+    List,
+)
+from uuid import UUID
+
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+from src.common.common_router_models import ApiResponse
+from .imports_storage_models import (
+    ImportEntityType,
+    ImportFormat,
+    ImportJobStatus,
+    ImportJobToGet,
+    ImportRowError,
+)
+
+
+class ImportJobResponse(BaseModel):
+    """Модель задачи импорта для ответа"""
+    id: UUID = Field(...)
+    entity_type: ImportEntityType = Field(...)
+    data_format: ImportFormat = Field(...)
+    category_id: UUID = Field(...)
+    status: ImportJobStatus = Field(...)
+    processed_rows: int = Field(...)
+    inserted_rows: int = Field(...)
+    failed_rows: int = Field(...)
+    errors: List[ImportRowError] = Field(default_factory=list)
+    error: Optional[str] = Field(default=None)
+    created_at: dt.datetime = Field(...)
+    created_by: UUID = Field(...)
+    updated_at: Optional[dt.datetime] = Field(default=None)
+    finished_at: Optional[dt.datetime] = Field(default=None)
+
+    @classmethod
+    def from_job(cls, job: ImportJobToGet):
+        return cls(
+            id=job.id,
+            entity_type=job.entity_type,
+            data_format=job.data_format,
+            category_id=job.category_id,
+            status=job.status,
+            processed_rows=job.processed_rows,
+            inserted_rows=job.inserted_rows,
+            failed_rows=job.failed_rows,
+            errors=job.errors,
+            error=job.error,
+            created_at=job.created_at,
+            created_by=job.created_by,
+            updated_at=job.updated_at,
+            finished_at=job.finished_at,
+        )
+
+
+class ImportJobApiResponse(ApiResponse):
+    """API ответ с задачей импорта"""
+    data: ImportJobResponse | dict = Field(default={})
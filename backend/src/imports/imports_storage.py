@@ -0,0 +1,134 @@
+import logging
+from typing import (
+    Optional,
+    List,
+)
+from uuid import UUID
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from src.clients.mongo.client import MClient
+from src.misc.misc_lib import utc_now
+from .imports_storage_models import (
+    ImportEntityType,
+    ImportFormat,
+    ImportJobStatus,
+    ImportJobToCreate,
+    ImportJobToGet,
+    ImportRowError,
+)
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+# Сколько ошибок по строкам храним в документе задачи, чтобы он не рос бесконечно
+MAX_STORED_ROW_ERRORS = 1000
+
+
+class ImportsStorageException(Exception):
+    pass
+
+
+class NoSuchImportJobError(ImportsStorageException):
+    pass
+
+
+class ImportsStorage:
+    def __init__(
+        self,
+        mongo_client: MClient,
+    ):
+        self.mongo_client: MClient = mongo_client
+        self.collection_name: str = "import_jobs"
+        self.collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            self.collection_name,
+        )
+
+    async def add_job(
+        self,
+        actor_id: UUID,
+        entity_type: ImportEntityType,
+        data_format: ImportFormat,
+        category_id: UUID,
+    ) -> ImportJobToGet:
+        """Создать задачу импорта"""
+        job = ImportJobToCreate(
+            entity_type=entity_type,
+            data_format=data_format,
+            category_id=category_id,
+            created_by=actor_id,
+        )
+        await self.collection.insert_one(
+            job.model_dump(),
+        )
+        return await self.get_job(job.id)
+
+    async def get_job(
+        self,
+        job_id: UUID,
+    ) -> ImportJobToGet:
+        """Получить задачу импорта по ID"""
+        projection = {
+            "_id": False,
+        }
+        for key in ImportJobToGet.model_fields:
+            projection[key] = True
+        data = await self.collection.find_one(
+            {"id": job_id},
+            projection=projection,
+        )
+        if data:
+            return ImportJobToGet(**data)
+        raise NoSuchImportJobError(
+            f"Задача импорта не найдена. {job_id=}",
+        )
+
+    async def update_job_progress(
+        self,
+        job_id: UUID,
+        processed_rows: int,
+        inserted_rows: int,
+        row_errors: List[ImportRowError],
+    ):
+        """Увеличить счетчики прогресса и дописать ошибки строк"""
+        update_query: dict = {
+            "$inc": {
+                "processed_rows": processed_rows,
+                "inserted_rows": inserted_rows,
+                "failed_rows": len(row_errors),
+            },
+            "$set": {
+                "updated_at": utc_now(),
+            },
+        }
+        if row_errors:
+            update_query["$push"] = {
+                "errors": {
+                    "$each": [row_error.model_dump() for row_error in row_errors],
+                    "$slice": MAX_STORED_ROW_ERRORS,
+                },
+            }
+        await self.collection.update_one(
+            {"id": job_id},
+            update_query,
+        )
+
+    async def finish_job(
+        self,
+        job_id: UUID,
+        status: ImportJobStatus,
+        error: Optional[str] = None,
+    ):
+        """Завершить задачу импорта"""
+        now = utc_now()
+        await self.collection.update_one(
+            {"id": job_id},
+            {
+                "$set": {
+                    "status": status.value,
+                    "error": error,
+                    "updated_at": now,
+                    "finished_at": now,
+                },
+            },
+        )
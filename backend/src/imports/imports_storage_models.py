@@ -0,0 +1,75 @@
+import datetime as dt
+from enum import Enum
+from typing import (
+    Optional,
+    List,
+)
+from uuid import (
+    UUID,
+    uuid4,
+)
+
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+from src.misc.misc_lib import utc_now
+
+
+class ImportEntityType(str, Enum):
+    DEALS = "deals"
+    BUYERS = "buyers"
+
+
+class ImportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class ImportJobStatus(str, Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ImportRowError(BaseModel):
+    """Ошибка импорта конкретной строки файла"""
+    row: int = Field(..., description="Номер строки данных (с 1, без заголовка)")
+    error: str = Field(..., description="Текст ошибки")
+
+
+class ImportJobToCreate(BaseModel):
+    """Модель задачи импорта для создания"""
+    id: UUID = Field(default_factory=uuid4)
+    entity_type: ImportEntityType = Field(..., description="Что импортируем: сделки или покупателей")
+    data_format: ImportFormat = Field(..., description="Формат файла: csv или ndjson")
+    category_id: UUID = Field(..., description="ID категории/воронки, в которую импортируем")
+    status: ImportJobStatus = Field(default=ImportJobStatus.RUNNING)
+    processed_rows: int = Field(default=0, description="Обработано строк")
+    inserted_rows: int = Field(default=0, description="Успешно добавлено записей")
+    failed_rows: int = Field(default=0, description="Строк с ошибками")
+    errors: List[ImportRowError] = Field(default_factory=list, description="Ошибки по строкам (ограниченный список)")
+    error: Optional[str] = Field(default=None, description="Ошибка, прервавшая импорт")
+    created_at: dt.datetime = Field(default_factory=utc_now)
+    created_by: UUID = Field(...)
+    updated_at: Optional[dt.datetime] = Field(default=None)
+    finished_at: Optional[dt.datetime] = Field(default=None)
+
+
+class ImportJobToGet(BaseModel):
+    """Модель задачи импорта для получения"""
+    id: UUID = Field(...)
+    entity_type: ImportEntityType = Field(...)
+    data_format: ImportFormat = Field(...)
+    category_id: UUID = Field(...)
+    status: ImportJobStatus = Field(...)
+    processed_rows: int = Field(default=0)
+    inserted_rows: int = Field(default=0)
+    failed_rows: int = Field(default=0)
+    errors: List[ImportRowError] = Field(default_factory=list)
+    error: Optional[str] = Field(default=None)
+    created_at: dt.datetime = Field(...)
+    created_by: UUID = Field(...)
+    updated_at: Optional[dt.datetime] = Field(default=None)
+    finished_at: Optional[dt.datetime] = Field(default=None)
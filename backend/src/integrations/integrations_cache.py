@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from typing import (
+    Dict,
+    Optional,
+)
+
+from cachetools import TTLCache
+
+from .integrations_storage import IntegrationsStorage
+from .integrations_storage_models import IntegrationToGet
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+# Страховка для нескольких воркеров: изменения, сделанные в другом процессе, подхватываются не позже чем через TTL
+ACTIVE_INTEGRATION_CACHE_TTL = 60
+
+
+class ActiveIntegrationCache:
+    """
+    Кеш активной интеграции по типу. Отсутствие активной интеграции тоже кешируется.
+    Сбрасывается IntegrationsManager при создании, изменении и удалении интеграций.
+    """
+
+    def __init__(
+        self,
+        integrations_storage: IntegrationsStorage,
+        ttl: float = ACTIVE_INTEGRATION_CACHE_TTL,
+    ):
+        self.integrations_storage = integrations_storage
+        self._cache: TTLCache[str, Optional[IntegrationToGet]] = TTLCache(maxsize=32, ttl=ttl)
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get(
+        self,
+        integration_type: str,
+    ) -> Optional[IntegrationToGet]:
+        """Получить активную интеграцию типа (первую найденную)"""
+        if integration_type in self._cache:
+            return self._cache[integration_type]
+
+        lock = self._locks.setdefault(integration_type, asyncio.Lock())
+        async with lock:
+            # Пока ждали блокировку, другой запрос мог уже заполнить кеш
+            if integration_type in self._cache:
+                return self._cache[integration_type]
+            integrations = await self.integrations_storage.get_by_type(
+                integration_type,
+                active_only=True,
+            )
+            integration = integrations[0] if integrations else None
+            self._cache[integration_type] = integration
+            return integration
+
+    def invalidate(
+        self,
+        integration_type: Optional[str] = None,
+    ):
+        """Сбросить кеш для типа интеграции или целиком"""
+        if integration_type is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(integration_type, None)
+        _LOG.info(f"Кеш активных интеграций сброшен: {integration_type=}")
@@ -7,6 +7,7 @@ from typing import (
 )
 from uuid import UUID
 
+from .integrations_cache import ActiveIntegrationCache
 from .integrations_storage import (
     IntegrationsStorage,
     NoSuchIntegrationError,
@@ -34,8 +35,10 @@ class IntegrationsManager:
     def __init__(
         self,
         integrations_storage: IntegrationsStorage,
+        integrations_cache: ActiveIntegrationCache,
     ):
         self.integrations_storage = integrations_storage
+        self.integrations_cache = integrations_cache
 
     async def create_integration(
         self,
@@ -55,7 +58,9 @@ class IntegrationsManager:
                 is_active=is_active,
             )
             
-            return await self.integrations_storage.create(integration)
+            new_integration = await self.integrations_storage.create(integration)
+            self.integrations_cache.invalidate(integration_type)
+            return new_integration
         except IntegrationsStorageException as e:
             _LOG.error(f"Error creating integration: {e}")
             raise IntegrationsManagerError(f"Failed to create integration: {e}") from e
@@ -91,8 +96,7 @@ class IntegrationsManager:
     ) -> Optional[IntegrationToGet]:
         """Получить активную интеграцию определенного типа (первую найденную)"""
         try:
-            integrations = await self.integrations_storage.get_by_type(integration_type, active_only=True)
-            return integrations[0] if integrations else None
+            return await self.integrations_cache.get(integration_type)
         except IntegrationsStorageException as e:
             _LOG.error(f"Error getting active integration: {e}")
             raise IntegrationsManagerError(f"Failed to get active integration: {e}") from e
@@ -118,13 +122,15 @@ class IntegrationsManager:
     ) -> IntegrationToGet:
         """Обновить интеграцию"""
         try:
-            return await self.integrations_storage.update(
+            integration = await self.integrations_storage.update(
                 integration_id=integration_id,
                 name=name,
                 is_active=is_active,
                 config=config,
                 updated_by=updated_by,
             )
+            self.integrations_cache.invalidate(integration.type)
+            return integration
         except NoSuchIntegrationError as e:
             raise NoSuchIntegrationManagerError(str(e)) from e
         except IntegrationsStorageException as e:
@@ -138,6 +144,8 @@ class IntegrationsManager:
         """Удалить интеграцию"""
         try:
             await self.integrations_storage.delete(integration_id)
+            # Тип удаленной интеграции неизвестен без дополнительного запроса, сбрасываем кеш целиком
+            self.integrations_cache.invalidate()
         except NoSuchIntegrationError as e:
             raise NoSuchIntegrationManagerError(str(e)) from e
         except IntegrationsStorageException as e:
@@ -14,10 +14,7 @@ from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
 from pymongo.errors import DuplicateKeyError
 
-from src.clients.mongo.client import (
-    MClient,
-    codec_options,
-)
+from src.clients.mongo.client import MClient
 from src.misc.misc_lib import utc_now
 from .integrations_storage_models import (
     IntegrationToCreate,
@@ -48,9 +45,8 @@ class IntegrationsStorage:
         self.mongo_client: MClient = mongo_client
         self.integrations_collection_name: str = "integrations"
         
-        self.integrations_collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
+        self.integrations_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
             self.integrations_collection_name,
-            codec_options=codec_options,
         )
 
     async def create(
@@ -0,0 +1,252 @@
+import datetime as dt
+import logging
+from typing import (
+    Any,
+    Optional,
+    List,
+)
+
+import pymongo
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError
+
+from src.clients.mongo.client import MClient
+from src.misc.misc_lib import (
+    normalized_phone_number,
+    utc_now,
+)
+from .telephony_calls_storage_models import (
+    CallRecordToCreate,
+    CallRecordToGet,
+    CallsSyncState,
+)
+from .telephony_models import (
+    CallInfo,
+    CallStatistic,
+)
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+# Документ состояния синхронизации в коллекции telephony_sync_state
+CALLS_SYNC_KEY = "mango_office_calls"
+
+
+class TelephonyCallsStorageException(Exception):
+    pass
+
+
+def _call_record(call: CallInfo) -> CallRecordToCreate:
+    from_phone = normalized_phone_number(call.from_number)
+    to_phone = normalized_phone_number(call.to_number)
+    # У неотвеченных звонков может не быть entry_id - ключом служат номера и время начала
+    record_id = call.entry_id or f"{call.from_number}:{call.to_number}:{call.start_time}"
+    return CallRecordToCreate(
+        id=record_id,
+        entry_id=call.entry_id or None,
+        from_number=call.from_number,
+        to_number=call.to_number,
+        from_phone=from_phone,
+        to_phone=to_phone,
+        phones=[phone for phone in {from_phone, to_phone} if phone],
+        start_time=call.start_time,
+        duration=call.duration,
+        status=call.status,
+        direction=call.direction,
+    )
+
+
+class TelephonyCallsStorage:
+    """Локальная копия истории звонков Mango Office и состояние ее синхронизации"""
+
+    def __init__(
+        self,
+        mongo_client: MClient,
+    ):
+        self.mongo_client: MClient = mongo_client
+        self.collection_name: str = "calls"
+        self.collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            self.collection_name,
+        )
+        self.sync_state_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            "telephony_sync_state",
+        )
+
+    async def create_indexes(self):
+        """Создать индексы коллекции звонков и состояния синхронизации"""
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index([("start_time", pymongo.DESCENDING)])
+        await self.collection.create_index(
+            [("phones", pymongo.ASCENDING), ("start_time", pymongo.DESCENDING)],
+        )
+        await self.collection.create_index(
+            [("from_phone", pymongo.ASCENDING), ("start_time", pymongo.DESCENDING)],
+        )
+        await self.collection.create_index(
+            [("to_phone", pymongo.ASCENDING), ("start_time", pymongo.DESCENDING)],
+        )
+        await self.sync_state_collection.create_index("key", unique=True)
+
+    async def upsert_calls(
+        self,
+        calls: List[CallInfo],
+    ) -> int:
+        """Сохранить звонки одним bulk_write; повторно полученные звонки перезаписываются"""
+        if not calls:
+            return 0
+        operations = []
+        for call in calls:
+            record = _call_record(call)
+            operations.append(
+                pymongo.ReplaceOne(
+                    {"id": record.id},
+                    record.model_dump(),
+                    upsert=True,
+                ),
+            )
+        result = await self.collection.bulk_write(
+            operations,
+            ordered=False,
+        )
+        return result.upserted_count + result.modified_count
+
+    async def get_calls(
+        self,
+        date_from: Optional[int] = None,
+        date_to: Optional[int] = None,
+        from_number: Optional[str] = None,
+        to_number: Optional[str] = None,
+        phones: Optional[List[str]] = None,
+        limit: int = 100,
+    ) -> List[CallRecordToGet]:
+        """Получить звонки за период (новые первыми) с фильтром по номерам"""
+        query = self._calls_query(date_from, date_to)
+        if from_number:
+            query["from_phone"] = normalized_phone_number(from_number)
+        if to_number:
+            query["to_phone"] = normalized_phone_number(to_number)
+        if phones is not None:
+            query["phones"] = {"$in": phones}
+
+        projection = {
+            "_id": False,
+        }
+        for key in CallRecordToGet.model_fields:
+            projection[key] = True
+        cursor = self.collection.find(
+            query,
+            projection=projection,
+        ).sort("start_time", pymongo.DESCENDING).limit(limit)
+        return [CallRecordToGet(**data) async for data in cursor]
+
+    async def get_statistics(
+        self,
+        date_from: int,
+        date_to: int,
+    ) -> CallStatistic:
+        """Посчитать статистику звонков за период агрегацией в Mongo"""
+        pipeline = [
+            {"$match": self._calls_query(date_from, date_to)},
+            {
+                "$group": {
+                    "_id": None,
+                    "total_calls": {"$sum": 1},
+                    "successful_calls": {
+                        "$sum": {"$cond": [{"$ifNull": ["$entry_id", False]}, 1, 0]},
+                    },
+                },
+            },
+        ]
+        async for data in self.collection.aggregate(pipeline):
+            return CallStatistic(
+                total_calls=data["total_calls"],
+                successful_calls=data["successful_calls"],
+                failed_calls=data["total_calls"] - data["successful_calls"],
+            )
+        return CallStatistic(total_calls=0, successful_calls=0, failed_calls=0)
+
+    @staticmethod
+    def _calls_query(
+        date_from: Optional[int],
+        date_to: Optional[int],
+    ) -> dict[str, Any]:
+        start_time: dict[str, int] = {}
+        if date_from is not None:
+            start_time["$gte"] = date_from
+        if date_to is not None:
+            start_time["$lte"] = date_to
+        return {"start_time": start_time} if start_time else {}
+
+    async def get_sync_state(self) -> CallsSyncState:
+        """Получить состояние синхронизации истории звонков"""
+        projection = {
+            "_id": False,
+        }
+        for key in CallsSyncState.model_fields:
+            projection[key] = True
+        data = await self.sync_state_collection.find_one(
+            {"key": CALLS_SYNC_KEY},
+            projection=projection,
+        )
+        return CallsSyncState(**(data or {}))
+
+    async def update_sync_state(
+        self,
+        synced_from: int,
+        watermark: int,
+    ):
+        """Сдвинуть водяной знак синхронизации"""
+        await self.sync_state_collection.update_one(
+            {"key": CALLS_SYNC_KEY},
+            {
+                "$set": {
+                    "synced_from": synced_from,
+                    "watermark": watermark,
+                    "updated_at": utc_now(),
+                },
+            },
+            upsert=True,
+        )
+
+    async def acquire_sync_lease(
+        self,
+        owner: str,
+        ttl: int,
+    ) -> bool:
+        """Захватить блокировку синхронизации, чтобы историю загружал только один воркер"""
+        now = utc_now()
+        try:
+            await self.sync_state_collection.find_one_and_update(
+                {
+                    "key": CALLS_SYNC_KEY,
+                    "$or": [
+                        {"lease_until": None},
+                        {"lease_until": {"$lte": now}},
+                        {"lease_owner": owner},
+                    ],
+                },
+                {
+                    "$set": {
+                        "lease_owner": owner,
+                        "lease_until": now + dt.timedelta(seconds=ttl),
+                    },
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Документ есть, но блокировка занята другим воркером
+            return False
+        return True
+
+    async def release_sync_lease(
+        self,
+        owner: str,
+    ):
+        """Освободить блокировку синхронизации"""
+        await self.sync_state_collection.update_one(
+            {
+                "key": CALLS_SYNC_KEY,
+                "lease_owner": owner,
+            },
+            {"$set": {"lease_until": None}},
+        )
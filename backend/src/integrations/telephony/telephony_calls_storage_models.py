@@ -0,0 +1,51 @@
+import datetime as dt
+from typing import (
+    Optional,
+    List,
+)
+
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+from src.misc.misc_lib import utc_now
+
+
+class CallRecordToCreate(BaseModel):
+    """Звонок из истории Mango Office в локальной копии"""
+    id: str = Field(..., description="ID записи звонка или ключ из номеров и времени начала")
+    entry_id: Optional[str] = Field(default=None)
+    from_number: Optional[str] = Field(default=None)
+    to_number: Optional[str] = Field(default=None)
+    from_phone: Optional[str] = Field(default=None, description="Нормализованный номер звонящего")
+    to_phone: Optional[str] = Field(default=None, description="Нормализованный номер получателя")
+    phones: List[str] = Field(default_factory=list, description="Нормализованные номера обеих сторон")
+    start_time: Optional[int] = Field(default=None, description="Время начала звонка (Unix timestamp)")
+    duration: Optional[int] = Field(default=None)
+    status: Optional[str] = Field(default=None)
+    direction: Optional[str] = Field(default=None)
+    synced_at: dt.datetime = Field(default_factory=utc_now)
+
+
+class CallRecordToGet(BaseModel):
+    """Звонок из локальной копии истории"""
+    id: str = Field(...)
+    entry_id: Optional[str] = Field(default=None)
+    from_number: Optional[str] = Field(default=None)
+    to_number: Optional[str] = Field(default=None)
+    from_phone: Optional[str] = Field(default=None)
+    to_phone: Optional[str] = Field(default=None)
+    phones: List[str] = Field(default_factory=list)
+    start_time: Optional[int] = Field(default=None)
+    duration: Optional[int] = Field(default=None)
+    status: Optional[str] = Field(default=None)
+    direction: Optional[str] = Field(default=None)
+    synced_at: dt.datetime = Field(...)
+
+
+class CallsSyncState(BaseModel):
+    """Состояние синхронизации истории звонков"""
+    synced_from: Optional[int] = Field(default=None, description="С какого момента история загружена")
+    watermark: Optional[int] = Field(default=None, description="До какого момента история загружена")
+    updated_at: Optional[dt.datetime] = Field(default=None)
@@ -1,8 +1,8 @@
 import logging
 import hashlib
+import hmac
 import time
 import json
-import asyncio
 from typing import (
     Dict,
     Any,
@@ -11,12 +11,8 @@ from typing import (
 )
 import httpx
 
-from .telephony_models import (
-    MangoOfficeConfig,
-    CallInfo,
-    CallHistoryResponse,
-    CallStatistic,
-)
+from src.clients.http_client import ManagedHttpClient
+from .telephony_models import MangoOfficeConfig
 
 
 _LOG = logging.getLogger("uvicorn.info")
@@ -34,8 +30,10 @@ class MangoOfficeClient:
     def __init__(
         self,
         config: MangoOfficeConfig,
+        http_client: ManagedHttpClient,
     ):
         self.config = config
+        self.http_client = http_client
         self.api_key = config.api_key
         self.api_salt = config.api_salt
         self.vpbx_api_key = config.vpbx_api_key
@@ -51,14 +49,30 @@ class MangoOfficeClient:
         sign_string = f"{self.vpbx_api_key}{json_data}{salt}"
         return hashlib.sha256(sign_string.encode()).hexdigest()
     
+    def verify_webhook_sign(
+        self,
+        vpbx_api_key: str,
+        sign: str,
+        json_data: str,
+    ) -> bool:
+        """Проверить подпись уведомления (webhook) от Mango Office"""
+        if not hmac.compare_digest(vpbx_api_key, self.vpbx_api_key):
+            return False
+        expected_sign = self._generate_vpbx_sign(json_data, self.vpbx_api_salt)
+        return hmac.compare_digest(sign, expected_sign)
+    
     async def _make_request(
         self,
         method: str,
         endpoint: str,
         data: Optional[Dict[str, Any]] = None,
         use_vpbx: bool = False,
+        retry: bool = True,
     ) -> Dict[str, Any]:
-        """Выполнить запрос к API Mango Office"""
+        """
+        Выполнить запрос к API Mango Office.
+        Все методы API вызываются через POST, поэтому команды с побочным эффектом передают retry=False.
+        """
         url = f"{self.BASE_URL}/{endpoint}"
         
         json_data = ""
@@ -87,15 +101,18 @@ class MangoOfficeClient:
             request_data.update(data)
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.request(
-                    method=method,
-                    url=url,
-                    json=request_data if json_data else None,
-                    headers=headers,
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.http_client.request(
+                method,
+                url,
+                retry=retry,
+                json=request_data if json_data else None,
+                headers=headers,
+            )
+            response.raise_for_status()
+            # 204 без тела: stats/result отвечает так, пока отчет формируется
+            if response.status_code == 204 or not response.content:
+                return {}
+            return response.json()
         except httpx.HTTPError as e:
             _LOG.error(f"Mango Office API request error: {e}")
             raise MangoOfficeClientError(f"Failed to make request to Mango Office: {e}") from e
@@ -118,58 +135,35 @@ class MangoOfficeClient:
             _LOG.error(f"Connection test failed: {e}")
             return False
     
-    async def get_call_history(
+    async def request_report(
         self,
-        date_from: Optional[int] = None,
-        date_to: Optional[int] = None,
-        from_number: Optional[str] = None,
-        to_number: Optional[str] = None,
-        limit: int = 100,
-    ) -> List[CallInfo]:
-        """Получить историю звонков"""
-        try:
-            if not date_from:
-                date_from = int(time.time()) - 86400  # По умолчанию последние 24 часа
-            if not date_to:
-                date_to = int(time.time())
-            
-            data = {
-                "date_from": date_from,
-                "date_to": date_to,
-                "limit": limit,
-            }
-            
-            if from_number:
-                data["from_number"] = from_number
-            if to_number:
-                data["to_number"] = to_number
-            
-            result = await self._make_request(
-                method="POST",
-                endpoint="stats/request",
-                data=data,
-            )
-            
-            # Получаем данные по ключу
-            key = result.get("key")
-            if not key:
-                return []
-            
-            # Ждем и получаем результат
-            await asyncio.sleep(2)  # Даем время на обработку
-            
-            history_result = await self._make_request(
-                method="POST",
-                endpoint="stats/result",
-                data={"key": key},
-            )
-            
-            calls = history_result.get("data", [])
-            return [CallInfo(**call) for call in calls]
-        except Exception as e:
-            _LOG.error(f"Error getting call history: {e}")
-            raise MangoOfficeClientError(f"Failed to get call history: {e}") from e
-    
+        data: Dict[str, Any],
+    ) -> str:
+        """Заказать отчет по звонкам (stats/request) и вернуть ключ для получения результата"""
+        result = await self._make_request(
+            method="POST",
+            endpoint="stats/request",
+            data=data,
+        )
+        key = result.get("key")
+        if not key:
+            raise MangoOfficeClientError("Mango Office did not return report key")
+        return key
+
+    async def fetch_report(
+        self,
+        key: str,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Получить готовый отчет по ключу (stats/result). None, если отчет еще формируется"""
+        result = await self._make_request(
+            method="POST",
+            endpoint="stats/result",
+            data={"key": key},
+        )
+        if not result:
+            return None
+        return result.get("data", [])
+
     async def make_call(
         self,
         from_number: str,
@@ -193,52 +187,10 @@ class MangoOfficeClient:
                 endpoint="commands/callback",
                 data=data,
                 use_vpbx=True,
+                retry=False,
             )
             
             return result
         except Exception as e:
             _LOG.error(f"Error making call: {e}")
             raise MangoOfficeClientError(f"Failed to make call: {e}") from e
-    
-    async def get_statistics(
-        self,
-        date_from: int,
-        date_to: int,
-    ) -> CallStatistic:
-        """Получить статистику звонков"""
-        try:
-            result = await self._make_request(
-                method="POST",
-                endpoint="stats/request",
-                data={
-                    "date_from": date_from,
-                    "date_to": date_to,
-                },
-            )
-            
-            key = result.get("key")
-            if not key:
-                raise MangoOfficeClientError("Failed to get statistics key")
-            
-            # Ждем и получаем результат
-            await asyncio.sleep(2)
-            
-            stats_result = await self._make_request(
-                method="POST",
-                endpoint="stats/result",
-                data={"key": key},
-            )
-            
-            data = stats_result.get("data", [])
-            total_calls = len(data)
-            successful_calls = sum(1 for call in data if call.get("entry_id"))
-            
-            return CallStatistic(
-                total_calls=total_calls,
-                successful_calls=successful_calls,
-                failed_calls=total_calls - successful_calls,
-            )
-        except Exception as e:
-            _LOG.error(f"Error getting statistics: {e}")
-            raise MangoOfficeClientError(f"Failed to get statistics: {e}") from e
-
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+from enum import Enum
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+)
+
+from bson import ObjectId
+from fastapi import WebSocket
+
+from src.misc.misc_lib import utc_now
+from src.model import TelephonyEventsConfig
+
+if TYPE_CHECKING:
+    from .telephony_events_storage import TelephonyEventsStorage
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+
+class TelephonyEventType(str, Enum):
+    CONNECTED = "connected"
+    PONG = "pong"
+    INCOMING_CALL = "incoming_call"
+    CALL_STATUS_CHANGED = "call_status_changed"
+    NEW_CALL_RECORD = "new_call_record"
+
+
+class TelephonyConnection:
+    """
+    WebSocket-соединение пользователя с собственной ограниченной очередью.
+    В сокет пишет только задача-отправитель, поэтому медленный клиент не задерживает рассылку.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        config: TelephonyEventsConfig,
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.config = config
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=config.queue_size)
+        self.dropped: int = 0
+        self._sender: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def put(self, message: str):
+        """Поставить сообщение в очередь; при переполнении отбросить самое старое"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                _LOG.warning(f"Очередь событий телефонии переполнена: user_id={self.user_id} dropped={self.dropped}")
+        self.queue.put_nowait(message)
+
+    async def _send_loop(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                await asyncio.wait_for(
+                    self.websocket.send_text(message),
+                    timeout=self.config.send_timeout,
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Клиент отключился или не успевает читать - закрываем, цикл приема в роутере завершится сам
+            _LOG.warning(f"Отправка событий телефонии прекращена: user_id={self.user_id} {e!r}")
+            try:
+                await self.websocket.close()
+            except Exception as close_error:
+                _LOG.debug(f"Не удалось закрыть WebSocket телефонии: user_id={self.user_id} {close_error!r}")
+
+    async def stop(self):
+        sender, self._sender = self._sender, None
+        if sender is None:
+            return
+        sender.cancel()
+        try:
+            await sender
+        except asyncio.CancelledError:
+            pass
+
+
+class TelephonyEventHub:
+    """
+    Реестр WebSocket-соединений телефонии и рассылка событий по пользователям.
+    С events_storage событие публикуется через Mongo, и каждый воркер доставляет его
+    своим соединениям; без него рассылка идет только в пределах процесса.
+    """
+
+    def __init__(
+        self,
+        config: TelephonyEventsConfig,
+        events_storage: Optional["TelephonyEventsStorage"] = None,
+    ):
+        self.config = config
+        self.events_storage = events_storage
+        # {user_id: {соединения пользователя}} - у пользователя может быть несколько вкладок
+        self._connections: Dict[str, Set[TelephonyConnection]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Начать доставку событий, опубликованных любым воркером"""
+        if self.events_storage is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen(self.events_storage))
+
+    async def stop(self):
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
+        listener.cancel()
+        try:
+            await listener
+        except asyncio.CancelledError:
+            pass
+
+    async def _listen(self, events_storage: "TelephonyEventsStorage"):
+        # Читаем события начиная с секунды последнего доставленного: ObjectId разных воркеров
+        # внутри одной секунды не упорядочены, уже доставленные за эту секунду пропускаем
+        resume_from = ObjectId.from_datetime(utc_now())
+        delivered_ids: Set[ObjectId] = set()
+        while True:
+            try:
+                async for document in events_storage.tail(resume_from):
+                    if document["_id"] in delivered_ids:
+                        continue
+                    second = ObjectId.from_datetime(document["_id"].generation_time)
+                    if second > resume_from:
+                        resume_from, delivered_ids = second, set()
+                    delivered_ids.add(document["_id"])
+                    self._deliver(document["message"], document.get("user_ids"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _LOG.warning(f"Чтение событий телефонии прервано: {e!r}")
+            # Курсор закрыт сервером (новых событий нет) - открываем заново
+            await asyncio.sleep(self.config.bus_retry_interval)
+
+    def register(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+    ) -> TelephonyConnection:
+        """Зарегистрировать принятое соединение и запустить отправку событий в него"""
+        connection = TelephonyConnection(websocket, user_id, self.config)
+        self._connections.setdefault(user_id, set()).add(connection)
+        connection.start()
+        _LOG.info(f"Telephony WebSocket connected: user {user_id}, connections={self.connections_count}")
+        return connection
+
+    async def unregister(
+        self,
+        connection: TelephonyConnection,
+    ):
+        """Убрать соединение из реестра и остановить отправку"""
+        connections = self._connections.get(connection.user_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self._connections[connection.user_id]
+        await connection.stop()
+        _LOG.info(f"Telephony WebSocket disconnected: user {connection.user_id}")
+
+    @property
+    def connections_count(self) -> int:
+        return sum(len(connections) for connections in self._connections.values())
+
+    def is_user_online(self, user_id: str) -> bool:
+        return user_id in self._connections
+
+    def send(
+        self,
+        connection: TelephonyConnection,
+        event: Dict[str, Any],
+    ):
+        """Отправить событие в одно соединение (ответ на ping, подтверждение подключения)"""
+        connection.put(json.dumps(event, default=str))
+
+    async def publish(
+        self,
+        event: Dict[str, Any],
+        user_ids: Optional[Iterable[str]] = None,
+    ):
+        """Разослать событие пользователям (None - всем подключенным) во всех воркерах"""
+        message = json.dumps(event, default=str)
+        targets = None if user_ids is None else list(set(user_ids))
+        if self.events_storage is None:
+            self._deliver(message, targets)
+            return
+        await self.events_storage.add_event(message, targets)
+
+    def _deliver(
+        self,
+        message: str,
+        user_ids: Optional[List[str]],
+    ) -> int:
+        """
+        Поставить сериализованное событие в соединения этого процесса.
+        Возвращает количество соединений, в которые оно поставлено.
+        """
+        if user_ids is None:
+            targets = list(self._connections.keys())
+        else:
+            targets = [user_id for user_id in user_ids if user_id in self._connections]
+        delivered = 0
+        for user_id in targets:
+            for connection in list(self._connections.get(user_id, ())):
+                connection.put(message)
+                delivered += 1
+        return delivered
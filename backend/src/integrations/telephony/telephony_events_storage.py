@@ -0,0 +1,90 @@
+import logging
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+)
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from src.clients.mongo.client import MClient
+from src.misc.misc_lib import utc_now
+from src.model import TelephonyEventsConfig
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+
+class TelephonyEventsStorage:
+    """
+    Capped-коллекция событий телефонии, через которую события расходятся по воркерам:
+    вебхук записывает событие, каждый воркер читает коллекцию tailable-курсором.
+    Работает и без реплика-сета, в отличие от change streams.
+    """
+
+    def __init__(
+        self,
+        mongo_client: MClient,
+        config: Optional[TelephonyEventsConfig] = None,
+    ):
+        self.mongo_client: MClient = mongo_client
+        self.config = config or TelephonyEventsConfig()
+        self.collection_name: str = "telephony_events"
+        self.collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            self.collection_name,
+        )
+
+    async def create_collection(self):
+        """Создать capped-коллекцию событий, если ее еще нет"""
+        try:
+            await self.mongo_client.db.create_collection(
+                self.collection_name,
+                capped=True,
+                size=self.config.bus_size,
+            )
+        except CollectionInvalid:
+            options = await self.collection.options()
+            if not options.get("capped"):
+                _LOG.error(
+                    "Collection %s is not capped, telephony events are not delivered across workers",
+                    self.collection_name,
+                )
+
+    async def add_event(
+        self,
+        message: str,
+        user_ids: Optional[List[str]],
+    ):
+        """Записать сериализованное событие; user_ids None - всем подключенным"""
+        await self.collection.insert_one(
+            {
+                "message": message,
+                "user_ids": user_ids,
+                "created_at": utc_now(),
+            },
+        )
+
+    async def tail(
+        self,
+        start_id: ObjectId,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        События начиная с start_id, затем ожидание новых. Итерация заканчивается,
+        когда сервер закрывает курсор (коллекция пуста или курсор отстал от перезаписи).
+        """
+        cursor = self.collection.find(
+            {"_id": {"$gte": start_id}},
+            cursor_type=CursorType.TAILABLE_AWAIT,
+        )
+        try:
+            # Пустой getMore завершает async for, хотя курсор жив; в заглушках motor alive - метод
+            while cursor.alive:  # type: ignore[truthy-function]
+                async for document in cursor:
+                    yield document
+        finally:
+            await cursor.close()
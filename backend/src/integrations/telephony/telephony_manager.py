@@ -1,23 +1,74 @@
+import asyncio
+import datetime as dt
+import functools
+import json
 import logging
+import time
 from typing import (
     Optional,
     List,
     Dict,
     Any,
+    Union,
+)
+from uuid import (
+    UUID,
+    uuid4,
 )
-from uuid import UUID
 
+from src.clients.http_client import HttpClientRegistry
+from src.buyers.buyers_storage import (
+    BuyersStorage,
+    BuyersStorageError,
+)
+from src.deals.deals_storage import (
+    DealsStorage,
+    DealsStorageError,
+)
+from src.misc.misc_lib import (
+    normalized_phone_number,
+    utc_now,
+)
+from src.model import (
+    TelephonyEventsConfig,
+    TelephonyReportsConfig,
+    TelephonySyncConfig,
+)
+from src.users.users_storage import UsersStorage
 from .telephony_client import (
     MangoOfficeClient,
     MangoOfficeClientError,
 )
+from .telephony_calls_storage import (
+    TelephonyCallsStorage,
+    TelephonyCallsStorageException,
+)
+from .telephony_calls_storage_models import CallRecordToGet
+from .telephony_events import (
+    TelephonyEventHub,
+    TelephonyEventType,
+)
 from .telephony_models import (
     MangoOfficeConfig,
     CallInfo,
     CallStatistic,
 )
-from ..integrations_storage import IntegrationsStorage
-from ..integrations_storage_models import IntegrationType
+from .telephony_reports_storage import (
+    TelephonyReportsStorage,
+    TelephonyReportsStorageException,
+    NoSuchTelephonyReportJobError,
+)
+from .telephony_reports_storage_models import (
+    TelephonyReportType,
+    TelephonyReportStatus,
+    TelephonyReportJobToCreate,
+    TelephonyReportJobToGet,
+)
+from ..integrations_cache import ActiveIntegrationCache
+from ..integrations_storage_models import (
+    IntegrationToGet,
+    IntegrationType,
+)
 
 
 _LOG = logging.getLogger("uvicorn.info")
@@ -27,33 +78,116 @@ class TelephonyManagerError(Exception):
     pass
 
 
+class NoSuchTelephonyReportJobManagerError(TelephonyManagerError):
+    pass
+
+
+class TelephonyWebhookSignError(TelephonyManagerError):
+    pass
+
+
+# Направление звонка в уведомлении events/summary
+MANGO_CALL_DIRECTIONS = {
+    1: "incoming",
+    2: "outgoing",
+}
+
+
+def _side_number(side: Optional[Dict[str, Any]]) -> Optional[str]:
+    return (side or {}).get("number")
+
+
+def _employee_numbers(payload: Dict[str, Any]) -> List[str]:
+    """Номера сотрудников в уведомлении: у стороны-сотрудника Mango Office указывает extension"""
+    numbers = []
+    for side in (payload.get("from"), payload.get("to")):
+        if side and side.get("extension") and side.get("number"):
+            numbers.append(side["number"])
+    return numbers
+
+
+def _summary_call(payload: Dict[str, Any]) -> CallInfo:
+    """Звонок из уведомления events/summary"""
+    talk_time = payload.get("talk_time") or 0
+    end_time = payload.get("end_time") or 0
+    return CallInfo(
+        entry_id=payload.get("entry_id"),
+        from_number=_side_number(payload.get("from")),
+        to_number=_side_number(payload.get("to")),
+        start_time=payload.get("create_time"),
+        duration=end_time - talk_time if talk_time and end_time else 0,
+        status="success" if payload.get("entry_result") == 1 else "failed",
+        direction=MANGO_CALL_DIRECTIONS.get(payload.get("call_direction"), "internal"),
+    )
+
+
+def _call_info(record: CallRecordToGet) -> CallInfo:
+    return CallInfo(**record.model_dump(include=set(CallInfo.model_fields)))
+
+
+def _build_report_result(
+    report_type: TelephonyReportType,
+    calls: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Преобразовать ответ stats/result в сохраняемый отчет"""
+    if report_type == TelephonyReportType.STATISTICS:
+        total_calls = len(calls)
+        successful_calls = sum(1 for call in calls if call.get("entry_id"))
+        statistics = CallStatistic(
+            total_calls=total_calls,
+            successful_calls=successful_calls,
+            failed_calls=total_calls - successful_calls,
+        )
+        return {"statistics": statistics.model_dump()}
+    return {
+        "calls": [CallInfo(**call).model_dump() for call in calls],
+        "total": len(calls),
+    }
+
+
 class TelephonyManager:
     """Менеджер для работы с телефонией"""
     
     def __init__(
         self,
-        integrations_storage: IntegrationsStorage,
+        integrations_cache: ActiveIntegrationCache,
+        http_clients: HttpClientRegistry,
+        reports_storage: TelephonyReportsStorage,
+        calls_storage: TelephonyCallsStorage,
+        buyers_storage: BuyersStorage,
+        deals_storage: DealsStorage,
+        users_storage: UsersStorage,
+        event_hub: TelephonyEventHub,
+        reports_config: Optional[TelephonyReportsConfig] = None,
+        sync_config: Optional[TelephonySyncConfig] = None,
+        events_config: Optional[TelephonyEventsConfig] = None,
     ):
-        self.integrations_storage = integrations_storage
+        self.integrations_cache = integrations_cache
+        self.http_clients = http_clients
+        self.reports_storage = reports_storage
+        self.calls_storage = calls_storage
+        self.buyers_storage = buyers_storage
+        self.deals_storage = deals_storage
+        self.reports_config = reports_config or TelephonyReportsConfig()
+        self.sync_config = sync_config or TelephonySyncConfig()
+        self.event_hub = event_hub
+        self.users_storage = users_storage
+        self.events_config = events_config or TelephonyEventsConfig()
+        # {нормализованный телефон: [user_id]} для маршрутизации событий и момент устаревания
+        self._users_by_phone: Dict[str, List[str]] = {}
+        self._users_by_phone_expires_at: float = 0.0
+        # Владелец блокировки синхронизации истории звонков
+        self._sync_owner: str = str(uuid4())
+        self._reports_lock = asyncio.Lock()
+        # Задачи отчетов, которые опрашивает этот воркер
+        self._report_tasks: Dict[UUID, asyncio.Task] = {}
         self._client: Optional[MangoOfficeClient] = None
-        self._current_integration_id: Optional[UUID] = None
+        self._integration: Optional[IntegrationToGet] = None
     
-    async def _get_active_integration(self) -> Optional[Dict[str, Any]]:
-        """Получить активную интеграцию телефонии"""
+    async def _get_active_integration(self) -> Optional[IntegrationToGet]:
+        """Получить активную интеграцию телефонии (из кеша)"""
         try:
-            integrations = await self.integrations_storage.get_by_type(
-                IntegrationType.TELEPHONY,
-                active_only=True,
-            )
-            if not integrations:
-                return None
-            
-            # Берем первую активную интеграцию
-            integration = integrations[0]
-            return {
-                "id": integration.id,
-                "config": integration.config,
-            }
+            return await self.integrations_cache.get(IntegrationType.TELEPHONY)
         except Exception as e:
             _LOG.error(f"Error getting active telephony integration: {e}")
             return None
@@ -64,15 +198,15 @@ class TelephonyManager:
         if not integration:
             raise TelephonyManagerError("No active telephony integration found")
         
-        # Если клиент уже инициализирован для этой интеграции, возвращаем его
-        if self._client and self._current_integration_id == integration["id"]:
+        # Если клиент уже инициализирован для этой же версии интеграции, возвращаем его без запросов в БД
+        if self._client and self._integration == integration:
             return self._client
         
         # Создаем новый клиент
         try:
-            config = MangoOfficeConfig(**integration["config"])
-            self._client = MangoOfficeClient(config)
-            self._current_integration_id = integration["id"]
+            config = MangoOfficeConfig(**integration.config)
+            self._client = MangoOfficeClient(config, self.http_clients.get("mango_office"))
+            self._integration = integration
             return self._client
         except Exception as e:
             _LOG.error(f"Error creating Mango Office client: {e}")
@@ -99,25 +233,31 @@ class TelephonyManager:
         from_number: Optional[str] = None,
         to_number: Optional[str] = None,
         limit: int = 100,
-    ) -> List[CallInfo]:
-        """Получить историю звонков"""
+    ) -> Union[List[CallInfo], TelephonyReportJobToGet]:
+        """
+        Получить историю звонков из отчета Mango Office. Если отчет не готов за inline_wait,
+        возвращается задача: клиент опрашивает ее через get_report_job.
+        """
+        now = int(time.time())
+        params: Dict[str, Any] = {
+            "date_from": date_from or now - 86400,  # По умолчанию последние 24 часа
+            "date_to": date_to or now,
+            "limit": limit,
+        }
+        if from_number:
+            params["from_number"] = from_number
+        if to_number:
+            params["to_number"] = to_number
         try:
-            client = await self._ensure_client()
-            return await client.get_call_history(
-                date_from=date_from,
-                date_to=date_to,
-                from_number=from_number,
-                to_number=to_number,
-                limit=limit,
-            )
+            job = await self._get_report(TelephonyReportType.CALL_HISTORY, params)
         except TelephonyManagerError as e:
             if "No active telephony integration found" in str(e):
                 _LOG.warning("No active telephony integration found for call history")
                 return []
             raise
-        except MangoOfficeClientError as e:
-            _LOG.error(f"Error getting call history: {e}")
-            raise TelephonyManagerError(f"Failed to get call history: {e}") from e
+        if job.status != TelephonyReportStatus.COMPLETED or not job.result:
+            return job
+        return [CallInfo(**call) for call in job.result.get("calls", [])]
     
     async def make_call(
         self,
@@ -146,20 +286,385 @@ class TelephonyManager:
         self,
         date_from: int,
         date_to: int,
-    ) -> CallStatistic:
-        """Получить статистику звонков"""
+    ) -> Union[CallStatistic, TelephonyReportJobToGet]:
+        """
+        Получить статистику звонков из отчета Mango Office. Если отчет не готов за inline_wait,
+        возвращается задача: клиент опрашивает ее через get_report_job.
+        """
         try:
-            client = await self._ensure_client()
-            return await client.get_statistics(
-                date_from=date_from,
-                date_to=date_to,
+            job = await self._get_report(
+                TelephonyReportType.STATISTICS,
+                {
+                    "date_from": date_from,
+                    "date_to": date_to,
+                },
             )
         except TelephonyManagerError as e:
             if "No active telephony integration found" in str(e):
                 _LOG.warning("No active telephony integration found for statistics")
                 return CallStatistic(total_calls=0, successful_calls=0, failed_calls=0)
             raise
-        except MangoOfficeClientError as e:
-            _LOG.error(f"Error getting statistics: {e}")
-            raise TelephonyManagerError(f"Failed to get statistics: {e}") from e
-
+        if job.status != TelephonyReportStatus.COMPLETED or not job.result:
+            return job
+        return CallStatistic(**job.result["statistics"])
+    
+    async def get_report_job(
+        self,
+        job_id: UUID,
+    ) -> TelephonyReportJobToGet:
+        """Получить задачу получения отчета (для опроса клиентом)"""
+        try:
+            return await self.reports_storage.get_job(job_id)
+        except NoSuchTelephonyReportJobError as e:
+            raise NoSuchTelephonyReportJobManagerError(str(e)) from e
+        except TelephonyReportsStorageException as e:
+            raise TelephonyManagerError(f"Failed to get report job: {e}") from e
+    
+    def _normalize_range(
+        self,
+        params: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Выровнять границы периода, чтобы близкие по времени запросы получали один и тот же отчет"""
+        step = self.reports_config.range_granularity
+        if step <= 1:
+            return params
+        date_from, date_to = params["date_from"], params["date_to"]
+        return {
+            **params,
+            "date_from": date_from - date_from % step,
+            "date_to": date_to if date_to % step == 0 else date_to - date_to % step + step,
+        }
+    
+    def _result_expires_at(
+        self,
+        params: Dict[str, Any],
+    ) -> dt.datetime:
+        """Отчет за закрытый период не меняется и хранится долго, за открытый - обновляется"""
+        if params["date_to"] < time.time() - self.reports_config.closed_range_lag:
+            ttl = self.reports_config.closed_range_ttl
+        else:
+            ttl = self.reports_config.open_range_ttl
+        return utc_now() + dt.timedelta(seconds=ttl)
+    
+    async def _get_report(
+        self,
+        report_type: TelephonyReportType,
+        params: Dict[str, Any],
+    ) -> TelephonyReportJobToGet:
+        """
+        Вернуть готовый отчет или задачу, которая его формирует. Новый отчет заказывается,
+        только если нет ни готового, ни формируемого (в том числе другим воркером).
+        """
+        params = self._normalize_range(params)
+        params_key = f"{report_type.value}:{json.dumps(params, sort_keys=True)}"
+        try:
+            async with self._reports_lock:
+                started_after = utc_now() - dt.timedelta(seconds=self.reports_config.poll_timeout)
+                job = await self.reports_storage.find_job(params_key, started_after)
+                if job is None:
+                    client = await self._ensure_client()
+                    job = await self.reports_storage.add_job(
+                        TelephonyReportJobToCreate(
+                            report_type=report_type,
+                            params_key=params_key,
+                            params=params,
+                            expires_at=self._result_expires_at(params),
+                        ),
+                    )
+                    task = asyncio.create_task(self._run_report_job(job, client))
+                    self._report_tasks[job.id] = task
+                    task.add_done_callback(functools.partial(self._forget_report_task, job.id))
+        except TelephonyReportsStorageException as e:
+            _LOG.error(f"Error getting telephony report job: {e}")
+            raise TelephonyManagerError(f"Failed to get report: {e}") from e
+        
+        if job.status in (TelephonyReportStatus.COMPLETED, TelephonyReportStatus.FAILED):
+            return job
+        
+        # Небольшие отчеты успевают сформироваться за время запроса - отдаем их сразу
+        return await self._wait_for_job(job.id, self.reports_config.inline_wait)
+    
+    def _forget_report_task(self, job_id: UUID, _: asyncio.Task):
+        self._report_tasks.pop(job_id, None)
+    
+    async def _wait_for_job(
+        self,
+        job_id: UUID,
+        wait: float,
+    ) -> TelephonyReportJobToGet:
+        """Дождаться завершения задачи отчета не дольше wait секунд и вернуть ее состояние"""
+        task = self._report_tasks.get(job_id)
+        if task is not None:
+            if wait > 0:
+                await asyncio.wait({task}, timeout=wait)
+            return await self.get_report_job(job_id)
+        
+        # Отчет формирует другой воркер - опрашиваем задачу в хранилище
+        deadline = time.monotonic() + wait
+        delay = self.reports_config.poll_initial_delay
+        while True:
+            job = await self.get_report_job(job_id)
+            remaining = deadline - time.monotonic()
+            if job.status in (TelephonyReportStatus.COMPLETED, TelephonyReportStatus.FAILED) or remaining <= 0:
+                return job
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.reports_config.poll_max_delay)
+    
+    async def _wait_for_report(
+        self,
+        client: MangoOfficeClient,
+        mango_key: str,
+    ) -> List[Dict[str, Any]]:
+        """Опрашивать готовность заказанного отчета Mango Office с растущей паузой"""
+        config = self.reports_config
+        started = time.monotonic()
+        delay = config.poll_initial_delay
+        while True:
+            await asyncio.sleep(delay)
+            calls = await client.fetch_report(mango_key)
+            if calls is not None:
+                return calls
+            if time.monotonic() - started >= config.poll_timeout:
+                raise TelephonyManagerError(f"Report is not ready after {config.poll_timeout} seconds")
+            delay = min(delay * 2, config.poll_max_delay)
+    
+    async def _run_report_job(
+        self,
+        job: TelephonyReportJobToGet,
+        client: MangoOfficeClient,
+    ):
+        """Сформировать отчет задачи и сохранить результат"""
+        config = self.reports_config
+        try:
+            mango_key = await client.request_report(job.params)
+            await self.reports_storage.mark_job_running(job.id, mango_key)
+            calls = await self._wait_for_report(client, mango_key)
+            
+            await self.reports_storage.finish_job(
+                job.id,
+                TelephonyReportStatus.COMPLETED,
+                expires_at=self._result_expires_at(job.params),
+                result=_build_report_result(job.report_type, calls),
+            )
+        except Exception as e:
+            _LOG.error(f"Error building telephony report: {job.id=} {e}")
+            try:
+                await self.reports_storage.finish_job(
+                    job.id,
+                    TelephonyReportStatus.FAILED,
+                    expires_at=utc_now() + dt.timedelta(seconds=config.open_range_ttl),
+                    error=str(e),
+                )
+            except Exception as storage_error:
+                _LOG.error(f"Error saving failed telephony report job: {job.id=} {storage_error}")
+    
+    async def sync_calls(self) -> int:
+        """
+        Догрузить историю звонков в локальную копию начиная с водяного знака.
+        Возвращает количество новых и измененных звонков.
+        """
+        config = self.sync_config
+        try:
+            client = await self._ensure_client()
+        except TelephonyManagerError as e:
+            _LOG.warning(f"Calls sync skipped: {e}")
+            return 0
+        
+        try:
+            if not await self.calls_storage.acquire_sync_lease(self._sync_owner, config.lease_ttl):
+                return 0
+            try:
+                state = await self.calls_storage.get_sync_state()
+                now = int(time.time())
+                if state.watermark is None:
+                    synced_from = now - config.initial_days * 24 * 60 * 60
+                    date_from = synced_from
+                else:
+                    synced_from = state.synced_from
+                    date_from = max(state.watermark - config.overlap, synced_from)
+                
+                synced = 0
+                while date_from < now:
+                    date_to = min(date_from + config.window, now)
+                    mango_key = await client.request_report(
+                        {
+                            "date_from": date_from,
+                            "date_to": date_to,
+                        },
+                    )
+                    calls = await self._wait_for_report(client, mango_key)
+                    synced += await self.calls_storage.upsert_calls(
+                        [CallInfo(**call) for call in calls],
+                    )
+                    await self.calls_storage.update_sync_state(synced_from, date_to)
+                    date_from = date_to
+                _LOG.info(f"Calls synced: {synced=} watermark={now}")
+                return synced
+            finally:
+                await self.calls_storage.release_sync_lease(self._sync_owner)
+        except (MangoOfficeClientError, TelephonyCallsStorageException) as e:
+            _LOG.error(f"Error syncing calls: {e}")
+            raise TelephonyManagerError(f"Failed to sync calls: {e}") from e
+    
+    async def _is_synced(
+        self,
+        date_from: int,
+        date_to: int,
+    ) -> bool:
+        """Покрывает ли локальная копия истории период целиком"""
+        if not self.sync_config.enabled:
+            return False
+        state = await self.calls_storage.get_sync_state()
+        if state.watermark is None or state.synced_from is None:
+            return False
+        date_to = min(date_to, int(time.time()))
+        return state.synced_from <= date_from and date_to - state.watermark <= self.sync_config.max_lag
+    
+    async def get_synced_call_history(
+        self,
+        date_from: Optional[int] = None,
+        date_to: Optional[int] = None,
+        from_number: Optional[str] = None,
+        to_number: Optional[str] = None,
+        limit: int = 100,
+    ) -> Optional[List[CallInfo]]:
+        """Получить историю звонков из локальной копии. None, если копия не покрывает период"""
+        now = int(time.time())
+        date_from = date_from or now - 86400  # По умолчанию последние 24 часа
+        date_to = date_to or now
+        if not await self._is_synced(date_from, date_to):
+            return None
+        records = await self.calls_storage.get_calls(
+            date_from=date_from,
+            date_to=date_to,
+            from_number=from_number,
+            to_number=to_number,
+            limit=limit,
+        )
+        return [_call_info(record) for record in records]
+    
+    async def get_synced_statistics(
+        self,
+        date_from: int,
+        date_to: int,
+    ) -> Optional[CallStatistic]:
+        """Посчитать статистику звонков по локальной копии. None, если копия не покрывает период"""
+        if not await self._is_synced(date_from, date_to):
+            return None
+        return await self.calls_storage.get_statistics(date_from, date_to)
+    
+    async def get_buyer_calls(
+        self,
+        buyer_id: UUID,
+        limit: int = 100,
+    ) -> List[CallInfo]:
+        """Звонки с покупателем: сопоставление по нормализованному телефону"""
+        try:
+            buyer = await self.buyers_storage.get_buyer(buyer_id)
+        except BuyersStorageError as e:
+            raise TelephonyManagerError(f"Failed to get buyer: {e}") from e
+        return await self._get_calls_by_phone(buyer.phone, limit)
+    
+    async def get_deal_calls(
+        self,
+        deal_id: UUID,
+        limit: int = 100,
+    ) -> List[CallInfo]:
+        """Звонки по сделке: звонки с покупателем, указанным клиентом сделки"""
+        try:
+            deal = await self.deals_storage.get_deal(deal_id)
+        except DealsStorageError as e:
+            raise TelephonyManagerError(f"Failed to get deal: {e}") from e
+        if deal.client_id is None:
+            return []
+        return await self.get_buyer_calls(deal.client_id, limit)
+    
+    async def _get_calls_by_phone(
+        self,
+        phone: Optional[str],
+        limit: int,
+    ) -> List[CallInfo]:
+        normalized_phone = normalized_phone_number(phone)
+        if not normalized_phone:
+            return []
+        records = await self.calls_storage.get_calls(
+            phones=[normalized_phone],
+            limit=limit,
+        )
+        return [_call_info(record) for record in records]
+    
+    async def handle_webhook(
+        self,
+        event_name: str,
+        vpbx_api_key: str,
+        sign: str,
+        json_data: str,
+    ) -> bool:
+        """
+        Обработать уведомление Mango Office: проверить подпись и разослать событие
+        сотрудникам-участникам звонка. Возвращает, было ли событие опубликовано.
+        """
+        client = await self._ensure_client()
+        if not client.verify_webhook_sign(vpbx_api_key, sign, json_data):
+            raise TelephonyWebhookSignError("Invalid Mango Office webhook sign")
+        try:
+            payload = json.loads(json_data)
+        except ValueError as e:
+            raise TelephonyManagerError(f"Invalid Mango Office webhook payload: {e}") from e
+        
+        if event_name == "call":
+            is_ringing = payload.get("call_state") == "Appeared" and (payload.get("to") or {}).get("extension")
+            event = {
+                "type": (
+                    TelephonyEventType.INCOMING_CALL.value if is_ringing
+                    else TelephonyEventType.CALL_STATUS_CHANGED.value
+                ),
+                "entry_id": payload.get("entry_id"),
+                "call_id": payload.get("call_id"),
+                "call_state": payload.get("call_state"),
+                "from_number": _side_number(payload.get("from")),
+                "to_number": _side_number(payload.get("to")),
+                "timestamp": payload.get("timestamp"),
+            }
+        elif event_name == "summary":
+            call = _summary_call(payload)
+            # Завершенный звонок сразу попадает в локальную историю, не дожидаясь синхронизации
+            try:
+                await self.calls_storage.upsert_calls([call])
+            except Exception as e:
+                _LOG.error(f"Error saving call from webhook: {e}")
+            event = {
+                "type": TelephonyEventType.NEW_CALL_RECORD.value,
+                "call": call.model_dump(),
+            }
+        else:
+            return False
+        
+        user_ids = await self._get_user_ids_by_phones(_employee_numbers(payload))
+        if not user_ids:
+            if not self.events_config.broadcast_unrouted:
+                return False
+            await self.event_hub.publish(event)
+            return True
+        await self.event_hub.publish(event, user_ids)
+        return True
+    
+    async def _get_user_ids_by_phones(
+        self,
+        phones: List[str],
+    ) -> List[str]:
+        """Сотрудники по телефонам; справочник телефонов перечитывается раз в users_cache_ttl секунд"""
+        if not phones:
+            return []
+        if time.monotonic() >= self._users_by_phone_expires_at:
+            users_by_phone: Dict[str, List[str]] = {}
+            for user in await self.users_storage.get_all():
+                phone = normalized_phone_number(user.phone)
+                if phone:
+                    users_by_phone.setdefault(phone, []).append(str(user.id))
+            self._users_by_phone = users_by_phone
+            self._users_by_phone_expires_at = time.monotonic() + self.events_config.users_cache_ttl
+        user_ids: List[str] = []
+        for phone in phones:
+            user_ids.extend(self._users_by_phone.get(normalized_phone_number(phone), []))
+        return user_ids
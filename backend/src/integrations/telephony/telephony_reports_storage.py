@@ -0,0 +1,162 @@
+import datetime as dt
+import logging
+from typing import (
+    Any,
+    Optional,
+)
+from uuid import UUID
+
+import pymongo
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from src.clients.mongo.client import MClient
+from src.misc.misc_lib import utc_now
+from .telephony_reports_storage_models import (
+    TelephonyReportStatus,
+    TelephonyReportJobToCreate,
+    TelephonyReportJobToGet,
+)
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+
+class TelephonyReportsStorageException(Exception):
+    pass
+
+
+class NoSuchTelephonyReportJobError(TelephonyReportsStorageException):
+    pass
+
+
+class TelephonyReportsStorage:
+    """Задачи получения отчетов Mango Office и их результаты, общие для всех воркеров"""
+
+    def __init__(
+        self,
+        mongo_client: MClient,
+    ):
+        self.mongo_client: MClient = mongo_client
+        self.collection_name: str = "telephony_report_jobs"
+        self.collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            self.collection_name,
+        )
+
+    async def create_indexes(self):
+        """Создать индексы коллекции задач отчетов"""
+        await self.collection.create_index(
+            [("params_key", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING)],
+        )
+        await self.collection.create_index(
+            "expires_at",
+            expireAfterSeconds=0,
+        )
+
+    @staticmethod
+    def _projection() -> dict[str, bool]:
+        projection = {
+            "_id": False,
+        }
+        for key in TelephonyReportJobToGet.model_fields:
+            projection[key] = True
+        return projection
+
+    async def add_job(
+        self,
+        job: TelephonyReportJobToCreate,
+    ) -> TelephonyReportJobToGet:
+        """Создать задачу получения отчета"""
+        await self.collection.insert_one(
+            job.model_dump(),
+        )
+        return TelephonyReportJobToGet(**job.model_dump())
+
+    async def get_job(
+        self,
+        job_id: UUID,
+    ) -> TelephonyReportJobToGet:
+        """Получить задачу получения отчета по ID"""
+        data = await self.collection.find_one(
+            {"id": job_id},
+            projection=self._projection(),
+        )
+        if data:
+            return TelephonyReportJobToGet(**data)
+        raise NoSuchTelephonyReportJobError(
+            f"Задача получения отчета не найдена. {job_id=}",
+        )
+
+    async def find_job(
+        self,
+        params_key: str,
+        started_after: dt.datetime,
+    ) -> Optional[TelephonyReportJobToGet]:
+        """
+        Найти задачу, которую можно переиспользовать: непросроченный готовый отчет
+        или задачу в работе, начатую после started_after (более старые считаются зависшими).
+        """
+        data = await self.collection.find_one(
+            {
+                "params_key": params_key,
+                "expires_at": {"$gt": utc_now()},
+                "$or": [
+                    {"status": TelephonyReportStatus.COMPLETED.value},
+                    {
+                        "status": {
+                            "$in": [
+                                TelephonyReportStatus.PENDING.value,
+                                TelephonyReportStatus.RUNNING.value,
+                            ],
+                        },
+                        "created_at": {"$gt": started_after},
+                    },
+                ],
+            },
+            projection=self._projection(),
+            sort=[("created_at", pymongo.DESCENDING)],
+        )
+        if data:
+            return TelephonyReportJobToGet(**data)
+        return None
+
+    async def mark_job_running(
+        self,
+        job_id: UUID,
+        mango_key: str,
+    ):
+        """Отметить, что отчет заказан в Mango Office"""
+        await self.collection.update_one(
+            {"id": job_id},
+            {
+                "$set": {
+                    "status": TelephonyReportStatus.RUNNING.value,
+                    "mango_key": mango_key,
+                    "updated_at": utc_now(),
+                },
+            },
+        )
+
+    async def finish_job(
+        self,
+        job_id: UUID,
+        status: TelephonyReportStatus,
+        expires_at: dt.datetime,
+        result: Optional[dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ):
+        """Завершить задачу: сохранить отчет или ошибку"""
+        now = utc_now()
+        await self.collection.update_one(
+            {"id": job_id},
+            {
+                "$set": {
+                    "status": status.value,
+                    "result": result,
+                    "error": error,
+                    "updated_at": now,
+                    "finished_at": now,
+                    "expires_at": expires_at,
+                },
+            },
+        )
+        _LOG.info(f"Задача получения отчета Mango Office завершена: {job_id=} {status=}")
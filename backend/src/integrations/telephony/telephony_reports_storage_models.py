@@ -0,0 +1,61 @@
+import datetime as dt
+from enum import Enum
+from typing import (
+    Any,
+    Optional,
+)
+from uuid import (
+    UUID,
+    uuid4,
+)
+
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+from src.misc.misc_lib import utc_now
+
+
+class TelephonyReportType(str, Enum):
+    CALL_HISTORY = "call_history"
+    STATISTICS = "statistics"
+
+
+class TelephonyReportStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class TelephonyReportJobToCreate(BaseModel):
+    """Модель задачи получения отчета Mango Office для создания"""
+    id: UUID = Field(default_factory=uuid4)
+    report_type: TelephonyReportType = Field(...)
+    params_key: str = Field(..., description="Ключ отчета: тип и параметры запроса (период, фильтры)")
+    params: dict[str, Any] = Field(default_factory=dict, description="Параметры запроса stats/request")
+    status: TelephonyReportStatus = Field(default=TelephonyReportStatus.PENDING)
+    mango_key: Optional[str] = Field(default=None, description="Ключ отчета, выданный Mango Office")
+    result: Optional[dict[str, Any]] = Field(default=None, description="Готовый отчет")
+    error: Optional[str] = Field(default=None)
+    created_at: dt.datetime = Field(default_factory=utc_now)
+    updated_at: Optional[dt.datetime] = Field(default=None)
+    finished_at: Optional[dt.datetime] = Field(default=None)
+    expires_at: dt.datetime = Field(..., description="Когда задача удаляется TTL-индексом")
+
+
+class TelephonyReportJobToGet(BaseModel):
+    """Модель задачи получения отчета Mango Office для получения"""
+    id: UUID = Field(...)
+    report_type: TelephonyReportType = Field(...)
+    params_key: str = Field(...)
+    params: dict[str, Any] = Field(default_factory=dict)
+    status: TelephonyReportStatus = Field(...)
+    mango_key: Optional[str] = Field(default=None)
+    result: Optional[dict[str, Any]] = Field(default=None)
+    error: Optional[str] = Field(default=None)
+    created_at: dt.datetime = Field(...)
+    updated_at: Optional[dt.datetime] = Field(default=None)
+    finished_at: Optional[dt.datetime] = Field(default=None)
+    expires_at: dt.datetime = Field(...)
@@ -1,6 +1,8 @@
 import json
 import logging
+import time
 from typing import Optional
+from urllib.parse import parse_qs
 from uuid import UUID
 
 from fastapi import (
@@ -8,6 +10,7 @@ from fastapi import (
     Body,
     Depends,
     Request,
+    Response,
     Query,
     WebSocket,
     WebSocketDisconnect,
@@ -16,7 +19,7 @@ from fastapi import (
 )
 
 from src.auth.auth_cookie import CookieAuthMiddleware
-from src.auth.auth_handler import decode_jwt
+from src.auth.auth_handler import decode_jwt_cached
 from src.common.common_router_models import (
     ResponseError,
     ApiErrorCodes,
@@ -28,9 +31,18 @@ from ..integrations_manager import (
     NoSuchIntegrationManagerError,
 )
 from ..integrations_storage_models import IntegrationType
+from .telephony_events import (
+    TelephonyEventHub,
+    TelephonyEventType,
+)
 from .telephony_manager import (
     TelephonyManager,
     TelephonyManagerError,
+    NoSuchTelephonyReportJobManagerError,
+)
+from .telephony_reports_storage_models import (
+    TelephonyReportJobToGet,
+    TelephonyReportStatus,
 )
 from .telephony_router_models import (
     CreateMangoOfficeIntegrationParams,
@@ -42,6 +54,7 @@ from .telephony_router_models import (
     MakeCallResponse,
     StatisticsParams,
     StatisticsResponse,
+    TelephonyReportJobResponse,
 )
 
 
@@ -53,6 +66,31 @@ router = APIRouter(
 )
 
 
+def _pending_report_response(
+    response: Response,
+    job: TelephonyReportJobToGet,
+) -> ApiResponse:
+    """
+    Отчет не успел сформироваться за время запроса: 202 и задача, которую клиент опрашивает
+    через /reports/{job_id}. Неудачная задача отдается ошибкой.
+    """
+    if job.status == TelephonyReportStatus.FAILED:
+        return ApiResponse.error_response(
+            errors=[
+                ResponseError(
+                    code=ApiErrorCodes.BASE_EXCEPTION,
+                    text=job.error or "Report failed",
+                ),
+            ],
+            message_text="Report job failed",
+        )
+    response.status_code = status.HTTP_202_ACCEPTED
+    return ApiResponse.success_response(
+        data=TelephonyReportJobResponse.from_job(job).model_dump(),
+        message_text="Report is being prepared",
+    )
+
+
 @router.post(
     "/mango-office",
     dependencies=[Depends(CookieAuthMiddleware())],
@@ -266,6 +304,7 @@ async def test_connection(
 )
 async def get_call_history(
     request: Request,
+    response: Response,
     params: CallHistoryParams = Body(...),
 ) -> ApiResponse:
     """Получить историю звонков"""
@@ -273,19 +312,29 @@ async def get_call_history(
     
     errors = []
     try:
-        calls = await telephony_manager.get_call_history(
+        synced_calls = await telephony_manager.get_synced_call_history(
             date_from=params.date_from,
             date_to=params.date_to,
             from_number=params.from_number,
             to_number=params.to_number,
             limit=params.limit,
         )
+        if synced_calls is not None:
+            report = TelephonyReportJobResponse.from_calls(synced_calls)
+        else:
+            calls = await telephony_manager.get_call_history(
+                date_from=params.date_from,
+                date_to=params.date_to,
+                from_number=params.from_number,
+                to_number=params.to_number,
+                limit=params.limit,
+            )
+            if isinstance(calls, TelephonyReportJobToGet):
+                return _pending_report_response(response, calls)
+            report = TelephonyReportJobResponse.from_calls(calls)
         
         return ApiResponse.success_response(
-            data={
-                "calls": [call.model_dump() for call in calls],
-                "total": len(calls),
-            },
+            data=report.model_dump(),
             message_text="Call history retrieved successfully",
         )
     except TelephonyManagerError as e:
@@ -348,6 +397,7 @@ async def make_call(
 )
 async def get_statistics(
     request: Request,
+    response: Response,
     params: StatisticsParams = Body(...),
 ) -> ApiResponse:
     """Получить статистику звонков"""
@@ -355,13 +405,23 @@ async def get_statistics(
     
     errors = []
     try:
-        statistics = await telephony_manager.get_statistics(
+        synced_statistics = await telephony_manager.get_synced_statistics(
             date_from=params.date_from,
             date_to=params.date_to,
         )
+        if synced_statistics is not None:
+            report = TelephonyReportJobResponse.from_statistics(synced_statistics)
+        else:
+            statistics = await telephony_manager.get_statistics(
+                date_from=params.date_from,
+                date_to=params.date_to,
+            )
+            if isinstance(statistics, TelephonyReportJobToGet):
+                return _pending_report_response(response, statistics)
+            report = TelephonyReportJobResponse.from_statistics(statistics)
         
         return ApiResponse.success_response(
-            data={"statistics": statistics.model_dump()},
+            data=report.model_dump(),
             message_text="Statistics retrieved successfully",
         )
     except TelephonyManagerError as e:
@@ -378,6 +438,178 @@ async def get_statistics(
         )
 
 
+@router.get(
+    "/reports/{job_id}",
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def get_report_job(
+    request: Request,
+    job_id: UUID,
+) -> ApiResponse:
+    """Получить задачу получения отчета (истории звонков или статистики) и готовый отчет"""
+    telephony_manager: TelephonyManager = request.app.state.telephony_manager
+    
+    errors = []
+    try:
+        job = await telephony_manager.get_report_job(job_id)
+        if job.status == TelephonyReportStatus.FAILED:
+            errors.append(
+                ResponseError(
+                    code=ApiErrorCodes.BASE_EXCEPTION,
+                    text=job.error or "Report failed",
+                ),
+            )
+            return ApiResponse.error_response(
+                errors=errors,
+                message_text="Report job failed",
+            )
+        
+        return ApiResponse.success_response(
+            data=TelephonyReportJobResponse.from_job(job).model_dump(),
+            message_text="Report job retrieved successfully",
+        )
+    except NoSuchTelephonyReportJobManagerError as e:
+        _LOG.error(f"Report job not found: {e}")
+        errors.append(
+            ResponseError(
+                code=ApiErrorCodes.BASE_EXCEPTION,
+                text=str(e),
+            ),
+        )
+        return ApiResponse.error_response(
+            errors=errors,
+            message_text="Report job not found",
+        )
+    except TelephonyManagerError as e:
+        _LOG.error(f"Error getting report job: {e}")
+        errors.append(
+            ResponseError(
+                code=ApiErrorCodes.BASE_EXCEPTION,
+                text=str(e),
+            ),
+        )
+        return ApiResponse.error_response(
+            errors=errors,
+            message_text="Failed to get report job",
+        )
+
+
+@router.get(
+    "/calls/buyer/{buyer_id}",
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def get_buyer_calls(
+    request: Request,
+    buyer_id: UUID,
+    limit: int = Query(default=100, ge=1, le=1000),
+) -> ApiResponse:
+    """Получить звонки с покупателем (по номеру телефона покупателя)"""
+    telephony_manager: TelephonyManager = request.app.state.telephony_manager
+    
+    errors = []
+    try:
+        calls = await telephony_manager.get_buyer_calls(buyer_id, limit=limit)
+        
+        return ApiResponse.success_response(
+            data={
+                "calls": [call.model_dump() for call in calls],
+                "total": len(calls),
+            },
+            message_text="Buyer calls retrieved successfully",
+        )
+    except TelephonyManagerError as e:
+        _LOG.error(f"Error getting buyer calls: {e}")
+        errors.append(
+            ResponseError(
+                code=ApiErrorCodes.BASE_EXCEPTION,
+                text=str(e),
+            ),
+        )
+        return ApiResponse.error_response(
+            errors=errors,
+            message_text="Failed to get buyer calls",
+        )
+
+
+@router.get(
+    "/calls/deal/{deal_id}",
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def get_deal_calls(
+    request: Request,
+    deal_id: UUID,
+    limit: int = Query(default=100, ge=1, le=1000),
+) -> ApiResponse:
+    """Получить звонки по сделке (с покупателем, указанным клиентом сделки)"""
+    telephony_manager: TelephonyManager = request.app.state.telephony_manager
+    
+    errors = []
+    try:
+        calls = await telephony_manager.get_deal_calls(deal_id, limit=limit)
+        
+        return ApiResponse.success_response(
+            data={
+                "calls": [call.model_dump() for call in calls],
+                "total": len(calls),
+            },
+            message_text="Deal calls retrieved successfully",
+        )
+    except TelephonyManagerError as e:
+        _LOG.error(f"Error getting deal calls: {e}")
+        errors.append(
+            ResponseError(
+                code=ApiErrorCodes.BASE_EXCEPTION,
+                text=str(e),
+            ),
+        )
+        return ApiResponse.error_response(
+            errors=errors,
+            message_text="Failed to get deal calls",
+        )
+
+
+@router.post(
+    "/mango-office/events/{event_name}",
+)
+async def mango_office_webhook(
+    request: Request,
+    event_name: str,
+) -> ApiResponse:
+    """
+    Уведомления Mango Office (events/call, events/summary).
+    Запрос подписан ключом VPBX API, поэтому аутентификация по cookie не нужна.
+    """
+    telephony_manager: TelephonyManager = request.app.state.telephony_manager
+    
+    errors = []
+    try:
+        # Mango Office присылает application/x-www-form-urlencoded с полями vpbx_api_key, sign и json
+        form = parse_qs((await request.body()).decode())
+        published = await telephony_manager.handle_webhook(
+            event_name=event_name,
+            vpbx_api_key=form.get("vpbx_api_key", [""])[0],
+            sign=form.get("sign", [""])[0],
+            json_data=form.get("json", [""])[0],
+        )
+        
+        return ApiResponse.success_response(
+            data={"published": published},
+            message_text="Webhook processed successfully",
+        )
+    except TelephonyManagerError as e:
+        _LOG.error(f"Error processing Mango Office webhook {event_name}: {e}")
+        errors.append(
+            ResponseError(
+                code=ApiErrorCodes.BASE_EXCEPTION,
+                text=str(e),
+            ),
+        )
+        return ApiResponse.error_response(
+            errors=errors,
+            message_text="Failed to process webhook",
+        )
+
+
 @router.websocket("/ws")
 async def telephony_websocket_endpoint(
     websocket: WebSocket,
@@ -395,80 +627,63 @@ async def telephony_websocket_endpoint(
     - new_call_record: новая запись в истории звонков
     - connected: подтверждение подключения
     """
+    # Проверяем аутентификацию через cookies
+    token = websocket.cookies.get("EPS-Auth")
+    if not token:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        _LOG.warning("WebSocket connection rejected: no token")
+        return
+    
+    # Проверяем токен (проверенные токены кешируются, переподключения не проверяют подпись заново)
     try:
-        # Проверяем аутентификацию через cookies
-        cookies = websocket.cookies
-        token = cookies.get("EPS-Auth")
-        
-        if not token:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            _LOG.warning("WebSocket connection rejected: no token")
-            return
-        
-        # Проверяем токен
-        try:
-            payload = decode_jwt(token)
-            if not payload:
-                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-                _LOG.warning(f"WebSocket connection rejected: invalid token for user {user_id}")
-                return
-            
-            # Проверяем, что user_id совпадает
-            token_user_id = str(payload.get("user_id", ""))
-            if token_user_id != user_id:
-                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-                _LOG.warning(f"WebSocket connection rejected: user_id mismatch. Token: {token_user_id}, Query: {user_id}")
-                return
-            
-            # Проверяем срок действия токена
-            expires = payload.get("expires", 0)
-            import time
-            if expires <= time.time():
-                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-                _LOG.warning(f"WebSocket connection rejected: token expired for user {user_id}")
-                return
-        except Exception as e:
-            _LOG.error(f"Error verifying token: {e}")
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-        
-        # Принимаем соединение
-        await websocket.accept()
-        
-        # Отправляем подтверждение подключения
-        await websocket.send_text(json.dumps({
-            "type": "connected",
-            "user_id": user_id
-        }))
-        
-        _LOG.info(f"Telephony WebSocket connected: user {user_id}")
+        payload = decode_jwt_cached(token)
+    except Exception as e:
+        _LOG.error(f"Error verifying token: {e}")
+        payload = None
+    if not payload:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        _LOG.warning(f"WebSocket connection rejected: invalid token for user {user_id}")
+        return
+    
+    # Проверяем, что user_id совпадает
+    token_user_id = str(payload.get("user_id", ""))
+    if token_user_id != user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        _LOG.warning(f"WebSocket connection rejected: user_id mismatch. Token: {token_user_id}, Query: {user_id}")
+        return
+    
+    # Проверяем срок действия токена
+    if payload.get("expires", 0) <= time.time():
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        _LOG.warning(f"WebSocket connection rejected: token expired for user {user_id}")
+        return
+    
+    event_hub: TelephonyEventHub = websocket.app.state.telephony_event_hub
+    await websocket.accept()
+    connection = event_hub.register(websocket, user_id)
+    try:
+        event_hub.send(connection, {
+            "type": TelephonyEventType.CONNECTED.value,
+            "user_id": user_id,
+        })
         
         # Обрабатываем входящие сообщения (ping/pong для поддержания соединения)
         while True:
+            data = await websocket.receive_text()
             try:
-                data = await websocket.receive_text()
-                message_data = json.loads(data)
-                message_type = message_data.get("type")
-                
-                if message_type == "ping":
-                    # Пинг для поддержания соединения
-                    await websocket.send_text(json.dumps({"type": "pong"}))
-                else:
-                    _LOG.warning(f"Unknown message type: {message_type}")
+                message_type = json.loads(data).get("type")
+            except (ValueError, AttributeError):
+                _LOG.warning(f"Invalid telephony WebSocket message from user {user_id}")
+                continue
             
-            except WebSocketDisconnect:
-                _LOG.info(f"Telephony WebSocket disconnected: user {user_id}")
-                break
-            except Exception as e:
-                _LOG.error(f"Error processing WebSocket message: {e}")
-                break
-    
+            if message_type == "ping":
+                # Ответ идет через очередь соединения, чтобы не писать в сокет параллельно с рассылкой
+                event_hub.send(connection, {"type": TelephonyEventType.PONG.value})
+            else:
+                _LOG.warning(f"Unknown message type: {message_type}")
     except WebSocketDisconnect:
-        _LOG.info(f"Telephony WebSocket disconnected: user {user_id}")
+        pass
     except Exception as e:
         _LOG.error(f"Telephony WebSocket error: {e}")
-        try:
-            await websocket.close()
-        except:
-            pass
-
+    finally:
+        await event_hub.unregister(connection)
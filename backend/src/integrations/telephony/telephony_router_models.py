@@ -1,8 +1,14 @@
+import datetime as dt
 from typing import Optional, List
 from pydantic import BaseModel, Field
 from uuid import UUID
 
 from .telephony_models import CallInfo, CallStatistic
+from .telephony_reports_storage_models import (
+    TelephonyReportType,
+    TelephonyReportStatus,
+    TelephonyReportJobToGet,
+)
 
 
 class CreateMangoOfficeIntegrationParams(BaseModel):
@@ -69,3 +75,49 @@ class StatisticsResponse(BaseModel):
     """Ответ со статистикой"""
     statistics: CallStatistic = Field(...)
 
+
+
+class TelephonyReportJobResponse(BaseModel):
+    """
+    Отчет Mango Office: готовый (calls/total или statistics) или задача в статусе pending/running.
+    Задачу клиент опрашивает через /reports/{job_id}, пока она не станет completed или failed.
+    Готовые отчеты из кеша и локальной копии истории звонков отдаются без job_id.
+    """
+    job_id: Optional[UUID] = Field(default=None)
+    report_type: TelephonyReportType = Field(...)
+    status: TelephonyReportStatus = Field(...)
+    error: Optional[str] = Field(default=None)
+    created_at: Optional[dt.datetime] = Field(default=None)
+    finished_at: Optional[dt.datetime] = Field(default=None)
+    calls: Optional[List[CallInfo]] = Field(default=None)
+    total: Optional[int] = Field(default=None)
+    statistics: Optional[CallStatistic] = Field(default=None)
+
+    @classmethod
+    def from_job(cls, job: TelephonyReportJobToGet) -> "TelephonyReportJobResponse":
+        return cls(
+            job_id=job.id,
+            report_type=job.report_type,
+            status=job.status,
+            error=job.error,
+            created_at=job.created_at,
+            finished_at=job.finished_at,
+            **(job.result or {}),
+        )
+
+    @classmethod
+    def from_calls(cls, calls: List[CallInfo]) -> "TelephonyReportJobResponse":
+        return cls(
+            report_type=TelephonyReportType.CALL_HISTORY,
+            status=TelephonyReportStatus.COMPLETED,
+            calls=calls,
+            total=len(calls),
+        )
+
+    @classmethod
+    def from_statistics(cls, statistics: CallStatistic) -> "TelephonyReportJobResponse":
+        return cls(
+            report_type=TelephonyReportType.STATISTICS,
+            status=TelephonyReportStatus.COMPLETED,
+            statistics=statistics,
+        )
@@ -1,6 +1,7 @@
 import logging
 import time
 import base64
+from datetime import date
 from typing import (
     Dict,
     Any,
@@ -9,8 +10,11 @@ from typing import (
 )
 import httpx
 
+from src.clients.http_client import ManagedHttpClient
+from .zoom_token_broker import ZoomTokenBroker
 from .zoom_models import (
     ZoomConfig,
+    ZoomToken,
     CreateMeetingParams,
     UpdateMeetingParams,
     ZoomMeeting,
@@ -20,6 +24,8 @@ from .zoom_models import (
     ParticipantListResponse,
     ZoomRecording,
     RecordingListResponse,
+    ZoomRecordedMeeting,
+    RecordedMeetingListResponse,
 )
 
 
@@ -30,6 +36,26 @@ class ZoomClientError(Exception):
     pass
 
 
+def _parse_recordings(
+    meeting_id: str,
+    recording_files: List[Dict[str, Any]],
+) -> List[ZoomRecording]:
+    recordings = []
+    for recording in recording_files:
+        recordings.append(ZoomRecording(
+            id=recording.get("id", ""),
+            meeting_id=meeting_id,
+            recording_start=recording.get("recording_start"),
+            recording_end=recording.get("recording_end"),
+            file_type=recording.get("file_type", ""),
+            file_size=recording.get("file_size"),
+            play_url=recording.get("play_url"),
+            download_url=recording.get("download_url"),
+            status=recording.get("status"),
+        ))
+    return recordings
+
+
 class ZoomClient:
     """Клиент для работы с Zoom API (Server-to-Server OAuth)"""
     
@@ -39,14 +65,18 @@ class ZoomClient:
     def __init__(
         self,
         config: ZoomConfig,
+        http_client: ManagedHttpClient,
+        token_broker: ZoomTokenBroker,
     ):
         self.config = config
+        self.http_client = http_client
         # Очищаем данные от пробелов и лишних символов
         self.account_id = config.account_id.strip() if config.account_id else ""
         self.client_id = config.client_id.strip() if config.client_id else ""
         self.client_secret = config.client_secret.strip() if config.client_secret else ""
-        self._access_token: Optional[str] = None
-        self._token_expires_at: float = 0
+        self.token_broker = token_broker
+        # Ключ учетной записи в брокере токенов (без секрета)
+        self.token_key = f"{self.account_id}:{self.client_id}"
         
         # Проверяем, что все данные заполнены
         if not self.account_id:
@@ -59,12 +89,16 @@ class ZoomClient:
     async def _get_access_token(
         self,
     ) -> str:
-        """Получить или обновить access token"""
-        # Если токен еще действителен, возвращаем его
-        if self._access_token and time.time() < self._token_expires_at:
-            return self._access_token
-        
-        # Получаем новый токен
+        """Получить access token из общего брокера (обновляется одним запросом на процесс)"""
+        return await self.token_broker.get_token(
+            self.token_key,
+            self._fetch_access_token,
+        )
+    
+    async def _fetch_access_token(
+        self,
+    ) -> ZoomToken:
+        """Запросить новый access token у Zoom OAuth"""
         # Для Zoom Server-to-Server OAuth используется Basic Auth с Client ID:Client Secret
         # Данные уже очищены в __init__, но на всякий случай еще раз очищаем
         client_id_clean = self.client_id.strip()
@@ -87,65 +121,66 @@ class ZoomClient:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                _LOG.info(f"Requesting Zoom OAuth token from {self.OAUTH_URL}")
-                _LOG.info(f"Account ID: {self.account_id}")
-                _LOG.info(f"Client ID: {self.client_id}")
-                _LOG.info(f"Client Secret length: {len(self.client_secret)}")
-                _LOG.info(f"Grant type: {data['grant_type']}")
-                
-                # Логируем заголовки (без секрета)
-                _LOG.info(f"Headers: Authorization=Basic ***, Content-Type={headers['Content-Type']}")
-                
-                response = await client.post(
-                    self.OAUTH_URL,
-                    headers=headers,
-                    data=data,
-                )
-                
-                _LOG.info(f"Zoom OAuth response status: {response.status_code}")
-                _LOG.info(f"Zoom OAuth response headers: {dict(response.headers)}")
+            _LOG.debug(
+                "Requesting Zoom OAuth token from %s: account_id=%s client_id=%s grant_type=%s",
+                self.OAUTH_URL,
+                self.account_id,
+                self.client_id,
+                data["grant_type"],
+            )
                 
-                # Логируем тело ответа для диагностики
-                response_text = response.text
-                _LOG.info(f"Zoom OAuth response body: {response_text[:500]}")  # Первые 500 символов
+            # Запрос токена ничего не изменяет, поэтому его безопасно повторять
+            response = await self.http_client.request(
+                "POST",
+                self.OAUTH_URL,
+                retry=True,
+                headers=headers,
+                data=data,
+            )
                 
-                response.raise_for_status()
-                token_data = response.json()
+            # Заголовки и тело ответа не логируем: в теле access_token
+            _LOG.debug("Zoom OAuth response status: %s", response.status_code)
+            response.raise_for_status()
+            token_data = response.json()
                 
-                self._access_token = token_data.get("access_token")
-                expires_in = token_data.get("expires_in", 3600)  # По умолчанию 1 час
-                self._token_expires_at = time.time() + expires_in - 60  # Вычитаем 1 минуту для запаса
+            access_token = token_data.get("access_token")
+            expires_in = token_data.get("expires_in", 3600)  # По умолчанию 1 час
                 
-                # Логируем scopes из токена (если доступны)
-                token_scopes = token_data.get("scope", "Not provided")
-                _LOG.info(f"Zoom OAuth token obtained successfully. Scopes: {token_scopes}")
+            # Логируем scopes из токена (если доступны)
+            token_scopes = token_data.get("scope", "Not provided")
+            _LOG.debug("Zoom OAuth token obtained. Scopes: %s", token_scopes)
                 
-                if not self._access_token:
-                    _LOG.error(f"No access_token in response: {token_data}")
-                    raise ZoomClientError("Failed to get access token: no access_token in response")
+            if not access_token:
+                _LOG.error("No access_token in Zoom OAuth response, keys: %s", sorted(token_data))
+                raise ZoomClientError("Failed to get access token: no access_token in response")
                 
-                # Проверяем, что токен содержит нужные scopes (предупреждение, не ошибка)
-                required_scopes = ["meeting:write:meeting", "meeting:write:meeting:admin"]
-                if token_scopes and isinstance(token_scopes, str):
-                    token_scopes_list = token_scopes.split()
-                    missing_scopes = [scope for scope in required_scopes if scope not in token_scopes_list]
-                    if missing_scopes:
-                        _LOG.warning(f"Token is missing required scopes: {missing_scopes}. Please add these scopes in Zoom App Marketplace.")
+            # Проверяем, что токен содержит нужные scopes (предупреждение, не ошибка)
+            required_scopes = ["meeting:write:meeting", "meeting:write:meeting:admin"]
+            if token_scopes and isinstance(token_scopes, str):
+                token_scopes_list = token_scopes.split()
+                missing_scopes = [scope for scope in required_scopes if scope not in token_scopes_list]
+                if missing_scopes:
+                    _LOG.warning(
+                        "Token is missing required scopes: %s. Please add these scopes in Zoom App Marketplace.",
+                        missing_scopes,
+                    )
                 
-                return self._access_token
+            return ZoomToken(
+                access_token=access_token,
+                expires_at=time.time() + expires_in - 60,  # Вычитаем 1 минуту для запаса
+                scope=token_scopes if isinstance(token_scopes, str) else None,
+            )
         except httpx.HTTPStatusError as e:
             error_detail = "Unknown error"
             try:
                 error_data = e.response.json()
                 error_detail = error_data.get("error_description") or error_data.get("error") or str(e)
-                _LOG.error(f"Zoom OAuth HTTP error {e.response.status_code}: {error_detail}")
-                _LOG.error(f"Response body: {e.response.text}")
+                _LOG.error("Zoom OAuth HTTP error %s: %s", e.response.status_code, error_detail)
             except:
-                _LOG.error(f"Zoom OAuth HTTP error {e.response.status_code}: {e.response.text}")
+                _LOG.error("Zoom OAuth HTTP error %s: %s", e.response.status_code, e.response.text)
             raise ZoomClientError(f"Failed to get access token: {error_detail}") from e
         except httpx.HTTPError as e:
-            _LOG.error(f"Zoom OAuth request error: {e}")
+            _LOG.error("Zoom OAuth request error: %s", e)
             raise ZoomClientError(f"Failed to get access token: {e}") from e
     
     async def _make_request(
@@ -154,6 +189,7 @@ class ZoomClient:
         endpoint: str,
         data: Optional[Dict[str, Any]] = None,
         params: Optional[Dict[str, Any]] = None,
+        is_token_retry: bool = False,
     ) -> Dict[str, Any]:
         """Выполнить запрос к Zoom API"""
         url = f"{self.BASE_URL}/{endpoint.lstrip('/')}"
@@ -166,22 +202,32 @@ class ZoomClient:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.request(
-                    method=method,
-                    url=url,
-                    json=data,
-                    params=params,
-                    headers=headers,
-                )
-                response.raise_for_status()
+            response = await self.http_client.request(
+                method,
+                url,
+                json=data,
+                params=params,
+                headers=headers,
+            )
+            response.raise_for_status()
                 
-                # Zoom API может возвращать пустой ответ для некоторых операций
-                if response.status_code == 204:
-                    return {}
+            # Zoom API может возвращать пустой ответ для некоторых операций
+            if response.status_code == 204:
+                return {}
                 
-                return response.json()
+            return response.json()
         except httpx.HTTPStatusError as e:
+            # Токен могли отозвать раньше срока: забываем его и повторяем запрос один раз с новым
+            if e.response.status_code == 401 and not is_token_retry:
+                _LOG.warning("Zoom API returned 401, refreshing access token")
+                self.token_broker.invalidate(self.token_key)
+                return await self._make_request(
+                    method=method,
+                    endpoint=endpoint,
+                    data=data,
+                    params=params,
+                    is_token_retry=True,
+                )
             error_detail = "Unknown error"
             try:
                 error_data = e.response.json()
@@ -189,29 +235,29 @@ class ZoomClient:
             except:
                 error_detail = str(e)
             
-            _LOG.error(f"Zoom API request error: {e.response.status_code} - {error_detail}")
+            _LOG.error("Zoom API request error: %s - %s", e.response.status_code, error_detail)
             raise ZoomClientError(f"Zoom API error: {error_detail}") from e
         except httpx.HTTPError as e:
-            _LOG.error(f"Zoom API request error: {e}")
+            _LOG.error("Zoom API request error: %s", e)
             raise ZoomClientError(f"Failed to make request to Zoom: {e}") from e
     
     async def test_connection(self) -> bool:
         """Проверить соединение с Zoom API"""
         try:
-            _LOG.info("Testing Zoom connection...")
+            _LOG.debug("Testing Zoom connection")
             # Простой запрос для проверки соединения - получаем информацию о текущем пользователе
             result = await self._make_request(
                 method="GET",
                 endpoint="/users/me",
             )
             user_id = result.get("id")
-            _LOG.info(f"Zoom connection test successful, user ID: {user_id}")
+            _LOG.debug("Zoom connection test successful, user ID: %s", user_id)
             return user_id is not None
         except ZoomClientError as e:
-            _LOG.error(f"Zoom connection test failed: {e}")
+            _LOG.error("Zoom connection test failed: %s", e)
             raise
         except Exception as e:
-            _LOG.error(f"Connection test failed with unexpected error: {e}")
+            _LOG.error("Connection test failed with unexpected error: %s", e)
             return False
     
     async def create_meeting(
@@ -252,7 +298,7 @@ class ZoomClient:
             
             return ZoomMeeting(**result)
         except Exception as e:
-            _LOG.error(f"Error creating meeting: {e}")
+            _LOG.error("Error creating meeting: %s", e)
             raise ZoomClientError(f"Failed to create meeting: {e}") from e
     
     async def get_meeting(
@@ -267,7 +313,7 @@ class ZoomClient:
             )
             return ZoomMeeting(**result)
         except Exception as e:
-            _LOG.error(f"Error getting meeting: {e}")
+            _LOG.error("Error getting meeting: %s", e)
             raise ZoomClientError(f"Failed to get meeting: {e}") from e
     
     async def update_meeting(
@@ -309,7 +355,7 @@ class ZoomClient:
                 data=meeting_data,
             )
         except Exception as e:
-            _LOG.error(f"Error updating meeting: {e}")
+            _LOG.error("Error updating meeting: %s", e)
             raise ZoomClientError(f"Failed to update meeting: {e}") from e
     
     async def delete_meeting(
@@ -323,7 +369,7 @@ class ZoomClient:
                 endpoint=f"/meetings/{meeting_id}",
             )
         except Exception as e:
-            _LOG.error(f"Error deleting meeting: {e}")
+            _LOG.error("Error deleting meeting: %s", e)
             raise ZoomClientError(f"Failed to delete meeting: {e}") from e
     
     async def list_meetings(
@@ -357,7 +403,7 @@ class ZoomClient:
                 total_records=result.get("total_records"),
             )
         except Exception as e:
-            _LOG.error(f"Error listing meetings: {e}")
+            _LOG.error("Error listing meetings: %s", e)
             raise ZoomClientError(f"Failed to list meetings: {e}") from e
     
     async def get_meeting_participants(
@@ -391,7 +437,7 @@ class ZoomClient:
                 next_page_token=result.get("next_page_token"),
             )
         except Exception as e:
-            _LOG.error(f"Error getting meeting participants: {e}")
+            _LOG.error("Error getting meeting participants: %s", e)
             raise ZoomClientError(f"Failed to get meeting participants: {e}") from e
     
     async def get_meeting_recordings(
@@ -415,19 +461,7 @@ class ZoomClient:
                 params=query_params,
             )
             
-            recordings = []
-            for recording in result.get("recording_files", []):
-                recordings.append(ZoomRecording(
-                    id=recording.get("id", ""),
-                    meeting_id=meeting_id,
-                    recording_start=recording.get("recording_start"),
-                    recording_end=recording.get("recording_end"),
-                    file_type=recording.get("file_type", ""),
-                    file_size=recording.get("file_size"),
-                    play_url=recording.get("play_url"),
-                    download_url=recording.get("download_url"),
-                    status=recording.get("status"),
-                ))
+            recordings = _parse_recordings(meeting_id, result.get("recording_files", []))
             
             return RecordingListResponse(
                 recordings=recordings,
@@ -436,6 +470,50 @@ class ZoomClient:
                 total_records=result.get("total_records"),
             )
         except Exception as e:
-            _LOG.error(f"Error getting meeting recordings: {e}")
+            _LOG.error("Error getting meeting recordings: %s", e)
             raise ZoomClientError(f"Failed to get meeting recordings: {e}") from e
-
+    
+    async def list_recorded_meetings(
+        self,
+        user_id: str,
+        date_from: date,
+        date_to: date,
+        page_size: int = 30,
+        next_page_token: Optional[str] = None,
+    ) -> RecordedMeetingListResponse:
+        """Получить прошедшие встречи пользователя с записями за период (не больше месяца за запрос)"""
+        try:
+            query_params: Dict[str, Any] = {
+                "from": date_from.isoformat(),
+                "to": date_to.isoformat(),
+                "page_size": page_size,
+            }
+            
+            if next_page_token:
+                query_params["next_page_token"] = next_page_token
+            
+            result = await self._make_request(
+                method="GET",
+                endpoint=f"/users/{user_id}/recordings",
+                params=query_params,
+            )
+            
+            meetings = []
+            for meeting in result.get("meetings", []):
+                meetings.append(ZoomRecordedMeeting(
+                    **meeting,
+                    recordings=_parse_recordings(
+                        str(meeting.get("id", "")),
+                        meeting.get("recording_files", []),
+                    ),
+                ))
+            
+            return RecordedMeetingListResponse(
+                meetings=meetings,
+                page_size=result.get("page_size", 30),
+                next_page_token=result.get("next_page_token") or None,
+                total_records=result.get("total_records"),
+            )
+        except Exception as e:
+            _LOG.error("Error listing recorded meetings: %s", e)
+            raise ZoomClientError(f"Failed to list recorded meetings: {e}") from e
@@ -1,28 +1,49 @@
+import datetime as dt
 import logging
 from typing import (
+    Any,
+    Awaitable,
+    Callable,
     Optional,
     List,
-    Dict,
-    Any,
 )
-from uuid import UUID
+from uuid import (
+    UUID,
+    uuid4,
+)
+
+from cachetools import TTLCache
 
+from src.clients.http_client import HttpClientRegistry
+from src.misc.misc_lib import utc_now
+from src.model import ZoomSyncConfig
 from .zoom_client import (
     ZoomClient,
     ZoomClientError,
 )
+from .zoom_meetings_storage import (
+    ZoomMeetingsStorage,
+    ZoomMeetingsStorageException,
+    NoSuchZoomMeetingError,
+)
+from .zoom_meetings_storage_models import ZoomMeetingRecordToGet
+from .zoom_token_broker import ZoomTokenBroker
 from .zoom_models import (
     ZoomConfig,
     CreateMeetingParams,
     UpdateMeetingParams,
     ZoomMeeting,
+    ZoomRecording,
     MeetingListParams,
     MeetingListResponse,
     ParticipantListResponse,
     RecordingListResponse,
 )
-from ..integrations_storage import IntegrationsStorage
-from ..integrations_storage_models import IntegrationType
+from ..integrations_cache import ActiveIntegrationCache
+from ..integrations_storage_models import (
+    IntegrationToGet,
+    IntegrationType,
+)
 
 
 _LOG = logging.getLogger("uvicorn.info")
@@ -32,46 +53,46 @@ class ZoomManagerError(Exception):
     pass
 
 
+class NoSuchZoomMeetingManagerError(ZoomManagerError):
+    pass
+
+
+# Zoom отдает список записей не больше чем за месяц на запрос
+RECORDINGS_WINDOW_DAYS = 30
+
+
 class ZoomManager:
     """Менеджер для работы с Zoom"""
     
     def __init__(
         self,
-        integrations_storage: IntegrationsStorage,
+        integrations_cache: ActiveIntegrationCache,
+        http_clients: HttpClientRegistry,
+        token_broker: ZoomTokenBroker,
+        meetings_storage: ZoomMeetingsStorage,
+        sync_config: Optional[ZoomSyncConfig] = None,
     ):
-        self.integrations_storage = integrations_storage
+        self.integrations_cache = integrations_cache
+        self.token_broker = token_broker
+        self.http_clients = http_clients
+        self.meetings_storage = meetings_storage
+        self.sync_config = sync_config or ZoomSyncConfig()
         self._client: Optional[ZoomClient] = None
-        self._current_integration_id: Optional[UUID] = None
+        self._integration: Optional[IntegrationToGet] = None
+        # Страницы ответов Zoom API, запрошенные напрямую: {(метод, параметры...): ответ}
+        self._pages_cache: TTLCache = TTLCache(
+            maxsize=self.sync_config.page_cache_size,
+            ttl=self.sync_config.page_cache_ttl,
+        )
+        self._sync_owner: str = str(uuid4())
     
-    async def _get_active_integration(self) -> Optional[Dict[str, Any]]:
-        """Получить активную интеграцию Zoom"""
+    async def _get_active_integration(self) -> Optional[IntegrationToGet]:
+        """Получить активную интеграцию Zoom (из кеша)"""
         try:
-            _LOG.info(f"Searching for active Zoom integrations...")
-            integrations = await self.integrations_storage.get_by_type(
-                IntegrationType.ZOOM,
-                active_only=True,
-            )
-            _LOG.info(f"Found {len(integrations)} active Zoom integration(s)")
-            
-            if not integrations:
-                # Попробуем найти любые интеграции Zoom для отладки
-                all_integrations = await self.integrations_storage.get_by_type(
-                    IntegrationType.ZOOM,
-                    active_only=False,
-                )
-                _LOG.warning(f"No active Zoom integrations found. Total Zoom integrations: {len(all_integrations)}")
-                if all_integrations:
-                    for integration in all_integrations:
-                        _LOG.warning(f"  - Integration ID: {integration.id}, Name: {integration.name}, is_active: {integration.is_active}")
-                return None
-            
-            # Берем первую активную интеграцию
-            integration = integrations[0]
-            _LOG.info(f"Using Zoom integration: ID={integration.id}, Name={integration.name}, is_active={integration.is_active}")
-            return {
-                "id": integration.id,
-                "config": integration.config,
-            }
+            integration = await self.integrations_cache.get(IntegrationType.ZOOM)
+            if not integration:
+                _LOG.warning("No active Zoom integrations found")
+            return integration
         except Exception as e:
             _LOG.error(f"Error getting active Zoom integration: {e}", exc_info=True)
             return None
@@ -82,13 +103,14 @@ class ZoomManager:
         if not integration:
             raise ZoomManagerError("No active Zoom integration found")
         
-        # Если клиент уже инициализирован для этой интеграции, возвращаем его
-        if self._client and self._current_integration_id == integration["id"]:
+        # Если клиент уже инициализирован для этой же версии интеграции, возвращаем его без запросов в БД
+        if self._client and self._integration == integration:
             return self._client
         
         # Создаем новый клиент
         try:
-            config_dict = integration["config"]
+            _LOG.info(f"Using Zoom integration: ID={integration.id}, Name={integration.name}")
+            config_dict = integration.config
             _LOG.info(f"Creating Zoom client with config keys: {list(config_dict.keys())}")
             
             # Проверяем наличие всех необходимых полей
@@ -123,8 +145,14 @@ class ZoomManager:
             _LOG.info(f"Cleaned config: account_id='{cleaned_config.get('account_id')}' (len={len(cleaned_config.get('account_id', ''))}), client_id='{cleaned_config.get('client_id')}' (len={len(cleaned_config.get('client_id', ''))})")
             
             config = ZoomConfig(**cleaned_config)
-            self._client = ZoomClient(config)
-            self._current_integration_id = integration["id"]
+            self._client = ZoomClient(
+                config,
+                self.http_clients.get("zoom"),
+                self.token_broker,
+            )
+            self._integration = integration
+            # Страницы, полученные со старыми учетными данными, больше не актуальны
+            self._pages_cache.clear()
             _LOG.info("Zoom client created successfully")
             return self._client
         except Exception as e:
@@ -152,16 +180,34 @@ class ZoomManager:
     async def create_meeting(
         self,
         params: CreateMeetingParams,
+        deal_id: Optional[UUID] = None,
+        buyer_id: Optional[UUID] = None,
     ) -> ZoomMeeting:
-        """Создать встречу"""
+        """Создать встречу и сразу сохранить ее в локальную копию (с привязкой к сделке и покупателю)"""
         try:
             client = await self._ensure_client()
-            return await client.create_meeting(params)
+            meeting = await client.create_meeting(params)
         except ZoomManagerError:
             raise
         except ZoomClientError as e:
             _LOG.error(f"Error creating meeting: {e}")
             raise ZoomManagerError(f"Failed to create meeting: {e}") from e
+        
+        self._pages_cache.clear()
+        try:
+            await self.meetings_storage.upsert_meetings(
+                [
+                    {
+                        **meeting.model_dump(),
+                        "deal_id": deal_id,
+                        "buyer_id": buyer_id,
+                    },
+                ],
+            )
+        except ZoomMeetingsStorageException as e:
+            # Встреча уже создана в Zoom - локальная копия догонит ее при синхронизации
+            _LOG.error(f"Error saving created meeting to mirror: {meeting.id=} {e}")
+        return meeting
     
     async def get_meeting(
         self,
@@ -186,9 +232,13 @@ class ZoomManager:
         try:
             client = await self._ensure_client()
             await client.update_meeting(meeting_id, params)
+            self._pages_cache.clear()
+            # Перечитываем встречу, чтобы локальная копия не ждала следующей синхронизации
+            meeting = await client.get_meeting(meeting_id)
+            await self.meetings_storage.upsert_meetings([meeting.model_dump()])
         except ZoomManagerError:
             raise
-        except ZoomClientError as e:
+        except (ZoomClientError, ZoomMeetingsStorageException) as e:
             _LOG.error(f"Error updating meeting: {e}")
             raise ZoomManagerError(f"Failed to update meeting: {e}") from e
     
@@ -200,9 +250,11 @@ class ZoomManager:
         try:
             client = await self._ensure_client()
             await client.delete_meeting(meeting_id)
+            self._pages_cache.clear()
+            await self.meetings_storage.mark_meeting_deleted(meeting_id)
         except ZoomManagerError:
             raise
-        except ZoomClientError as e:
+        except (ZoomClientError, ZoomMeetingsStorageException) as e:
             _LOG.error(f"Error deleting meeting: {e}")
             raise ZoomManagerError(f"Failed to delete meeting: {e}") from e
     
@@ -213,7 +265,16 @@ class ZoomManager:
         """Получить список встреч"""
         try:
             client = await self._ensure_client()
-            return await client.list_meetings(params)
+            return await self._get_cached_page(
+                (
+                    "meetings",
+                    params.user_id,
+                    params.type,
+                    params.page_size,
+                    params.next_page_token,
+                ),
+                lambda: client.list_meetings(params),
+            )
         except ZoomManagerError as e:
             if "No active Zoom integration found" in str(e):
                 _LOG.warning("No active Zoom integration found for listing meetings")
@@ -232,10 +293,13 @@ class ZoomManager:
         """Получить список участников встречи"""
         try:
             client = await self._ensure_client()
-            return await client.get_meeting_participants(
-                meeting_id=meeting_id,
-                page_size=page_size,
-                next_page_token=next_page_token,
+            return await self._get_cached_page(
+                ("participants", meeting_id, page_size, next_page_token),
+                lambda: client.get_meeting_participants(
+                    meeting_id=meeting_id,
+                    page_size=page_size,
+                    next_page_token=next_page_token,
+                ),
             )
         except ZoomManagerError:
             raise
@@ -252,14 +316,180 @@ class ZoomManager:
         """Получить список записей встречи"""
         try:
             client = await self._ensure_client()
-            return await client.get_meeting_recordings(
-                meeting_id=meeting_id,
-                page_size=page_size,
-                next_page_token=next_page_token,
+            return await self._get_cached_page(
+                ("recordings", meeting_id, page_size, next_page_token),
+                lambda: client.get_meeting_recordings(
+                    meeting_id=meeting_id,
+                    page_size=page_size,
+                    next_page_token=next_page_token,
+                ),
             )
         except ZoomManagerError:
             raise
         except ZoomClientError as e:
             _LOG.error(f"Error getting meeting recordings: {e}")
             raise ZoomManagerError(f"Failed to get meeting recordings: {e}") from e
-
+    
+    async def _get_cached_page(
+        self,
+        key: tuple,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Вернуть страницу ответа Zoom API из кеша или запросить ее"""
+        page = self._pages_cache.get(key)
+        if page is None:
+            page = await fetch()
+            self._pages_cache[key] = page
+        return page
+    
+    async def get_mirrored_meetings(
+        self,
+        upcoming: Optional[bool] = None,
+        deal_id: Optional[UUID] = None,
+        buyer_id: Optional[UUID] = None,
+        limit: int = 50,
+    ) -> List[ZoomMeetingRecordToGet]:
+        """Получить встречи из локальной копии"""
+        try:
+            return await self.meetings_storage.get_meetings(
+                upcoming=upcoming,
+                deal_id=deal_id,
+                buyer_id=buyer_id,
+                limit=limit,
+            )
+        except ZoomMeetingsStorageException as e:
+            _LOG.error(f"Error getting mirrored meetings: {e}")
+            raise ZoomManagerError(f"Failed to get mirrored meetings: {e}") from e
+    
+    async def get_mirrored_recordings(
+        self,
+        meeting_id: str,
+    ) -> List[ZoomRecording]:
+        """Получить записи встречи из локальной копии"""
+        try:
+            return await self.meetings_storage.get_recordings(meeting_id)
+        except ZoomMeetingsStorageException as e:
+            _LOG.error(f"Error getting mirrored recordings: {e}")
+            raise ZoomManagerError(f"Failed to get mirrored recordings: {e}") from e
+    
+    async def link_meeting(
+        self,
+        meeting_id: str,
+        deal_id: Optional[UUID],
+        buyer_id: Optional[UUID],
+    ) -> ZoomMeetingRecordToGet:
+        """Привязать встречу из локальной копии к сделке и/или покупателю"""
+        try:
+            await self.meetings_storage.link_meeting(meeting_id, deal_id, buyer_id)
+            return await self.meetings_storage.get_meeting(meeting_id)
+        except NoSuchZoomMeetingError as e:
+            raise NoSuchZoomMeetingManagerError(str(e)) from e
+        except ZoomMeetingsStorageException as e:
+            _LOG.error(f"Error linking meeting: {e}")
+            raise ZoomManagerError(f"Failed to link meeting: {e}") from e
+    
+    async def sync_meetings(self) -> int:
+        """
+        Синхронизировать предстоящие встречи и записи прошедших встреч в локальную копию.
+        Возвращает количество сохраненных встреч.
+        """
+        try:
+            client = await self._ensure_client()
+        except ZoomManagerError as e:
+            _LOG.warning(f"Zoom meetings sync skipped: {e}")
+            return 0
+        
+        try:
+            if not await self.meetings_storage.acquire_sync_lease(self._sync_owner, self.sync_config.lease_ttl):
+                return 0
+            try:
+                synced = await self._sync_upcoming_meetings(client)
+                synced += await self._sync_recorded_meetings(client)
+                _LOG.info(f"Zoom meetings synced: {synced=}")
+                return synced
+            finally:
+                await self.meetings_storage.release_sync_lease(self._sync_owner)
+        except (ZoomClientError, ZoomMeetingsStorageException) as e:
+            _LOG.error(f"Error syncing Zoom meetings: {e}")
+            raise ZoomManagerError(f"Failed to sync Zoom meetings: {e}") from e
+    
+    async def _sync_upcoming_meetings(
+        self,
+        client: ZoomClient,
+    ) -> int:
+        """Перечитать все предстоящие встречи; пропавшие из Zoom пометить удаленными"""
+        config = self.sync_config
+        started_at = utc_now()
+        seen_ids: List[str] = []
+        next_page_token = None
+        while True:
+            page = await client.list_meetings(
+                MeetingListParams(
+                    user_id=config.user_id,
+                    type="upcoming",
+                    page_size=config.page_size,
+                    next_page_token=next_page_token,
+                ),
+            )
+            await self.meetings_storage.upsert_meetings(
+                [meeting.model_dump() for meeting in page.meetings],
+            )
+            seen_ids.extend(meeting.id for meeting in page.meetings)
+            next_page_token = page.next_page_token
+            if not next_page_token:
+                break
+        
+        # Удаляем только после полного прохода: при ошибке на середине списка ничего не помечается
+        deleted = await self.meetings_storage.mark_missing_upcoming_deleted(seen_ids, started_at)
+        if deleted:
+            _LOG.info(f"Zoom upcoming meetings marked deleted: {deleted}")
+        await self.meetings_storage.update_sync_state(upcoming_synced_at=started_at)
+        return len(seen_ids)
+    
+    async def _sync_recorded_meetings(
+        self,
+        client: ZoomClient,
+    ) -> int:
+        """Догрузить прошедшие встречи с записями окнами по месяцу начиная с водяного знака"""
+        config = self.sync_config
+        state = await self.meetings_storage.get_sync_state()
+        today = utc_now().date()
+        if state.recordings_synced_to is None:
+            date_from = today - dt.timedelta(days=config.recordings_initial_days)
+        else:
+            date_from = (
+                dt.date.fromisoformat(state.recordings_synced_to)
+                - dt.timedelta(days=config.recordings_overlap_days)
+            )
+        
+        synced = 0
+        while date_from <= today:
+            date_to = min(date_from + dt.timedelta(days=RECORDINGS_WINDOW_DAYS - 1), today)
+            next_page_token = None
+            while True:
+                page = await client.list_recorded_meetings(
+                    user_id=config.user_id,
+                    date_from=date_from,
+                    date_to=date_to,
+                    page_size=config.page_size,
+                    next_page_token=next_page_token,
+                )
+                await self.meetings_storage.upsert_meetings(
+                    [
+                        {
+                            **meeting.model_dump(exclude={"recordings"}),
+                            "has_recordings": True,
+                        }
+                        for meeting in page.meetings
+                    ],
+                )
+                await self.meetings_storage.upsert_recordings(
+                    [recording for meeting in page.meetings for recording in meeting.recordings],
+                )
+                synced += len(page.meetings)
+                next_page_token = page.next_page_token
+                if not next_page_token:
+                    break
+            await self.meetings_storage.update_sync_state(recordings_synced_to=date_to.isoformat())
+            date_from = date_to + dt.timedelta(days=1)
+        return synced
@@ -0,0 +1,314 @@
+import datetime as dt
+import logging
+from typing import (
+    Any,
+    Optional,
+    List,
+)
+from uuid import UUID
+
+import pymongo
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError
+
+from src.clients.mongo.client import MClient
+from src.misc.misc_lib import utc_now
+from .zoom_meetings_storage_models import (
+    ZoomMeetingRecordToGet,
+    ZoomSyncState,
+)
+from .zoom_models import ZoomRecording
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+# Документ состояния синхронизации в коллекции zoom_sync_state
+MEETINGS_SYNC_KEY = "zoom_meetings"
+
+# Поля встречи, которые не сохраняются в локальной копии
+SECRET_MEETING_FIELDS = {"start_url", "password", "settings"}
+
+
+class ZoomMeetingsStorageException(Exception):
+    pass
+
+
+class NoSuchZoomMeetingError(ZoomMeetingsStorageException):
+    pass
+
+
+class ZoomMeetingsStorage:
+    """Локальная копия встреч и записей Zoom, привязки встреч к сделкам и покупателям"""
+
+    def __init__(
+        self,
+        mongo_client: MClient,
+    ):
+        self.mongo_client: MClient = mongo_client
+        self.collection_name: str = "zoom_meetings"
+        self.collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            self.collection_name,
+        )
+        self.recordings_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            "zoom_recordings",
+        )
+        self.sync_state_collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            "zoom_sync_state",
+        )
+
+    async def create_indexes(self):
+        """Создать индексы коллекций встреч, записей и состояния синхронизации"""
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index([("start_time", pymongo.DESCENDING)])
+        await self.collection.create_index(
+            [("deal_id", pymongo.ASCENDING), ("start_time", pymongo.DESCENDING)],
+        )
+        await self.collection.create_index(
+            [("buyer_id", pymongo.ASCENDING), ("start_time", pymongo.DESCENDING)],
+        )
+        await self.recordings_collection.create_index("id", unique=True)
+        await self.recordings_collection.create_index("meeting_id")
+        await self.sync_state_collection.create_index("key", unique=True)
+
+    async def upsert_meetings(
+        self,
+        meetings: List[dict[str, Any]],
+    ):
+        """
+        Сохранить встречи одним bulk_write. Обновляются только переданные поля,
+        поэтому частичные данные (встречи из списка записей) не затирают полные.
+        """
+        if not meetings:
+            return
+        now = utc_now()
+        operations = []
+        for meeting in meetings:
+            fields = {
+                key: value for key, value in meeting.items()
+                if value is not None and key not in SECRET_MEETING_FIELDS
+            }
+            operations.append(
+                pymongo.UpdateOne(
+                    {"id": fields["id"]},
+                    {
+                        "$set": {
+                            **fields,
+                            "is_deleted": False,
+                            "synced_at": now,
+                        },
+                    },
+                    upsert=True,
+                ),
+            )
+        await self.collection.bulk_write(
+            operations,
+            ordered=False,
+        )
+
+    async def mark_missing_upcoming_deleted(
+        self,
+        seen_ids: List[str],
+        since: dt.datetime,
+    ) -> int:
+        """Пометить удаленными предстоящие встречи, которых больше нет в Zoom"""
+        result = await self.collection.update_many(
+            {
+                "id": {"$nin": seen_ids},
+                "start_time": {"$gte": since},
+                "has_recordings": {"$ne": True},
+                "is_deleted": False,
+            },
+            {"$set": {"is_deleted": True, "synced_at": utc_now()}},
+        )
+        return result.modified_count
+
+    async def mark_meeting_deleted(
+        self,
+        meeting_id: str,
+    ):
+        """Пометить встречу удаленной"""
+        await self.collection.update_one(
+            {"id": meeting_id},
+            {"$set": {"is_deleted": True, "synced_at": utc_now()}},
+        )
+
+    async def upsert_recordings(
+        self,
+        recordings: List[ZoomRecording],
+    ):
+        """Сохранить записи встреч одним bulk_write"""
+        if not recordings:
+            return
+        now = utc_now()
+        operations = [
+            pymongo.ReplaceOne(
+                {"id": recording.id},
+                {
+                    **recording.model_dump(),
+                    "synced_at": now,
+                },
+                upsert=True,
+            )
+            for recording in recordings
+        ]
+        await self.recordings_collection.bulk_write(
+            operations,
+            ordered=False,
+        )
+
+    async def get_meeting(
+        self,
+        meeting_id: str,
+    ) -> ZoomMeetingRecordToGet:
+        """Получить встречу из локальной копии"""
+        data = await self.collection.find_one(
+            {"id": meeting_id},
+            projection=self._meeting_projection(),
+        )
+        if data:
+            return ZoomMeetingRecordToGet(**data)
+        raise NoSuchZoomMeetingError(
+            f"Встреча не найдена. {meeting_id=}",
+        )
+
+    async def get_meetings(
+        self,
+        upcoming: Optional[bool] = None,
+        deal_id: Optional[UUID] = None,
+        buyer_id: Optional[UUID] = None,
+        limit: int = 50,
+    ) -> List[ZoomMeetingRecordToGet]:
+        """
+        Получить встречи из локальной копии: предстоящие - ближайшие первыми,
+        прошедшие и все остальные - последние первыми.
+        """
+        query: dict[str, Any] = {"is_deleted": False}
+        if deal_id is not None:
+            query["deal_id"] = deal_id
+        if buyer_id is not None:
+            query["buyer_id"] = buyer_id
+        sort_direction = pymongo.DESCENDING
+        if upcoming is True:
+            query["start_time"] = {"$gte": utc_now()}
+            sort_direction = pymongo.ASCENDING
+        elif upcoming is False:
+            query["start_time"] = {"$lt": utc_now()}
+
+        cursor = self.collection.find(
+            query,
+            projection=self._meeting_projection(),
+        ).sort("start_time", sort_direction).limit(limit)
+        return [ZoomMeetingRecordToGet(**data) async for data in cursor]
+
+    async def get_recordings(
+        self,
+        meeting_id: str,
+    ) -> List[ZoomRecording]:
+        """Получить записи встречи из локальной копии"""
+        projection = {
+            "_id": False,
+        }
+        for key in ZoomRecording.model_fields:
+            projection[key] = True
+        cursor = self.recordings_collection.find(
+            {"meeting_id": meeting_id},
+            projection=projection,
+        ).sort("recording_start", pymongo.ASCENDING)
+        return [ZoomRecording(**data) async for data in cursor]
+
+    async def link_meeting(
+        self,
+        meeting_id: str,
+        deal_id: Optional[UUID],
+        buyer_id: Optional[UUID],
+    ):
+        """Привязать встречу к сделке и/или покупателю (None снимает привязку)"""
+        result = await self.collection.update_one(
+            {"id": meeting_id},
+            {"$set": {"deal_id": deal_id, "buyer_id": buyer_id}},
+        )
+        if not result.matched_count:
+            raise NoSuchZoomMeetingError(
+                f"Встреча не найдена. {meeting_id=}",
+            )
+
+    @staticmethod
+    def _meeting_projection() -> dict[str, bool]:
+        projection = {
+            "_id": False,
+        }
+        for key in ZoomMeetingRecordToGet.model_fields:
+            projection[key] = True
+        return projection
+
+    async def get_sync_state(self) -> ZoomSyncState:
+        """Получить состояние синхронизации встреч"""
+        projection = {
+            "_id": False,
+        }
+        for key in ZoomSyncState.model_fields:
+            projection[key] = True
+        data = await self.sync_state_collection.find_one(
+            {"key": MEETINGS_SYNC_KEY},
+            projection=projection,
+        )
+        return ZoomSyncState(**(data or {}))
+
+    async def update_sync_state(
+        self,
+        **fields: Any,
+    ):
+        """Обновить состояние синхронизации встреч"""
+        await self.sync_state_collection.update_one(
+            {"key": MEETINGS_SYNC_KEY},
+            {
+                "$set": {
+                    **fields,
+                    "updated_at": utc_now(),
+                },
+            },
+            upsert=True,
+        )
+
+    async def acquire_sync_lease(
+        self,
+        owner: str,
+        ttl: int,
+    ) -> bool:
+        """Захватить блокировку синхронизации, чтобы встречи загружал только один воркер"""
+        now = utc_now()
+        try:
+            await self.sync_state_collection.find_one_and_update(
+                {
+                    "key": MEETINGS_SYNC_KEY,
+                    "$or": [
+                        {"lease_until": None},
+                        {"lease_until": {"$lte": now}},
+                        {"lease_owner": owner},
+                    ],
+                },
+                {
+                    "$set": {
+                        "lease_owner": owner,
+                        "lease_until": now + dt.timedelta(seconds=ttl),
+                    },
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Документ есть, но блокировка занята другим воркером
+            return False
+        return True
+
+    async def release_sync_lease(
+        self,
+        owner: str,
+    ):
+        """Освободить блокировку синхронизации"""
+        await self.sync_state_collection.update_one(
+            {
+                "key": MEETINGS_SYNC_KEY,
+                "lease_owner": owner,
+            },
+            {"$set": {"lease_until": None}},
+        )
@@ -0,0 +1,38 @@
+import datetime as dt
+from typing import Optional
+from uuid import UUID
+
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+
+class ZoomMeetingRecordToGet(BaseModel):
+    """
+    Встреча Zoom в локальной копии. Встречи, известные только по записям,
+    могут не иметь join_url. start_url и пароль не сохраняются.
+    """
+    id: str = Field(...)
+    uuid: Optional[str] = Field(default=None)
+    host_id: Optional[str] = Field(default=None)
+    topic: Optional[str] = Field(default=None)
+    type: Optional[int] = Field(default=None)
+    start_time: Optional[dt.datetime] = Field(default=None)
+    duration: Optional[int] = Field(default=None)
+    timezone: Optional[str] = Field(default=None)
+    join_url: Optional[str] = Field(default=None)
+    agenda: Optional[str] = Field(default=None)
+    status: Optional[str] = Field(default=None)
+    has_recordings: bool = Field(default=False)
+    deal_id: Optional[UUID] = Field(default=None, description="Сделка, к которой привязана встреча")
+    buyer_id: Optional[UUID] = Field(default=None, description="Покупатель, к которому привязана встреча")
+    is_deleted: bool = Field(default=False)
+    synced_at: Optional[dt.datetime] = Field(default=None)
+
+
+class ZoomSyncState(BaseModel):
+    """Состояние синхронизации встреч Zoom"""
+    recordings_synced_to: Optional[str] = Field(default=None, description="До какой даты (YYYY-MM-DD) загружены записи")
+    upcoming_synced_at: Optional[dt.datetime] = Field(default=None)
+    updated_at: Optional[dt.datetime] = Field(default=None)
@@ -10,6 +10,13 @@ class ZoomConfig(BaseModel):
     client_secret: str = Field(..., description="Client Secret (OAuth Client Secret)")
 
 
+class ZoomToken(BaseModel):
+    """OAuth access token Zoom"""
+    access_token: str = Field(...)
+    expires_at: float = Field(..., description="Момент истечения (unix time, секунды)")
+    scope: Optional[str] = Field(default=None)
+
+
 class ZoomMeetingSettings(BaseModel):
     """Настройки встречи Zoom"""
     host_video: bool = Field(default=False, description="Включить видео для организатора")
@@ -145,3 +152,32 @@ class RecordingListResponse(BaseModel):
     next_page_token: Optional[str] = Field(default=None)
     total_records: Optional[int] = Field(default=None)
 
+
+
+class ZoomRecordedMeeting(BaseModel):
+    """Прошедшая встреча с записями (из списка записей пользователя)"""
+    id: str = Field(..., description="ID встречи")
+    uuid: Optional[str] = Field(default=None, description="UUID экземпляра встречи")
+    host_id: Optional[str] = Field(default=None, description="ID организатора")
+    topic: Optional[str] = Field(default=None, description="Тема встречи")
+    type: Optional[int] = Field(default=None, description="Тип встречи")
+    start_time: Optional[datetime] = Field(default=None, description="Время начала")
+    duration: Optional[int] = Field(default=None, description="Длительность в минутах")
+    timezone: Optional[str] = Field(default=None, description="Часовой пояс")
+    recordings: List[ZoomRecording] = Field(default_factory=list)
+
+    @field_validator('id', 'host_id', mode='before')
+    @classmethod
+    def convert_id_to_string(cls, v):
+        """Конвертировать ID в строку, если он приходит как число"""
+        if isinstance(v, (int, float)):
+            return str(int(v))
+        return str(v) if v is not None else v
+
+
+class RecordedMeetingListResponse(BaseModel):
+    """Ответ со списком прошедших встреч с записями"""
+    meetings: List[ZoomRecordedMeeting] = Field(default_factory=list)
+    page_size: int = Field(default=30)
+    next_page_token: Optional[str] = Field(default=None)
+    total_records: Optional[int] = Field(default=None)
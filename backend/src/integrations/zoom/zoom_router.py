@@ -26,6 +26,7 @@ from ..integrations_storage_models import IntegrationType
 from .zoom_manager import (
     ZoomManager,
     ZoomManagerError,
+    NoSuchZoomMeetingManagerError,
 )
 from .zoom_router_models import (
     CreateZoomIntegrationParams,
@@ -44,6 +45,7 @@ from .zoom_router_models import (
     GetParticipantsApiResponse,
     GetRecordingsApiParams,
     GetRecordingsApiResponse,
+    LinkMeetingApiParams,
 )
 from .zoom_models import (
     CreateMeetingParams,
@@ -439,7 +441,11 @@ async def create_meeting(
             user_id=params.user_id,
         )
         
-        meeting = await zoom_manager.create_meeting(create_params)
+        meeting = await zoom_manager.create_meeting(
+            create_params,
+            deal_id=params.deal_id,
+            buyer_id=params.buyer_id,
+        )
         
         return ApiResponse.success_response(
             data=meeting.dict(),
@@ -712,3 +718,125 @@ async def get_meeting_recordings(
             message_text="Failed to get meeting recordings",
         )
 
+
+@router.get(
+    "/mirror/meetings",
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def get_mirrored_meetings(
+    request: Request,
+    upcoming: Optional[bool] = Query(default=None, description="true - предстоящие, false - прошедшие, не указано - все"),
+    deal_id: Optional[UUID] = Query(default=None, description="ID сделки"),
+    buyer_id: Optional[UUID] = Query(default=None, description="ID покупателя"),
+    limit: int = Query(default=50, ge=1, le=500, description="Максимальное количество встреч"),
+) -> ApiResponse:
+    """Получить встречи из локальной копии (без запросов к Zoom API)"""
+    zoom_manager: ZoomManager = request.app.state.zoom_manager
+    
+    errors = []
+    try:
+        meetings = await zoom_manager.get_mirrored_meetings(
+            upcoming=upcoming,
+            deal_id=deal_id,
+            buyer_id=buyer_id,
+            limit=limit,
+        )
+        
+        return ApiResponse.success_response(
+            data=[meeting.model_dump() for meeting in meetings],
+            message_text="Meetings retrieved successfully",
+        )
+    except ZoomManagerError as e:
+        _LOG.error(f"Error getting mirrored meetings: {e}")
+        errors.append(
+            ResponseError(
+                code=ApiErrorCodes.BASE_EXCEPTION,
+                text=str(e),
+            ),
+        )
+        return ApiResponse.error_response(
+            errors=errors,
+            message_text="Failed to get meetings",
+        )
+
+
+@router.get(
+    "/mirror/meetings/{meeting_id}/recordings",
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def get_mirrored_recordings(
+    request: Request,
+    meeting_id: str = Path(...),
+) -> ApiResponse:
+    """Получить записи встречи из локальной копии"""
+    zoom_manager: ZoomManager = request.app.state.zoom_manager
+    
+    errors = []
+    try:
+        recordings = await zoom_manager.get_mirrored_recordings(meeting_id)
+        
+        return ApiResponse.success_response(
+            data=[recording.model_dump() for recording in recordings],
+            message_text="Recordings retrieved successfully",
+        )
+    except ZoomManagerError as e:
+        _LOG.error(f"Error getting mirrored recordings: {e}")
+        errors.append(
+            ResponseError(
+                code=ApiErrorCodes.BASE_EXCEPTION,
+                text=str(e),
+            ),
+        )
+        return ApiResponse.error_response(
+            errors=errors,
+            message_text="Failed to get recordings",
+        )
+
+
+@router.put(
+    "/mirror/meetings/{meeting_id}/link",
+    dependencies=[Depends(CookieAuthMiddleware())],
+)
+async def link_meeting(
+    request: Request,
+    meeting_id: str = Path(...),
+    params: LinkMeetingApiParams = Body(...),
+) -> ApiResponse:
+    """Привязать встречу к сделке и/или покупателю"""
+    zoom_manager: ZoomManager = request.app.state.zoom_manager
+    
+    errors = []
+    try:
+        meeting = await zoom_manager.link_meeting(
+            meeting_id,
+            deal_id=params.deal_id,
+            buyer_id=params.buyer_id,
+        )
+        
+        return ApiResponse.success_response(
+            data=meeting.model_dump(),
+            message_text="Meeting linked successfully",
+        )
+    except NoSuchZoomMeetingManagerError as e:
+        errors.append(
+            ResponseError(
+                code=ApiErrorCodes.BASE_EXCEPTION,
+                text=str(e),
+            ),
+        )
+        return ApiResponse.error_response(
+            errors=errors,
+            message_text="Meeting not found",
+        )
+    except ZoomManagerError as e:
+        _LOG.error(f"Error linking meeting: {e}")
+        errors.append(
+            ResponseError(
+                code=ApiErrorCodes.BASE_EXCEPTION,
+                text=str(e),
+            ),
+        )
+        return ApiResponse.error_response(
+            errors=errors,
+            message_text="Failed to link meeting",
+        )
@@ -76,6 +76,8 @@ class CreateMeetingApiParams(BaseModel):
     waiting_room: bool = Field(default=False, description="Использовать комнату ожидания")
     auto_recording: Optional[str] = Field(default=None, description="Автоматическая запись (local/cloud/none)")
     user_id: Optional[str] = Field(default="me", description="ID пользователя Zoom")
+    deal_id: Optional[UUID] = Field(default=None, description="Сделка, к которой привязать встречу")
+    buyer_id: Optional[UUID] = Field(default=None, description="Покупатель, к которому привязать встречу")
 
 
 class CreateMeetingApiResponse(BaseModel):
@@ -149,3 +151,8 @@ class GetRecordingsApiResponse(BaseModel):
     data: Optional[RecordingListResponse] = Field(default=None, description="Данные записей")
     message: Optional[str] = Field(default=None, description="Сообщение")
 
+
+class LinkMeetingApiParams(BaseModel):
+    """Параметры API для привязки встречи к сделке и покупателю (null снимает привязку)"""
+    deal_id: Optional[UUID] = Field(default=None, description="ID сделки")
+    buyer_id: Optional[UUID] = Field(default=None, description="ID покупателя")
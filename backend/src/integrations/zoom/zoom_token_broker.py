@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Set,
+)
+
+from .zoom_models import ZoomToken
+from .zoom_token_storage import ZoomTokenStorage
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+# За сколько секунд до истечения токен обновляется заранее, в фоне
+TOKEN_REFRESH_MARGIN = 300
+
+
+class ZoomTokenBroker:
+    """
+    Общий для процесса кеш OAuth токенов Zoom.
+
+    Обновление выполняется одной корутиной на учетную запись, остальные ждут ее результат.
+    Незадолго до истечения токен обновляется в фоне, не задерживая запросы.
+    Если задано хранилище, токены разделяются между воркерами через Mongo.
+    """
+
+    def __init__(
+        self,
+        token_storage: Optional[ZoomTokenStorage] = None,
+        refresh_margin: float = TOKEN_REFRESH_MARGIN,
+    ):
+        self.token_storage = token_storage
+        self.refresh_margin = refresh_margin
+        self._tokens: Dict[str, ZoomToken] = {}
+        self._refreshing: Dict[str, asyncio.Task[ZoomToken]] = {}
+        # Ключи, для которых сохраненный в хранилище токен признан недействительным
+        self._invalidated: Set[str] = set()
+
+    async def get_token(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[ZoomToken]],
+    ) -> str:
+        """Получить действующий access token учетной записи, при необходимости обновив его"""
+        token = self._tokens.get(key)
+        now = time.time()
+        if token and now < token.expires_at - self.refresh_margin:
+            return token.access_token
+        if token and now < token.expires_at:
+            self._start_refresh(key, fetch)
+            return token.access_token
+        # shield: отмена одного ожидающего запроса не должна отменять общее обновление
+        refreshed_token: ZoomToken = await asyncio.shield(self._start_refresh(key, fetch))
+        return refreshed_token.access_token
+
+    def invalidate(
+        self,
+        key: str,
+    ):
+        """Забыть токен (например, после ответа 401), в том числе сохраненный в хранилище"""
+        self._tokens.pop(key, None)
+        self._invalidated.add(key)
+
+    def _start_refresh(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[ZoomToken]],
+    ) -> asyncio.Task[ZoomToken]:
+        task = self._refreshing.get(key)
+        if task is None:
+            task = asyncio.create_task(self._refresh(key, fetch))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda done_task: self._on_refresh_done(key, done_task))
+        return task
+
+    def _on_refresh_done(
+        self,
+        key: str,
+        task: asyncio.Task,
+    ):
+        self._refreshing.pop(key, None)
+        if not task.cancelled() and task.exception():
+            _LOG.error(f"Не удалось обновить токен Zoom: {task.exception()}")
+
+    async def _refresh(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[ZoomToken]],
+    ) -> ZoomToken:
+        if self.token_storage and key not in self._invalidated:
+            try:
+                stored_token = await self.token_storage.get_token(key)
+            except Exception as e:
+                _LOG.error(f"Ошибка чтения токена Zoom из хранилища: {e}")
+                stored_token = None
+            # Токен мог уже обновить другой воркер
+            if stored_token and time.time() < stored_token.expires_at - self.refresh_margin:
+                self._tokens[key] = stored_token
+                return stored_token
+
+        token = await fetch()
+        self._tokens[key] = token
+        self._invalidated.discard(key)
+        if self.token_storage:
+            try:
+                await self.token_storage.save_token(key, token)
+            except Exception as e:
+                _LOG.error(f"Ошибка сохранения токена Zoom в хранилище: {e}")
+        return token
@@ -0,0 +1,60 @@
+import logging
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from src.clients.mongo.client import MClient
+from src.misc.misc_lib import utc_now
+from .zoom_models import ZoomToken
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+
+class ZoomTokenStorage:
+    """Общие для всех воркеров OAuth токены Zoom"""
+
+    def __init__(
+        self,
+        mongo_client: MClient,
+    ):
+        self.mongo_client: MClient = mongo_client
+        self.collection_name: str = "zoom_oauth_tokens"
+        self.collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            self.collection_name,
+        )
+
+    async def get_token(
+        self,
+        key: str,
+    ) -> Optional[ZoomToken]:
+        """Получить сохраненный токен по ключу учетной записи"""
+        projection = {
+            "_id": False,
+        }
+        for field in ZoomToken.model_fields:
+            projection[field] = True
+        data = await self.collection.find_one(
+            {"key": key},
+            projection=projection,
+        )
+        if data:
+            return ZoomToken(**data)
+        return None
+
+    async def save_token(
+        self,
+        key: str,
+        token: ZoomToken,
+    ):
+        """Сохранить токен (upsert по ключу учетной записи)"""
+        await self.collection.update_one(
+            {"key": key},
+            {
+                "$set": {
+                    **token.model_dump(),
+                    "updated_at": utc_now(),
+                },
+            },
+            upsert=True,
+        )
@@ -0,0 +1,62 @@
+import time
+
+from src.metrics.metrics_registry import MetricsRegistry
+
+
+# Метка для запросов, не совпавших ни с одним маршрутом: путь в метке раздул бы число рядов
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: длительность, количество и статусы HTTP-запросов по шаблону маршрута,
+    число запросов в обработке.
+    """
+
+    def __init__(
+        self,
+        app,
+        metrics: MetricsRegistry,
+    ):
+        self.app = app
+        self.requests_total = metrics.counter(
+            "http_requests_total",
+            "Количество HTTP-запросов",
+            ("method", "route", "status"),
+        )
+        self.request_duration = metrics.histogram(
+            "http_request_duration_seconds",
+            "Длительность обработки HTTP-запроса до отправки ответа",
+            ("method", "route"),
+        )
+        self.requests_in_flight = metrics.gauge(
+            "http_requests_in_flight",
+            "Количество HTTP-запросов в обработке",
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started_at = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started_at
+            self.requests_in_flight.dec()
+            # Маршрут FastAPI кладет в scope при сопоставлении запроса
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            self.requests_total.inc(method, route_path, str(status))
+            self.request_duration.observe(method, route_path, value=duration)
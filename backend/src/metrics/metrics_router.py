@@ -0,0 +1,42 @@
+import secrets
+
+from fastapi import (
+    APIRouter,
+    Request,
+    HTTPException,
+    status,
+)
+from fastapi.responses import PlainTextResponse
+
+from src.metrics.metrics_registry import MetricsRegistry
+
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get(
+    "/metrics",
+    include_in_schema=False,
+)
+async def get_metrics(
+    request: Request,
+) -> PlainTextResponse:
+    """
+    Метрики процесса в текстовом формате Prometheus.
+    Каждый воркер отдает только свои метрики.
+    """
+    token = request.app.state.config.metrics_config.token
+    if token:
+        expected = f"Bearer {token}".encode()
+        if not secrets.compare_digest(request.headers.get("Authorization", "").encode(), expected):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Неверный токен метрик",
+            )
+    metrics: MetricsRegistry = request.app.state.metrics
+    return PlainTextResponse(
+        metrics.render(),
+        media_type=PROMETHEUS_CONTENT_TYPE,
+    )
@@ -0,0 +1,74 @@
+import threading
+from typing import (
+    Dict,
+    Tuple,
+)
+
+from pymongo import monitoring
+
+from src.metrics.metrics_registry import MetricsRegistry
+
+
+# Служебные команды соединений не относятся к коллекциям и только шумят
+IGNORED_COMMANDS = frozenset(
+    {
+        "hello",
+        "ismaster",
+        "isMaster",
+        "ping",
+        "buildInfo",
+        "endSessions",
+        "saslStart",
+        "saslContinue",
+        "authenticate",
+    },
+)
+# Команды, у которых имя коллекции лежит не в значении имени команды
+COLLECTION_FIELDS = {
+    "getMore": "collection",
+}
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Длительность и ошибки команд Mongo по коллекциям.
+    Вызывается драйвером из его потоков, поэтому начатые команды хранятся под блокировкой.
+    """
+
+    def __init__(self, metrics: MetricsRegistry):
+        self.command_duration = metrics.histogram(
+            "mongo_command_duration_seconds",
+            "Длительность команд Mongo",
+            ("collection", "command"),
+        )
+        self.command_failures = metrics.counter(
+            "mongo_command_failures_total",
+            "Количество команд Mongo, завершившихся ошибкой",
+            ("collection", "command"),
+        )
+        self._lock = threading.Lock()
+        # {(connection_id, request_id): коллекция}
+        self._started: Dict[Tuple[object, int], str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(COLLECTION_FIELDS.get(event.command_name, event.command_name))
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ""
+
+    def _finish(self, event) -> Tuple[str, bool]:
+        with self._lock:
+            collection = self._started.pop((event.connection_id, event.request_id), None)
+        if collection is None:
+            return "", False
+        self.command_duration.observe(collection, event.command_name, value=event.duration_micros / 1_000_000)
+        return collection, True
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        collection, tracked = self._finish(event)
+        if tracked:
+            self.command_failures.inc(collection, event.command_name)
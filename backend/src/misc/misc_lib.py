@@ -225,6 +225,26 @@ def proper_phone_number(
     return "Не указано"
 
 
+def normalized_phone_number(
+    phone: str | None,
+) -> str | None:
+    """
+    Ключ для сопоставления телефонов: российский номер в формате proper_phone_number,
+    прочие (внутренние, зарубежные) - только цифры. None, если цифр нет.
+    """
+
+    formatted = proper_phone_number(phone)
+    if formatted.startswith("+"):
+        return formatted
+
+    digits = re.sub(
+        r"\D",
+        "",
+        phone or "",
+    )
+    return digits or None
+
+
 def get_extenison_by_filename(
     file_name: str,
 ) -> str:
@@ -1,3 +1,4 @@
+import functools
 from abc import (
     ABC,
     abstractmethod,
@@ -24,6 +25,9 @@ class OmnicomConfig(BaseSettings):
     sadr: Optional[str] = None
     user: Optional[str] = None
     pwd: Optional[str] = None
+    # Ограничение частоты отправки SMS: сообщений в секунду и сколько можно отправить подряд
+    rate_limit: float = 10.0
+    rate_burst: int = 10
     #
     model_config = SettingsConfigDict(env_prefix="OMNICOM_")
 
@@ -32,10 +36,45 @@ class ExchangeConfig(BaseSettings):
     email: Optional[EmailStr] = None
     password: Optional[str] = None
     login: Optional[str] = None
+    # Адрес EWS (https://.../EWS/Exchange.asmx); если не задан, используется autodiscover
+    ews_url: Optional[str] = None
+    # Размер пула HTTP-сессий к EWS
+    max_connections: int = 8
     #
     model_config = SettingsConfigDict(env_prefix="EXCHANGE_")
 
 
+class SmtpConfig(BaseSettings):
+    host: Optional[str] = None
+    port: int = 587
+    login: Optional[str] = None
+    password: Optional[str] = None
+    # Адрес отправителя (по умолчанию - login)
+    email_from: Optional[str] = None
+    # STARTTLS после подключения; use_ssl - SMTP поверх TLS (порт 465)
+    use_tls: bool = True
+    use_ssl: bool = False
+    timeout: float = 30.0
+    #
+    model_config = SettingsConfigDict(env_prefix="SMTP_")
+
+
+class EmailConfig(BaseSettings):
+    # Транспорт писем: exchange, smtp или file (письма сохраняются в файлы, для тестов и локального запуска)
+    transport: str = "exchange"
+    # Потоки, в которых выполняются блокирующие отправки (по одной сессии на поток)
+    max_workers: int = 8
+    # Сколько писем отправляется одним запросом EWS / одним соединением SMTP
+    batch_size: int = 50
+    # Сколько уведомлений забирается из очереди за один проход
+    fetch_limit: int = 1000
+    # Каталог для транспорта file
+    file_directory: str = "sent_emails"
+    subject: str = "Уведомление от Энергопромсбыт"
+    #
+    model_config = SettingsConfigDict(env_prefix="EMAIL_")
+
+
 class MongoConfig(BaseSettings):
     user: Optional[str] = None
     password: Optional[str] = None
@@ -43,17 +82,251 @@ class MongoConfig(BaseSettings):
     port: int = 27017
     db_name: Optional[str] = None
     enable_ssl: bool = False
+    # Пул соединений на процесс: воркер держит не меньше min и не больше max соединений
+    min_pool_size: int = 0
+    max_pool_size: int = 100
+    # Простаивающие дольше соединения закрываются (None - не закрываются)
+    max_idle_time_ms: Optional[int] = 300000
+    # Сколько запрос ждет свободного соединения, когда пул исчерпан (None - без ограничения)
+    wait_queue_timeout_ms: Optional[int] = 10000
+    # Сжатие трафика через запятую в порядке предпочтения: zstd (zstandard из requirements.txt),
+    # snappy (нужен python-snappy), zlib (встроен). Компрессоры без установленного модуля пропускаются
+    compressors: str = "zstd,zlib"
+    retry_reads: bool = True
+    retry_writes: bool = True
+    # Read preference по умолчанию: primary, primaryPreferred, secondary, secondaryPreferred, nearest
+    read_preference: str = "primary"
+    # Read preference выгрузок, счетчиков и аналитических агрегаций, допускающих отставание реплики
+    analytics_read_preference: str = "secondaryPreferred"
+    # Максимальное отставание вторичной реплики в секундах (не меньше 90, None - без ограничения)
+    max_staleness_seconds: Optional[int] = None
+    # Read preference отдельных коллекций: "коллекция=режим,коллекция=режим"
+    read_preference_overrides: str = ""
     #
     model_config = SettingsConfigDict(env_prefix="MONGO_")
 
+    def get_read_preference_overrides(self) -> dict[str, str]:
+        overrides = {}
+        for item in self.read_preference_overrides.split(","):
+            if not item.strip():
+                continue
+            collection, _, mode = item.partition("=")
+            overrides[collection.strip()] = mode.strip()
+        return overrides
+
+
+class SlowQueryConfig(BaseSettings):
+    # Логировать команды Mongo дольше порога вместе с формой фильтра
+    enabled: bool = True
+    threshold_ms: int = 100
+    # Режим отладки: запрашивать план медленных команд и отмечать полные сканирования коллекции (COLLSCAN)
+    explain: bool = False
+    # Не чаще раза в столько секунд для одной формы запроса
+    explain_interval: int = 600
+    # Сколько explain может ждать выполнения; остальные пропускаются
+    explain_queue_size: int = 100
+    #
+    model_config = SettingsConfigDict(env_prefix="MONGO_SLOW_QUERY_")
+
+
+class ChatsConfig(BaseSettings):
+    # Искать чаты и сообщения и по бинарным, и по строковым UUID, пока старые документы не переведены
+    # tools/migrate_chats_binary_uuids.py; после перевода выключить
+    legacy_string_ids: bool = True
+    #
+    model_config = SettingsConfigDict(env_prefix="CHATS_")
+
+
+class ChatSearchConfig(BaseSettings):
+    # Сколько последних подходящих сообщений ранжируется в одном запросе поиска
+    scan_limit: int = 1000
+    # Длина фрагмента текста в результатах поиска
+    snippet_length: int = 160
+    # Сколько разных слов сообщения индексируется
+    max_tokens: int = 256
+    #
+    model_config = SettingsConfigDict(env_prefix="CHAT_SEARCH_")
+
+
+class ImportsConfig(BaseSettings):
+    # Максимальный размер загружаемого файла импорта, байты; файл больше отклоняется с 413
+    max_upload_bytes: int = 100 * 1024 * 1024
+    #
+    model_config = SettingsConfigDict(env_prefix="IMPORTS_")
+
+
+class RevisionsConfig(BaseSettings):
+    # Каждая N-я ревизия сущности хранится полным снимком, остальные - дельтами
+    snapshot_every: int = 20
+    # Сколько последних ревизий хранить на одну сущность (None - без ограничения)
+    max_per_entity: Optional[int] = None
+    # Сколько дней хранить ревизии (None - бессрочно). Удаляются целыми цепочками снимок -> дельты,
+    # поэтому последняя цепочка сущности может пережить срок
+    ttl_days: Optional[int] = None
+    # Пауза между проходами удаления ревизий старше ttl_days, секунды
+    ttl_cleanup_interval: int = 3600
+    #
+    model_config = SettingsConfigDict(env_prefix="REVISIONS_")
+
+
+class PasswordHashingConfig(BaseSettings):
+    # Количество раундов pbkdf2_sha256 для новых хешей; хеши с меньшим числом раундов пересчитываются при входе
+    rounds: int = 29000
+    # Потоки, в которых считаются хеши (hashlib.pbkdf2_hmac отпускает GIL)
+    max_workers: int = 4
+    # Сколько операций хеширования может ожидать выполнения одновременно
+    max_concurrency: int = 32
+    # Сколько секунд ждать свободного слота, прежде чем отказать в операции
+    acquire_timeout: float = 10.0
+    #
+    model_config = SettingsConfigDict(env_prefix="PASSWORD_HASHING_")
+
+
+class HttpClientConfig(BaseSettings):
+    # Пул соединений на одну интеграцию
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    # Таймауты, секунды
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 10.0
+    # HTTP/2 включается, только если установлен пакет h2
+    http2: bool = True
+    # Повторы при сетевых ошибках, 429 и 5xx (экспоненциальная задержка с джиттером)
+    max_retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    # Сколько запросов одновременно отправляем на один хост
+    per_host_concurrency: int = 10
+    #
+    model_config = SettingsConfigDict(env_prefix="HTTP_CLIENT_")
+
+
+class TelephonyReportsConfig(BaseSettings):
+    # Опрос готовности отчета Mango Office: первая пауза и ее предел (пауза растет вдвое), секунды
+    poll_initial_delay: float = 0.25
+    poll_max_delay: float = 5.0
+    # Сколько секунд ждать отчет, прежде чем признать задачу неудачной
+    poll_timeout: float = 120.0
+    # Сколько секунд запрос API ждет готовности отчета, прежде чем вернуть задачу (202) для опроса клиентом
+    inline_wait: float = 2.0
+    # Границы периода выравниваются до этого шага, чтобы "скользящие" периоды панелей попадали в кеш
+    range_granularity: int = 60
+    # Период считается закрытым, если закончился больше чем столько секунд назад
+    closed_range_lag: int = 3600
+    # Сколько секунд хранить отчет за открытый и за закрытый период
+    open_range_ttl: int = 300
+    closed_range_ttl: int = 7 * 24 * 60 * 60
+    #
+    model_config = SettingsConfigDict(env_prefix="TELEPHONY_REPORTS_")
+
+
+class TelephonySyncConfig(BaseSettings):
+    # Фоновая синхронизация истории звонков Mango Office в локальную коллекцию calls
+    enabled: bool = True
+    # Пауза между проходами синхронизации, секунды
+    interval: int = 60
+    # Сколько секунд до водяного знака перечитывать: звонки попадают в отчет Mango Office с задержкой
+    overlap: int = 300
+    # За сколько дней загрузить историю при первом запуске
+    initial_days: int = 30
+    # Период одного отчета stats/request при догрузке, секунды
+    window: int = 24 * 60 * 60
+    # Насколько локальная копия может отставать от конца запрошенного периода, чтобы отвечать из нее
+    max_lag: int = 300
+    # Сколько секунд воркер владеет блокировкой синхронизации (не дольше прохода)
+    lease_ttl: int = 600
+    #
+    model_config = SettingsConfigDict(env_prefix="TELEPHONY_SYNC_")
+
+
+class TelephonyEventsConfig(BaseSettings):
+    # Сколько событий копится в очереди одного WebSocket-соединения; при переполнении отбрасываются старые
+    queue_size: int = 100
+    # Сколько секунд ждать отправки события клиенту, прежде чем закрыть медленное соединение
+    send_timeout: float = 5.0
+    # Рассылать всем подключенным события, которые не удалось сопоставить с сотрудником по телефону.
+    # В событиях есть номера клиентов, поэтому включается явно
+    broadcast_unrouted: bool = False
+    # Сколько секунд кешировать соответствие телефонов сотрудникам
+    users_cache_ttl: int = 300
+    # Размер capped-коллекции telephony_events, через которую события расходятся по воркерам, байт
+    bus_size: int = 16 * 1024 * 1024
+    # Через сколько секунд заново открывать курсор событий, закрытый сервером или после ошибки
+    bus_retry_interval: float = 1.0
+    #
+    model_config = SettingsConfigDict(env_prefix="TELEPHONY_EVENTS_")
+
+
+class ZoomSyncConfig(BaseSettings):
+    # Фоновая синхронизация встреч и записей Zoom в локальные коллекции
+    enabled: bool = True
+    interval: int = 300
+    # Чьи встречи синхронизируются (ID или email пользователя Zoom, me - владелец приложения)
+    user_id: str = "me"
+    # Размер страницы запросов к Zoom API (максимум 300)
+    page_size: int = 300
+    # За сколько дней загрузить записи при первом запуске и сколько дней перечитывать до водяного знака
+    recordings_initial_days: int = 30
+    recordings_overlap_days: int = 1
+    # Сколько секунд кешировать страницы ответов Zoom API, которые запрашиваются напрямую
+    page_cache_ttl: int = 60
+    page_cache_size: int = 512
+    # Сколько секунд воркер владеет блокировкой синхронизации
+    lease_ttl: int = 900
+    #
+    model_config = SettingsConfigDict(env_prefix="ZOOM_SYNC_")
+
 
 class TelegramConfig(BaseSettings):
     token: Optional[str] = None
     chat_id: Optional[str] = None
+    # Telegram разрешает боту не больше 20 сообщений в минуту в одну группу
+    rate_limit: float = 0.33
+    rate_burst: int = 3
     #
     model_config = SettingsConfigDict(env_prefix="TG_")
 
 
+class FeaturesConfig(BaseSettings):
+    # Подсистемы, которые подключает воркер, через запятую; авторизация и пользователи подключаются всегда.
+    # Зависимости подключаются автоматически (telephony и zoom - integrations, imports - deals и buyers)
+    enabled: str = "signs,deals,buyers,chats,integrations,telephony,zoom,imports"
+    # Логировать время импорта каждой подсистемы при старте
+    log_import_time: bool = True
+    #
+    model_config = SettingsConfigDict(env_prefix="FEATURES_")
+
+    def get_enabled(self) -> list[str]:
+        return [name.strip() for name in self.enabled.split(",") if name.strip()]
+
+
+class MetricsConfig(BaseSettings):
+    # Сбор метрик запросов и команд Mongo и их отдача на /metrics
+    enabled: bool = True
+    # Если задан, /metrics требует заголовок Authorization: Bearer <token>
+    token: Optional[str] = None
+    #
+    model_config = SettingsConfigDict(env_prefix="METRICS_")
+
+
+class LoggingConfig(BaseSettings):
+    level: str = "INFO"
+    # Писать логи одной JSON-строкой на запись (false - обычный текстовый формат)
+    json_format: bool = True
+    # Запись в поток выполняется отдельным потоком через очередь; при переполнении записи отбрасываются
+    use_queue: bool = True
+    queue_size: int = 10000
+    # Доля запросов, для которых пишутся DEBUG-логи горячих путей (0 - никогда, 1 - всегда)
+    debug_sample_rate: float = 0.01
+    # Заголовок с идентификатором запроса; если клиент его не передал, идентификатор генерируется
+    request_id_header: str = "X-Request-ID"
+    #
+    model_config = SettingsConfigDict(env_prefix="LOG_")
+
+
 def _get_env_file_path() -> str:
     """Получает путь к файлу local.env относительно текущего файла"""
     current_file = Path(__file__).resolve()
@@ -76,10 +349,28 @@ class AppConfig(BaseSettings):
     domain: str | None = None
     front_office_url: Optional[str] = None
     mongo_config: MongoConfig = MongoConfig()
+    slow_query_config: SlowQueryConfig = SlowQueryConfig()
     exchange_config: ExchangeConfig = ExchangeConfig()
+    smtp_config: SmtpConfig = SmtpConfig()
+    email_config: EmailConfig = EmailConfig()
     omnicom_config: OmnicomConfig = OmnicomConfig()
     files_storage_directory_path: Optional[str] = None
     telegram_config: TelegramConfig = TelegramConfig()
+    revisions_config: RevisionsConfig = RevisionsConfig()
+    chats_config: ChatsConfig = ChatsConfig()
+    chat_search_config: ChatSearchConfig = ChatSearchConfig()
+    imports_config: ImportsConfig = ImportsConfig()
+    password_hashing_config: PasswordHashingConfig = PasswordHashingConfig()
+    http_client_config: HttpClientConfig = HttpClientConfig()
+    telephony_reports_config: TelephonyReportsConfig = TelephonyReportsConfig()
+    telephony_sync_config: TelephonySyncConfig = TelephonySyncConfig()
+    telephony_events_config: TelephonyEventsConfig = TelephonyEventsConfig()
+    zoom_sync_config: ZoomSyncConfig = ZoomSyncConfig()
+    logging_config: LoggingConfig = LoggingConfig()
+    metrics_config: MetricsConfig = MetricsConfig()
+    features_config: FeaturesConfig = FeaturesConfig()
+    # Хранить OAuth токены Zoom в Mongo, чтобы воркеры не запрашивали их каждый сам
+    zoom_token_persistence: bool = False
     system_user_id: UUID = UUID("52432537-dbfd-4081-a47b-4e6c7ba1e6c9")
     #
     model_config = SettingsConfigDict(
@@ -94,9 +385,31 @@ class AppConfig(BaseSettings):
         # Пересоздаем вложенные конфигурации после загрузки env_file,
         # чтобы они получили переменные окружения
         self.mongo_config = MongoConfig()
+        self.slow_query_config = SlowQueryConfig()
         self.exchange_config = ExchangeConfig()
+        self.smtp_config = SmtpConfig()
+        self.email_config = EmailConfig()
         self.omnicom_config = OmnicomConfig()
         self.telegram_config = TelegramConfig()
+        self.revisions_config = RevisionsConfig()
+        self.chats_config = ChatsConfig()
+        self.chat_search_config = ChatSearchConfig()
+        self.imports_config = ImportsConfig()
+        self.password_hashing_config = PasswordHashingConfig()
+        self.http_client_config = HttpClientConfig()
+        self.telephony_reports_config = TelephonyReportsConfig()
+        self.telephony_sync_config = TelephonySyncConfig()
+        self.telephony_events_config = TelephonyEventsConfig()
+        self.zoom_sync_config = ZoomSyncConfig()
+        self.logging_config = LoggingConfig()
+        self.metrics_config = MetricsConfig()
+        self.features_config = FeaturesConfig()
+
+
+@functools.lru_cache(maxsize=None)
+def get_app_config() -> AppConfig:
+    """Конфигурация процесса: окружение и local.env читаются один раз"""
+    return AppConfig()
 
 
 class StorageABC(ABC):
@@ -1,6 +1,9 @@
 import datetime as dt
 import logging
-from typing import Type
+from typing import (
+    Optional,
+    Type,
+)
 from uuid import UUID
 
 from src.misc.misc_lib import (
@@ -22,6 +25,8 @@ _LOG = logging.getLogger("uvicorn.info")
 
 NOTIFICATION_TTL_SECONDS = 60  # 1 minutes
 NOTIFICATION_MAX_ATTEMPTS = 5
+# Пауза перед повторной попыткой отправки, чтобы попытки не кончились за время сбоя провайдера
+NOTIFICATION_RETRY_DELAY_SECONDS = 10
 
 
 class NotificationsManagerException(Exception):
@@ -97,10 +102,13 @@ class NotificationManager:
     async def get_notifications_to_send_for_channel(
         self,
         message_channel: NotificationMessageChannel,
+        limit: Optional[int] = None,
     ) -> list[NotificationMessageToCreate]:
         return await self.storage.get_notifications_to_send_for_channel(
             message_channel,
             NOTIFICATION_MAX_ATTEMPTS,
+            limit=limit,
+            retry_delay=NOTIFICATION_RETRY_DELAY_SECONDS,
         )
 
     async def handle_notifications_on_user_registration(
@@ -1,6 +1,9 @@
+import datetime as dt
 import logging
+from typing import Optional
 from uuid import UUID
 
+import pymongo
 from bson.objectid import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
 
@@ -23,7 +26,7 @@ class NotificationsStorage:
     ):
         self.mongo_client = mongo_client
         self.collection_name = "notifications"
-        self.collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
+        self.collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
             self.collection_name,
         )
 
@@ -39,7 +42,7 @@ class NotificationsStorage:
             f" {notification.message_channel=}",
         )
         result = await self.collection.insert_one(notification.dict())
-        _LOG.info(f"Результат добавления нотификации: {result}")
+        _LOG.info("Результат добавления нотификации: %s", result)
         return await self.get_by_object_id(
             result.inserted_id,
         )
@@ -48,20 +51,18 @@ class NotificationsStorage:
         self,
         _id: ObjectId,
     ) -> NotificationMessageToCreate | None:
-        _LOG.info(f"Запрашиваю по ObjectID: {_id}")
+        _LOG.debug("Запрашиваю по ObjectID: %s", _id)
         projection = {
             "_id": False,
         }
         for key in NotificationMessageToCreate.model_fields:
             projection[key] = True
-        _LOG.info(f"{projection=}")
         data = await self.collection.find_one(
             {
                 "_id": _id,
             },
             projection=projection,
         )
-        _LOG.debug(f"Полученные данные: {data}")
         if data:
             return NotificationMessageToCreate(**data)
         else:
@@ -76,13 +77,10 @@ class NotificationsStorage:
         }
         for key in NotificationMessageToCreate.model_fields:
             projection[key] = True
-        _LOG.info(f"{query=}")
-        _LOG.info(f"{projection=}")
         data = await self.collection.find_one(
             query,
             projection=projection,
         )
-        _LOG.debug(f"Полученные данные: {data}")
         if data:
             return NotificationMessageToCreate(**data)
         else:
@@ -108,32 +106,43 @@ class NotificationsStorage:
         self,
         message_channel: NotificationMessageChannel,
         max_attempts: int,
+        limit: Optional[int] = None,
+        retry_delay: int = 0,
     ) -> list[NotificationMessageToCreate]:
         """
-        Получить список неотправленных уведомлений по каналу.
+        Получить список неотправленных уведомлений по каналу (старые первыми).
         - TTL не должен быть больше текущего времени.
         - Количество совершенных попыток не должно превышать максимальное количество попыток.
+        - С последней попытки должно пройти не меньше retry_delay секунд.
         """
+        now = utc_now()
         query = {
             "message_channel": message_channel,
-            "ttl_expires_at": {"$gt": utc_now()},
+            "ttl_expires_at": {"$gt": now},
             "performed_attempts": {"$lt": max_attempts},
             "sent_at": None,
         }
-        _LOG.info(f"{query=}")
-        messages = await self.collection.find(
+        if retry_delay > 0:
+            query["$or"] = [
+                {"last_attempt_at": None},
+                {"last_attempt_at": {"$lte": now - dt.timedelta(seconds=retry_delay)}},
+            ]
+        cursor = self.collection.find(
             query,
             projection={
                 "_id": False,
             },
-        ).to_list(None)
+        ).sort("created_at", pymongo.ASCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        messages = await cursor.to_list(None)
         return [NotificationMessageToCreate(**message) for message in messages]
 
     async def bump_attempt_notification(
         self,
         notification_id: UUID,
     ):
-        _LOG.info(f"Bumping attempt for notification_id: {notification_id}")
+        _LOG.info("Bumping attempt for notification_id: %s", notification_id)
         await self.collection.update_one(
             {"id": notification_id},
             {
@@ -164,3 +173,48 @@ class NotificationsStorage:
             {"id": notification_id},
             {"$push": {"errors": error_dict}},
         )
+
+    async def bump_attempt_notifications(
+        self,
+        notification_ids: list[UUID],
+    ):
+        """Увеличить счетчик попыток сразу для пачки уведомлений"""
+        if not notification_ids:
+            return
+        await self.collection.update_many(
+            {"id": {"$in": notification_ids}},
+            {
+                "$inc": {"performed_attempts": 1},
+                "$set": {"last_attempt_at": utc_now()},
+            },
+        )
+
+    async def mark_notifications_as_sent(
+        self,
+        notification_ids: list[UUID],
+    ):
+        if not notification_ids:
+            return
+        await self.collection.update_many(
+            {"id": {"$in": notification_ids}},
+            {"$set": {"sent_at": utc_now()}},
+        )
+
+    async def add_errors_to_notifications(
+        self,
+        errors: dict[UUID, str],
+    ):
+        """Добавить ошибки нескольким уведомлениям одним bulk_write"""
+        if not errors:
+            return
+        now = utc_now()
+        await self.collection.bulk_write(
+            [
+                pymongo.UpdateOne(
+                    {"id": notification_id},
+                    {"$push": {"errors": {"ts": now, "error_message": error}}},
+                )
+                for notification_id, error in errors.items()
+            ],
+            ordered=False,
+        )
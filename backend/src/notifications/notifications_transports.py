@@ -0,0 +1,160 @@
+import asyncio
+import logging
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from typing import (
+    List,
+    Optional,
+)
+
+from src.clients.email_transport import (
+    EmailTransport,
+    OutgoingEmail,
+    build_email_transport,
+)
+from src.clients.http_client import HttpClientRegistry
+from src.clients.omnicom_sms_client import AsyncOmnicomSmsClient
+from src.clients.telegram import AsyncTgClient
+from src.model import AppConfig
+from src.notifications.notifications_storage_models import (
+    NotificationMessageChannel,
+    NotificationMessageToCreate,
+)
+
+
+_LOG = logging.getLogger(__name__)
+
+
+class NotificationTransport(ABC):
+    """Отправка уведомлений одного канала пачкой"""
+
+    channel: NotificationMessageChannel
+
+    @abstractmethod
+    async def send_batch(
+        self,
+        notifications: List[NotificationMessageToCreate],
+    ) -> List[Optional[Exception]]:
+        """Отправить уведомления; вернуть ошибку для каждого (None - отправлено)"""
+
+    async def aclose(self):  # noqa: B027 - необязательный хук, переопределяют транспорты с соединениями
+        """Освободить ресурсы транспорта. По умолчанию закрывать нечего - намеренно ничего не делает"""
+
+
+class EmailNotificationTransport(NotificationTransport):
+    """
+    Email-уведомления. Вне prod письма на адреса rzd.energy не отправляются,
+    а уходят в Telegram файлами.
+    """
+
+    channel = NotificationMessageChannel.EMAIL
+
+    def __init__(
+        self,
+        email_transport: EmailTransport,
+        subject: str,
+        tg_client: Optional[AsyncTgClient] = None,
+    ):
+        self.email_transport = email_transport
+        self.subject = subject
+        self.tg_client = tg_client
+
+    def _send_to_telegram(self, notification: NotificationMessageToCreate) -> bool:
+        # Fixme: Проверка на то что email отправлен
+        return self.tg_client is not None and notification.destination_address.endswith("rzd.energy")
+
+    async def send_batch(
+        self,
+        notifications: List[NotificationMessageToCreate],
+    ) -> List[Optional[Exception]]:
+        errors: List[Optional[Exception]] = [None] * len(notifications)
+        tg_indexes = []
+        email_indexes = []
+        for i, notification in enumerate(notifications):
+            if self._send_to_telegram(notification):
+                tg_indexes.append(i)
+            else:
+                email_indexes.append(i)
+
+        # Индексы уведомлений каждой отправки в порядке sends
+        send_indexes = [email_indexes]
+        sends = [
+            self.email_transport.send_batch(
+                [
+                    OutgoingEmail(
+                        email_to=notifications[i].destination_address,
+                        subject=self.subject,
+                        html_string=notifications[i].body,
+                    )
+                    for i in email_indexes
+                ],
+            ),
+        ]
+        if tg_indexes:
+            send_indexes.append(tg_indexes)
+            sends.append(
+                self.tg_client.send_files(
+                    [(notifications[i].body, notifications[i].destination_address) for i in tg_indexes],
+                ),
+            )
+            _LOG.warning("Сообщения уходят через телеграм: %s", len(tg_indexes))
+        results = await asyncio.gather(*sends)
+        for indexes, batch_errors in zip(send_indexes, results, strict=True):
+            for i, error in zip(indexes, batch_errors, strict=True):
+                errors[i] = error
+        return errors
+
+    async def aclose(self):
+        await asyncio.to_thread(self.email_transport.close)
+
+
+class SmsNotificationTransport(NotificationTransport):
+    """SMS-уведомления через Omnicom"""
+
+    channel = NotificationMessageChannel.SMS
+
+    def __init__(
+        self,
+        sms_client: AsyncOmnicomSmsClient,
+    ):
+        self.sms_client = sms_client
+
+    async def send_batch(
+        self,
+        notifications: List[NotificationMessageToCreate],
+    ) -> List[Optional[Exception]]:
+        return await self.sms_client.send_batch(
+            [(notification.destination_address, notification.body) for notification in notifications],
+        )
+
+
+def build_notification_transports(
+    app_config: AppConfig,
+    http_clients: HttpClientRegistry,
+    channels: List[NotificationMessageChannel],
+) -> List[NotificationTransport]:
+    """Создать транспорты для выбранных каналов; каналы без настроек провайдера пропускаются"""
+    transports: List[NotificationTransport] = []
+    if NotificationMessageChannel.EMAIL in channels:
+        tg_client = None
+        if app_config.stage != "prod":
+            tg_client = AsyncTgClient(app_config.telegram_config, http_clients.get("telegram"))
+        transports.append(
+            EmailNotificationTransport(
+                build_email_transport(app_config),
+                subject=app_config.email_config.subject,
+                tg_client=tg_client,
+            ),
+        )
+    if NotificationMessageChannel.SMS in channels:
+        if app_config.omnicom_config.user and app_config.omnicom_config.pwd:
+            transports.append(
+                SmsNotificationTransport(
+                    AsyncOmnicomSmsClient(app_config.omnicom_config, http_clients.get("omnicom")),
+                ),
+            )
+        else:
+            _LOG.warning("SMS-уведомления не отправляются: не заданы OMNICOM_USER и OMNICOM_PWD")
+    return transports
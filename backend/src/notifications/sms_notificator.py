@@ -3,37 +3,38 @@
 import argparse
 import asyncio
 import logging
-import time
-import schedule  # type: ignore
+from typing import (
+    List,
+    Tuple,
+)
 
-from src.clients.exchange_client import ExchangeClient
+from src.clients.http_client import HttpClientRegistry
 from src.clients.mongo.client import MClient
-from src.model import AppConfig
+from src.common.app_logging import (
+    setup_logging,
+    stop_logging,
+)
+from src.model import (
+    AppConfig,
+    get_app_config,
+)
 from src.notifications.notifications_manager import NotificationManager
 from src.notifications.notifications_storage import NotificationsStorage
-from src.notifications.notifications_storage_models import (
-    NotificationMessageToCreate,
-    NotificationMessageChannel,
+from src.notifications.notifications_storage_models import NotificationMessageChannel
+from src.notifications.notifications_transports import (
+    NotificationTransport,
+    build_notification_transports,
 )
 
 from src.users.users_storage import UsersStorage
-from src.clients.telegram import TgClient
 
 
 _LOG = logging.getLogger(__name__)
 
-APP_CONFIG = AppConfig()
-SENT_MESSAGE_DELAY_SECONDS = 1
+APP_CONFIG = get_app_config()
 FETCH_MESSAGES_TO_SEND_DELAY_SECONDS = 5
-HEALTH_CHECK_DELAY_MINUTES = 5
-M_CLIENT = MClient(APP_CONFIG.mongo_config)
-E_CLIENT = ExchangeClient(APP_CONFIG.exchange_config)
-NOTIFICATIONS_STORAGE = NotificationsStorage(M_CLIENT)
-USERS_STORAGE = UsersStorage(M_CLIENT)
-NOTIFICATIONS_MANAGER = NotificationManager(NOTIFICATIONS_STORAGE, USERS_STORAGE)
-
-LOOP = asyncio.get_event_loop()
-TG_CLIENT = TgClient(APP_CONFIG.telegram_config)
+# Предел паузы, когда ни одно уведомление пачки не отправлено (провайдер недоступен)
+FAILED_BATCH_MAX_DELAY_SECONDS = 60
 
 
 def _parse() -> argparse.ArgumentParser:
@@ -51,104 +52,146 @@ def _parse() -> argparse.ArgumentParser:
     parser.add_argument(
         "--run",
         action="store_true",
-        help="Run the email notificator",
+        help="Run the notificator",
     )
     parser.add_argument(
         "--once",
         action="store_true",
-        help="Run the email once",
+        help="Send one batch per channel",
     )
     parser.add_argument(
         "--forever",
         action="store_true",
-        help="Run the email forever",
+        help="Run the notificator forever",
+    )
+    parser.add_argument(
+        "--channels",
+        nargs="+",
+        default=[channel.value for channel in NotificationMessageChannel],
+        choices=[channel.value for channel in NotificationMessageChannel],
+        help="Notification channels to send",
     )
     return parser
 
 
-def handle_message(message: NotificationMessageToCreate) -> None:
-    _LOG.info(f"Отправка email: {message.id=} {message.destination_address=}")
-    _LOG.info(f"{message.dict()}")
-    LOOP.run_until_complete(
-        NOTIFICATIONS_STORAGE.bump_attempt_notification(
-            message.id,
-        ),
-    )
-    result = False
-    try:
-        # Fixme: Проверка на то что email отправлен
-        if message.destination_address.endswith("rzd.energy") and APP_CONFIG.stage != "prod":
-            TG_CLIENT.send_file(message.body, to=message.destination_address)
-            result = True
-            _LOG.warning("Сообщение ушло через телеграм.")
-        else:
-            result = E_CLIENT.send_email(
-                email_to=message.destination_address,
-                subject="Уведомление от Энергопромсбыт",
-                html_string=message.body,
-            )
-            _LOG.info(f"Результат отправки email {result=}")
-    except Exception as e:
-        error_message = f"Ошибка отправки email: {e}"
-        _LOG.error(f"Ошибка отправки email: {e}")
-        LOOP.run_until_complete(
-            NOTIFICATIONS_STORAGE.add_error_to_notification(
-                message.id,
-                f"{error_message}",
-            ),
+class NotificationsDispatcher:
+    """Отправка уведомлений из очереди в Mongo пачками через транспорты каналов"""
+
+    def __init__(
+        self,
+        app_config: AppConfig,
+        transports: List[NotificationTransport],
+    ):
+        self.app_config = app_config
+        self.transports = transports
+        self.mongo_client = MClient(app_config.mongo_config)
+        self.notifications_storage = NotificationsStorage(self.mongo_client)
+        self.notifications_manager = NotificationManager(
+            self.notifications_storage,
+            UsersStorage(self.mongo_client, self.app_config.revisions_config),
         )
-    if result:
-        _LOG.info("Email отправлен")
-        _LOG.info("Помечаю сообщение как отправлено.")
-        LOOP.run_until_complete(
-            NOTIFICATIONS_STORAGE.mark_notification_as_sent(message.id),
+
+    async def handle_notifications(
+        self,
+        transport: NotificationTransport,
+    ) -> Tuple[int, int]:
+        """Отправить одну пачку уведомлений канала; возвращает количество полученных из очереди и отправленных"""
+        channel = transport.channel.value
+        notifications = await self.notifications_manager.get_notifications_to_send_for_channel(
+            transport.channel,
+            limit=self.app_config.email_config.fetch_limit,
+        )
+        if not notifications:
+            return 0, 0
+        _LOG.info("Количество сообщений для отправки (%s): %s", channel, len(notifications))
+        await self.notifications_storage.bump_attempt_notifications(
+            [notification.id for notification in notifications],
         )
-    _LOG.info("Процессинг email закончен")
 
+        results = await transport.send_batch(notifications)
+        sent_ids = []
+        errors = {}
+        for notification, error in zip(notifications, results, strict=True):
+            if error is None:
+                sent_ids.append(notification.id)
+            else:
+                _LOG.error("Ошибка отправки %s: notification.id=%r %s", channel, notification.id, error)
+                errors[notification.id] = f"Ошибка отправки {channel}: {error}"
+
+        await self.notifications_storage.mark_notifications_as_sent(sent_ids)
+        await self.notifications_storage.add_errors_to_notifications(errors)
+        _LOG.info("Отправлено (%s): %s, с ошибкой: %s", channel, len(sent_ids), len(errors))
+        return len(notifications), len(sent_ids)
+
+    async def handle_all(self):
+        await asyncio.gather(
+            *(self.handle_notifications(transport) for transport in self.transports),
+        )
 
-def handle_email_notifications() -> None:
-    _LOG.info("Запрашиваю сообщения для отправки.")
-    email_notifications = LOOP.run_until_complete(
-        NOTIFICATIONS_MANAGER.get_notifications_to_send_for_channel(
-            NotificationMessageChannel.EMAIL,
-        ),
+    async def _run_channel_forever(
+        self,
+        transport: NotificationTransport,
+    ):
+        failure_delay = FETCH_MESSAGES_TO_SEND_DELAY_SECONDS
+        while True:
+            try:
+                fetched, sent = await self.handle_notifications(transport)
+                failed = fetched > 0 and sent == 0
+            except Exception as e:
+                _LOG.error("Ошибка обработки %s: %s", transport.channel.value, e)
+                fetched, failed = 0, True
+            if failed:
+                # Ничего не отправлено: пауза растет, чтобы сбой провайдера не исчерпал попытки уведомлений
+                await asyncio.sleep(failure_delay)
+                failure_delay = min(failure_delay * 2, FAILED_BATCH_MAX_DELAY_SECONDS)
+                continue
+            failure_delay = FETCH_MESSAGES_TO_SEND_DELAY_SECONDS
+            # Пока очередь не пуста, забираем следующую пачку без паузы
+            if fetched < self.app_config.email_config.fetch_limit:
+                await asyncio.sleep(FETCH_MESSAGES_TO_SEND_DELAY_SECONDS)
+
+    async def run_forever(self):
+        # Каналы независимы: медленный провайдер SMS не задерживает письма
+        await asyncio.gather(
+            *(self._run_channel_forever(transport) for transport in self.transports),
+        )
+
+
+async def _run(args: argparse.Namespace) -> None:
+    http_clients = HttpClientRegistry(APP_CONFIG.http_client_config)
+    transports = build_notification_transports(
+        APP_CONFIG,
+        http_clients,
+        [NotificationMessageChannel(channel) for channel in args.channels],
     )
-    _LOG.info(f"Количество сообщений для отправки: {len(email_notifications)}")
-    for email_notification in email_notifications:
-        try:
-            handle_message(email_notification)
-        except Exception as e:
-            _LOG.error(f"Ошибка обработки email: {e}")
-            LOOP.run_until_complete(
-                NOTIFICATIONS_STORAGE.add_error_to_notification(
-                    email_notification.id,
-                    f"{e}",
-                ),
-            )
-        time.sleep(SENT_MESSAGE_DELAY_SECONDS)
-    _LOG.info("Все сообщения отправлены.")
+    dispatcher = NotificationsDispatcher(APP_CONFIG, transports)
+    try:
+        if args.forever:
+            await dispatcher.run_forever()
+        elif args.once:
+            await dispatcher.handle_all()
+    finally:
+        for transport in transports:
+            await transport.aclose()
+        await http_clients.aclose()
 
 
 def _main(parser: argparse.ArgumentParser) -> None:
     args = parser.parse_args()
-    logging.basicConfig(level=args.log_level)
-    _LOG.info("Аргументы запуска:")
-    _LOG.info(f"{args.run=}")
-    _LOG.info(f"{args.once=}")
-    _LOG.info(f"{args.forever=}")
-    if args.run:
-        # Запуск по расписанию
-        if args.forever:
-            schedule.every(FETCH_MESSAGES_TO_SEND_DELAY_SECONDS).seconds.do(
-                handle_email_notifications,
-            )
-            schedule.every(HEALTH_CHECK_DELAY_MINUTES).minutes.do()
-            while True:
-                schedule.run_pending()
-                time.sleep(1)
-        # Запуск по расписанию
-        elif args.once:
-            handle_email_notifications()
+    APP_CONFIG.logging_config.level = args.log_level
+    setup_logging(APP_CONFIG.logging_config)
+    _LOG.info(
+        "Аргументы запуска: run=%r once=%r forever=%r channels=%r",
+        args.run,
+        args.once,
+        args.forever,
+        args.channels,
+    )
+    try:
+        if args.run:
+            asyncio.run(_run(args))
+    finally:
+        stop_logging()
 
 
 if __name__ == "__main__":
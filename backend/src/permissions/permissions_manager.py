@@ -10,6 +10,7 @@ from src.roles.roles_manager_models import (
     Roles,
     UserRoleId,
 )
+from src.common.app_logging import is_debug_sampled
 from src.users.users_storage import UsersStorage
 
 
@@ -37,10 +38,12 @@ class PermissionsManager:
         user_id: UUID,
         allowed_permissions: list[Permission]
     ) -> bool:
-        _LOG.info(f"Проверяем действие {allowed_permissions=}")
-        _LOG.info(f"Пользователь {actor_user_id=}")
-        _LOG.info(f"Пользователь {user_id=}")
-        _LOG.info(f"Метод: {inspect.stack()[1].function=}")
+        _LOG.debug(
+            "Проверяем действие allowed_permissions=%r actor_user_id=%r user_id=%r",
+            allowed_permissions,
+            actor_user_id,
+            user_id,
+        )
 
         actor_user_roles = await self.users_storage.get_user_roles_cached(
             actor_user_id,
@@ -51,14 +54,16 @@ class PermissionsManager:
             role_permissions = Roles[role_id].permissions
             for permission in role_permissions:
                 if permission in allowed_permissions:
-                    _LOG.debug(f"Пермишен: {permission}")
+                    _LOG.debug("Пермишен: %s", permission)
                     if permission.self_only:
                         if actor_user_id == user_id:
                             return True
                     else:
                         return True
-        _LOG.info(f"{inspect.stack()[1].filename}:{inspect.stack()[1].lineno}")
-        _LOG.info(f"{inspect.stack()[1].function=}")
+        # Обход стека дорогой, поэтому вызывающий код логируется только для запросов из выборки
+        if is_debug_sampled(_LOG):
+            caller = inspect.stack(context=0)[1]
+            _LOG.debug("Действие не разрешено в %s:%s %s", caller.filename, caller.lineno, caller.function)
 
         raise PermissionsManagerError(
             f"Действие не разрешено для пользователя. {actor_user_id=}"
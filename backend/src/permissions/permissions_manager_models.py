@@ -92,6 +92,8 @@ class PermissionId(str, Enum):
     ADD_ROLE = "ADD_ROLE"
     DELETE_ROLE = "DELETE_ROLE"
 
+    DEAL_BULK_UPDATE_OTHER = "DEAL_BULK_UPDATE_OTHER"
+
 
 class Permission(BaseModel):
     permission_id: PermissionId
@@ -468,6 +470,11 @@ class Permissions(metaclass=SubscriptableMeta):
         description="Разрешить пользователю просмотр ревизий чужой формы",
         self_only=False,
     )
+    DEAL_BULK_UPDATE_OTHER: Permission = Permission(
+        permission_id=PermissionId.DEAL_BULK_UPDATE_OTHER,
+        description="Разрешить массовые операции со сделками (перемещение, закрытие, переназначение, удаление)",
+        self_only=False,
+    )
 
     @classmethod
     def as_list(cls) -> list[Permission]:
@@ -0,0 +1,35 @@
+"""Модуль для хранения ревизий сущностей (дельты и периодические снимки)"""
+
+import logging
+
+from src.clients.mongo.client import MClient
+from src.model import RevisionsConfig
+from .revisions_storage import RevisionsStorage
+
+logger = logging.getLogger(__name__)
+
+# Коллекции сущностей, для которых ведутся ревизии
+REVISIONED_COLLECTIONS = [
+    "deals",
+    "deal_categories",
+    "buyers",
+    "buyer_categories",
+    "users",
+]
+
+
+async def create_revisions_indexes(mongo_client: MClient, config: RevisionsConfig):
+    """Создать индексы для коллекций ревизий"""
+    try:
+        for collection_name in REVISIONED_COLLECTIONS:
+            await RevisionsStorage(mongo_client, collection_name, config).create_indexes()
+        logger.info("Индексы для ревизий успешно созданы")
+    except Exception as e:
+        logger.error(f"Ошибка создания индексов для ревизий: {e}")
+        raise
+
+
+async def apply_revisions_ttl(mongo_client: MClient, config: RevisionsConfig):
+    """Удалить ревизии старше срока хранения во всех коллекциях ревизий"""
+    for collection_name in REVISIONED_COLLECTIONS:
+        await RevisionsStorage(mongo_client, collection_name, config).apply_ttl()
@@ -0,0 +1,104 @@
+"""
+Компактные дельты между ревизиями в формате JSON Patch (RFC 6902, подмножество add/remove/replace).
+
+Словари сравниваются по ключам, списки - поэлементно (хвост добавляется или удаляется),
+поэтому изменение одной стадии воронки не копирует весь массив stages.
+"""
+
+import copy
+from typing import (
+    Any,
+    Iterable,
+)
+
+
+def _escape(token: Any) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_patch(
+    old: Any,
+    new: Any,
+    path: str = "",
+) -> list[dict[str, Any]]:
+    """Построить список операций, превращающих old в new"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: list[dict[str, Any]] = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            key_path = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": key_path, "value": value})
+            elif old[key] != value:
+                ops.extend(make_patch(old[key], value, key_path))
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        common_length = min(len(old), len(new))
+        for index in range(common_length):
+            if old[index] != new[index]:
+                ops.extend(make_patch(old[index], new[index], f"{path}/{index}"))
+        for index in range(common_length, len(new)):
+            ops.append({"op": "add", "path": f"{path}/{index}", "value": new[index]})
+        # Удаляем с конца, чтобы индексы оставшихся элементов не сдвигались
+        for index in range(len(old) - 1, common_length - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{index}"})
+        return ops
+
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def apply_patch(
+    document: Any,
+    ops: list[dict[str, Any]],
+) -> Any:
+    """Применить операции к копии документа"""
+    result = copy.deepcopy(document)
+    for op in ops:
+        if op["path"] == "":
+            result = copy.deepcopy(op["value"])
+            continue
+
+        tokens = [_unescape(token) for token in op["path"].split("/")[1:]]
+        parent = result
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del parent[index]
+            else:
+                parent[index] = copy.deepcopy(op["value"])
+        else:
+            if op["op"] == "remove":
+                del parent[last]
+            else:
+                parent[last] = copy.deepcopy(op["value"])
+    return result
+
+
+def diff_fields(
+    old: dict[str, Any],
+    new: dict[str, Any],
+    ignore: Iterable[str] = (),
+) -> list[tuple[str, Any, Any]]:
+    """Список (поле, старое значение, новое значение) для изменившихся полей верхнего уровня"""
+    ignored = set(ignore)
+    changes = []
+    for key in list(old) + [key for key in new if key not in old]:
+        if key in ignored:
+            continue
+        if old.get(key) != new.get(key):
+            changes.append((key, old.get(key), new.get(key)))
+    return changes
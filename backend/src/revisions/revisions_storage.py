@@ -0,0 +1,348 @@
+import datetime as dt
+import logging
+from typing import (
+    Any,
+    Optional,
+    List,
+)
+from uuid import UUID
+
+import pymongo
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from src.clients.mongo.client import MClient
+from src.misc.misc_lib import utc_now
+from src.model import RevisionsConfig
+from .revisions_patch import (
+    apply_patch,
+    make_patch,
+)
+from .revisions_storage_models import (
+    RevisionKind,
+    RevisionToCreate,
+)
+
+
+_LOG = logging.getLogger("uvicorn.info")
+
+
+class RevisionsStorageException(Exception):
+    pass
+
+
+class NoSuchRevisionError(RevisionsStorageException):
+    pass
+
+
+def _is_snapshot(document: dict[str, Any]) -> bool:
+    # Документы, записанные до появления дельт, не имеют kind и являются полными копиями
+    return document.get("kind", RevisionKind.SNAPSHOT.value) != RevisionKind.DELTA.value
+
+
+def _snapshot_data(document: dict[str, Any]) -> dict[str, Any]:
+    if "kind" not in document:
+        return {key: value for key, value in document.items() if key != "_id"}
+    return document["data"]
+
+
+def _collect_chain(
+    documents: List[dict[str, Any]],
+    revision: int,
+) -> Optional[List[dict[str, Any]]]:
+    """
+    Из документов, отсортированных по убыванию ревизии, выбрать цепочку
+    снимок -> дельты до нужной ревизии. None, если цепочка неполная.
+    """
+    chain: List[dict[str, Any]] = []
+    current = revision
+    for document in documents:
+        if document["revision"] > current:
+            # Дубликат уже взятой ревизии или ревизия новее искомой
+            continue
+        if document["revision"] < current:
+            return None
+        chain.append(document)
+        if _is_snapshot(document):
+            chain.reverse()
+            return chain
+        current = document["base_revision"]
+    return None
+
+
+def _materialize(chain: List[dict[str, Any]]) -> dict[str, Any]:
+    state = _snapshot_data(chain[0])
+    for document in chain[1:]:
+        state = apply_patch(state, document["ops"])
+    return state
+
+
+class RevisionsStorage:
+    """
+    Хранилище ревизий сущности: дельты относительно предыдущей ревизии
+    и периодические полные снимки, с ограничением по количеству и по времени.
+    Старые ревизии удаляются только целыми цепочками снимок -> дельты.
+    """
+
+    def __init__(
+        self,
+        mongo_client: MClient,
+        entity_collection_name: str,
+        config: Optional[RevisionsConfig] = None,
+    ):
+        self.mongo_client: MClient = mongo_client
+        self.config: RevisionsConfig = config or RevisionsConfig()
+        self.collection_name: str = f"{entity_collection_name}_revisions"
+        self.collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
+            self.collection_name,
+        )
+
+    async def create_indexes(self):
+        """Создать индексы коллекции ревизий"""
+        await self.collection.create_index(
+            [("id", pymongo.ASCENDING), ("revision", pymongo.DESCENDING)],
+        )
+        # TTL-индекс удалял снимки раньше зависящих от них дельт; срок хранения соблюдает apply_ttl
+        indexes = await self.collection.index_information()
+        if "expireAfterSeconds" in indexes.get("stored_at_1", {}):
+            await self.collection.drop_index("stored_at_1")
+        if self.config.ttl_days:
+            await self.collection.create_index("stored_at")
+
+    async def add_revision(
+        self,
+        actor_id: UUID | None,
+        state: dict[str, Any],
+    ):
+        """Сохранить ревизию сущности (state - состояние до обновления)"""
+        await self.add_revisions(actor_id, [state])
+
+    async def add_revisions(
+        self,
+        actor_id: UUID | None,
+        states: List[dict[str, Any]],
+    ):
+        """
+        Сохранить ревизии нескольких сущностей.
+
+        Предыдущие ревизии всех сущностей читаются одним запросом, ревизии пишутся одним insert_many.
+        """
+        if not states:
+            return
+
+        previous_documents = await self._get_recent_documents(
+            {state["id"]: state["revision"] for state in states},
+        )
+        documents = []
+        snapshots: List[tuple[UUID, int]] = []
+        for state in states:
+            entity_id, revision = state["id"], state["revision"]
+            chain = _collect_chain(previous_documents.get(entity_id, []), revision - 1)
+            if chain is None or len(chain) >= self.config.snapshot_every:
+                document = RevisionToCreate(
+                    id=entity_id,
+                    revision=revision,
+                    kind=RevisionKind.SNAPSHOT,
+                    data=state,
+                    stored_by=actor_id,
+                )
+                snapshots.append((entity_id, revision))
+            else:
+                document = RevisionToCreate(
+                    id=entity_id,
+                    revision=revision,
+                    kind=RevisionKind.DELTA,
+                    ops=make_patch(_materialize(chain), state),
+                    base_revision=revision - 1,
+                    stored_by=actor_id,
+                )
+            documents.append(document.model_dump())
+
+        await self.collection.insert_many(
+            documents,
+            ordered=False,
+        )
+        if self.config.max_per_entity:
+            for entity_id, revision in snapshots:
+                await self._apply_retention(entity_id, revision, self.config.max_per_entity)
+
+    async def get_revision(
+        self,
+        entity_id: UUID,
+        revision: int,
+    ) -> dict[str, Any]:
+        """Восстановить состояние сущности на заданной ревизии"""
+        cursor = self.collection.find(
+            {
+                "id": entity_id,
+                "revision": {"$lte": revision},
+            },
+            projection={"_id": False},
+        ).sort("revision", pymongo.DESCENDING)
+
+        documents = []
+        async for document in cursor:
+            documents.append(document)
+            # Дельты идут без пропусков, поэтому первый встреченный снимок - начало цепочки
+            if _is_snapshot(document):
+                break
+
+        chain = _collect_chain(documents, revision)
+        if chain is None:
+            raise NoSuchRevisionError(
+                f"Ревизия не найдена или уже удалена. {self.collection_name=} {entity_id=} {revision=}",
+            )
+        return _materialize(chain)
+
+    async def get_revisions_range(
+        self,
+        entity_id: UUID,
+        from_revision: int,
+        to_revision: int,
+    ) -> dict[int, dict[str, Any]]:
+        """
+        Восстановить состояния сущности для ревизий from_revision..to_revision одним проходом.
+        Ревизии, удаленные по сроку хранения, в результат не попадают.
+        """
+        if to_revision < from_revision:
+            return {}
+        cursor = self.collection.find(
+            {
+                "id": entity_id,
+                "revision": {"$lte": to_revision},
+            },
+            projection={"_id": False},
+        ).sort("revision", pymongo.DESCENDING)
+
+        documents: dict[int, dict[str, Any]] = {}
+        async for document in cursor:
+            documents.setdefault(document["revision"], document)
+            # Ниже снимка, предшествующего from_revision, документы уже не нужны
+            if document["revision"] <= from_revision and _is_snapshot(document):
+                break
+
+        states: dict[int, dict[str, Any]] = {}
+        state: Optional[dict[str, Any]] = None
+        previous_revision: Optional[int] = None
+        for revision in sorted(documents):
+            document = documents[revision]
+            if _is_snapshot(document):
+                state = _snapshot_data(document)
+            elif state is not None and document["base_revision"] == previous_revision:
+                state = apply_patch(state, document["ops"])
+            else:
+                state = None
+            previous_revision = revision
+            if state is not None and revision >= from_revision:
+                states[revision] = state
+        return states
+
+    async def _get_recent_documents(
+        self,
+        revisions: dict[UUID, int],
+    ) -> dict[UUID, List[dict[str, Any]]]:
+        """
+        Получить ревизии сущностей, из которых восстанавливается предыдущее состояние.
+        Цепочка от снимка не длиннее snapshot_every, поэтому окно ограничено.
+        """
+        query = {
+            "$or": [
+                {
+                    "id": entity_id,
+                    "revision": {
+                        "$gte": revision - self.config.snapshot_every,
+                        "$lt": revision,
+                    },
+                }
+                for entity_id, revision in revisions.items()
+            ],
+        }
+        cursor = self.collection.find(
+            query,
+            projection={"_id": False},
+        ).sort("revision", pymongo.DESCENDING)
+
+        documents: dict[UUID, List[dict[str, Any]]] = {}
+        async for document in cursor:
+            documents.setdefault(document["id"], []).append(document)
+        return documents
+
+    async def apply_ttl(self) -> int:
+        """
+        Удалить ревизии старше ttl_days целыми цепочками снимок -> дельты.
+        Цепочка, в которой есть хотя бы одна ревизия моложе срока, остается целиком,
+        поэтому каждая оставшаяся дельта восстанавливается. Возвращает количество удаленных.
+        """
+        if not self.config.ttl_days:
+            return 0
+        expired_before = utc_now() - dt.timedelta(days=self.config.ttl_days)
+        cursor = self.collection.aggregate(
+            [
+                {"$match": {"stored_at": {"$lte": expired_before}}},
+                {"$group": {"_id": "$id", "max_expired": {"$max": "$revision"}}},
+            ],
+        )
+        deleted = 0
+        async for item in cursor:
+            entity_id = item["_id"]
+            oldest_alive = await self.collection.find_one(
+                {"id": entity_id, "revision": {"$gt": item["max_expired"]}},
+                projection={"_id": False, "revision": True},
+                sort=[("revision", pymongo.ASCENDING)],
+            )
+            if oldest_alive is None:
+                # Все ревизии сущности старше срока
+                result = await self.collection.delete_many({"id": entity_id})
+                deleted += result.deleted_count
+                continue
+            chain_start = await self.collection.find_one(
+                {
+                    "id": entity_id,
+                    "kind": {"$ne": RevisionKind.DELTA.value},
+                    "revision": {"$lte": oldest_alive["revision"]},
+                },
+                projection={"_id": False, "revision": True},
+                sort=[("revision", pymongo.DESCENDING)],
+            )
+            if chain_start is None:
+                continue
+            result = await self.collection.delete_many(
+                {"id": entity_id, "revision": {"$lt": chain_start["revision"]}},
+            )
+            deleted += result.deleted_count
+        if deleted:
+            _LOG.info("Удалены ревизии старше срока хранения: %s %s", self.collection_name, deleted)
+        return deleted
+
+    async def _apply_retention(
+        self,
+        entity_id: UUID,
+        revision: int,
+        max_per_entity: int,
+    ):
+        """
+        Удалить ревизии сверх max_per_entity. Граница сдвигается только до снимка,
+        чтобы оставшиеся дельты можно было восстановить.
+        """
+        cutoff = revision - max_per_entity + 1
+        if cutoff <= 1:
+            return
+        oldest_kept = await self.collection.find_one(
+            {
+                "id": entity_id,
+                "kind": {"$ne": RevisionKind.DELTA.value},
+                "revision": {"$lte": cutoff},
+            },
+            projection={"_id": False, "revision": True},
+            sort=[("revision", pymongo.DESCENDING)],
+        )
+        if not oldest_kept:
+            return
+        result = await self.collection.delete_many(
+            {
+                "id": entity_id,
+                "revision": {"$lt": oldest_kept["revision"]},
+            },
+        )
+        _LOG.info(
+            f"Удалены старые ревизии: {self.collection_name=} {entity_id=} {result.deleted_count=}",
+        )
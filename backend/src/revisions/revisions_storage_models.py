@@ -0,0 +1,44 @@
+import datetime as dt
+from enum import Enum
+from typing import (
+    Any,
+    Optional,
+    List,
+)
+from uuid import UUID
+
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+from src.misc.misc_lib import utc_now
+
+
+class RevisionKind(str, Enum):
+    SNAPSHOT = "snapshot"
+    DELTA = "delta"
+
+
+class RevisionToCreate(BaseModel):
+    """
+    Модель ревизии сущности.
+
+    Снимок хранит состояние целиком в data, дельта - операции JSON Patch в ops
+    относительно ревизии base_revision.
+    """
+    id: UUID = Field(..., description="ID сущности")
+    revision: int = Field(..., description="Номер ревизии сущности")
+    kind: RevisionKind = Field(...)
+    data: Optional[dict[str, Any]] = Field(default=None, description="Полное состояние (для снимка)")
+    ops: Optional[List[dict[str, Any]]] = Field(default=None, description="Операции JSON Patch (для дельты)")
+    base_revision: Optional[int] = Field(default=None, description="Ревизия, к которой применяется дельта")
+    stored_at: dt.datetime = Field(default_factory=utc_now)
+    stored_by: UUID | None = Field(default=None)
+
+
+class RevisionFieldChange(BaseModel):
+    """Изменение поля сущности между соседними ревизиями"""
+    field: str = Field(...)
+    old_value: Any = Field(default=None)
+    new_value: Any = Field(default=None)
@@ -170,6 +170,7 @@ class Roles(metaclass=SubscriptableMeta):
             Permissions.REGION_GET_BY_ID,
             Permissions.RETAIL_MARKET_ENTITY_GET_BY_ID,
             Permissions.FORM_GET_REVISIONS_OTHER,
+            Permissions.DEAL_BULK_UPDATE_OTHER,
         ]
     )
 
@@ -1,15 +1,123 @@
-from passlib.hash import pbkdf2_sha256
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from src.model import PasswordHashingConfig
+
+
+class PasswordHashingBusyError(Exception):
+    pass
+
+
+def build_crypt_context(config: PasswordHashingConfig) -> CryptContext:
+    """Контекст хеширования: хеши с меньшим числом раундов помечаются как требующие обновления"""
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        pbkdf2_sha256__default_rounds=config.rounds,
+        pbkdf2_sha256__min_rounds=config.rounds,
+    )
+
+
+class PasswordHasher:
+    """
+    Асинхронное хеширование паролей.
+
+    pbkdf2 выполняется в ограниченном пуле потоков, чтобы не блокировать event loop,
+    а семафор ограничивает очередь, чтобы всплеск логинов не копил бесконечное ожидание.
+    """
+
+    def __init__(self, config: PasswordHashingConfig):
+        self.config: PasswordHashingConfig = config
+        self.context: CryptContext = build_crypt_context(config)
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=config.max_workers,
+            thread_name_prefix="password-hashing",
+        )
+        self.semaphore: asyncio.Semaphore = asyncio.Semaphore(config.max_concurrency)
+
+    async def _run(self, func, *args):
+        try:
+            await asyncio.wait_for(
+                self.semaphore.acquire(),
+                timeout=self.config.acquire_timeout,
+            )
+        except asyncio.TimeoutError:
+            raise PasswordHashingBusyError(
+                "Сервис проверки паролей перегружен, повторите попытку позже",
+            )
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(
+        self,
+        plain_password: str,
+        hashed_password: str,
+    ) -> bool:
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    async def verify_and_update(
+        self,
+        plain_password: str,
+        hashed_password: str,
+    ) -> tuple[bool, Optional[str]]:
+        """Проверить пароль и, если параметры хеша устарели, вернуть новый хеш"""
+        return await self._run(self.context.verify_and_update, plain_password, hashed_password)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+_PASSWORD_HASHER: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _PASSWORD_HASHER
+    if _PASSWORD_HASHER is None:
+        _PASSWORD_HASHER = PasswordHasher(PasswordHashingConfig())
+    return _PASSWORD_HASHER
 
 
 def hash_password(password) -> str:
-    return pbkdf2_sha256.hash(password)
+    return get_password_hasher().context.hash(password)
 
 
 def verify_password(
     plain_password,
     hashed_password,
 ) -> bool:
-    return pbkdf2_sha256.verify(
+    return get_password_hasher().context.verify(
+        plain_password,
+        hashed_password,
+    )
+
+
+async def hash_password_async(password: str) -> str:
+    return await get_password_hasher().hash(password)
+
+
+async def verify_password_async(
+    plain_password: str,
+    hashed_password: str,
+) -> bool:
+    return await get_password_hasher().verify(
+        plain_password,
+        hashed_password,
+    )
+
+
+async def verify_and_update_password_async(
+    plain_password: str,
+    hashed_password: str,
+) -> tuple[bool, Optional[str]]:
+    return await get_password_hasher().verify_and_update(
         plain_password,
         hashed_password,
-    )
\ No newline at end of file
+    )
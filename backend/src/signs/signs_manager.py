@@ -52,7 +52,7 @@ class SignsManager:
             user_id=user_id,
             entity_id=entity_id,
         )
-        _LOG.info(f"sign: {sign}")
+        _LOG.debug("sign: %s", sign)
         if not sign:
             raise ExpiredSignError("Время действия подписи истекло")
 
@@ -85,7 +85,7 @@ class SignsManager:
 
         user = await self.users_storage.get(user_id)
         if not user:
-            _LOG.error(f"Пользователь не найден: {user_id=}")
+            _LOG.error("Пользователь не найден: user_id=%r", user_id)
             raise SignsManagerException("Пользователь не найден")
 
         if user.is_backoffice_user:
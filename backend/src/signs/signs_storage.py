@@ -25,7 +25,7 @@ class SignsStorage:
     ):
         self.mongo_client: MClient = mongo_client
         self.collection_name: str = "signs"
-        self.collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
+        self.collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
             self.collection_name,
         )
 
@@ -42,28 +42,26 @@ class SignsStorage:
         )
         # FIXME: Проверить что запись создана
         result = await self.collection.insert_one(sign.dict())
-        _LOG.info(f"Результат создания подписи: {result}")
+        _LOG.info("Результат создания подписи: %s", result)
         return sign
 
     async def get(
         self,
         uid: UUID,
     ) -> Optional[SignToCreate]:
-        _LOG.info(f"Запрашиваю подпись по id: {uid}")
+        _LOG.debug("Запрашиваю подпись по id: %s", uid)
         projection = {
             "_id": False,
         }
         for key in SignToCreate.model_fields:
             projection[key] = True
-        _LOG.info(f"{projection=}")
         data = await self.collection.find_one(
             {"id": uid},
             projection=projection,
         )
-        _LOG.info(f"Полученные данные: {data}")
         if data:
             return SignToCreate(**data)
-        _LOG.info(f"Подпись не найдена. {uid=}")
+        _LOG.debug("Подпись не найдена. uid=%r", uid)
         return None
 
     async def get_not_expired_sign(
@@ -71,13 +69,12 @@ class SignsStorage:
         user_id: UUID,
         entity_id: UUID,
     ) -> Optional[SignToCreate]:
-        _LOG.info(f"Запрашиваю подпись {user_id=} {entity_id=}")
+        _LOG.debug("Запрашиваю подпись user_id=%r entity_id=%r", user_id, entity_id)
         projection = {
             "_id": False,
         }
         for key in SignToCreate.model_fields:
             projection[key] = True
-        _LOG.info(f"{projection=}")
         data = await self.collection.find_one(
             {
                 "requested_by_id": user_id,
@@ -88,10 +85,9 @@ class SignsStorage:
             projection=projection,
 
         )
-        _LOG.info(f"Полученные данные: {data}")
         if data:
             return SignToCreate(**data)
-        _LOG.info(f"Подпись не найдена. {user_id=} {entity_id=}")
+        _LOG.debug("Подпись не найдена. user_id=%r entity_id=%r", user_id, entity_id)
         return None
 
     async def update(
@@ -105,7 +101,7 @@ class SignsStorage:
             },
             update_query,
         )
-        _LOG.info(f"Результат обновления записи: {uid=} {result=}")
+        _LOG.info("Результат обновления записи: uid=%r result=%r", uid, result)
 
     async def set_sign_used(
         self,
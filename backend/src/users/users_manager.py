@@ -8,15 +8,21 @@ from uuid import UUID
 from pydantic import EmailStr
 from pymongo.errors import DuplicateKeyError
 
-from src.users.users_manager_common import USERS
+from src.users.users_manager_common import (
+    SYSTEM_USER_IDS,
+    build_system_user,
+)
 from src.notifications.notifications_storage_models import (
     NotificationMessageChannel,
     NotificationMessageType,
 )
 from src.notifications.notifications_manager import NotificationManager
+from src.clients.mongo.create_models import PasswordHashData
 from src.sec.password import (
-    verify_password,
-    hash_password,
+    PasswordHashingBusyError,
+    hash_password_async,
+    verify_and_update_password_async,
+    verify_password_async,
 )
 from .users_storage_models import (
     UserToGet,
@@ -107,25 +113,25 @@ class UsersManager:
         try:
             await self.notification_manager.handle_notifications_on_user_registration(user.id)
         except Exception as e:
-            _LOG.error(f"Failed to send registration notifications for user {user.id}: {e}")
+            _LOG.error("Failed to send registration notifications for user %s: %s", user.id, e)
             # Не прерываем регистрацию, если уведомления не отправились
         return user
 
     async def create_system_users(
         self,
     ) -> None:
-        for role, data in USERS.items():
+        for role, user_id in SYSTEM_USER_IDS.items():
             try:
-                await self.users_storage.get(data.id)
+                await self.users_storage.get(user_id)
             except UsersStorageNoSuchUserException:
-                _LOG.info(f"Создаем системного пользователя {role=}")
+                _LOG.info("Создаем системного пользователя role=%r", role)
                 try:
                     await self.users_storage.add_system_user(
-                        data,
+                        await build_system_user(role),
                     )
                 except Exception as e:
-                    _LOG.error(f"Ошибка при создании системного пользователя {role}: {e}")
-            _LOG.debug(f"Системный пользователь {role=} уже создан")
+                    _LOG.error("Ошибка при создании системного пользователя %s: %s", role, e)
+            _LOG.debug("Системный пользователь role=%r уже создан", role)
 
     async def authenticate_user(
         self,
@@ -142,8 +148,7 @@ class UsersManager:
             password_data = await self.users_storage.get_password_hash_by_phone(phone)
             if password_data is None:
                 raise NoSuchUserError("Пользователь с таким телефоном не найден")
-            if not verify_password(password, password_data.password_hash):
-                raise AuthenticationError("Неверный пароль")
+            await self._check_password_and_rehash(password, password_data)
             user = await self.users_storage.get_by_phone(phone)
             if user is None:
                 raise NoSuchUserError(f"Пользователь с таким {phone=} не найден")
@@ -153,8 +158,7 @@ class UsersManager:
             password_data = await self.users_storage.get_password_hash_by_email(email)
             if password_data is None:
                 raise NoSuchUserError("Пользователь с таким email не найден")
-            if not verify_password(password, password_data.password_hash):
-                raise AuthenticationError("Неверный пароль")
+            await self._check_password_and_rehash(password, password_data)
             user = await self.users_storage.get_by_email(email)
             if user is None:
                 raise NoSuchUserError(f"Пользователь с таким {email=} не найден")
@@ -162,6 +166,33 @@ class UsersManager:
         else:
             raise AuthenticationError("Ошибка логики!")
 
+    async def _check_password_and_rehash(
+        self,
+        password: str,
+        password_data: PasswordHashData,
+    ):
+        """
+        Проверить пароль вне event loop. Если хеш посчитан с устаревшими параметрами,
+        прозрачно сохранить новый хеш.
+        """
+        try:
+            is_valid, new_password_hash = await verify_and_update_password_async(
+                password,
+                password_data.password_hash,
+            )
+        except PasswordHashingBusyError as e:
+            _LOG.error(e)
+            raise AuthenticationError(str(e))
+        if not is_valid:
+            raise AuthenticationError("Неверный пароль")
+        if new_password_hash:
+            _LOG.info("Обновляю параметры хеша пароля пользователя %s", password_data.id)
+            await self.users_storage.update_password(
+                actor_id=password_data.id,
+                uid=password_data.id,
+                password_hash=new_password_hash,
+            )
+
     async def get_user(
         self,
         actor_user_id: UUID,
@@ -361,11 +392,15 @@ class UsersManager:
         password_data = await self.users_storage.get_password_hash_by_id(user_id)
         if password_data is None:
             raise NoSuchUserError("Пользователь не найден")
-        if not verify_password(old_password, password_data.password_hash):
-            raise AuthenticationError("Действующий пароль введен неверно")
         if new_password == old_password:
             raise AuthenticationError("Новый пароль должен отличаться от старого")
-        password_hash = hash_password(new_password)
+        try:
+            if not await verify_password_async(old_password, password_data.password_hash):
+                raise AuthenticationError("Действующий пароль введен неверно")
+            password_hash = await hash_password_async(new_password)
+        except PasswordHashingBusyError as e:
+            _LOG.error(e)
+            raise AuthenticationError(str(e))
         await self.users_storage.update_password(
             actor_id=actor_user_id,
             uid=user_id,
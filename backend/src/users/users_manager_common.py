@@ -1,24 +1,30 @@
-from src.model import AppConfig
+from src.model import get_app_config
 from src.roles.roles_manager_models import UserRoleId
-from src.sec.password import hash_password
+from src.sec.password import hash_password_async
 from src.users.users_storage_models import UserToCreate
 
 
-APP_CONFIG = AppConfig()
+APP_CONFIG = get_app_config()
 
 system_user_id = APP_CONFIG.system_user_id
 
-USERS = {
-        UserRoleId.SYSTEM_USER: UserToCreate(
-            id=system_user_id,
-            created_by=system_user_id,
-            updated_by=system_user_id,
-            roles=[UserRoleId.SYSTEM_USER,],
-            name="System",
-            soname="System",
-            father_name="System",
-            phone="+79999991010",
-            email="system@rzd.energy",
-            password_hash=hash_password("12345678"),
-        ),
-    }
+SYSTEM_USER_IDS = {
+    UserRoleId.SYSTEM_USER: system_user_id,
+}
+
+
+async def build_system_user(role: UserRoleId) -> UserToCreate:
+    """Данные системного пользователя; пароль хешируется только когда пользователя нужно создать"""
+    user_id = SYSTEM_USER_IDS[role]
+    return UserToCreate(
+        id=user_id,
+        created_by=user_id,
+        updated_by=user_id,
+        roles=[role,],
+        name="System",
+        soname="System",
+        father_name="System",
+        phone="+79999991010",
+        email="system@rzd.energy",
+        password_hash=await hash_password_async("12345678"),
+    )
@@ -67,7 +67,7 @@ async def get_me(
             samesite="none" if request.app.state.config.secure_mode else "lax",
         )
         user_model = UserResponse.from_user(user)
-        _LOG.info(f"Получен пользователь: {user_model}")
+        _LOG.debug("Получен пользователь: %s", user_model.id)
         return UserApiResponse.success_response(data=user_model)
     except Exception as e:
         _LOG.error(e)
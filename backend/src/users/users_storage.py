@@ -15,17 +15,22 @@ from pydantic import EmailStr
 
 from src.clients.cache import cachedmethod
 from src.clients.mongo.client import MClient
+from src.model import RevisionsConfig
 from src.clients.mongo.create_models import (
     PasswordHashData,
     EmailApproveData,
     PhoneApproveData,
 )
 from src.misc.misc_lib import utc_now
+from src.revisions.revisions_storage import (
+    RevisionsStorage,
+    NoSuchRevisionError,
+)
 from src.roles.roles_manager_models import (
     UserRoleId,
     Roles,
 )
-from src.sec.password import hash_password
+from src.sec.password import hash_password_async
 from src.users.users_storage_models import (
     UserToCreate,
     UserToGet,
@@ -49,15 +54,17 @@ class UsersStorage:
     def __init__(
         self,
         mongo_client: MClient,
+        revisions_config: Optional[RevisionsConfig] = None,
     ):
         self.mongo_client: MClient = mongo_client
         self.collection_name: str = "users"
-        self.revisions_collection_name: str = f"{self.collection_name}_revisions"
-        self.collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
+        self.collection: AsyncIOMotorCollection = self.mongo_client.get_collection(
             self.collection_name,
         )
-        self.revisions_collection: AsyncIOMotorCollection = self.mongo_client.db.get_collection(
-            self.collection_name + "_revisions",
+        self.revisions: RevisionsStorage = RevisionsStorage(
+            self.mongo_client,
+            self.collection_name,
+            revisions_config,
         )
 
     async def add(
@@ -85,7 +92,7 @@ class UsersStorage:
             father_name=father_name,
             phone=phone,
             email=email,
-            password_hash=hash_password(password),
+            password_hash=await hash_password_async(password),
             email_approve_code=email_approve_code,
             phone_approve_code=phone_approve_code,
         )
@@ -154,8 +161,8 @@ class UsersStorage:
             },
             current_update_query,
         )
-        _LOG.info(f"Результат обновления пользователя: {uid=} {result=}")
-        await self.revisions_collection.insert_one(user.dict())
+        _LOG.info("Результат обновления пользователя: uid=%r result=%r", uid, result)
+        await self.revisions.add_revision(actor_id, user.model_dump())
 
     async def update_email_approve_code(self, actor_id: UUID, uid: UUID, code: str):
         query = {
@@ -174,43 +181,39 @@ class UsersStorage:
         await self.update_with_revision(actor_id, uid, query)
 
     async def get(self, uid: UUID) -> UserToGet:
-        _LOG.info(f"Запрашиваю пользователя по id: {uid}")
+        _LOG.debug("Запрашиваю пользователя по id: %s", uid)
         projection = {"_id": False}
         for key in UserToGet.model_fields:
             projection[key] = True
-        _LOG.info(f"{projection=}")
         data = await self.collection.find_one(
             {"id": uid},
             projection=projection,
         )
-        _LOG.debug(f"Полученные данные: {data}")
         if data:
             return UserToGet(**data)
-        _LOG.info(f"Пользователь не найден. {uid=}")
+        _LOG.debug("Пользователь не найден. uid=%r", uid)
         raise UsersStorageNoSuchUserException(f"Пользователь не найден. {uid=}")
 
     async def get_by_roles(self, role_ids: list[UserRoleId]) -> list[UserToCreate]:
-        _LOG.info(f"Запрашиваю пользователя по role_ids: {role_ids}")
+        _LOG.debug("Запрашиваю пользователя по role_ids: %s", role_ids)
         projection = {"_id": False}
         for key in UserToCreate.model_fields:
             projection[key] = True
-        _LOG.info(f"{projection=}")
         cursor = self.collection.find(
             {"roles": {"$in": role_ids}},
             projection=projection,
         )
         users: list[UserToCreate] = []
-        _LOG.info(f"Полученные данные: {len(users)=}")
+        _LOG.debug("Получено пользователей: %s", len(users))
         async for raw_user in cursor:
             users.append(UserToCreate(**raw_user))
         return users
 
     async def get_all(self) -> list[UserToGet]:
-        _LOG.info("Запрашиваю всех пользователей")
+        _LOG.debug("Запрашиваю всех пользователей")
         projection = {"_id": False}
         for key in UserToGet.model_fields:
             projection[key] = True
-        _LOG.info(f"{projection=}")
         cursor = self.collection.find(
             {},
             projection=projection,
@@ -227,31 +230,37 @@ class UsersStorage:
         )
         if result:
             return result["roles"]
-        _LOG.info(f"Пользователь не найден. {user_id=}")
+        _LOG.debug("Пользователь не найден. user_id=%r", user_id)
         raise UsersStorageNoSuchUserException(f"Пользователь не найден. {user_id=}")
 
+    async def get_existing_user_ids(self, user_ids: list[UUID]) -> set[UUID]:
+        _LOG.debug("Проверяю существование пользователей: %s шт.", len(user_ids))
+        cursor = self.collection.find(
+            {"id": {"$in": user_ids}},
+            projection={"_id": False, "id": True},
+        )
+        return {user["id"] async for user in cursor}
+
     @cachedmethod(lambda self: self._users_role_cache)
     async def get_user_roles_cached(self, user_id: UUID) -> list[UserRoleId]:
         return await self.get_user_roles(user_id)
 
     async def get_by_object_id(self, _id: ObjectId) -> UserToGet:
-        _LOG.info(f"Запрашиваю пользователя по ObjectID: {_id}")
+        _LOG.debug("Запрашиваю пользователя по ObjectID: %s", _id)
         projection = {"_id": False}
         for key in UserToGet.model_fields:
             projection[key] = True
-        _LOG.info(f"{projection=}")
         data = await self.collection.find_one(
             {"_id": _id},
             projection=projection,
         )
-        _LOG.debug(f"Полученные данные: {data}")
         if data:
             return UserToGet(**data)
-        _LOG.info(f"Пользователь не найден. {_id=}")
+        _LOG.debug("Пользователь не найден. _id=%r", _id)
         raise UsersStorageNoSuchUserException(f"Пользователь не найден. {_id=}")
 
     async def get_full(self, uid: UUID) -> UserToCreate:
-        _LOG.info(f"Запрашиваю пользователя по id: {uid}")
+        _LOG.debug("Запрашиваю пользователя по id: %s", uid)
         projection = {"_id": False}
         for key in UserToCreate.model_fields:
             projection[key] = True
@@ -259,28 +268,35 @@ class UsersStorage:
             {"id": uid},
             projection=projection,
         )
-        _LOG.debug(f"Полученные данные: {data}")
         if data:
             return UserToCreate(**data)
-        _LOG.info(f"Пользователь не найден. {uid=}")
+        _LOG.debug("Пользователь не найден. uid=%r", uid)
         raise UsersStorageNoSuchUserException(f"Пользователь не найден. {uid=}")
 
+    async def get_revision(self, uid: UUID, revision: int) -> UserToGet:
+        """Восстановить пользователя на заданной ревизии"""
+        try:
+            data = await self.revisions.get_revision(uid, revision)
+        except NoSuchRevisionError as e:
+            raise UsersStorageNoSuchUserException(str(e))
+        return UserToGet(**data)
+
     async def get_by_email(self, email: str) -> Optional[UserToGet]:
         result = await self.collection.find_one({"email": email})
         if result:
             return UserToGet(**result)
-        _LOG.info(f"Пользователь не найден. {email=}")
+        _LOG.debug("Пользователь не найден по email")
         return None
 
     async def get_by_phone(self, phone: str) -> UserToGet:
         result = await self.collection.find_one({"phone": phone})
         if result:
             return UserToGet(**result)
-        _LOG.info(f"Пользователь не найден. {phone=}")
+        _LOG.debug("Пользователь не найден по phone")
         raise UsersStorageNoSuchUserException(f"Пользователь не найден. {phone=}")
 
     async def get_password_hash_by_email(self, email: str) -> PasswordHashData:
-        _LOG.info(f"Запрашиваю по email: {email}")
+        _LOG.debug("Запрашиваю по email")
         projection = {"_id": False}
         for key in PasswordHashData.model_fields:
             projection[key] = True
@@ -288,14 +304,13 @@ class UsersStorage:
             {"email": email},
             projection=projection,
         )
-        _LOG.debug(f"Полученные данные: {data}")
         if data:
             return PasswordHashData(**data)
-        _LOG.info(f"Пользователь не найден. {email=}")
+        _LOG.debug("Пользователь не найден по email")
         raise UsersStorageNoSuchUserException(f"Пользователь не найден. {email=}")
 
     async def get_password_hash_by_phone(self, phone: str) -> PasswordHashData:
-        _LOG.info(f"Запрашиваю по phone: {phone}")
+        _LOG.debug("Запрашиваю по phone")
         projection = {"_id": False}
         for key in PasswordHashData.model_fields:
             projection[key] = True
@@ -303,14 +318,13 @@ class UsersStorage:
             {"phone": phone},
             projection=projection,
         )
-        _LOG.debug(f"Полученные данные: {data}")
         if data:
             return PasswordHashData(**data)
-        _LOG.info(f"Пользователь не найден. {phone=}")
+        _LOG.debug("Пользователь не найден по phone")
         raise UsersStorageNoSuchUserException(f"Пользователь не найден. {phone=}")
 
     async def get_password_hash_by_id(self, uid: UUID) -> PasswordHashData:
-        _LOG.info(f"Запрашиваю по id: {uid}")
+        _LOG.debug("Запрашиваю по id: %s", uid)
         projection = {"_id": False}
         for key in PasswordHashData.model_fields:
             projection[key] = True
@@ -318,14 +332,13 @@ class UsersStorage:
             {"id": uid},
             projection=projection,
         )
-        _LOG.debug(f"Полученные данные: {data}")
         if data:
             return PasswordHashData(**data)
-        _LOG.info(f"Пользователь не найден. {uid=}")
+        _LOG.debug("Пользователь не найден. uid=%r", uid)
         raise UsersStorageNoSuchUserException(f"Пользователь не найден. {uid=}")
 
     async def get_email_approve_data(self, uid: UUID) -> EmailApproveData:
-        _LOG.info(f"Запрашиваю по id: {uid}")
+        _LOG.debug("Запрашиваю по id: %s", uid)
         projection = {"_id": False}
         for key in EmailApproveData.model_fields:
             projection[key] = True
@@ -333,14 +346,13 @@ class UsersStorage:
             {"id": uid},
             projection=projection,
         )
-        _LOG.debug(f"Полученные данные: {data}")
         if data:
             return EmailApproveData(**data)
-        _LOG.info(f"Пользователь не найден. {uid=}")
+        _LOG.debug("Пользователь не найден. uid=%r", uid)
         raise UsersStorageNoSuchUserException(f"Пользователь не найден. {uid=}")
 
     async def get_phone_approve_data(self, uid: UUID) -> PhoneApproveData:
-        _LOG.info(f"Запрашиваю по id: {uid}")
+        _LOG.debug("Запрашиваю по id: %s", uid)
         projection = {"_id": False}
         for key in PhoneApproveData.model_fields:
             projection[key] = True
@@ -348,14 +360,13 @@ class UsersStorage:
             {"id": uid},
             projection=projection,
         )
-        _LOG.debug(f"Полученные данные: {data}")
         if data:
             return PhoneApproveData(**data)
-        _LOG.info(f"Пользователь не найден. {uid=}")
+        _LOG.debug("Пользователь не найден. uid=%r", uid)
         raise UsersStorageNoSuchUserException(f"Пользователь не найден. {uid=}")
 
     async def get_user_email(self, uid: UUID) -> str:
-        _LOG.info(f"Запрашиваю по id: {uid}")
+        _LOG.debug("Запрашиваю по id: %s", uid)
         projection = {"_id": False, "email": True}
         data = await self.collection.find_one(
             {"id": uid},
@@ -368,7 +379,7 @@ class UsersStorage:
         return data["email"]
 
     async def get_user_phone(self, uid: UUID) -> str:
-        _LOG.info(f"Запрашиваю по id: {uid}")
+        _LOG.debug("Запрашиваю по id: %s", uid)
         projection = {"_id": False, "phone": True}
         data = await self.collection.find_one(
             {"id": uid},
@@ -519,7 +530,7 @@ class UsersStorage:
         search_string: str,
         backoffice_only: bool = True
     ) -> list[UserToGet]:
-        _LOG.info(f"Поиск пользователей {search_string=} {backoffice_only=}")
+        _LOG.debug("Поиск пользователей backoffice_only=%r", backoffice_only)
         query = {}
         if backoffice_only:
             query["is_backoffice_user"] = True
@@ -536,7 +547,6 @@ class UsersStorage:
         projection = {"_id": False}
         for key in UserToGet.model_fields:
             projection[key] = True
-        _LOG.info(f"{projection=}")
         cursor = self.collection.find(
             query,
             projection=projection,
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Заполнение слов для поиска (search_tokens) у сообщений чатов, записанных до появления поиска.
+Обрабатываются только неудаленные сообщения без search_tokens, поэтому запуск можно повторять.
+
+Запуск из каталога backend:
+    python -m tools.backfill_chat_search_tokens --dry-run
+    python -m tools.backfill_chat_search_tokens --batch-size 500
+"""
+
+import argparse
+import asyncio
+import time
+
+from pymongo import UpdateOne
+
+from src.chats.chats_search import tokenize
+from src.clients.mongo.client import MClient
+from src.model import get_app_config
+
+
+async def main(args: argparse.Namespace):
+    app_config = get_app_config()
+    mongo_client = MClient(app_config.mongo_config)
+    max_tokens = app_config.chat_search_config.max_tokens
+    collection = mongo_client.get_collection("chat_messages")
+    try:
+        started = time.perf_counter()
+        updated = 0
+        batch = []
+        cursor = collection.find(
+            {"search_tokens": {"$exists": False}, "is_deleted": False},
+            {"_id": True, "content": True},
+            batch_size=args.batch_size,
+        )
+        async for message in cursor:
+            tokens = tokenize(message.get("content") or "", max_tokens)
+            batch.append(
+                UpdateOne(
+                    {"_id": message["_id"], "search_tokens": {"$exists": False}},
+                    {"$set": {"search_tokens": tokens}},
+                ),
+            )
+            updated += 1
+            if len(batch) >= args.batch_size:
+                if not args.dry_run:
+                    await collection.bulk_write(batch, ordered=False)
+                batch = []
+        if batch and not args.dry_run:
+            await collection.bulk_write(batch, ordered=False)
+        action = "к заполнению" if args.dry_run else "заполнено"
+        print(f"chat_messages  {action}: {updated:<8} за {time.perf_counter() - started:6.1f} с")
+    finally:
+        mongo_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Заполнение слов для поиска по сообщениям чатов")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Документов в одном bulk_write")
+    parser.add_argument("--dry-run", action="store_true", help="Только посчитать документы")
+    asyncio.run(main(parser.parse_args()))
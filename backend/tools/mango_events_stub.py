@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Заглушка Mango Office: отправляет в локальный сервер подписанные уведомления
+о входящем звонке (events/call: Appeared -> Connected -> Disconnected, затем events/summary).
+Ключ и соль должны совпадать с активной интеграцией телефонии.
+
+Запуск из каталога backend:
+    python -m tools.mango_events_stub --vpbx-api-key KEY --vpbx-api-salt SALT \\
+        --client-number 79001234567 --employee-number 79007654321
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+
+import httpx
+
+
+def _signed_form(vpbx_api_key: str, vpbx_api_salt: str, payload: dict) -> dict:
+    json_data = json.dumps(payload, separators=(",", ":"))
+    sign = hashlib.sha256(f"{vpbx_api_key}{json_data}{vpbx_api_salt}".encode()).hexdigest()
+    return {
+        "vpbx_api_key": vpbx_api_key,
+        "sign": sign,
+        "json": json_data,
+    }
+
+
+async def main(args: argparse.Namespace):
+    entry_id = uuid.uuid4().hex
+    call_id = uuid.uuid4().hex
+    client_side = {"number": args.client_number}
+    employee_side = {"extension": args.extension, "number": args.employee_number}
+    started = int(time.time())
+
+    events = [
+        ("call", {"call_state": "Appeared", "location": "abonent"}),
+        ("call", {"call_state": "Connected", "location": "abonent"}),
+        ("call", {"call_state": "Disconnected", "location": "abonent", "disconnect_reason": 1110}),
+    ]
+    async with httpx.AsyncClient(base_url=args.url) as client:
+        for seq, (event_name, fields) in enumerate(events, start=1):
+            payload = {
+                "entry_id": entry_id,
+                "call_id": call_id,
+                "timestamp": int(time.time()),
+                "seq": seq,
+                "from": client_side,
+                "to": employee_side,
+                **fields,
+            }
+            response = await client.post(
+                f"/integrations/telephony/mango-office/events/{event_name}",
+                data=_signed_form(args.vpbx_api_key, args.vpbx_api_salt, payload),
+            )
+            print(f"events/{event_name} {fields['call_state']:<12} -> {response.status_code} {response.text}")
+            await asyncio.sleep(args.delay)
+
+        summary = {
+            "entry_id": entry_id,
+            "call_direction": 1,
+            "from": client_side,
+            "to": employee_side,
+            "create_time": started,
+            "forward_time": started,
+            "talk_time": started + 1,
+            "end_time": int(time.time()),
+            "entry_result": 1,
+            "disconnect_reason": 1110,
+        }
+        response = await client.post(
+            "/integrations/telephony/mango-office/events/summary",
+            data=_signed_form(args.vpbx_api_key, args.vpbx_api_salt, summary),
+        )
+        print(f"events/summary              -> {response.status_code} {response.text}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Заглушка уведомлений Mango Office")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Адрес локального сервера")
+    parser.add_argument("--vpbx-api-key", required=True, help="VPBX API ключ интеграции")
+    parser.add_argument("--vpbx-api-salt", required=True, help="Соль VPBX API ключа интеграции")
+    parser.add_argument("--client-number", default="79001234567", help="Номер звонящего клиента")
+    parser.add_argument("--employee-number", default="79007654321", help="Номер сотрудника (телефон пользователя CRM)")
+    parser.add_argument("--extension", default="101", help="Внутренний номер сотрудника")
+    parser.add_argument("--delay", type=float, default=1.0, help="Пауза между уведомлениями, секунды")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+Перевод чатов со строковой схемы (model_dump(mode="json")) на бинарные UUID и BSON datetime.
+Переводятся только документы, у которых id еще строка, поэтому запуск можно повторять.
+
+Порядок перевода без простоя:
+    1. Развернуть версию с бинарными UUID с CHATS_LEGACY_STRING_IDS=true (по умолчанию):
+       чаты и сообщения ищутся и по бинарным, и по строковым UUID.
+    2. Запустить перевод (повторить, если старая версия еще писала во время развертывания).
+    3. Убедиться, что --dry-run ничего не находит, и выставить CHATS_LEGACY_STRING_IDS=false.
+
+Запуск из каталога backend:
+    python -m tools.migrate_chats_binary_uuids --dry-run
+    python -m tools.migrate_chats_binary_uuids --batch-size 500
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import time
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+)
+from uuid import UUID
+
+from pymongo import UpdateOne
+
+from src.clients.mongo.client import MClient
+from src.model import get_app_config
+
+
+# Поля документов: (UUID, списки UUID, даты)
+CHATS_FIELDS = (
+    ("id", "created_by", "deal_id", "buyer_id"),
+    (),
+    ("created_at", "updated_at", "last_message_at"),
+)
+MESSAGES_FIELDS = (
+    ("id", "chat_id", "sender_id"),
+    ("read_by",),
+    ("created_at", "updated_at"),
+)
+PARTICIPANT_FIELDS = (
+    ("user_id",),
+    (),
+    ("joined_at", "last_read_at"),
+)
+
+
+def _to_uuid(value: Any) -> Any:
+    return UUID(value) if isinstance(value, str) else value
+
+
+def _to_datetime(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    # pydantic записывал UTC с суффиксом Z
+    parsed = dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt.timezone.utc)
+    return parsed
+
+
+def convert_fields(document: Dict[str, Any], fields) -> Dict[str, Any]:
+    """Измененные поля документа в бинарной схеме"""
+    uuid_fields, uuid_list_fields, datetime_fields = fields
+    changes = {}
+    for name in uuid_fields:
+        if isinstance(document.get(name), str):
+            changes[name] = _to_uuid(document[name])
+    for name in uuid_list_fields:
+        values = document.get(name)
+        if isinstance(values, list) and any(isinstance(value, str) for value in values):
+            changes[name] = [_to_uuid(value) for value in values]
+    for name in datetime_fields:
+        if isinstance(document.get(name), str):
+            changes[name] = _to_datetime(document[name])
+    return changes
+
+
+def convert_chat(document: Dict[str, Any]) -> Dict[str, Any]:
+    changes = convert_fields(document, CHATS_FIELDS)
+    participants = document.get("participants")
+    if isinstance(participants, list):
+        converted = [
+            {**participant, **convert_fields(participant, PARTICIPANT_FIELDS)}
+            for participant in participants
+        ]
+        if converted != participants:
+            changes["participants"] = converted
+    return changes
+
+
+def convert_message(document: Dict[str, Any]) -> Dict[str, Any]:
+    return convert_fields(document, MESSAGES_FIELDS)
+
+
+async def migrate_collection(
+    collection,
+    convert,
+    batch_size: int,
+    dry_run: bool,
+) -> int:
+    """Перевести документы со строковым id пачками; возвращает количество переведенных"""
+    migrated = 0
+    batch = []
+
+    async def flush(requests: Iterable[UpdateOne]):
+        requests = list(requests)
+        if requests and not dry_run:
+            await collection.bulk_write(requests, ordered=False)
+
+    cursor = collection.find({"id": {"$type": "string"}}, batch_size=batch_size)
+    async for document in cursor:
+        changes = convert(document)
+        if not changes:
+            continue
+        # Условие на строковый id: документ, уже переведенный параллельным запуском, не трогаем
+        batch.append(UpdateOne({"_id": document["_id"], "id": document["id"]}, {"$set": changes}))
+        migrated += 1
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    await flush(batch)
+    return migrated
+
+
+async def main(args: argparse.Namespace):
+    mongo_client = MClient(get_app_config().mongo_config)
+    try:
+        for name, convert in (
+            ("chats", convert_chat),
+            ("chat_messages", convert_message),
+        ):
+            started = time.perf_counter()
+            migrated = await migrate_collection(
+                mongo_client.get_collection(name),
+                convert,
+                batch_size=args.batch_size,
+                dry_run=args.dry_run,
+            )
+            action = "к переводу" if args.dry_run else "переведено"
+            print(f"{name:<14} {action}: {migrated:<8} за {time.perf_counter() - started:6.1f} с")
+    finally:
+        mongo_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перевод чатов на бинарные UUID и BSON datetime")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Документов в одном bulk_write")
+    parser.add_argument("--dry-run", action="store_true", help="Только посчитать документы")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Микробенчмарк проверки паролей: сравнивает синхронную проверку в event loop
+и проверку через PasswordHasher (ограниченный пул потоков).
+
+Запуск из каталога backend:
+    python -m tools.password_hashing_benchmark --logins 50 --workers 4
+"""
+
+import argparse
+import asyncio
+import secrets
+import time
+
+from src.model import PasswordHashingConfig
+from src.sec.password import PasswordHasher
+
+
+async def _measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Максимальная задержка event loop: насколько позже положенного просыпается таймер"""
+    max_lag = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, time.perf_counter() - started - interval)
+    return max_lag
+
+
+async def _run_scenario(name: str, logins: int, verify) -> None:
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_measure_loop_lag(stop))
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(verify() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    max_lag = await lag_task
+    print(
+        f"{name:<12} логинов: {logins:<5} всего: {elapsed * 1000:8.1f} мс"
+        f"  на логин: {elapsed / logins * 1000:6.2f} мс"
+        f"  макс. задержка event loop: {max_lag * 1000:8.1f} мс",
+    )
+
+
+async def main(args: argparse.Namespace):
+    config = PasswordHashingConfig(
+        rounds=args.rounds,
+        max_workers=args.workers,
+        max_concurrency=max(args.logins, 1),
+        acquire_timeout=60,
+    )
+    hasher = PasswordHasher(config)
+    # Стоимость проверки не зависит от пароля - берем случайный
+    password = secrets.token_urlsafe(16)
+    password_hash = hasher.context.hash(password)
+
+    async def verify_blocking():
+        hasher.context.verify(password, password_hash)
+
+    async def verify_offloaded():
+        await hasher.verify(password, password_hash)
+
+    print(f"pbkdf2_sha256, раундов: {config.rounds}, потоков: {config.max_workers}")
+    await _run_scenario("в loop", args.logins, verify_blocking)
+    await _run_scenario("в пуле", args.logins, verify_offloaded)
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк проверки паролей")
+    parser.add_argument("--logins", type=int, default=50, help="Количество одновременных логинов")
+    parser.add_argument("--workers", type=int, default=4, help="Размер пула потоков")
+    parser.add_argument("--rounds", type=int, default=PasswordHashingConfig().rounds, help="Раунды pbkdf2")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,49 @@
+import type { AxiosResponse } from 'axios'
+
+import httpClient from '@/helpers/httpClient'
+import type { TelephonyReport } from '@/types/telephony'
+import { sleep } from '@/utils/promise'
+
+export interface TelephonyReportApiResponse {
+  status: boolean
+  data?: TelephonyReport
+  message?: {
+    text?: string
+    errors?: Array<{ code: number; text: string }>
+  }
+}
+
+// Опрос задачи отчета: первая пауза, ее предел (пауза растет вдвое) и общее время ожидания, мс
+const POLL_INITIAL_DELAY = 500
+const POLL_MAX_DELAY = 5000
+const POLL_TIMEOUT = 150000
+
+const isPending = (report?: TelephonyReport) =>
+  !!report?.job_id && (report.status === 'pending' || report.status === 'running')
+
+/**
+ * Если бэкенд не успел сформировать отчет за время запроса, он отвечает 202 с задачей.
+ * Опрашиваем /reports/{job_id}, пока задача не завершится, и возвращаем ответ с готовым отчетом.
+ */
+export const waitForTelephonyReport = async (
+  response: TelephonyReportApiResponse,
+): Promise<TelephonyReportApiResponse> => {
+  let current = response
+  let delay = POLL_INITIAL_DELAY
+  const deadline = Date.now() + POLL_TIMEOUT
+  while (current.status && isPending(current.data)) {
+    if (Date.now() >= deadline) {
+      return {
+        status: false,
+        message: { text: 'Отчет телефонии не сформирован вовремя, попробуйте позже' },
+      }
+    }
+    await sleep(delay)
+    delay = Math.min(delay * 2, POLL_MAX_DELAY)
+    const pollResponse: AxiosResponse<TelephonyReportApiResponse> = await httpClient.get(
+      `/integrations/telephony/reports/${current.data?.job_id}`,
+    )
+    current = pollResponse.data
+  }
+  return current
+}
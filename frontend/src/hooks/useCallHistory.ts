@@ -3,20 +3,9 @@ import type { AxiosResponse } from 'axios'
 
 import { useNotificationContext } from '@/context/useNotificationContext'
 import httpClient from '@/helpers/httpClient'
+import { waitForTelephonyReport, type TelephonyReportApiResponse } from '@/helpers/telephonyReports'
 import type { CallInfo, CallHistoryParams } from '@/types/telephony'
 
-interface CallHistoryApiResponse {
-  status: boolean
-  data?: {
-    calls: CallInfo[]
-    total: number
-  }
-  message?: {
-    text?: string
-    errors?: Array<{ code: number; text: string }>
-  }
-}
-
 export const useCallHistory = (params?: CallHistoryParams, autoFetch: boolean = false) => {
   const [calls, setCalls] = useState<CallInfo[]>([])
   const [loading, setLoading] = useState(false)
@@ -31,21 +20,22 @@ export const useCallHistory = (params?: CallHistoryParams, autoFetch: boolean =
       
       try {
         const requestParams = fetchParams || params || {}
-        const response: AxiosResponse<CallHistoryApiResponse> = await httpClient.post(
+        const response: AxiosResponse<TelephonyReportApiResponse> = await httpClient.post(
           '/integrations/telephony/call-history',
           requestParams,
         )
+        const report = await waitForTelephonyReport(response.data)
 
-        if (response.data.status && response.data.data) {
-          const callList = response.data.data.calls || []
+        if (report.status && report.data) {
+          const callList = report.data.calls || []
           setCalls(callList)
-          setTotal(response.data.data.total || callList.length)
+          setTotal(report.data.total || callList.length)
           return callList
         } else {
-          const errors = response.data.message?.errors || []
+          const errors = report.message?.errors || []
           const errorMessage = errors.length > 0
             ? errors.map((err) => err.text).join('. ')
-            : response.data.message?.text || 'Ошибка при получении истории звонков'
+            : report.message?.text || 'Ошибка при получении истории звонков'
           setError(errorMessage)
           showNotification({ message: errorMessage, variant: 'danger' })
           return []
@@ -3,19 +3,9 @@ import type { AxiosResponse } from 'axios'
 
 import { useNotificationContext } from '@/context/useNotificationContext'
 import httpClient from '@/helpers/httpClient'
+import { waitForTelephonyReport, type TelephonyReportApiResponse } from '@/helpers/telephonyReports'
 import type { CallStatistic, StatisticsParams } from '@/types/telephony'
 
-interface StatisticsApiResponse {
-  status: boolean
-  data?: {
-    statistics: CallStatistic
-  }
-  message?: {
-    text?: string
-    errors?: Array<{ code: number; text: string }>
-  }
-}
-
 export const useCallStatistics = () => {
   const [statistics, setStatistics] = useState<CallStatistic | null>(null)
   const [loading, setLoading] = useState(false)
@@ -28,20 +18,21 @@ export const useCallStatistics = () => {
       setError(null)
       
       try {
-        const response: AxiosResponse<StatisticsApiResponse> = await httpClient.post(
+        const response: AxiosResponse<TelephonyReportApiResponse> = await httpClient.post(
           '/integrations/telephony/statistics',
           params,
         )
+        const report = await waitForTelephonyReport(response.data)
 
-        if (response.data.status && response.data.data?.statistics) {
-          const stats = response.data.data.statistics
+        if (report.status && report.data?.statistics) {
+          const stats = report.data.statistics
           setStatistics(stats)
           return stats
         } else {
-          const errors = response.data.message?.errors || []
+          const errors = report.message?.errors || []
           const errorMessage = errors.length > 0
             ? errors.map((err) => err.text).join('. ')
-            : response.data.message?.text || 'Ошибка при получении статистики'
+            : report.message?.text || 'Ошибка при получении статистики'
           setError(errorMessage)
           showNotification({ message: errorMessage, variant: 'danger' })
           return null
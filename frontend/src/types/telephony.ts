@@ -33,6 +33,19 @@ export interface CallStatistic {
   failed_calls: number
 }
 
+export type TelephonyReportStatus = 'pending' | 'running' | 'completed' | 'failed'
+
+// Отчет Mango Office: готовый (calls/total или statistics) или задача, которую нужно опрашивать
+export interface TelephonyReport {
+  job_id?: string | null
+  report_type: 'call_history' | 'statistics'
+  status: TelephonyReportStatus
+  error?: string | null
+  calls?: CallInfo[] | null
+  total?: number | null
+  statistics?: CallStatistic | null
+}
+
 export interface MakeCallParams {
   from_number: string
   to_number: string